@@ -0,0 +1,148 @@
+"""
+Listing chats of a user with many chats in the memory backend.
+
+One user has `--chats` dialogs (10k by default) and a few conferences, one
+of which is large enough to be read when listed instead of being moved
+on each message. Messages are sent to random chats, then the first and
+deep pages of the chat list are requested; each page is checked against
+sorting all chats of the user, time of that sorting is reported too.
+Costs of sending and of deleting the last message are reported as well.
+Output is JSON with sorted keys.
+
+Usage: python -m benchmarks.chat_list [--chats N] [--messages N]
+                                      [--rounds N] [--seed N] [--output FILE]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import time
+
+from microchat.core.entities import ConferenceParticipation, Dialog, User
+from microchat.storages.memory import MemoryDatabase
+from microchat.storages.memory.chat_list import MAX_FOLLOWERS
+from microchat.storages.memory.entities import MemoryConference, MessageLog
+from microchat.storages.memory.storages import MemoryChatsStorage
+
+
+SCHEMA_VERSION = 1
+
+CONFERENCES = 20
+PAGE_SIZE = 20
+DEEP_OFFSET = 1_000
+
+Chat = Dialog | ConferenceParticipation[User]
+
+
+def log_of(chat: Chat) -> MessageLog:
+    related = chat.related
+    if isinstance(related, MemoryConference):
+        return related.log
+    return chat.log  # type: ignore
+
+
+async def run(
+    chats: int, messages: int, rounds: int, seed: int
+) -> dict[str, object]:
+    rng = random.Random(seed)
+    db = MemoryDatabase()
+    storage = MemoryChatsStorage(db)
+    user = db.create_user("owner", "benchmark")
+    others = [db.create_user(f"user{no}", "benchmark") for no in range(chats)]
+    for other in others:
+        db.dialog(user, other)
+    for no in range(CONFERENCES):
+        conference = db.create_conference(others[no], f"conference{no}", "")
+        db.join(conference, user)
+    large = db.create_conference(others[0], "large", "")
+    for other in others[1:MAX_FOLLOWERS + 1]:
+        db.join(large, other)
+    db.join(large, user)
+    relations = db.user_chats(user)
+
+    started = time.perf_counter()
+    for _ in range(messages):
+        chat = rng.choice(relations)
+        await storage.add_message(user, chat, "message", None, None)  # type: ignore  # noqa
+    send = (time.perf_counter() - started) / max(messages, 1)
+
+    removed = rng.sample(relations, min(len(relations), 1_000))
+    started = time.perf_counter()
+    for chat in removed:
+        log = log_of(chat)  # type: ignore
+        if log.latest >= 0:
+            await storage.remove_message(log.message(log.latest))
+    remove = (time.perf_counter() - started) / len(removed)
+
+    pages: dict[str, object] = {}
+    verified = True
+    sort_timings = []
+    for name, offset in ("first", 0), ("deep", DEEP_OFFSET):
+        timings = []
+        page: list[Chat] = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            page = await storage.get_user_chats(user, offset, PAGE_SIZE)
+            timings.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        since = db.chat_lists[user.id].since
+        expected = sorted(
+            db.user_chats(user),
+            key=lambda chat: (
+                max(log_of(chat).last_activity, since[chat.related.id]),  # type: ignore  # noqa
+                chat.related.id
+            ),
+            reverse=True
+        )[offset:offset + PAGE_SIZE]
+        sort_timings.append(time.perf_counter() - started)
+        verified &= [chat.related.id for chat in page] == \
+            [chat.related.id for chat in expected]
+        pages[name] = {
+            "offset": offset,
+            "median_us": _us(statistics.median(timings)),
+            "max_us": _us(max(timings)),
+        }
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "parameters": {
+            "chats": chats, "messages": messages, "rounds": rounds,
+            "seed": seed, "page_size": PAGE_SIZE,
+        },
+        "pages": pages,
+        "sort_all_us": _us(statistics.median(sort_timings)),
+        "send_us": _us(send),
+        "remove_last_us": _us(remove),
+        "verified": verified,
+        "environment": {"python": platform.python_version()},
+    }
+
+
+def _us(seconds: float) -> float:
+    return round(seconds * 1e6, 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chats", type=int, default=10_000)
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="-", help="file, '-' is stdout")
+    args = parser.parse_args()
+    results = asyncio.run(
+        run(args.chats, args.messages, args.rounds, args.seed)
+    )
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output == "-":
+        print(output)
+    else:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Seeded data set for end-to-end benchmarks.
+
+Sizes are given for scale 1.0 and are multiplied by `scale`, so the same
+data set shape can be used for quick runs (e.g. scale 0.01) and full ones.
+"""
+from __future__ import annotations
+
+import random
+
+from dataclasses import dataclass, field
+
+from microchat.core.types import AudiosMIME, MIMEType
+from microchat.core.entities import Media
+from microchat.storages.memory import MemoryDatabase
+from microchat.storages.memory.entities import MemoryConference, MemoryUser
+from microchat.storages.memory.entities import MessageLog
+
+
+PASSWORD = "benchmark"
+
+USERS = 50_000
+CONFERENCES = {"small": 10, "medium": 1_000, "large": 50_000}
+CONFERENCE_MESSAGES = 10_000
+DIALOG_MESSAGES = 1_000_000
+DIALOGS = 1_000  # dialogs of the first user, makes its chats list long
+MEDIA_SIZE = 256 * 1024
+EPOCH = 1_600_000_000.0  # seeded messages are sent since, for stable data
+
+WORDS = (
+    "hello world message chat conference media upload download event "
+    "stream latency throughput memory answer question today tomorrow"
+).split()
+
+
+@dataclass
+class Dataset:
+    db: MemoryDatabase
+    users: list[MemoryUser]
+    conferences: dict[str, MemoryConference]
+    dialog_messages: int
+    media: Media
+    sizes: dict[str, int] = field(default_factory=dict)
+
+
+def seed(scale: float = 1.0, seed: int = 0) -> Dataset:
+    rng = random.Random(seed)
+    db = MemoryDatabase()
+    # texts are taken from a pool: seeding must not be dominated by text
+    # generation, while lengths of texts still vary as in real chats
+    texts = [
+        " ".join(rng.choices(WORDS, k=rng.randint(1, 24)))
+        for _ in range(1024)
+    ]
+
+    users_count = max(int(USERS * scale), 20)
+    users = [
+        db.create_user(f"user{no}", PASSWORD, f"User {no}")
+        for no in range(users_count)
+    ]
+    owner = users[0]
+
+    conferences = {}
+    sizes = {"users": users_count}
+    for name, size in CONFERENCES.items():
+        members = min(max(int(size * scale), 2), users_count)
+        conference = db.create_conference(owner, f"{name}_conference", name)
+        for user in users[1:members]:
+            db.join(conference, user)
+        _fill(
+            db, conference.log, users[:members], texts, rng,
+            max(int(CONFERENCE_MESSAGES * scale), 100)
+        )
+        conferences[name] = conference
+        sizes[f"{name}_conference_members"] = members
+
+    dialog_messages = max(int(DIALOG_MESSAGES * scale), 100)
+    dialog = db.dialog(owner, users[1])
+    _fill(db, dialog.log, users[:2], texts, rng, dialog_messages)
+    sizes["dialog_messages"] = dialog_messages
+
+    dialogs = min(max(int(DIALOGS * scale), 10), users_count - 2)
+    for user in users[2:2+dialogs]:
+        chat = db.dialog(owner, user)
+        _fill(db, chat.log, [owner, user], texts, rng, 1)
+    sizes["first_user_chats"] = len(db.user_chats(owner))
+
+    content = rng.randbytes(MEDIA_SIZE)
+    media = db.store_file(
+        owner, "seed.ogg", (MIMEType.AUDIO, AudiosMIME.OGG), content
+    )
+    return Dataset(db, users, conferences, dialog_messages, media, sizes)
+
+
+def _fill(
+    db: MemoryDatabase,
+    log: MessageLog,
+    senders: list[MemoryUser],
+    texts: list[str],
+    rng: random.Random,
+    count: int
+) -> None:
+    for no in range(count):
+        log.append(
+            db.next_message_id(), rng.choice(senders), rng.choice(texts),
+            sent=EPOCH + no
+        )
@@ -0,0 +1,231 @@
+"""
+Directory search of users, bots and conferences of the memory backend.
+
+`--accounts` users (1M by default) with Latin and Cyrillic names and
+surnames are registered together with bots and conferences, then queries
+which a user picker makes while one types are run: one, two and three
+letters, aliases and their prefixes, names, full names, substrings of
+surnames, other case and misses. Each query is checked against a scan of
+all entities: every result must match, and all matches must be found when
+there are fewer of them than a page. Cost of registration, renaming and
+removal and memory are reported too. Output is JSON with sorted keys.
+
+Usage: python -m benchmarks.directory [--accounts N] [--rounds N]
+                                      [--seed N] [--output FILE]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import time
+
+from microchat.core.entities import User, Bot, Conference
+from microchat.storages.memory import MemoryDatabase
+from microchat.storages.memory.search import normalize
+from microchat.storages.memory.storages import MemoryEntitiesStorage
+
+from .load import rss_mb
+from .search import CYRILLIC, LATIN
+
+
+SCHEMA_VERSION = 1
+
+NAMES = 2_000
+SURNAMES = 20_000
+BOTS_SHARE = 0.005
+CONFERENCES_SHARE = 0.01
+PAGE_SIZE = 20
+UPDATES = 10_000
+
+Agent = User | Bot | Conference
+KINDS: tuple[type[Agent], ...] = (User, Bot, Conference)
+
+
+class Accounts:
+
+    def __init__(self, accounts: int, seed: int) -> None:
+        self.rng = random.Random(seed)
+        self.db = MemoryDatabase()
+        self.names = self._words(NAMES, 2, 3)
+        self.surnames = self._words(SURNAMES, 3, 5)
+        self.users: list[User] = []
+        self.conferences: list[Conference] = []
+        started = time.perf_counter()
+        self._register(accounts)
+        self.register_seconds = time.perf_counter() - started
+
+    def _words(self, count: int, shortest: int, longest: int) -> list[str]:
+        rng = self.rng
+        words: set[str] = set()
+        while len(words) < count:
+            syllables = rng.choice((LATIN, CYRILLIC))
+            word = "".join(rng.choices(
+                syllables, k=rng.randint(shortest, longest)
+            ))
+            words.add(word.capitalize())
+        return sorted(words)
+
+    def _register(self, accounts: int) -> None:
+        rng, db = self.rng, self.db
+        for no in range(accounts):
+            name = rng.choice(self.names)
+            surname = rng.choice(self.surnames)
+            alias = f"{''.join(rng.choices(LATIN, k=3))}{no}"
+            user = db.create_user(alias, "benchmark", name, surname)
+            self.users.append(user)
+            if rng.random() < BOTS_SHARE:
+                db.create_bot(user, f"{alias}_bot", f"{name} bot")
+            if rng.random() < CONFERENCES_SHARE:
+                conference = db.create_conference(
+                    user, f"{alias}_chat", f"{surname} {rng.choice(self.names)}",  # noqa
+                    private=rng.random() < 0.5
+                )
+                self.conferences.append(conference)
+
+
+def matches(entity: Agent, query: str) -> bool:
+    query = " ".join(normalize(query).split())
+    fields = [entity.alias, entity.title]
+    if isinstance(entity, User):
+        fields += [entity.name, f"{entity.name} {entity.surname}"]
+        fields.append(entity.surname or "")
+    for field in fields:
+        value = " ".join(normalize(field).split())
+        if value.startswith(query) or any(
+            word.startswith(query) for word in value.split()
+        ):
+            return True
+        if len(query) >= 3 and query in value:
+            return True
+    return False
+
+
+def queries(accounts: Accounts) -> dict[str, tuple[str, tuple[type[Agent], ...]]]:  # noqa
+    rng = accounts.rng
+    user = rng.choice(accounts.users)
+    other = rng.choice(accounts.users)
+    public = [item for item in accounts.conferences if not item.private]
+    conference = rng.choice(public) if public else accounts.conferences[0]
+    surname = other.surname or ""
+    return {
+        "one_letter": (user.alias[:1], KINDS),
+        "two_letters": (user.alias[:2], KINDS),
+        "three_letters": (user.name[:3], KINDS),
+        "exact_alias": (user.alias, KINDS),
+        "alias_prefix": (user.alias[:-1], KINDS),
+        "name": (user.name, KINDS),
+        "full_name": (f"{other.name} {surname[:3]}", KINDS),
+        "surname_substring": (surname[1:5], KINDS),
+        "other_case": (other.name.upper(), KINDS),
+        "conference_title": (conference.title.split()[0], (Conference,)),
+        "missing": ("qqqzzz", KINDS),
+    }
+
+
+async def run_queries(
+    accounts: Accounts, storage: MemoryEntitiesStorage, rounds: int
+) -> tuple[dict[str, object], bool]:
+    results: dict[str, object] = {}
+    verified = True
+    everything = list(accounts.db.directory.entities.values())
+    for name, (query, kinds) in queries(accounts).items():
+        timings = []
+        found: list[Agent] = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            found = await storage.search(query, kinds, PAGE_SIZE)
+            timings.append(time.perf_counter() - started)
+        expected = [
+            entity for entity in everything
+            if isinstance(entity, kinds) and matches(entity, query)
+        ]
+        verified &= all(matches(entity, query) for entity in found)
+        if len(expected) <= PAGE_SIZE:
+            verified &= {id(item) for item in found} == \
+                {id(item) for item in expected}
+        timings.sort()
+        results[name] = {
+            "query": query,
+            "found": len(found),
+            "matching": len(expected),
+            "median_us": _us(statistics.median(timings)),
+            "p95_us": _us(timings[min(int(rounds * 0.95), rounds - 1)]),
+        }
+    return results, verified
+
+
+async def run_updates(
+    accounts: Accounts, storage: MemoryEntitiesStorage
+) -> dict[str, float]:
+    rng = accounts.rng
+    users = rng.sample(accounts.users, min(UPDATES, len(accounts.users)))
+    started = time.perf_counter()
+    for no, user in enumerate(users):
+        await storage.edit_entity(user, {
+            "alias": f"renamed{no}", "name": rng.choice(accounts.names)
+        })
+    rename = time.perf_counter() - started
+    started = time.perf_counter()
+    for user in users:
+        await storage.remove_entity(user)
+    remove = time.perf_counter() - started
+    return {
+        "rename_us": _us(rename / max(len(users), 1)),
+        "remove_us": _us(remove / max(len(users), 1)),
+    }
+
+
+async def run(accounts_count: int, rounds: int, seed: int) -> dict[str, object]:  # noqa
+    accounts = Accounts(accounts_count, seed)
+    storage = MemoryEntitiesStorage(accounts.db)
+    query_results, verified = await run_queries(accounts, storage, rounds)
+    directory = accounts.db.directory
+    listed = len(directory.entities)
+    rss = rss_mb()
+    updates = await run_updates(accounts, storage)
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "parameters": {
+            "accounts": accounts_count, "rounds": rounds, "seed": seed,
+            "page_size": PAGE_SIZE,
+        },
+        "build": {
+            "listed": listed,
+            "register_us": _us(accounts.register_seconds / listed),
+            "prefix_keys": len(directory.keys),
+            "trigrams": len(directory.trigrams),
+            "rss_mb": rss,
+        },
+        "queries": query_results,
+        "updates": updates,
+        "verified": verified,
+        "environment": {"python": platform.python_version()},
+    }
+
+
+def _us(seconds: float) -> float:
+    return round(seconds * 1e6, 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--accounts", type=int, default=1_000_000)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="-", help="file, '-' is stdout")
+    args = parser.parse_args()
+    results = asyncio.run(run(args.accounts, args.rounds, args.seed))
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output == "-":
+        print(output)
+    else:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
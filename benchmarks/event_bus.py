@@ -0,0 +1,241 @@
+"""
+Cross-process delivery of events over the events bus.
+
+Runs the events broker and a publishing BusClient in this process and
+`--subscribers` worker processes with their own BusClient and EventStream.
+Events are published in two phases:
+
+- latency: events are published one by one with a pause between them, so
+  every event is sent in its own frame;
+- burst: events are published back to back, so they are batched.
+
+For each phase delivery latency percentiles (publish to delivery to the
+subscriber's queue) and throughput are reported, as well as size and speed
+of the event codec compared to pickle. Output is JSON with sorted keys.
+
+Usage: python -m benchmarks.event_bus [--events N] [--subscribers N]
+                                      [--interval SEC] [--output FILE]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import functools
+import json
+import multiprocessing
+import pickle
+import platform
+import statistics
+import tempfile
+import time
+
+from dataclasses import dataclass
+from multiprocessing.connection import Connection
+from pathlib import Path
+
+from microchat.bus import BusClient, EventBroker, EventCodec
+from microchat.core.events import Event, EventStream
+
+
+SCHEMA_VERSION = 1
+
+RECEIVE_TIMEOUT = 10.0
+
+
+@dataclass
+class BusBenchmarkEvent(Event):
+    phase: str
+    no: int
+    sent_ns: int
+    chat: int
+    text: str
+
+
+def subscriber(
+    path: Path, phases: list[tuple[str, int]], conn: Connection
+) -> None:
+    asyncio.run(receive(path, phases, conn))
+
+
+async def receive(
+    path: Path, phases: list[tuple[str, int]], conn: Connection
+) -> None:
+    stream = EventStream()
+    bus = BusClient(path, stream)
+    queue = stream.subscribe()
+    await bus.start()
+    conn.send("ready")
+    try:
+        for phase, count in phases:
+            latencies: list[int] = []
+            last_ns = 0
+            while len(latencies) < count:
+                if queue.empty():
+                    # wait_for creates a task, avoid it while batch lasts
+                    try:
+                        event = await asyncio.wait_for(
+                            queue.get(), RECEIVE_TIMEOUT
+                        )
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    event = queue.get_nowait()
+                last_ns = time.monotonic_ns()
+                if isinstance(event, BusBenchmarkEvent):
+                    latencies.append(last_ns - event.sent_ns)
+            conn.send((phase, latencies, last_ns))
+    finally:
+        await bus.close()
+
+
+async def publish(
+    stream: EventStream, phase: str, count: int, interval: float
+) -> int:
+    started_ns = time.monotonic_ns()
+    for no in range(count):
+        event = BusBenchmarkEvent(
+            phase, no, time.monotonic_ns(), no % 100, f"message {no}"
+        )
+        await stream.dispatch(event)
+        if interval:
+            await asyncio.sleep(interval)
+        elif no % 1000 == 999:
+            # let the transport write what is batched
+            await asyncio.sleep(0)
+    return started_ns
+
+
+async def run(
+    events: int, subscribers: int, interval: float
+) -> dict[str, object]:
+    phases = [("latency", min(events, 1000)), ("burst", events)]
+    context = multiprocessing.get_context("spawn")
+    results: dict[str, object] = {}
+    with tempfile.TemporaryDirectory(prefix="microchat-bench-") as directory:
+        path = Path(directory) / "events.sock"
+        broker = EventBroker(path)
+        await broker.start()
+        stream = EventStream()
+        bus = BusClient(path, stream)
+        await bus.start()
+        connections, processes = [], []
+        for _ in range(subscribers):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=functools.partial(subscriber, path, phases, child_conn)
+            )
+            process.start()
+            connections.append(parent_conn)
+            processes.append(process)
+        try:
+            for conn in connections:
+                await asyncio.to_thread(conn.recv)
+            for phase, count in phases:
+                started_ns = await publish(
+                    stream, phase, count,
+                    interval if phase == "latency" else 0
+                )
+                reports = [
+                    await asyncio.to_thread(conn.recv) for conn in connections
+                ]
+                results[phase] = phase_report(count, started_ns, reports)
+        finally:
+            await bus.close()
+            for process in processes:
+                process.join(RECEIVE_TIMEOUT)
+                if process.is_alive():
+                    process.kill()
+            await broker.close()
+
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "parameters": {
+            "events": events,
+            "subscribers": subscribers,
+            "interval": interval,
+        },
+        "delivery": results,
+        "codec": codec_report(),
+        "environment": {"python": platform.python_version()},
+    }
+
+
+def phase_report(
+    count: int,
+    started_ns: int,
+    reports: list[tuple[str, list[int], int]]
+) -> dict[str, float | int]:
+    latencies = sorted(
+        latency for _, received, _ in reports for latency in received
+    )
+    delivered = min(len(received) for _, received, _ in reports)
+    finished_ns = max(last_ns for _, _, last_ns in reports)
+    elapsed = max(finished_ns - started_ns, 1) / 1e9
+    report: dict[str, float | int] = {
+        "published": count,
+        "lost": count * len(reports) - len(latencies),
+        "throughput_eps": round(delivered / elapsed, 1),
+    }
+    if latencies:
+        report.update({
+            "mean_us": _us(statistics.fmean(latencies)),
+            "p50_us": _us(_percentile(latencies, 0.5)),
+            "p99_us": _us(_percentile(latencies, 0.99)),
+            "max_us": _us(latencies[-1]),
+        })
+    return report
+
+
+def codec_report(rounds: int = 20000) -> dict[str, float | int]:
+    codec = EventCodec()
+    event = BusBenchmarkEvent("codec", 123456, time.monotonic_ns(), 42, "hi")
+    encoded = codec.encode(event)
+    pickled = pickle.dumps(event, pickle.HIGHEST_PROTOCOL)
+
+    def per_call(function: functools.partial[object]) -> float:
+        started = time.perf_counter()
+        for _ in range(rounds):
+            function()
+        return _us((time.perf_counter() - started) / rounds * 1e9)
+
+    return {
+        "codec_bytes": len(encoded),
+        "pickle_bytes": len(pickled),
+        "codec_encode_us": per_call(functools.partial(codec.encode, event)),
+        "codec_decode_us": per_call(functools.partial(codec.decode, encoded)),
+        "pickle_encode_us": per_call(functools.partial(
+            pickle.dumps, event, pickle.HIGHEST_PROTOCOL
+        )),
+        "pickle_decode_us": per_call(functools.partial(pickle.loads, pickled)),
+    }
+
+
+def _percentile(timings: list[int], quantile: float) -> int:
+    return timings[min(int(len(timings) * quantile), len(timings) - 1)]
+
+
+def _us(nanoseconds: float) -> float:
+    return round(nanoseconds / 1000, 2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--subscribers", type=int, default=3)
+    parser.add_argument(
+        "--interval", type=float, default=0.001,
+        help="pause between events of latency phase, seconds"
+    )
+    parser.add_argument("--output", default="-", help="file, '-' is stdout")
+    args = parser.parse_args()
+    results = asyncio.run(run(args.events, args.subscribers, args.interval))
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output == "-":
+        print(output)
+    else:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Edit history of messages in the memory backend.
+
+A message of `--size` chars (10k by default) is edited `--edits` times,
+each edit replaces a few words at a random place. Chars kept by history
+are reported against what full copies of each version would take, with
+time of an edit, of reading the message and of getting its versions.
+Versions are checked against texts the message was edited to. Output is
+JSON with sorted keys.
+
+Usage: python -m benchmarks.history [--size N] [--edits N] [--seed N]
+                                    [--output FILE]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import time
+
+from microchat.storages.memory.entities import MessageLog
+
+
+SCHEMA_VERSION = 1
+
+WORDS = ("lorem", "ipsum", "dolor", "sit", "amet", "consectetur")
+EDIT_WORDS = 3
+
+
+def run(size: int, edits: int, seed: int) -> dict[str, object]:
+    rng = random.Random(seed)
+    log = MessageLog()
+    words: list[str] = []
+    while sum(map(len, words)) + len(words) < size:
+        words.append(rng.choice(WORDS))
+    text = " ".join(words)
+    texts = [text]
+    no = log.append(1, None, text)  # type: ignore  # sender is not read
+    timings = []
+    for _ in range(edits):
+        position = rng.randrange(len(words))
+        words[position:position + EDIT_WORDS] = [
+            rng.choice(WORDS).upper() for _ in range(EDIT_WORDS)
+        ]
+        text = " ".join(words)
+        texts.append(text)
+        started = time.perf_counter()
+        log.edit(no, text, None)
+        timings.append(time.perf_counter() - started)
+    stored = sum(
+        len(edit.delta[2] or "") if edit.delta else 0
+        for edit in log.history.edits[no]
+    )
+    started = time.perf_counter()
+    latest = log.message(no)
+    read = time.perf_counter() - started
+    started = time.perf_counter()
+    versions = log.versions(no)
+    all_versions = time.perf_counter() - started
+    started = time.perf_counter()
+    first = log.versions(no, 0)[0]
+    middle = log.versions(no, edits // 2)[0]
+    some_versions = time.perf_counter() - started
+    verified = [version.text for version in versions] == texts
+    verified &= latest.text == texts[-1] and first.text == texts[0]
+    verified &= middle.text == texts[edits // 2]
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "parameters": {"size": len(texts[0]), "edits": edits, "seed": seed},
+        "history_chars": stored,
+        "full_copies_chars": sum(map(len, texts[:-1])),
+        "edit_median_us": _us(statistics.median(timings)),
+        "read_latest_us": _us(read),
+        "all_versions_us": _us(all_versions),
+        "first_and_middle_versions_us": _us(some_versions),
+        "verified": verified,
+        "environment": {"python": platform.python_version()},
+    }
+
+
+def _us(seconds: float) -> float:
+    return round(seconds * 1e6, 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=10_000)
+    parser.add_argument("--edits", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="-", help="file, '-' is stdout")
+    args = parser.parse_args()
+    results = run(args.size, args.edits, args.seed)
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output == "-":
+        print(output)
+    else:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
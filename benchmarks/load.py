@@ -0,0 +1,390 @@
+"""
+End-to-end load test of the API served by app() over HTTP.
+
+The app is seeded with the memory storage backend (see benchmarks.dataset)
+and served on localhost in the same process. Virtual users drive the real
+routes: each operation is loaded separately and then all of them together
+in a weighted mix. For each operation latency percentiles, throughput and
+errors are reported, memory usage is reported for the whole run.
+
+Output is JSON with sorted keys and fixed precision, so results of two
+versions can be compared with plain diff. Note that client and server
+share one event loop, so latencies include the client side.
+
+Usage: python -m benchmarks.load [--scale S] [--requests N | --duration SEC]
+                                 [--concurrency C] [--seed N] [--output FILE]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import time
+
+from dataclasses import dataclass, field
+
+from typing import Awaitable, Callable
+
+import aiohttp
+from aiohttp.test_utils import TestClient, TestServer
+
+from microchat.app import app
+from microchat.core.jwt_manager import JWTManager
+from microchat.storages.memory import MemoryUoW
+
+from .dataset import Dataset, PASSWORD, seed
+
+
+SCHEMA_VERSION = 1
+
+PAGE_SIZE = 50
+UPLOAD_SIZE = 64 * 1024
+
+MIX = {
+    "login": 5,
+    "list_chats": 20,
+    "paginate_dialog": 20,
+    "paginate_conference": 20,
+    "send_message": 20,
+    "upload_media": 5,
+    "download_media": 10,
+}
+
+
+@dataclass
+class VirtualUser:
+    alias: str
+    token: str
+    rng: random.Random
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {"Authentication": f"Bearer {self.token}"}
+
+
+@dataclass
+class Stats:
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    elapsed: float = 0
+
+    def report(self) -> dict[str, float | int]:
+        timings = sorted(self.latencies)
+        if not timings:
+            return {"requests": 0, "errors": self.errors}
+        return {
+            "requests": len(timings),
+            "errors": self.errors,
+            "mean_ms": _ms(statistics.fmean(timings)),
+            "p50_ms": _ms(_percentile(timings, 0.5)),
+            "p99_ms": _ms(_percentile(timings, 0.99)),
+            "max_ms": _ms(timings[-1]),
+            "throughput_rps": round(len(timings) / self.elapsed, 1),
+        }
+
+
+Operation = Callable[[TestClient, VirtualUser], Awaitable[int]]
+
+
+def operations(dataset: Dataset) -> dict[str, Operation]:
+    dialog_id = dataset.users[1].id
+    dialog_pages = max(dataset.dialog_messages - PAGE_SIZE, 1)
+    medium = dataset.conferences["medium"]
+    large = dataset.conferences["large"]
+    conference_pages = max(len(large.log) - PAGE_SIZE, 1)
+    media_hash = dataset.media.file_info.hash
+    uploads = itertools.count()
+
+    async def login(client: TestClient, user: VirtualUser) -> int:
+        payload = {"username": user.alias, "password": PASSWORD}
+        async with client.post("/api/auth/sessions", json=payload) as resp:
+            await resp.read()
+            return resp.status
+
+    async def list_chats(client: TestClient, user: VirtualUser) -> int:
+        path = "/api/chats/?offset=0&count=20"
+        async with client.get(path, headers=user.headers) as resp:
+            await resp.read()
+            return resp.status
+
+    async def paginate_dialog(client: TestClient, user: VirtualUser) -> int:
+        offset = user.rng.randrange(dialog_pages)
+        path = (
+            f"/api/chats/{dialog_id}/messages"
+            f"?offset={offset}&count={PAGE_SIZE}"
+        )
+        async with client.get(path, headers=user.headers) as resp:
+            await resp.read()
+            return resp.status
+
+    async def paginate_conference(
+        client: TestClient, user: VirtualUser
+    ) -> int:
+        offset = user.rng.randrange(conference_pages)
+        path = (
+            f"/api/chats/{large.id}/messages"
+            f"?offset={offset}&count={PAGE_SIZE}"
+        )
+        async with client.get(path, headers=user.headers) as resp:
+            await resp.read()
+            return resp.status
+
+    async def send_message(client: TestClient, user: VirtualUser) -> int:
+        path = f"/api/chats/{medium.id}/messages"
+        payload = {"text": f"load test message from {user.alias}"}
+        async with client.post(path, json=payload, headers=user.headers) as resp:  # noqa
+            await resp.read()
+            return resp.status
+
+    async def upload_media(client: TestClient, user: VirtualUser) -> int:
+        # every upload is unique, otherwise it is deduplicated by hash
+        content = next(uploads).to_bytes(8, "big") * (UPLOAD_SIZE // 8)
+        form = aiohttp.FormData()
+        form.add_field("filename", "upload.ogg")
+        form.add_field("mimetype", "audio/ogg")
+        form.add_field("content", content, filename="upload.ogg")
+        async with client.post("/api/media/", data=form, headers=user.headers) as resp:  # noqa
+            await resp.read()
+            return resp.status
+
+    async def download_media(client: TestClient, user: VirtualUser) -> int:
+        path = f"/api/media/{media_hash}/content?csrf_token={user.token}"
+        cookies = {"MEDIA_ACCESS_TOKEN": user.token}
+        async with client.get(path, cookies=cookies) as resp:
+            await resp.read()
+            return resp.status
+
+    return {
+        "login": login,
+        "list_chats": list_chats,
+        "paginate_dialog": paginate_dialog,
+        "paginate_conference": paginate_conference,
+        "send_message": send_message,
+        "upload_media": upload_media,
+        "download_media": download_media,
+    }
+
+
+async def drive(
+    client: TestClient,
+    users: list[VirtualUser],
+    pick: Callable[[VirtualUser], str],
+    operations: dict[str, Operation],
+    requests: int | None,
+    duration: float | None
+) -> dict[str, Stats]:
+    """
+    Runs virtual users concurrently until `requests` are made in total
+    or `duration` seconds are passed.
+    """
+    stats: dict[str, Stats] = {}
+    issued = itertools.count()
+    started = time.perf_counter()
+    deadline = started + duration if duration is not None else None
+
+    async def virtual_user(user: VirtualUser) -> None:
+        while True:
+            if requests is not None and next(issued) >= requests:
+                return
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            name = pick(user)
+            operation_stats = stats.setdefault(name, Stats())
+            request_started = time.perf_counter()
+            try:
+                status = await operations[name](client, user)
+            except aiohttp.ClientError:
+                status = 0
+            operation_stats.latencies.append(
+                time.perf_counter() - request_started
+            )
+            if not 200 <= status < 300:
+                operation_stats.errors += 1
+
+    await asyncio.gather(*(virtual_user(user) for user in users))
+    elapsed = time.perf_counter() - started
+    for operation_stats in stats.values():
+        operation_stats.elapsed = elapsed
+    return stats
+
+
+async def subscribe(
+    client: TestClient, users: list[VirtualUser]
+) -> dict[str, float | int]:
+    """Opens an events stream per user at once and keeps all of them."""
+    responses: list[aiohttp.ClientResponse] = []
+    stats = Stats()
+
+    async def connect(user: VirtualUser) -> None:
+        request_started = time.perf_counter()
+        try:
+            response = await client.get("/api/events", headers=user.headers)
+        except aiohttp.ClientError:
+            stats.errors += 1
+            return
+        stats.latencies.append(time.perf_counter() - request_started)
+        responses.append(response)
+        if response.status != 200:
+            stats.errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(connect(user) for user in users))
+    stats.elapsed = time.perf_counter() - started
+    report = stats.report()
+    report["open_streams"] = sum(
+        response.status == 200 for response in responses
+    )
+    report["rss_with_streams_mb"] = rss_mb()
+    # server notices closed streams at the next SSE ping (15 s), so
+    # shutdown of the app waits for them
+    for response in responses:
+        response.close()
+    return report
+
+
+async def login_users(
+    client: TestClient, dataset: Dataset, count: int, seed: int
+) -> list[VirtualUser]:
+    # senders must be members of the medium conference
+    members = dataset.sizes["medium_conference_members"]
+    users = []
+    for no in range(count):
+        alias = dataset.users[no % members].alias
+        payload = {"username": alias, "password": PASSWORD}
+        async with client.post("/api/auth/sessions", json=payload) as resp:
+            body = await resp.json()
+            if resp.status != 201:
+                raise RuntimeError(f"Can't login as {alias}: {body}")
+        rng = random.Random(seed * 1_000_003 + no)
+        users.append(VirtualUser(alias, body["response"], rng))
+    return users
+
+
+async def run(
+    scale: float,
+    requests: int | None,
+    duration: float | None,
+    concurrency: int,
+    seed_value: int
+) -> dict[str, object]:
+    seeding_started = time.perf_counter()
+    dataset = seed(scale, seed_value)
+    seeding = time.perf_counter() - seeding_started
+    rss_seeded = rss_mb()
+
+    jwt_manager = JWTManager("load-test")
+    database = dataset.db
+    application = await app(lambda: MemoryUoW(database), jwt_manager)
+    connector = aiohttp.TCPConnector(limit=0)
+    client = TestClient(TestServer(application), connector=connector)
+    await client.start_server()
+    results: dict[str, object] = {}
+    try:
+        users = await login_users(client, dataset, concurrency, seed_value)
+        table = operations(dataset)
+        for name in table:
+            stats = await drive(
+                client, users, lambda _, name=name: name,  # type: ignore
+                table, requests, duration
+            )
+            results[name] = stats[name].report()
+        names, weights = list(MIX), list(MIX.values())
+        mix = await drive(
+            client, users,
+            lambda user: user.rng.choices(names, weights)[0],
+            table, requests, duration
+        )
+        results["mix"] = {
+            name: operation_stats.report()
+            for name, operation_stats in sorted(mix.items())
+        }
+        results["sse_subscribe"] = await subscribe(client, users)
+    finally:
+        await client.close()
+
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "parameters": {
+            "scale": scale,
+            "requests": requests,
+            "duration": duration,
+            "concurrency": concurrency,
+            "seed": seed_value,
+        },
+        "dataset": dict(dataset.sizes, seeding_s=round(seeding, 2)),
+        "operations": results,
+        "memory": {
+            "rss_seeded_mb": rss_seeded,
+            "rss_end_mb": rss_mb(),
+            "rss_peak_mb": peak_rss_mb(),
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "aiohttp": aiohttp.__version__,
+        },
+    }
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / 2**20, 1)
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    divider = 2**20 if sys.platform == "darwin" else 2**10
+    return round(peak / divider, 1)
+
+
+def _percentile(timings: list[float], quantile: float) -> float:
+    return timings[min(int(len(timings) * quantile), len(timings) - 1)]
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", type=float, default=1.0)
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument(
+        "--requests", type=int, default=None,
+        help="requests per load phase (default: 2000)"
+    )
+    load.add_argument(
+        "--duration", type=float, default=None,
+        help="seconds per load phase"
+    )
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="-", help="file, '-' is stdout")
+    args = parser.parse_args()
+    requests = args.requests
+    if requests is None and args.duration is None:
+        requests = 2000
+    results = asyncio.run(run(
+        args.scale, requests, args.duration, args.concurrency, args.seed
+    ))
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output == "-":
+        print(output)
+    else:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
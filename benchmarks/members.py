@@ -0,0 +1,161 @@
+"""
+Member listing of large conferences in the memory backend.
+
+A conference gets `--members` members (100k by default), some of them
+admins, then a share of members leaves and some join again, so the member
+list has holes. First and deep pages of all members and of admins are
+requested, members are got by `no` and found by actor; each result is
+checked against a scan of all participations, time of that scan is
+reported too. Costs of joining and leaving are reported as well. Output
+is JSON with sorted keys.
+
+Usage: python -m benchmarks.members [--members N] [--rounds N] [--seed N]
+                                    [--output FILE]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import time
+
+from typing import Awaitable, Callable
+
+from microchat.core.entities import ConferenceParticipation, User, Bot
+from microchat.storages.memory import MemoryDatabase
+from microchat.storages.memory.entities import MemoryParticipation
+from microchat.storages.memory.storages import MemoryConferencesStorage
+
+
+SCHEMA_VERSION = 1
+
+ADMINS_SHARE = 0.01
+LEFT_SHARE = 0.3
+REJOINED_SHARE = 0.1
+PAGE_SIZE = 50
+
+Member = ConferenceParticipation[User | Bot]
+
+
+async def timed(
+    call: Callable[[], Awaitable[object]], rounds: int
+) -> dict[str, float]:
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        await call()
+        timings.append(time.perf_counter() - started)
+    return {
+        "median_us": _us(statistics.median(timings)),
+        "max_us": _us(max(timings)),
+    }
+
+
+async def run(members: int, rounds: int, seed: int) -> dict[str, object]:
+    rng = random.Random(seed)
+    db = MemoryDatabase()
+    storage = MemoryConferencesStorage(db)
+    owner = db.create_user("owner", "benchmark")
+    users = [db.create_user(f"user{no}", "benchmark") for no in range(members)]
+    conference = db.create_conference(owner, "large", "Large")
+    participations: list[MemoryParticipation] = []
+    started = time.perf_counter()
+    for user in users:
+        role = "admin" if rng.random() < ADMINS_SHARE else "member"
+        participations.append(db.join(conference, user, role))
+    join = (time.perf_counter() - started) / max(members, 1)
+    left = rng.sample(participations, int(members * LEFT_SHARE))
+    started = time.perf_counter()
+    for participation in left:
+        db.leave(participation)
+    leave = (time.perf_counter() - started) / max(len(left), 1)
+    for participation in left[:int(members * REJOINED_SHARE)]:
+        db.join(conference, participation.actor)
+
+    index = db.members[conference.id]
+    started = time.perf_counter()
+    present = [member for member in index.members if member is not None]
+    admins = [member for member in present if member.role == "admin"]
+    scan = time.perf_counter() - started
+
+    results: dict[str, object] = {}
+    verified = True
+    pages = {
+        "first": (0, None, present),
+        "deep": (len(present) - PAGE_SIZE, None, present),
+        "admins_first": (0, "admin", admins),
+        "admins_deep": (len(admins) - PAGE_SIZE, "admin", admins),
+    }
+    for name, (offset, role, expected) in pages.items():
+        offset = max(offset, 0)
+        page = await storage.list_members(conference, offset, PAGE_SIZE, role)
+        verified &= page == expected[offset:offset + PAGE_SIZE]
+        verified &= await storage.count_members(conference, role) == \
+            len(expected)
+        results[name] = {
+            "offset": offset,
+            **await timed(
+                lambda: storage.list_members(
+                    conference, offset, PAGE_SIZE, role
+                ),
+                rounds
+            ),
+        }
+    sample = rng.sample(present, min(len(present), rounds))
+    for member in sample:
+        verified &= await storage.get_member(conference, member.no) is member
+        verified &= await storage.find_member(conference, member.actor) is \
+            member
+    members_iter = iter(sample * 2)
+    results["get_by_no"] = await timed(
+        lambda: storage.get_member(conference, next(members_iter).no),
+        len(sample)
+    )
+    results["find_by_actor"] = await timed(
+        lambda: storage.find_member(conference, next(members_iter).actor),
+        len(sample)
+    )
+    results["count"] = await timed(
+        lambda: storage.count_members(conference, "admin"), rounds
+    )
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "parameters": {
+            "members": members, "rounds": rounds, "seed": seed,
+            "page_size": PAGE_SIZE,
+        },
+        "present": len(present),
+        "queries": results,
+        "scan_all_us": _us(scan),
+        "join_us": _us(join),
+        "leave_us": _us(leave),
+        "verified": verified,
+        "environment": {"python": platform.python_version()},
+    }
+
+
+def _us(seconds: float) -> float:
+    return round(seconds * 1e6, 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--members", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="-", help="file, '-' is stdout")
+    args = parser.parse_args()
+    results = asyncio.run(run(args.members, args.rounds, args.seed))
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output == "-":
+        print(output)
+    else:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Per-request overhead of the API pipeline.
+
+Storage answers instantly, so the numbers show the cost of the pipeline
+itself: endpoint() -> extractor -> executor (with services injection and
+UoW enter/exit) -> renderer. Two modes are measured:
+
+- handler: resolved route handler is called with a mocked request
+- http: request goes through in-process app served on localhost
+
+Usage: python -m benchmarks.request_overhead [-n REQUESTS] [--json]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from datetime import datetime as dt
+from hashlib import sha3_512
+
+from typing import Any, Awaitable, Callable, TypeVar
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer, make_mocked_request
+
+from microchat.app import app
+from microchat.core.entities import AuthMethod, Authentication, Session, User
+from microchat.core.jwt_manager import JWTManager
+from microchat.storages import UoW
+
+
+T = TypeVar("T")
+
+PASSWORD = "benchmark"
+
+
+class Sessions:
+
+    def __init__(self, sessions: list[Session]) -> None:
+        self._sessions = sessions
+
+    async def __getitem__(self, index: int | slice) -> Any:
+        return self._sessions[index]
+
+
+class Entities:
+
+    def __init__(self, user: User) -> None:
+        self.user = user
+
+    async def get_by_alias(self, alias: str) -> User:
+        return self.user
+
+    async def get_by_id(self, id: int) -> User:
+        return self.user
+
+
+class Auth:
+
+    def __init__(self, auth: Authentication, session: Session) -> None:
+        self.authentication = auth
+        self.session = session
+
+    async def get_auth_data(self, user: User, auth_kind: str) -> Authentication:
+        return self.authentication
+
+    async def create_session(self, user: User, auth: Authentication) -> Session:
+        return self.session
+
+
+class InstantUoW(UoW):
+
+    def __init__(self, entities: Entities, auth: Auth) -> None:
+        self.entities = entities  # type: ignore
+        self.auth = auth  # type: ignore
+
+
+def uow_factory() -> Callable[[], UoW]:
+    user = User()
+    user.id = 1
+    user.alias = "bench"
+    auth = Authentication()
+    auth.method = AuthMethod.PASSWORD
+    auth.user = user
+    auth.data = sha3_512(PASSWORD.encode()).digest()
+    session = Session()
+    session.id = 0
+    session.name = "benchmark"
+    session.last_active = dt.now()
+    session.location = None
+    session.ip_address = "127.0.0.1"
+    session.auth = auth
+    session.closed = False
+    user.sessions = Sessions([session])  # type: ignore
+    entities = Entities(user)
+    storage = Auth(auth, session)
+    return lambda: InstantUoW(entities, storage)
+
+
+Scenario = tuple[str, str, str, dict[str, str], bytes | None]
+
+
+def scenarios(token: str) -> list[Scenario]:
+    auth = {"Authentication": f"Bearer {token}"}
+    login = json.dumps({"username": "bench", "password": PASSWORD}).encode()
+    return [
+        ("login", "POST", "/api/auth/sessions", {}, login),
+        # sessions page is empty: renderer does not serialize entities yet
+        ("list_sessions", "GET", "/api/auth/sessions?offset=1&count=10", auth, None),
+        ("unauthorized", "GET", "/api/auth/sessions?offset=0&count=10", {}, None),
+    ]
+
+
+async def measure(
+    call: Callable[[T], Awaitable[int]],
+    prepare: Callable[[], T],
+    requests: int
+) -> dict[str, float]:
+    timings = []
+    for _ in range(requests // 10):  # warm up
+        status = await call(prepare())
+    for _ in range(requests):
+        argument = prepare()
+        request_started = time.perf_counter_ns()
+        await call(argument)
+        timings.append(time.perf_counter_ns() - request_started)
+    timings.sort()
+    mean = statistics.fmean(timings)
+    return {
+        "status": status,
+        "mean_us": mean / 1000,
+        "p50_us": timings[len(timings) // 2] / 1000,
+        "p99_us": timings[int(len(timings) * 0.99)] / 1000,
+        "rps": 1e9 / mean,
+    }
+
+
+async def run(requests: int) -> dict[str, dict[str, dict[str, float]]]:
+    jwt_manager = JWTManager("benchmark")
+    token = jwt_manager.create_access_token(1, 0)
+    application = await app(uow_factory(), jwt_manager)
+    results: dict[str, dict[str, dict[str, float]]] = {}
+
+    client = TestClient(TestServer(application))
+    await client.start_server()
+    try:
+        for name, method, path, headers, body in scenarios(token):
+            async def http_call(_: None) -> int:
+                async with client.request(
+                    method, path, headers=headers, data=body
+                ) as response:
+                    await response.read()
+                    return response.status
+            results.setdefault(name, {})["http"] = await measure(
+                http_call, lambda: None, requests
+            )
+            if body is not None:
+                continue
+
+            def prepare() -> web.Request:
+                return make_mocked_request(
+                    method, path, headers, app=application
+                )
+            # same handler as in http mode, but without HTTP stack around
+            resolved = await application.router.resolve(prepare())
+            handler = resolved.handler
+
+            async def handler_call(request: web.Request) -> int:
+                response: web.StreamResponse = await handler(request)
+                return response.status
+            results[name]["handler"] = await measure(
+                handler_call, prepare, requests
+            )
+    finally:
+        await client.close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", dest="requests", type=int, default=5000)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    results = asyncio.run(run(args.requests))
+    if args.json:
+        print(json.dumps(results, indent=2, sort_keys=True))
+        return
+    print(f"{'scenario':<16}{'mode':<9}{'status':>7}{'mean, us':>10}"
+          f"{'p50, us':>10}{'p99, us':>10}{'rps':>10}")
+    for name, modes in results.items():
+        for mode, stats in modes.items():
+            print(
+                f"{name:<16}{mode:<9}{stats['status']:>7}"
+                f"{stats['mean_us']:>10.1f}"
+                f"{stats['p50_us']:>10.1f}{stats['p99_us']:>10.1f}"
+                f"{stats['rps']:>10.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Route resolution over the whole API route table.
+
+A concrete path is made for each route (placeholders are filled with
+values of their type) and resolved many times by the router used by the
+API and by aiohttp's UrlDispatcher, which matches route regexes in order.
+Both must give the same route and match info. Unknown paths and methods
+are resolved too. Output is JSON with sorted keys, time is per resolution.
+
+Usage: python -m benchmarks.routing [--rounds N] [--output FILE]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import re
+import time
+
+from aiohttp import web
+from aiohttp.test_utils import make_mocked_request
+
+from microchat.app.routes import get_api_router
+from microchat.config import Config
+from microchat.core.events import EventStream
+from microchat.core.jwt_manager import JWTManager
+
+
+SCHEMA_VERSION = 1
+
+PREFIX = "/api"
+
+# values for placeholders by their pattern
+SAMPLES = {
+    r"\d+": "1234567",
+    r"\w+": "some_alias",
+    r"[\da-fA-F]+": "9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08",  # noqa
+}
+PLACEHOLDER = re.compile(r"\{(?P<name>\w+)(?::(?P<re>(?:[^{}]|\{[^{}]*\})+))?\}")  # noqa
+
+UNKNOWN = [
+    ("GET", "/nothing/here"),
+    ("GET", "/chats/1234567/messages/1/attachments/x/unknown"),
+    ("PUT", "/chats/1234567/messages"),
+]
+
+
+def sample_path(template: str) -> str:
+    def fill(match: re.Match[str]) -> str:
+        pattern = match["re"] or r"\w+"
+        if pattern in SAMPLES:
+            return SAMPLES[pattern]
+        alternatives = re.fullmatch(r"\((\w+)(?:\|\w+)*\)(\w*)", pattern)
+        if alternatives is not None:
+            return alternatives[1] + alternatives[2]
+        raise ValueError(f"No sample for '{pattern}'")
+    return PLACEHOLDER.sub(fill, template)
+
+
+def build_router() -> web.UrlDispatcher:
+    config = Config()
+    router = get_api_router(
+        lambda: None,  # type: ignore
+        JWTManager("benchmark"), EventStream(), config
+    )
+    # prefix as API app has
+    api = web.Application(router=router)
+    web.Application().add_subapp(f"{PREFIX}/", api)
+    router.freeze()
+    return router
+
+
+def route_path(route: web.AbstractRoute) -> str:
+    info = route.resource.get_info() if route.resource else {}
+    template = info.get("formatter") or info.get("path") or ""
+    pattern = info.get("pattern")
+    if pattern is None:
+        return str(template)
+    # formatter has no patterns of placeholders, take them from regex
+    groups = re.findall(r"\(\?P<(\w+)>((?:[^()]|\((?:[^()])*\))+)\)", pattern.pattern)  # noqa
+    path = str(template)
+    for name, regex in groups:
+        path = path.replace(f"{{{name}}}", sample_path(f"{{{name}:{regex}}}"))  # noqa
+    return path
+
+
+def same_resolution(
+    first: web.UrlMappingMatchInfo, second: web.UrlMappingMatchInfo
+) -> bool:
+    first_error = first.http_exception
+    second_error = second.http_exception
+    if first_error is not None or second_error is not None:
+        # route of errors is made for each of them
+        return type(first_error) is type(second_error) and \
+            first_error.headers == second_error.headers  # type: ignore
+    return first.route is second.route and dict(first) == dict(second)
+
+
+async def measure(
+    resolve: object, request: web.Request, rounds: int
+) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        await resolve(request)  # type: ignore
+    return (time.perf_counter() - started) / rounds
+
+
+async def run(rounds: int) -> dict[str, object]:
+    router = build_router()
+    linear = super(type(router), router).resolve
+    checked = [(route.method, route_path(route)) for route in router.routes()]
+    checked += [(method, PREFIX + path) for method, path in UNKNOWN]
+    per_route: dict[str, dict[str, float]] = {}
+    totals = {"trie_ns": 0.0, "linear_ns": 0.0}
+    for method, path in checked:
+        request = make_mocked_request(method, path)
+        trie_info = await router.resolve(request)
+        linear_info = await linear(request)
+        if not same_resolution(trie_info, linear_info):
+            raise AssertionError(f"Routers disagree on {method} {path}")
+        trie = await measure(router.resolve, request, rounds)
+        linear_time = await measure(linear, request, rounds)
+        per_route[f"{method} {path}"] = {
+            "trie_ns": round(trie * 1e9),
+            "linear_ns": round(linear_time * 1e9),
+        }
+        totals["trie_ns"] += trie * 1e9
+        totals["linear_ns"] += linear_time * 1e9
+    count = len(per_route)
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "parameters": {"rounds": rounds, "paths": count},
+        "mean": {
+            "trie_ns": round(totals["trie_ns"] / count),
+            "linear_ns": round(totals["linear_ns"] / count),
+        },
+        "routes": per_route,
+        "environment": {"python": platform.python_version()},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument("--output", default="-", help="file, '-' is stdout")
+    args = parser.parse_args()
+    results = asyncio.run(run(args.rounds))
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output == "-":
+        print(output)
+    else:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
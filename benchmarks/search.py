@@ -0,0 +1,367 @@
+"""
+Full-text message search over a large corpus of the memory backend.
+
+One user has many dialogs and public and private conferences which hold
+`--messages` messages in total (10M by default). Texts are made of
+synthetic Latin and Cyrillic words with Zipf-like frequencies, in mixed
+case, and a few words occur in one message only. Queries of each kind
+(rare, common and absent words, several words, prefixes, other case) are
+run in all chats of the user and in one chat; deep pages are reached by
+the cursor. Results of a dialog and of a private conference are checked
+against a scan of their texts. Index build, edit and remove costs and
+memory are reported too. Output is JSON with sorted keys.
+
+Usage: python -m benchmarks.search [--messages N] [--rounds N] [--seed N]
+                                   [--output FILE]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+
+from typing import Awaitable, Callable
+
+from microchat.core.entities import ConferenceParticipation, Dialog, User
+from microchat.storages.memory import MemoryDatabase
+from microchat.storages.memory.entities import MemoryConference, MessageLog
+from microchat.storages.memory.search import parse_query, words
+from microchat.storages.memory.storages import MemoryChatsStorage
+
+from .load import rss_mb
+
+
+SCHEMA_VERSION = 1
+
+DIALOGS = 1_000
+PUBLIC_CONFERENCES = 16
+PRIVATE_CONFERENCES = 4
+CONFERENCES_SHARE = 0.6  # of messages
+VOCABULARY = 50_000
+TEXTS = 100_000
+NEEDLES = 10
+PAGE_SIZE = 20
+DEEP_PAGES = 20
+UPDATES = 10_000
+CHUNK = 65536
+
+LATIN = "ba be bi bo bu da de di do du ka ke ki ko ku la le li lo lu ma me mi mo mu na ne ni no nu ra re ri ro ru sa se si so su ta te ti to tu".split()  # noqa
+CYRILLIC = "ба бе би бо бу ва ве ви во ву да де ди до ду ка ке ки ко ку ла ле ли ло лу ма ме ми мо му на не ни но ну ра ре ри ро ру са се си со су та те ти то ту ё жё".split()  # noqa
+
+Chat = Dialog | ConferenceParticipation[User]
+
+
+class Corpus:
+
+    def __init__(self, messages: int, seed: int) -> None:
+        self.rng = random.Random(seed)
+        self.db = MemoryDatabase()
+        self.vocabulary = self._vocabulary()
+        self.user = self.db.create_user("searcher", "benchmark", "Searcher")
+        self.dialogs: list[Dialog] = []
+        self.conferences: list[ConferenceParticipation[User]] = []
+        self.private: list[ConferenceParticipation[User]] = []
+        self.needles: list[str] = []
+        self.build_seconds = self._fill(messages)
+
+    def frequent(self, rank: int) -> str:
+        return self.vocabulary[rank]
+
+    def _vocabulary(self) -> list[str]:
+        rng = self.rng
+        known: set[str] = set()
+        vocabulary: list[str] = []
+        while len(vocabulary) < VOCABULARY:
+            syllables = LATIN if len(vocabulary) % 2 else CYRILLIC
+            word = "".join(rng.choices(syllables, k=rng.randint(2, 5)))
+            if word not in known:
+                known.add(word)
+                vocabulary.append(word)
+        return vocabulary
+
+    def _texts(self) -> list[str]:
+        rng = self.rng
+        weights = list(itertools.accumulate(
+            1 / rank for rank in range(1, VOCABULARY + 1)
+        ))
+        texts = []
+        for _ in range(TEXTS):
+            chosen = rng.choices(
+                self.vocabulary, cum_weights=weights, k=rng.randint(3, 20)
+            )
+            case = rng.random()
+            if case < 0.1:
+                chosen = [word.upper() for word in chosen]
+            elif case < 0.3:
+                chosen[0] = chosen[0].capitalize()
+            texts.append(" ".join(chosen))
+        return texts
+
+    def _fill(self, messages: int) -> float:
+        rng, db, user = self.rng, self.db, self.user
+        texts = self._texts()
+        logs: list[MessageLog] = []
+        for no in range(DIALOGS):
+            other = db.create_user(f"friend{no}", "benchmark", f"F{no}")
+            dialog = db.dialog(user, other)
+            self.dialogs.append(dialog)
+            logs.append(dialog.log)
+        conferences = []
+        for no in range(PUBLIC_CONFERENCES + PRIVATE_CONFERENCES):
+            private = no >= PUBLIC_CONFERENCES
+            owner = db.create_user(f"owner{no}", "benchmark", f"O{no}")
+            conference = db.create_conference(
+                owner, f"conference{no}", f"Conference {no}", private
+            )
+            conferences.append(conference)
+            logs.append(conference.log)
+        weights = [(1 - CONFERENCES_SHARE) / DIALOGS] * DIALOGS
+        weights += [CONFERENCES_SHARE / len(conferences)] * len(conferences)
+        cum_weights = list(itertools.accumulate(weights))
+        needles = set(rng.sample(range(messages), min(NEEDLES, messages)))
+        # the user joins conferences after a quarter of messages and
+        # leaves a half of private ones after three quarters
+        join_at, leave_at = messages // 4, messages * 3 // 4
+        started = time.perf_counter()
+        position = 0
+        while position < messages:
+            if position == join_at:
+                self._join(conferences)
+            if position == leave_at:
+                for participation in self.private[::2]:
+                    db.leave(participation)  # type: ignore
+            next_stop = min(
+                stop for stop in (join_at, leave_at, messages)
+                if stop > position
+            )
+            chunk = min(next_stop - position, CHUNK)
+            for log in rng.choices(logs, cum_weights=cum_weights, k=chunk):
+                text = rng.choice(texts)
+                if position in needles:
+                    # in a dialog to be found whenever it is sent
+                    log = logs[position % DIALOGS]
+                    needle = f"needle{len(self.needles)}x"
+                    self.needles.append(needle)
+                    text = f"{text} {needle}"
+                log.append(db.next_message_id(), user, text, sent=position)
+                position += 1
+        if not self.conferences:
+            self._join(conferences)
+        return time.perf_counter() - started
+
+    def _join(self, conferences: list[MemoryConference]) -> None:
+        for conference in conferences:
+            participation = self.db.join(conference, self.user)
+            if conference.private:
+                self.private.append(participation)  # type: ignore
+            else:
+                self.conferences.append(participation)  # type: ignore
+
+
+async def timed(
+    call: Callable[[], Awaitable[list[object]]], rounds: int
+) -> dict[str, float]:
+    timings = []
+    found = 0
+    for _ in range(rounds):
+        started = time.perf_counter()
+        found = len(await call())
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        "median_us": _us(statistics.median(timings)),
+        "p95_us": _us(timings[min(int(rounds * 0.95), rounds - 1)]),
+        "found": found,
+    }
+
+
+async def run_queries(
+    corpus: Corpus, storage: MemoryChatsStorage, rounds: int
+) -> dict[str, object]:
+    user = corpus.user
+    biggest = corpus.conferences[0]
+    common = corpus.frequent(0)
+    two_words = f"{corpus.frequent(100)} {corpus.frequent(201)}"
+    cyrillic = corpus.frequent(50)
+    queries: dict[str, tuple[list[Chat] | None, str]] = {
+        "all_rare": (None, corpus.needles[0]),
+        "all_absent": (None, "nosuchword"),
+        "all_common": (None, common),
+        "all_two_words": (None, two_words),
+        "all_prefix": (None, cyrillic[:3] + "*"),
+        "all_other_case": (None, cyrillic.upper()),
+        "chat_common": ([biggest], common),
+        "chat_two_words": ([biggest], two_words),
+        "dialog_common": ([corpus.dialogs[0]], common),
+        "private_common": ([corpus.private[0]], common),
+    }
+    results: dict[str, object] = {}
+    for name, (chats, query) in queries.items():
+        results[name] = await timed(
+            lambda: storage.search_messages(  # type: ignore  # noqa
+                user, chats, query, None, PAGE_SIZE
+            ),
+            rounds
+        )
+
+    # deep pages are reached through the cursor
+    before = None
+    timings = []
+    for _ in range(DEEP_PAGES):
+        started = time.perf_counter()
+        page = await storage.search_messages(
+            user, None, common, before, PAGE_SIZE
+        )
+        timings.append(time.perf_counter() - started)
+        if len(page) < PAGE_SIZE:
+            break
+        before = page[-1].message.id
+    results["all_common_deep_pages"] = {
+        "pages": len(timings),
+        "median_us": _us(statistics.median(timings)),
+        "last_us": _us(timings[-1]),
+    }
+    return results
+
+
+async def verify(corpus: Corpus, storage: MemoryChatsStorage) -> bool:
+    """Compares found messages with a scan of chat's texts."""
+    chats: list[Chat] = [corpus.dialogs[0], corpus.private[0]]
+    queries = [
+        corpus.frequent(0), corpus.frequent(50).upper(),
+        f"{corpus.frequent(3)} {corpus.frequent(7)}",
+        corpus.frequent(50)[:3] + "*",
+    ]
+    for chat in chats:
+        log = _log(chat)
+        ranges = [(0, len(log))]
+        if isinstance(chat, ConferenceParticipation):
+            ranges = [
+                (presence.join_at, presence.leave_at or len(log))
+                for presence in await chat.presences
+            ]
+        for query in queries:
+            terms = parse_query(query)
+            expected = []
+            for start, stop in ranges:
+                for no in range(start, stop):
+                    text = log.texts[no]
+                    if no in log.deleted or text is None:
+                        continue
+                    found_words = words(text)
+                    if all(
+                        any(word.startswith(term) for word in found_words)
+                        if prefix else term in found_words
+                        for term, prefix in terms
+                    ):
+                        expected.append(no)
+            expected.reverse()
+            found: list[int] = []
+            before = None
+            while True:
+                page = await storage.search_messages(
+                    corpus.user, [chat], query, before, 100
+                )
+                found += [item.message.no for item in page]
+                if len(page) < 100:
+                    break
+                before = page[-1].message.id
+            if found != expected:
+                return False
+    return True
+
+
+async def run_updates(
+    corpus: Corpus, storage: MemoryChatsStorage
+) -> dict[str, float]:
+    log = _log(corpus.conferences[0])
+    numbers = corpus.rng.sample(range(len(log)), min(UPDATES, len(log)))
+    text = " ".join(corpus.vocabulary[:10])
+    started = time.perf_counter()
+    for no in numbers:
+        await storage.edit_message(log.message(no), text, None)
+    edit = time.perf_counter() - started
+    started = time.perf_counter()
+    for no in numbers:
+        await storage.remove_message(log.message(no))
+    remove = time.perf_counter() - started
+    return {
+        "edit_us": _us(edit / max(len(numbers), 1)),
+        "remove_us": _us(remove / max(len(numbers), 1)),
+    }
+
+
+def index_size_mb(corpus: Corpus) -> float:
+    chats: list[Chat] = [*corpus.dialogs, *corpus.conferences, *corpus.private]
+    size = sys.getsizeof(corpus.db.vocabulary.words)
+    for chat in chats:
+        postings = _log(chat).index.postings
+        size += sys.getsizeof(postings)
+        size += sum(map(sys.getsizeof, postings.values()))
+    return round(size / 2**20, 1)
+
+
+async def run(messages: int, rounds: int, seed: int) -> dict[str, object]:
+    corpus = Corpus(messages, seed)
+    storage = MemoryChatsStorage(corpus.db)
+    queries = await run_queries(corpus, storage, rounds)
+    verified = await verify(corpus, storage)
+    # measured before updates, they change the biggest conference
+    index_mb = index_size_mb(corpus)
+    updates = await run_updates(corpus, storage)
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "parameters": {
+            "messages": messages, "rounds": rounds, "seed": seed,
+            "chats": DIALOGS + PUBLIC_CONFERENCES + PRIVATE_CONFERENCES,
+            "page_size": PAGE_SIZE,
+        },
+        "build": {
+            "seconds": round(corpus.build_seconds, 1),
+            "messages_per_second": round(messages / corpus.build_seconds),
+            "words": len(corpus.db.vocabulary.words),
+            "index_mb": index_mb,
+            "rss_mb": rss_mb(),
+        },
+        "queries": queries,
+        "updates": updates,
+        "verified": verified,
+        "environment": {"python": platform.python_version()},
+    }
+
+
+def _log(chat: Chat) -> MessageLog:
+    log: MessageLog = (
+        chat.log if isinstance(chat, Dialog) else chat.related.log  # type: ignore  # noqa
+    )
+    return log
+
+
+def _us(seconds: float) -> float:
+    return round(seconds * 1e6, 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=10_000_000)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="-", help="file, '-' is stdout")
+    args = parser.parse_args()
+    results = asyncio.run(run(args.messages, args.rounds, args.seed))
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output == "-":
+        print(output)
+    else:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Cold start of the server: time from launching `python -m microchat` to the
+first HTTP response, which is what a worker restart costs.
+
+Each run launches a fresh server process with a config from `--config`
+(port is replaced with a free one, empty secret with a random one) and
+polls it until GET /api/chats/ is answered. Time of bare interpreter
+start is reported as the baseline and the server's own `--profile-startup`
+report is included, so a regression can be traced to imports or app
+building. Output is JSON with sorted keys.
+
+Usage: python -m benchmarks.startup [--runs N] [--config FILE]
+                                    [--output FILE]
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import secrets
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from pathlib import Path
+
+import tomlkit
+
+
+SCHEMA_VERSION = 1
+
+START_TIMEOUT = 30.0
+POLL_INTERVAL = 0.002
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port: int = sock.getsockname()[1]
+        return port
+
+
+def write_config(source: Path, directory: Path, port: int) -> Path:
+    with source.open() as file:
+        document = tomlkit.load(file)
+    server = document.setdefault("server", tomlkit.table())
+    server["host"] = "127.0.0.1"
+    server["port"] = port
+    auth = document.setdefault("auth", tomlkit.table())
+    if not auth.get("jwt_secret"):
+        auth["jwt_secret"] = secrets.token_hex(32)
+    path = directory / f"config-{port}.toml"
+    path.write_text(tomlkit.dumps(document))
+    return path
+
+
+def first_response(port: int, deadline: float) -> int:
+    while time.monotonic() < deadline:
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+        try:
+            connection.request("GET", "/api/chats/")
+            return connection.getresponse().status
+        except OSError:
+            time.sleep(POLL_INTERVAL)
+        finally:
+            connection.close()
+    raise TimeoutError(f"Server on port {port} did not start")
+
+
+def cold_start(config: Path, directory: Path) -> tuple[float, int]:
+    port = free_port()
+    path = write_config(config, directory, port)
+    started = time.monotonic()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "microchat", "--config", str(path)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        status = first_response(port, started + START_TIMEOUT)
+        return time.monotonic() - started, status
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def interpreter_start() -> float:
+    started = time.monotonic()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    return time.monotonic() - started
+
+
+def startup_profile(config: Path) -> object:
+    output = subprocess.run(
+        [
+            sys.executable, "-m", "microchat",
+            "--config", str(config), "--profile-startup"
+        ],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output)
+
+
+def run(runs: int, config: Path) -> dict[str, object]:
+    with tempfile.TemporaryDirectory(prefix="microchat-bench-") as directory:
+        timings, statuses = [], set()
+        for _ in range(runs):
+            elapsed, status = cold_start(config, Path(directory))
+            timings.append(elapsed)
+            statuses.add(status)
+        profile = startup_profile(
+            write_config(config, Path(directory), free_port())
+        )
+    baseline = sorted(interpreter_start() for _ in range(runs))
+    timings.sort()
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "parameters": {"runs": runs, "config": str(config)},
+        "first_response": {
+            "min_ms": _ms(timings[0]),
+            "median_ms": _ms(statistics.median(timings)),
+            "max_ms": _ms(timings[-1]),
+            "statuses": sorted(statuses),
+        },
+        "interpreter_start_median_ms": _ms(statistics.median(baseline)),
+        "profile": profile,
+        "environment": {
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+        },
+    }
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument(
+        "--config", type=Path, default=Path("config.toml"),
+        help="server config, its port is replaced"
+    )
+    parser.add_argument("--output", default="-", help="file, '-' is stdout")
+    args = parser.parse_args()
+    results = run(args.runs, args.config)
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output == "-":
+        print(output)
+    else:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Sweeps of orphan media files in the memory backend.
+
+`--files` files (100k by default) are uploaded by a user, half of them
+are attached to messages, the rest are left as abandoned uploads. A sweep
+before the grace period is over is timed against a scan of all orphans as
+collection did before the sweeper, then orphans are swept by batches as
+the background sweeper does, with time of a batch and of the whole sweep.
+Remaining files, removed ones and reclaimed bytes are checked against
+what was attached. Output is JSON with sorted keys.
+
+Usage: python -m benchmarks.sweeper [--files N] [--rounds N] [--seed N]
+                                    [--output FILE]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import time
+
+from microchat.core.types import ImagesMIME, MIMETuple, MIMEType
+from microchat.storages.memory import MemoryDatabase
+from microchat.storages.memory.sweeper import Sweeper
+
+
+SCHEMA_VERSION = 1
+
+BATCH_SIZE = 1024
+GRACE_PERIOD = 3600.0
+
+
+def run(files: int, rounds: int, seed: int) -> dict[str, object]:
+    rng = random.Random(seed)
+    db = MemoryDatabase()
+    user = db.create_user("owner", "benchmark")
+    other = db.create_user("other", "benchmark")
+    log = db.dialog(user, other).log
+    mime: MIMETuple = (MIMEType.IMAGE, ImagesMIME.PNG)
+    medias = [
+        db.store_file(
+            user, f"{no}.png", mime,
+            no.to_bytes(4, "big") + rng.randbytes(rng.randrange(256))
+        )
+        for no in range(files)
+    ]
+    attached = rng.sample(medias, files // 2)
+    for media in attached:
+        log.append(db.next_message_id(), user, "", [media])
+    kept = {media.file_info.hash for media in attached}
+    orphans = [media for media in medias if media.file_info.hash not in kept]
+    sweeper = Sweeper(db, batch_size=BATCH_SIZE, grace_period=GRACE_PERIOD)
+    now = time.time()
+
+    def scan() -> list[str]:
+        deadline = now - GRACE_PERIOD
+        return [
+            hash for hash, released in db.media_refs.released.items()
+            if released <= deadline
+        ]
+
+    early: dict[str, list[float]] = {"sweep": [], "scan": []}
+    for _ in range(rounds):
+        started = time.perf_counter()
+        sweeper.sweep(now, BATCH_SIZE)
+        early["sweep"].append(time.perf_counter() - started)
+        started = time.perf_counter()
+        scan()
+        early["scan"].append(time.perf_counter() - started)
+    verified = len(db.media) == files
+
+    later = now + GRACE_PERIOD
+    timings = []
+    started = time.perf_counter()
+    while True:
+        batch_started = time.perf_counter()
+        removed, _ = sweeper.sweep(later, BATCH_SIZE)
+        if not removed:
+            break
+        timings.append(time.perf_counter() - batch_started)
+    total = time.perf_counter() - started
+    verified &= set(db.media) == kept
+    verified &= sweeper.removed_files == len(orphans)
+    verified &= sweeper.reclaimed_bytes == sum(
+        media.file_info.size for media in orphans
+    )
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "parameters": {
+            "files": files, "rounds": rounds, "seed": seed,
+            "batch_size": BATCH_SIZE,
+        },
+        "before_grace_period": {
+            name: {
+                "median_us": _us(statistics.median(values)),
+                "max_us": _us(max(values)),
+            }
+            for name, values in early.items()
+        },
+        "sweep": {
+            "batch_median_us": _us(statistics.median(timings or [0])),
+            "batch_max_us": _us(max(timings or [0])),
+            "total_us": _us(total),
+            "removed_files": sweeper.removed_files,
+            "reclaimed_bytes": sweeper.reclaimed_bytes,
+        },
+        "verified": verified,
+        "environment": {"python": platform.python_version()},
+    }
+
+
+def _us(seconds: float) -> float:
+    return round(seconds * 1e6, 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="-", help="file, '-' is stdout")
+    args = parser.parse_args()
+    results = run(args.files, args.rounds, args.seed)
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output == "-":
+        print(output)
+    else:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
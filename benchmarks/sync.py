@@ -0,0 +1,136 @@
+"""
+Delta sync of a user with many chats in the memory backend.
+
+One user has `--chats` dialogs (10k by default) and a large conference
+with a long history. After the first sync a few chats get new, edited and
+deleted messages and the conference is renamed, then the user syncs with
+the token. Time of the delta sync is reported for growing numbers of
+changed chats together with time of listing all chats, which is what a
+client does without sync. Deltas are checked against the changes made.
+Output is JSON with sorted keys.
+
+Usage: python -m benchmarks.sync [--chats N] [--rounds N] [--seed N]
+                                 [--output FILE]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import time
+
+from microchat.core.entities import ConferenceParticipation, Dialog, User
+from microchat.storages.memory import MemoryDatabase
+from microchat.storages.memory.storages import MemoryChatsStorage
+from microchat.storages.memory.storages import MemoryEntitiesStorage
+
+
+SCHEMA_VERSION = 1
+
+CONFERENCE_MEMBERS = 5_000
+CONFERENCE_MESSAGES = 100_000
+CHANGED_CHATS = (1, 10, 100, 1_000)
+
+Chat = Dialog | ConferenceParticipation[User]
+
+
+async def run(chats: int, rounds: int, seed: int) -> dict[str, object]:
+    rng = random.Random(seed)
+    db = MemoryDatabase()
+    storage = MemoryChatsStorage(db)
+    entities = MemoryEntitiesStorage(db)
+    user = db.create_user("owner", "benchmark")
+    others = [db.create_user(f"user{no}", "benchmark") for no in range(chats)]
+    dialogs = [db.dialog(other, user) for other in others]
+    conference = db.create_conference(others[0], "large", "Large")
+    for other in [user, *others[1:CONFERENCE_MEMBERS]]:
+        db.join(conference, other)
+    for no in range(CONFERENCE_MESSAGES):
+        conference.log.append(db.next_message_id(), others[0], f"text {no}")
+
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        changes = await storage.get_changes(user, 0)
+        timings.append(time.perf_counter() - started)
+    full_sync = statistics.median(timings)
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        await storage.get_user_chats(user, 0, chats + 1)
+        timings.append(time.perf_counter() - started)
+    list_all = statistics.median(timings)
+
+    results: dict[str, object] = {}
+    verified = True
+    for changed_count in CHANGED_CHATS:
+        token = changes.version
+        changed = rng.sample(dialogs, min(changed_count, len(dialogs)))
+        expected: dict[int, tuple[list[str], list[int]]] = {}
+        for dialog in changed:
+            sent = await storage.add_message(
+                dialog.actor, dialog, "new", None, None
+            )
+            first = dialog.log.message(0) if len(dialog.log) > 1 else sent
+            deleted = []
+            if first is not sent:
+                await storage.edit_message(first, "edited", None)
+                await storage.remove_message(sent)
+                deleted.append(sent.no)
+            texts = ["edited"] if deleted else ["new"]
+            expected[dialog.actor.id] = (texts, deleted)
+        await entities.edit_entity(conference, {"title": f"{changed_count}"})
+        timings = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            changes = await storage.get_changes(user, token)
+            timings.append(time.perf_counter() - started)
+        got = {
+            item.chat.related.id: (
+                [message.text or "" for message in item.messages],
+                item.deleted
+            )
+            for item in changes.chats
+        }
+        verified &= got.pop(conference.id, None) == ([], [])
+        verified &= got == expected
+        results[str(changed_count)] = {
+            "chats": len(changes.chats),
+            "median_us": _us(statistics.median(timings)),
+        }
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "parameters": {"chats": chats, "rounds": rounds, "seed": seed},
+        "changed_chats": results,
+        "full_sync_us": _us(full_sync),
+        "list_all_chats_us": _us(list_all),
+        "verified": verified,
+        "environment": {"python": platform.python_version()},
+    }
+
+
+def _us(seconds: float) -> float:
+    return round(seconds * 1e6, 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chats", type=int, default=10_000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="-", help="file, '-' is stdout")
+    args = parser.parse_args()
+    results = asyncio.run(run(args.chats, args.rounds, args.seed))
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output == "-":
+        print(output)
+    else:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Deleted messages of a large chat in the memory backend.
+
+A chat gets `--messages` messages (1M by default) with attachments on
+some of them, then most of its history is deleted in long runs (as chat
+cleanups do) and a share of the rest one by one. Pages over the deleted
+part are read with the skip index and by a scan of every `no` as paging
+did before it; counts of messages are checked too. Then deleted messages
+are compacted by batches as the background compactor does, time of a
+batch and of the whole compaction are reported together with reclaimed
+texts and files, which are removed by the sweeper. Output is JSON with
+sorted keys.
+
+Usage: python -m benchmarks.tombstones [--messages N] [--rounds N]
+                                       [--seed N] [--output FILE]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import time
+
+from typing import Callable
+
+from microchat.core.types import ImagesMIME, MIMETuple, MIMEType
+from microchat.storages.memory import MemoryDatabase
+from microchat.storages.memory.compaction import Compactor
+from microchat.storages.memory.sweeper import Sweeper
+
+
+SCHEMA_VERSION = 1
+
+RUNS = 20
+RUNS_SHARE = 0.9
+SINGLE_SHARE = 0.05
+MEDIA_EVERY = 100
+PAGE_SIZE = 50
+BATCH_SIZE = 1024
+
+
+def timed(call: Callable[[], object], rounds: int) -> dict[str, float]:
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - started)
+    return {
+        "median_us": _us(statistics.median(timings)),
+        "max_us": _us(max(timings)),
+    }
+
+
+def run(messages: int, rounds: int, seed: int) -> dict[str, object]:
+    rng = random.Random(seed)
+    db = MemoryDatabase()
+    user = db.create_user("owner", "benchmark")
+    other = db.create_user("other", "benchmark")
+    log = db.dialog(user, other).log
+    mime: MIMETuple = (MIMEType.IMAGE, ImagesMIME.PNG)
+    medias = [
+        db.store_file(user, f"{no}.png", mime, f"image {no}".encode())
+        for no in range(messages // MEDIA_EVERY)
+    ]
+    for no in range(messages):
+        attached = [medias[no // MEDIA_EVERY]] if no % MEDIA_EVERY == 0 else []  # noqa
+        log.append(db.next_message_id(), user, f"message {no}", attached)
+
+    run_size = int(messages * RUNS_SHARE) // RUNS
+    gap = (messages - run_size * RUNS) // RUNS
+    for run_no in range(RUNS):
+        start = run_no * (run_size + gap)
+        for no in range(start, start + run_size):
+            log.remove(no)
+    alive = [no for no in range(messages) if no not in log.deleted]
+    for no in rng.sample(alive, int(len(alive) * SINGLE_SHARE)):
+        log.remove(no)
+    expected = [no for no in range(messages) if no not in log.deleted]
+
+    def scan(offset: int) -> list[int]:
+        nos: list[int] = []
+        no = offset
+        while no < messages and len(nos) < PAGE_SIZE:
+            if no not in log.deleted:
+                nos.append(no)
+            no += 1
+        return nos
+
+    verified = log.count(0) == len(expected)
+    results: dict[str, object] = {}
+    offsets = {"first": 0, "middle": messages // 2, "last": messages - 1}
+    for name, offset in offsets.items():
+        page = [message.no for message in log.page(offset, PAGE_SIZE)]
+        verified &= page == scan(offset)
+        results[name] = {
+            "skip_index": timed(lambda: log.page(offset, PAGE_SIZE), rounds),
+            "scan": timed(lambda: scan(offset), rounds),
+        }
+
+    compactor = Compactor(db, batch_size=BATCH_SIZE)
+    garbage = len(log.garbage)
+    timings = []
+    started = time.perf_counter()
+    while True:
+        batch_started = time.perf_counter()
+        if not compactor.compact(BATCH_SIZE):
+            break
+        timings.append(time.perf_counter() - batch_started)
+    compaction = time.perf_counter() - started
+    files = len(db.media)
+    removed, reclaimed = Sweeper(db, grace_period=0).sweep()
+    verified &= sum(text is not None for text in log.texts) == len(expected)
+    verified &= len(db.media) == files - removed
+    verified &= all(
+        db.media_refs[media.file_info.hash] == (media.file_info.hash in db.media)  # noqa
+        for media in medias
+    )
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "parameters": {
+            "messages": messages, "rounds": rounds, "seed": seed,
+            "page_size": PAGE_SIZE, "batch_size": BATCH_SIZE,
+        },
+        "deleted": len(log.deleted),
+        "deleted_runs": len(log.deleted.starts),
+        "pages": results,
+        "compaction": {
+            "messages": garbage,
+            "batch_median_us": _us(statistics.median(timings or [0])),
+            "batch_max_us": _us(max(timings or [0])),
+            "total_us": _us(compaction),
+            "removed_files": removed,
+            "reclaimed_bytes": reclaimed,
+        },
+        "verified": verified,
+        "environment": {"python": platform.python_version()},
+    }
+
+
+def _us(seconds: float) -> float:
+    return round(seconds * 1e6, 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="-", help="file, '-' is stdout")
+    args = parser.parse_args()
+    results = run(args.messages, args.rounds, args.seed)
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output == "-":
+        print(output)
+    else:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
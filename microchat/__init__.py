@@ -1 +1,14 @@
-from . import api, api_utils, app, config, core
+import importlib
+
+from types import ModuleType
+
+
+# subpackages are imported on first access: processes which need only a
+# part of them (supervisor, benchmarks) do not pay for the rest
+SUBPACKAGES = ("api", "api_utils", "app", "config", "core")
+
+
+def __getattr__(name: str) -> ModuleType:
+    if name in SUBPACKAGES:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
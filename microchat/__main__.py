@@ -1,23 +1,7 @@
 from pathlib import Path
-from typing import Callable
 
-from aiohttp import web
-
-
-from .app import app
-from .core.jwt_manager import JWTManager
-from .config import Config
-from .storages import UoW
-
-
-def create_uow_factory(config: Config) -> Callable[[], UoW]:
-    pass
-
-
-def run(config: Config) -> None:
-    uow_factory = create_uow_factory(config)
-    jwt_manager = JWTManager(config.jwt_secret)
-    web.run_app(app(uow_factory, jwt_manager))
+from .config import Config, ConfigError
+from .server import create_app, run
 
 
 if __name__ == "__main__":
@@ -31,13 +15,26 @@ if __name__ == "__main__":
         type=Path, required=False,
         help='Path to config file'
     )
+    parser.add_argument(
+        '--profile-startup', dest='profile_startup', action='store_true',
+        help='Report time of imports and app building instead of serving'
+    )
 
     args = parser.parse_args()
     config_path: Path | None = args.config
     if config_path:
         with config_path.open() as config_file:
             config_toml = tomlkit.load(config_file)
-        config = Config.from_mapping(config_toml)
-        run(config)
+        try:
+            config = Config.from_mapping(config_toml)
+        except ConfigError as exc:
+            parser.exit(2, f"Invalid config {config_path}: {exc}\n")
+        if args.profile_startup:
+            import asyncio
+
+            from .startup import print_profile, profile_startup
+            print_profile(asyncio.run(profile_startup(config, create_app)))
+        else:
+            run(config)
     else:
         parser.print_help()
@@ -7,7 +7,9 @@ from microchat.api_utils.response import APIResponse, Status
 from microchat.api_utils.handler import authenticated, cookie_authenticated
 
 from microchat.core.entities import User, Dialog, ConferenceParticipation
-from microchat.core.entities import Message, Attachment
+from microchat.core.entities import Message, Attachment, SearchResults
+from microchat.core.entities import MessageVersion
+from microchat.core.entities import Changes, ItemResult
 from microchat.core.entities import File, Media
 from microchat.core.entities import Animation, Image, Video, Audio
 from microchat.services import ServiceSet
@@ -42,6 +44,19 @@ class GetMessage(ChatsAPIRequest):
     message_no: int
 
 
+@dataclass
+class SearchMessages(ChatsAPIRequest):
+    chat: GetChat | None  # None means all of user's chats
+    query: str
+    before: int | None
+    count: int
+
+
+@dataclass
+class SyncChats(ChatsAPIRequest):
+    version: int  # token of the previous sync, 0 for the first one
+
+
 @dataclass
 class SendMessage(ChatsAPIRequest):
     chat: GetChat
@@ -50,6 +65,18 @@ class SendMessage(ChatsAPIRequest):
     reply_to: int | None
 
 
+@dataclass
+class OutgoingMessage:
+    chat: int | str
+    text: str | None
+    attachments: list[str] | None
+
+
+@dataclass
+class SendMessages(ChatsAPIRequest):
+    messages: list[OutgoingMessage]
+
+
 @dataclass
 class EditMessage(ChatsAPIRequest):
     message: GetMessage
@@ -57,11 +84,28 @@ class EditMessage(ChatsAPIRequest):
     attachments: list[str] | None
 
 
+@dataclass
+class GetMessageVersions(ChatsAPIRequest):
+    message: GetMessage
+
+
+@dataclass
+class GetMessageVersion(ChatsAPIRequest):
+    message: GetMessage
+    version_no: int
+
+
 @dataclass
 class DeleteMessage(ChatsAPIRequest):
     message: GetMessage
 
 
+@dataclass
+class MarkRead(ChatsAPIRequest):
+    chat: GetChat
+    no: int
+
+
 @dataclass
 class GetAttachmentPreview(ChatsAPIRequest, CookieAuthenticated):
     message: GetMessage
@@ -126,11 +170,37 @@ async def list_messages(
     chat_response = await get_chat(request.chat, services, user)
     chat = chat_response.payload
     messages = await services.chats.list_chat_messages(
-        user, chat, offset, count
+        user, chat, offset, count, shared=True
     )
     return APIResponse(messages)
 
 
+# @router.get(r"/search")
+# @router.get(r"/{entity_id:\d+}/search")
+# @router.get(r"/@{alias:\w+}/search")
+@authenticated
+async def search_messages(
+    request: SearchMessages, services: ServiceSet, user: User
+) -> APIResponse[SearchResults]:
+    chat = None
+    if request.chat is not None:
+        chat_response = await get_chat(request.chat, services, user)
+        chat = chat_response.payload
+    results = await services.chats.search_messages(
+        user, chat, request.query, request.before, request.count
+    )
+    return APIResponse(results)
+
+
+# @router.get(r"/sync")
+@authenticated
+async def sync_chats(
+    request: SyncChats, services: ServiceSet, user: User
+) -> APIResponse[Changes]:
+    changes = await services.chats.get_changes(user, request.version)
+    return APIResponse(changes)
+
+
 # @router.post(r"/{entity_id:\d+}/messages")
 # @router.post(r"/@{alias:\w+}/messages")
 @authenticated
@@ -148,6 +218,19 @@ async def send_message(
     return APIResponse(message)
 
 
+# @router.post("/messages")
+@authenticated
+async def send_messages(
+    request: SendMessages, services: ServiceSet, user: User
+) -> APIResponse[list[ItemResult[Message]]]:
+    outgoing = [
+        (message.chat, message.text, message.attachments)
+        for message in request.messages
+    ]
+    results = await services.chats.add_chat_messages(user, outgoing)
+    return APIResponse(results)
+
+
 # @router.get(r"/{entity_id:\d+}/messages/{id:\d+}")
 # @router.get(r"/@{alias:\w+}/messages/{id:\d+}")
 @authenticated
@@ -180,6 +263,36 @@ async def edit_message(
     return APIResponse(edited_message)
 
 
+# @router.get(r"/{entity_id:\d+}/messages/{message_id:\d+}/versions")
+# @router.get(r"/@{alias:\w+}/messages/{message_id:\d+}/versions")
+@authenticated
+async def list_message_versions(
+    request: GetMessageVersions, services: ServiceSet, user: User
+) -> APIResponse[list[MessageVersion]]:
+    message_no = request.message.message_no
+    chat_response = await get_chat(request.message.chat, services, user)
+    chat = chat_response.payload
+    versions = await services.chats.list_message_versions(
+        user, chat, message_no
+    )
+    return APIResponse(versions)
+
+
+# @router.get(r"/{entity_id:\d+}/messages/{message_id:\d+}/versions/{version:\d+}")  # noqa
+# @router.get(r"/@{alias:\w+}/messages/{message_id:\d+}/versions/{version:\d+}")  # noqa
+@authenticated
+async def get_message_version(
+    request: GetMessageVersion, services: ServiceSet, user: User
+) -> APIResponse[MessageVersion]:
+    message_no = request.message.message_no
+    chat_response = await get_chat(request.message.chat, services, user)
+    chat = chat_response.payload
+    version = await services.chats.get_message_version(
+        user, chat, message_no, request.version_no
+    )
+    return APIResponse(version)
+
+
 # @router.delete(r"/{entity_id:\d+}/messages/{id:\d+}")
 # @router.delete(r"/@{alias:\w+}/messages/{id:\d+}")
 @authenticated
@@ -194,6 +307,18 @@ async def remove_message(
     return APIResponse(status=Status.NO_CONTENT)
 
 
+# @router.post(r"/{entity_id:\d+}/read")
+# @router.post(r"/@{alias:\w+}/read")
+@authenticated
+async def mark_read(
+    request: MarkRead, services: ServiceSet, user: User
+) -> APIResponse[Dialog | ConferenceParticipation[User]]:
+    chat_response = await get_chat(request.chat, services, user)
+    chat = chat_response.payload
+    chat = await services.chats.mark_read(user, chat, request.no)
+    return APIResponse(chat)
+
+
 # @router.get(r"/{entity_id:\d+}/messages/{message_id:\d+}/attachments/{id:\w+}/{view:(preview|content)}")
 # @router.get(r"/@{alias:\w+}/messages/{message_id:\d+}/attachments/{id:\w+}/{view:(preview|content)}")
 @cookie_authenticated
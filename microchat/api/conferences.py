@@ -2,12 +2,12 @@ from dataclasses import dataclass
 
 
 from microchat.core.entities import User, Dialog, ConferenceParticipation
-from microchat.core.entities import Bot, Conference, Permissions
+from microchat.core.entities import Bot, Conference, ItemResult, Permissions
 
 from microchat.services import ServiceSet
 from microchat.api_utils.handler import authenticated
 from microchat.api_utils.request import APIRequest, Authenticated
-from microchat.api_utils.response import APIResponse, Status
+from microchat.api_utils.response import APIResponse, HEADER, Status
 from microchat.api_utils.exceptions import BadRequest, NotFound
 
 from .misc import Disposition, PermissionsPatch
@@ -46,6 +46,7 @@ class EditDefaultPermissions(ConferencesAPIRequest):
 class GetMembers(ConferencesAPIRequest):
     conference_request: GetConference
     disposition: Disposition
+    role: str | None
 
 
 @dataclass
@@ -60,11 +61,23 @@ class AddMember(ConferencesAPIRequest):
     invitee: int | str
 
 
+@dataclass
+class AddMembers(ConferencesAPIRequest):
+    conference_request: GetConference
+    invitees: list[int | str]
+
+
 @dataclass
 class RemoveMember(ConferencesAPIRequest):
     member_request: GetMember
 
 
+@dataclass
+class RemoveMembers(ConferencesAPIRequest):
+    conference_request: GetConference
+    members: list[int]
+
+
 @dataclass
 class GetMemberPermissions(ConferencesAPIRequest):
     member_request: GetMember
@@ -103,11 +116,13 @@ async def list_chat_members(
     identity = request.conference_request.identity
     offset = request.disposition.offset
     count = request.disposition.count
+    role = request.role
     conference = await get_conference(services, user, identity)
     members = await services.conferences.list_members(
-        user, conference, offset, count
+        user, conference, offset, count, role
     )
-    return APIResponse(members)
+    total = await services.conferences.count_members(user, conference, role)
+    return APIResponse(members, headers={HEADER.TotalCount: str(total)})
 
 
 # @router.post(r"/{entity_id:\d+}/members")
@@ -125,6 +140,20 @@ async def add_chat_member(
     return APIResponse(member, Status.CREATED)
 
 
+# @router.post(r"/{entity_id:\d+}/members/bulk")
+# @router.post(r"/@{alias:\w+}/members/bulk")
+@authenticated
+async def add_chat_members(
+    request: AddMembers, services: ServiceSet, user: User
+) -> APIResponse[list[ItemResult[ConferenceParticipation[User | Bot]]]]:
+    conference_identity = request.conference_request.identity
+    conference = await get_conference(services, user, conference_identity)
+    results = await services.conferences.add_members(
+        user, conference, request.invitees
+    )
+    return APIResponse(results)
+
+
 # @router.get(r"/{entity_id:\d+}/members/{id:\d+}")
 # @router.get(r"/{entity_id:\d+}/members/{member_alias:\w+}")
 # @router.get(r"/@{alias:\w+}/members/{id:\d+}")
@@ -158,6 +187,20 @@ async def remove_chat_member(
     return APIResponse(status=Status.NO_CONTENT)
 
 
+# @router.post(r"/{entity_id:\d+}/members/bulk/remove")
+# @router.post(r"/@{alias:\w+}/members/bulk/remove")
+@authenticated
+async def remove_chat_members(
+    request: RemoveMembers, services: ServiceSet, user: User
+) -> APIResponse[list[ItemResult[ConferenceParticipation[User | Bot]]]]:
+    conference_identity = request.conference_request.identity
+    conference = await get_conference(services, user, conference_identity)
+    results = await services.conferences.remove_members(
+        user, conference, request.members
+    )
+    return APIResponse(results)
+
+
 # @router.get(r"/{entity_id:\d+}/members/{id:\d+}/permissions")
 # @router.get(r"/{entity_id:\d+}/members/{member_alias:\w+}/permissions")
 # @router.get(r"/@{alias:\w+}/members/{id:\d+}/permissions")
@@ -44,6 +44,13 @@ class GetEntity(EntitiesAPIRequest):
     identity: str | int
 
 
+@dataclass
+class SearchEntities(EntitiesAPIRequest):
+    query: str
+    kinds: tuple[type[User | Bot | Conference], ...]
+    count: int
+
+
 @dataclass
 class EditEntity(EntitiesAPIRequest):
     entity_request: GetEntity
@@ -133,6 +140,17 @@ async def get_entity(
     return APIResponse(entity)
 
 
+# @router.get("/search")
+@authenticated
+async def search_entities(
+    request: SearchEntities, services: ServiceSet, user: User
+) -> APIResponse[list[User | Bot | Conference]]:
+    found = await services.agents.search(
+        user, request.query, request.kinds, request.count
+    )
+    return APIResponse(found)
+
+
 # @router.patch(r"/{entity_id:\d+}")
 # @router.patch(r"/@{alias:\w+}")
 @authenticated
@@ -218,7 +236,8 @@ async def get_entity_permissions(
     relation = await services.agents.get_chat(user, identity)
     if isinstance(relation, ConferenceParticipation):
         raise BadRequest("Can't ask for conference's permissions")
-    return APIResponse(relation.permissions)
+    permissions = await services.agents.get_permissions(user, relation)
+    return APIResponse(permissions)
 
 
 # @router.patch(r"/{entity_id:\d+}/permissions")
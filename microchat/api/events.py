@@ -0,0 +1,28 @@
+from asyncio import Queue
+from dataclasses import dataclass
+
+from microchat.api_utils.request import APIRequest, Authenticated
+from microchat.api_utils.response import APIResponse
+from microchat.api_utils.handler import authenticated
+from microchat.core.entities import User
+from microchat.core.events import Event
+from microchat.services import ServiceSet
+
+
+@dataclass
+class EventsAPIRequest(APIRequest, Authenticated):
+    pass
+
+
+@dataclass
+class GetEvents(EventsAPIRequest):
+    pass
+
+
+# @router.get("/")
+@authenticated
+async def get_events(
+    request: GetEvents, services: ServiceSet, user: User
+) -> APIResponse[Queue[Event]]:
+    events = await services.events.subscribe(user)
+    return APIResponse(events)
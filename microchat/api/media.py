@@ -7,13 +7,13 @@ from microchat.api_utils.handler import authenticated, cookie_authenticated
 
 from microchat.services import ServiceSet
 from microchat.core.entities import Animation, Image, Media, User, Video
+from microchat.core.entities import StorageUsage
+from microchat.core.types import MIMESubtype
 
 from microchat.api_utils.request import APIRequest, Authenticated, CookieAuthenticated  # noqa
 from microchat.api_utils.response import HEADER, APIResponse, Status
 from microchat.api_utils.exceptions import BadRequest, NotFound
-
-
-CHUNK_SIZE = 65535
+from microchat.api_utils.exceptions import PayloadTooLarge
 
 
 class PartReader(ABC):
@@ -23,9 +23,7 @@ class PartReader(ABC):
         pass
 
     @abstractmethod
-    async def iter_chunks(
-        self, size: int = CHUNK_SIZE
-    ) -> AsyncIterable[bytes]:
+    async def iter_chunks(self, size: int) -> AsyncIterable[bytes]:
         yield b""
 
 
@@ -37,6 +35,7 @@ class MediaAPIRequest(APIRequest, Authenticated):
 @dataclass
 class UploadMedia(MediaAPIRequest):
     payload: AsyncIterable[tuple[str, PartReader]]
+    size: int | None  # Content-Length of the request if it is known
 
 
 @dataclass
@@ -59,6 +58,11 @@ class DownloadPreview(MediaRequest, CookieAuthenticated):
     pass
 
 
+@dataclass
+class GetTopUsage(MediaAPIRequest):
+    count: int
+
+
 # @router.post("/")
 @authenticated
 async def store(
@@ -68,6 +72,13 @@ async def store(
 ) -> APIResponse[Media]:
     file_name = None
     file_type = None
+    # uploads which don't fit are rejected before their content is read,
+    # the content and its hash are not known yet, so these checks count
+    # the whole upload even if the file is stored already and would not be
+    # charged; materialize makes the exact check of a complete file
+    left = await services.files.quota_left(user)
+    if left is not None and request.size is not None and request.size > left:
+        raise PayloadTooLarge("Storage quota exceeded")
     async with services.files.tempfile() as tempfile:
         async for name, reader in request.payload:
             if name == 'filename':
@@ -77,8 +88,11 @@ async def store(
                 content = await reader.read()
                 file_type = content.decode()
             if name == 'content':
-                async for chunk in reader.iter_chunks():
+                chunk_size = services.config.media.upload_chunk_size
+                async for chunk in reader.iter_chunks(chunk_size):
                     await tempfile.write(chunk)
+                    if left is not None and tempfile.size > left:
+                        raise PayloadTooLarge("Storage quota exceeded")
         if not (file_name and file_type):
             raise BadRequest("file name does not specified")
         media = await services.files.materialize(
@@ -107,10 +121,8 @@ async def get_content(
     headers = {}
     disposition = f"attachment; filename={media.name}"
     headers[HEADER.ContentDisposition] = disposition
-    headers[HEADER.ContentType] = f"{media.type}/{media.subtype}"
-    content = services.files.iter_content(
-        user, media.file_info, chunk_size=1024**2
-    )
+    headers[HEADER.ContentType] = f"{media.type.value}/{_subtype(media.subtype)}"
+    content = services.files.iter_content(user, media.file_info)
     return APIResponse(content, headers=headers)
 
 
@@ -127,8 +139,19 @@ async def get_preview(
     preview = media.preview
     headers = {}
     headers[HEADER.ContentDisposition] = "inline"
-    headers[HEADER.ContentType] = f"{preview.type}/{preview.subtype}"
-    content = services.files.iter_content(
-        user, preview.file_info, chunk_size=1024**2
-    )
+    headers[HEADER.ContentType] = f"{preview.type.value}/{preview.subtype.value}"
+    content = services.files.iter_content(user, preview.file_info)
     return APIResponse(content, headers=headers)
+
+
+# @router.get("/usage")
+@authenticated
+async def list_top_usage(
+    request: GetTopUsage, services: ServiceSet, user: User
+) -> APIResponse[list[StorageUsage]]:
+    usage = await services.files.list_top_usage(user, request.count)
+    return APIResponse(usage)
+
+
+def _subtype(subtype: MIMESubtype) -> str:
+    return subtype if isinstance(subtype, str) else subtype.value
@@ -16,5 +16,6 @@ class PermissionsPatch(TypedDict):
     send_media: bool | None
     send_mediamessage: bool | None
     add_user: bool | None
+    remove_user: bool | None
     pin_message: bool | None
     edit_conference: bool | None
@@ -5,6 +5,10 @@ from abc import ABC
 from typing import ClassVar
 
 from microchat.services import ServiceError
+from microchat.services.auth import AuthenticationError
+from microchat.services.files import QuotaExceeded
+from microchat.services.general_exceptions import AccessDenied, DoesNotExists
+from microchat.services.general_exceptions import AlreadyExists
 
 from .response import APIResponse, JSON
 
@@ -28,7 +32,18 @@ class APIError(ABC, Exception, APIResponse[JSON]):
 
     @classmethod
     def from_service_exc(cls, exc: ServiceError) -> APIError:
-        pass
+        msg = str(exc) or None
+        if isinstance(exc, AccessDenied):
+            return Forbidden(msg)
+        if isinstance(exc, DoesNotExists):
+            return NotFound(msg)
+        if isinstance(exc, AlreadyExists):
+            return Conflict(msg)
+        if isinstance(exc, AuthenticationError):
+            return Unauthorized(msg)
+        if isinstance(exc, QuotaExceeded):
+            return PayloadTooLarge(msg)
+        return BadRequest(msg)
 
 
 class BadRequest(APIError):
@@ -45,3 +60,23 @@ class Forbidden(APIError):
 
 class NotFound(APIError):
     status_code = 404
+
+
+class MethodNotAllowed(APIError):
+    status_code = 405
+
+
+class Conflict(APIError):
+    status_code = 409
+
+
+class PayloadTooLarge(APIError):
+    status_code = 413
+
+
+class TooManyRequests(APIError):
+    status_code = 429
+
+
+class InternalServerError(APIError):
+    status_code = 500
@@ -1,21 +1,27 @@
 from __future__ import annotations
 
 import functools
+import time
 
 from typing import TypeVar
 from typing import Awaitable, Callable
 from typing import TYPE_CHECKING
 
 from microchat.api_utils.exceptions import Unauthorized
+from microchat.config import Config
+from microchat.core.events import EventStream
 from microchat.core.jwt_manager import JWTManager
 from microchat.core.entities import User
-from microchat.services import ServiceSet
+from microchat.services import Flights, ServiceSet
 from microchat.storages import UoW
+from microchat.storages.proxy import ObservedUoW, ObservedUoWFactory
+from microchat.storages.proxy import StorageCalls
 
 if TYPE_CHECKING:
     from .types import AuthenticatedHandler
     from .types import R, AR, CAR
 
+from .instrumentation import Instrumentation, Stage
 from .response import APIResponse, P
 
 
@@ -68,23 +74,82 @@ def cookie_authenticated(
 
 def services_injector(
     uow_factory: Callable[[], UoW],
-    jwt_manager: JWTManager
-) -> Callable[[Callable[[R, ServiceSet], Awaitable[APIResponse[P]]]], Callable[[R], Awaitable[APIResponse[P]]]]:
+    flights: Flights,
+    jwt_manager: JWTManager,
+    event_stream: EventStream,
+    config: Config,
+    instrumentation: Instrumentation | None = None
+) -> Callable[[Callable[[R, ServiceSet], Awaitable[APIResponse[P]]], str], Callable[[R], Awaitable[APIResponse[P]]]]:
     def with_services(
-        executor: Callable[[R, ServiceSet], Awaitable[APIResponse[P]]]
+        executor: Callable[[R, ServiceSet], Awaitable[APIResponse[P]]],
+        route: str = ""
     ) -> Callable[[R], Awaitable[APIResponse[P]]]:
-        return inject_services(executor, uow_factory, jwt_manager)
+        return inject_services(
+            executor, uow_factory, flights, jwt_manager, event_stream,
+            config, instrumentation, route
+        )
     return with_services
 
 
 def inject_services(
     executor: Callable[[R, ServiceSet], Awaitable[APIResponse[P]]],
     uow_factory: Callable[[], UoW],
-    jwt_manager: JWTManager
+    flights: Flights,
+    jwt_manager: JWTManager,
+    event_stream: EventStream,
+    config: Config,
+    instrumentation: Instrumentation | None = None,
+    route: str = ""
 ) -> Callable[[R], Awaitable[APIResponse[P]]]:
     async def with_services(request: R) -> APIResponse[P]:
         async with uow_factory() as uow:
-            services = ServiceSet(uow, jwt_manager)
+            services = ServiceSet(
+                uow, uow_factory, flights, jwt_manager, event_stream, config
+            )
             response = await executor(request, services)
+        await services.outbox.flush()
         return response
-    return with_services
+
+    if instrumentation is None:
+        return with_services
+
+    async def with_instrumented_services(request: R) -> APIResponse[P]:
+        storage_calls = StorageCalls()
+
+        def observe_call(
+            storage: str, method: str, arguments: dict[str, object],
+            seconds: float
+        ) -> None:
+            storage_calls(storage, method, arguments, seconds)
+            instrumentation.observe_storage_call(
+                route, storage, method, arguments, seconds
+            )
+
+        # shared calls started by the request are observed as its own
+        observed_factory = ObservedUoWFactory(uow_factory, observe_call)
+        try:
+            async with uow_factory() as uow:
+                observed_uow = ObservedUoW(uow, observe_call)
+                services = ServiceSet(
+                    observed_uow, observed_factory, flights, jwt_manager,
+                    event_stream, config
+                )
+                started = time.perf_counter()
+                try:
+                    response = await executor(request, services)
+                finally:
+                    executed = time.perf_counter()
+                    instrumentation.observe_stage(
+                        route, Stage.EXECUTE, executed - started
+                    )
+            committed = time.perf_counter()
+            instrumentation.observe_stage(
+                route, Stage.COMMIT, committed - executed
+            )
+            await services.outbox.flush()
+        finally:
+            instrumentation.observe_storage(
+                route, storage_calls.calls, storage_calls.seconds
+            )
+        return response
+    return with_instrumented_services
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import enum
+
+from typing import Iterable
+
+
+class Stage(enum.Enum):
+    EXTRACT = "extract"  # request parsing
+    EXECUTE = "execute"  # business logic
+    COMMIT = "commit"  # UoW exit
+    RENDER = "render"  # response serialization
+
+
+class Instrumentation:
+    """
+    Observer of endpoints pipeline. All of hooks are no-op, subclasses
+    override the ones they are interested in. Route is given as
+    '{METHOD} {path pattern}'. Hooks for one request are called from the
+    task which handles that request.
+    """
+
+    def request_started(self, route: str) -> None:
+        pass
+
+    def request_finished(self, route: str, seconds: float) -> None:
+        pass
+
+    def observe_stage(self, route: str, stage: Stage, seconds: float) -> None:
+        pass
+
+    def observe_storage_call(
+        self,
+        route: str,
+        storage: str, method: str, arguments: dict[str, object],
+        seconds: float
+    ) -> None:
+        pass
+
+    def observe_storage(
+        self, route: str, calls: int, seconds: float
+    ) -> None:
+        pass
+
+    def events_stream_opened(self) -> None:
+        pass
+
+    def events_stream_closed(self) -> None:
+        pass
+
+
+class Instrumentations(Instrumentation):
+    """Passes every hook call to each of given instrumentations."""
+
+    def __init__(self, instrumentations: Iterable[Instrumentation]) -> None:
+        self.instrumentations = tuple(instrumentations)
+
+    def request_started(self, route: str) -> None:
+        for instrumentation in self.instrumentations:
+            instrumentation.request_started(route)
+
+    def request_finished(self, route: str, seconds: float) -> None:
+        for instrumentation in self.instrumentations:
+            instrumentation.request_finished(route, seconds)
+
+    def observe_stage(self, route: str, stage: Stage, seconds: float) -> None:
+        for instrumentation in self.instrumentations:
+            instrumentation.observe_stage(route, stage, seconds)
+
+    def observe_storage_call(
+        self,
+        route: str,
+        storage: str, method: str, arguments: dict[str, object],
+        seconds: float
+    ) -> None:
+        for instrumentation in self.instrumentations:
+            instrumentation.observe_storage_call(
+                route, storage, method, arguments, seconds
+            )
+
+    def observe_storage(
+        self, route: str, calls: int, seconds: float
+    ) -> None:
+        for instrumentation in self.instrumentations:
+            instrumentation.observe_storage(route, calls, seconds)
+
+    def events_stream_opened(self) -> None:
+        for instrumentation in self.instrumentations:
+            instrumentation.events_stream_opened()
+
+    def events_stream_closed(self) -> None:
+        for instrumentation in self.instrumentations:
+            instrumentation.events_stream_closed()
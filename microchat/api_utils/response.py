@@ -2,18 +2,21 @@ from __future__ import annotations
 
 from asyncio import Queue
 from dataclasses import dataclass
+from datetime import datetime as dt
 import enum
 import json
 import functools
 
 from typing import Any, AsyncIterable, Generic, Sequence, TypeVar
 
-from microchat.core.entities import Entity
+from microchat.core.entities import Entity, Permissions
 from microchat.core.events import Event
 from microchat.core.types import JSON
 
+from .serialization import serialize, serialize_permissions
 
-APIResponseBody = Entity | Sequence[Entity] | dict[str, Entity]
+
+APIResponseBody = Entity | Permissions | Sequence[Entity] | dict[str, Entity]
 # Sequence used instead of list because list is invariant (and then it is
 # list[EntityChildClass] is not matched by theese union)
 
@@ -29,6 +32,7 @@ class Status(enum.Enum):
 class HEADER(enum.Enum):
     ContentDisposition = "Content-Disposition"
     ContentType = "Content-Type"
+    TotalCount = "X-Total-Count"
 
 
 @dataclass
@@ -45,8 +49,8 @@ class APIResponse(Generic[P]):
         reason: str | None = None,
         headers: dict[HEADER, str] | None = None,
     ) -> None:
-        if payload is not None:
-            self.payload = payload
+        # responses without content (204) have None payload
+        self.payload = payload  # type: ignore
         self.status = status
         self.reason = reason
         self.headers = {
@@ -61,8 +65,13 @@ class APIResponse(Generic[P]):
 class APIResponseEncoder(json.JSONEncoder):
     def default(self, o: Any) -> Any:  # type: ignore  # Any not allowed
         if isinstance(o, Entity):
-            # TODO: make serialization for all entity types
-            pass
+            return serialize(o)
+        if isinstance(o, Permissions):
+            return serialize_permissions(o)
+        if isinstance(o, dt):
+            return o.isoformat()
+        if isinstance(o, enum.Enum):
+            return o.value
         return super().default(o)
 
 
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+from microchat.core.entities import Entity, PERMISSIONS_FIELDS
+from microchat.core.entities import User, Bot, Conference
+from microchat.core.entities import Dialog, ConferenceParticipation
+from microchat.core.entities import Message, MessageVersion
+from microchat.core.entities import Attachment, Media
+from microchat.core.entities import FoundMessage, SearchResults
+from microchat.core.entities import ChatChanges, Changes, ItemResult
+from microchat.core.entities import StorageUsage
+from microchat.core.entities import Permissions, Session
+
+
+# Entities are serialized field by field: bound attributes (sender, members,
+# avatars and so on) need storage calls and are available by own endpoints.
+USER_FIELDS = ("id", "alias", "name", "surname", "bio")
+BOT_FIELDS = ("id", "alias", "title", "description")
+CONFERENCE_FIELDS = ("id", "alias", "title", "description", "private")
+SESSION_FIELDS = ("id", "name", "last_active", "location", "ip_address", "closed")  # noqa
+
+
+def serialize(entity: Entity) -> dict[str, object]:
+    """
+    Returns dict representation of entity. Values may be entities, enums
+    and datetimes, they are handled by the JSON encoder.
+    """
+    if isinstance(entity, User):
+        return _fields(entity, USER_FIELDS)
+    if isinstance(entity, Bot):
+        return _fields(entity, BOT_FIELDS)
+    if isinstance(entity, Conference):
+        return _fields(entity, CONFERENCE_FIELDS)
+    if isinstance(entity, Dialog):
+        return {
+            "related": entity.related,
+            "permissions": entity.permissions,
+            "read_no": entity.read_no,
+            "unread": entity.unread,
+        }
+    if isinstance(entity, ConferenceParticipation):
+        return {
+            "no": entity.no,
+            "related": entity.related,
+            "role": entity.role,
+            "permissions": entity.permissions,
+            "read_no": entity.read_no,
+            "unread": entity.unread,
+        }
+    if isinstance(entity, Message):
+        reply_to = entity.reply_to
+        return {
+            "id": entity.id,
+            "no": entity.no,
+            "text": entity.text,
+            "time_sent": entity.time_sent,
+            "time_edit": entity.time_edit,
+            "reply_to": reply_to.no if reply_to is not None else None,
+        }
+    if isinstance(entity, MessageVersion):
+        return {
+            "no": entity.no,
+            "text": entity.text,
+            "attachments": entity.attachments,
+            "time": entity.time,
+        }
+    if isinstance(entity, FoundMessage):
+        return {"chat": entity.chat.related.id, "message": entity.message}
+    if isinstance(entity, SearchResults):
+        return {"found": entity.found, "before": entity.before}
+    if isinstance(entity, ChatChanges):
+        return {
+            "chat": entity.chat,
+            "messages": entity.messages,
+            "deleted": entity.deleted,
+            "complete": entity.complete,
+        }
+    if isinstance(entity, Changes):
+        return {
+            "token": entity.version,
+            "chats": entity.chats,
+            "left": entity.left,
+        }
+    if isinstance(entity, ItemResult):
+        return {"value": entity.value, "error": entity.error}
+    if isinstance(entity, StorageUsage):
+        return {
+            "owner": entity.owner,
+            "uploaded": entity.uploaded,
+            "charged": entity.charged,
+            "uploads": {
+                media_type.value: count
+                for media_type, count in entity.uploads.items()
+            },
+        }
+    if isinstance(entity, Attachment):
+        return {"no": entity.no, "media": entity.media}
+    if isinstance(entity, Media):
+        return {
+            "kind": type(entity).__name__.lower(),
+            "name": entity.name,
+            "type": entity.type,
+            "subtype": entity.subtype,
+            "hash": entity.file_info.hash,
+            "size": entity.file_info.size,
+            "loaded_at": entity.loaded_at,
+        }
+    if isinstance(entity, Session):
+        return _fields(entity, SESSION_FIELDS)
+    entity_type = type(entity).__name__
+    raise TypeError(f"Serialization of '{entity_type}' is not supported")
+
+
+def serialize_permissions(permissions: Permissions) -> dict[str, bool]:
+    return {
+        field: Permissions.of(field) in permissions
+        for field in PERMISSIONS_FIELDS
+    }
+
+
+def _fields(entity: Entity, fields: tuple[str, ...]) -> dict[str, object]:
+    return {field: getattr(entity, field, None) for field in fields}
@@ -1,15 +1,24 @@
+from __future__ import annotations
+
 from logging import Logger
 
 from typing import Awaitable, Callable, Iterable
+from typing import TYPE_CHECKING
 
 from aiohttp import log
 from aiohttp import web
 from aiohttp.typedefs import Handler
 
+from microchat.config import Config
+from microchat.core.events import EventStream
 from microchat.core.jwt_manager import JWTManager
 from microchat.storages import UoW
 
 from .api import api_app
+from .rate_limit import rate_limiter
+
+if TYPE_CHECKING:
+    from microchat.metrics import LoopMonitor, Registry, Tracer
 
 
 _Middleware = Callable[[web.Request, Handler], Awaitable[web.StreamResponse]]
@@ -20,12 +29,41 @@ async def app(
     jwt_manager: JWTManager,
     logger: Logger = log.web_logger,
     middlewares: Iterable[_Middleware] = (),
-    client_max_size: int = 1024**2,
+    config: Config | None = None,
+    metrics: Registry | None = None,
+    tracer: Tracer | None = None,
+    loop_monitor: LoopMonitor | None = None,
+    event_stream: EventStream | None = None,
 ) -> web.Application:
+    if config is None:
+        config = Config()
+    if event_stream is None:
+        event_stream = EventStream(queue_size=config.events.queue_size)
+    middlewares = list(middlewares)
+    rate_limits = config.rate_limits
+    if rate_limits.rate:
+        middlewares.insert(
+            0, rate_limiter(rate_limits.rate, rate_limits.burst)
+        )
     router = web.UrlDispatcher()
     app = web.Application(
         logger=logger, router=router, middlewares=middlewares,
-        client_max_size=client_max_size
+        client_max_size=config.server.client_max_size
     )
-    app.add_subapp("/api/", api_app(uow_factory, jwt_manager))
+    app.add_subapp("/api/", api_app(
+        uow_factory, jwt_manager, event_stream, config, metrics, tracer
+    ))
+    if loop_monitor is not None:
+        _add_loop_monitor(app, loop_monitor)
     return app
+
+
+def _add_loop_monitor(app: web.Application, monitor: LoopMonitor) -> None:
+    async def start(app: web.Application) -> None:
+        monitor.start()
+
+    async def stop(app: web.Application) -> None:
+        await monitor.stop()
+
+    app.on_startup.append(start)  # type: ignore
+    app.on_cleanup.append(stop)  # type: ignore
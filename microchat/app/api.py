@@ -1,17 +1,61 @@
+from __future__ import annotations
+
 from typing import Callable
+from typing import TYPE_CHECKING
 
 from aiohttp import web
 
+from microchat.api_utils.instrumentation import Instrumentation
+from microchat.api_utils.instrumentation import Instrumentations
+from microchat.config import Config
+from microchat.core.events import EventStream
 from microchat.core.jwt_manager import JWTManager
+from microchat.services import Flights
 from microchat.storages import UoW
 
 from .routes import get_api_router
 
+if TYPE_CHECKING:
+    from microchat.metrics import Registry, Tracer
+
 
 def api_app(
     uow_factory: Callable[[], UoW],
-    jwt_manager: JWTManager
+    jwt_manager: JWTManager,
+    event_stream: EventStream,
+    config: Config,
+    metrics: Registry | None = None,
+    tracer: Tracer | None = None
 ) -> web.Application:
-    router = get_api_router(uow_factory, jwt_manager)
+    # metrics are imported only when they are enabled
+    instrumentations: list[Instrumentation] = []
+    flights = Flights()
+    if metrics is not None:
+        from microchat.metrics import PipelineMetrics
+        from microchat.metrics import register_singleflight_metrics
+        instrumentations.append(PipelineMetrics(metrics))
+        register_singleflight_metrics(metrics, flights)
+    if tracer is not None:
+        instrumentations.append(tracer)
+    instrumentation = None
+    if len(instrumentations) == 1:
+        instrumentation = instrumentations[0]
+    elif instrumentations:
+        instrumentation = Instrumentations(instrumentations)
+    router = get_api_router(
+        uow_factory, jwt_manager, event_stream, config, instrumentation,
+        flights
+    )
+    if metrics is not None:
+        from .metrics import metrics_endpoint
+        router.add_route(
+            "GET", "/metrics", metrics_endpoint(metrics, config.metrics.token)
+        )
+    if tracer is not None:
+        from .metrics import traces_endpoint
+        router.add_route(
+            "GET", "/debug/traces",
+            traces_endpoint(tracer, config.metrics.token)
+        )
     api_app = web.Application(router=router)
     return api_app
@@ -3,9 +3,11 @@ from aiohttp import web
 from microchat.api.chats import GetMessage, GetChat, GetChatMedia
 from microchat.api.chats import GetAttachmentContent, GetAttachmentPreview
 from microchat.api.chats import GetChatMedias, GetChats, GetMessages
-from microchat.api.chats import EditMessage, DeleteMessage
+from microchat.api.chats import EditMessage, DeleteMessage, MarkRead
 from microchat.api.chats import RemoveChatMedia
-from microchat.api.chats import SendMessage
+from microchat.api.chats import SearchMessages, SendMessage, SyncChats
+from microchat.api.chats import OutgoingMessage, SendMessages
+from microchat.api.chats import GetMessageVersions, GetMessageVersion
 from microchat.api_utils.exceptions import BadRequest, NotFound
 
 from microchat.core.entities import Animation, Audio, File, Image, Video
@@ -13,6 +15,11 @@ from .misc import get_disposition, get_request_payload, int_param
 from .misc import get_access_token, get_media_access_info
 
 
+SEARCH_DEFAULT_COUNT = 20
+SEARCH_MAX_COUNT = 100
+SEARCH_MAX_QUERY_LENGTH = 256
+SEND_MAX_MESSAGES = 1000
+
 MEDIA_CLASSES: dict[str, type[Image | Animation | Audio | Video | File]] = {
     "photo": Image,
     "animation": Animation,
@@ -48,6 +55,38 @@ async def messages_request_params(request: web.Request) -> GetMessages:
     return GetMessages(access_token, chat_request, disposition)
 
 
+async def search_request_params(request: web.Request) -> SearchMessages:
+    access_token = get_access_token(request)
+    chat_request = None
+    if request.match_info:
+        chat_request = await chat_request_params(request)
+    query = request.query.get("q", "")
+    if not query.strip():
+        raise BadRequest("Search query 'q' must be given")
+    if len(query) > SEARCH_MAX_QUERY_LENGTH:
+        raise BadRequest(
+            f"Search query is longer than {SEARCH_MAX_QUERY_LENGTH}"
+        )
+    before_repr = request.query.get("before")
+    before = int_param(before_repr, "before") if before_repr else None
+    count_repr = request.query.get("count")
+    count = SEARCH_DEFAULT_COUNT
+    if count_repr is not None:
+        count = int_param(count_repr, "count")
+    if not 0 < count <= SEARCH_MAX_COUNT:
+        raise BadRequest(f"'count' must be in 1..{SEARCH_MAX_COUNT}")
+    return SearchMessages(access_token, chat_request, query, before, count)
+
+
+async def sync_request_params(request: web.Request) -> SyncChats:
+    access_token = get_access_token(request)
+    token_repr = request.query.get("token")
+    version = int_param(token_repr, "token") if token_repr else 0
+    if version < 0:
+        raise BadRequest("'token' must be non-negative")
+    return SyncChats(access_token, version)
+
+
 async def message_request_params(request: web.Request) -> GetMessage:
     access_token = get_access_token(request)
     chat_request = await chat_request_params(request)
@@ -74,6 +113,36 @@ async def message_send_params(request: web.Request) -> SendMessage:
     )
 
 
+async def messages_send_params(request: web.Request) -> SendMessages:
+    access_token = get_access_token(request)
+    payload = await get_request_payload(request)
+    items = payload.get("messages")
+    if not isinstance(items, list) or not items:
+        raise BadRequest("'messages' must be a non-empty list")
+    if len(items) > SEND_MAX_MESSAGES:
+        raise BadRequest(f"At most {SEND_MAX_MESSAGES} messages are allowed")
+    messages = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise BadRequest("Messages must be objects")
+        chat = item.get("chat")
+        text = item.get("text")
+        attachments = item.get("attachments")
+        if not isinstance(chat, (int, str)) or isinstance(chat, bool):
+            raise BadRequest("'chat' must be id or alias")
+        if text is not None and not isinstance(text, str):
+            raise BadRequest("'text' must be string")
+        if attachments is not None and not (
+            isinstance(attachments, list)
+            and all(isinstance(hash, str) for hash in attachments)
+        ):
+            raise BadRequest("Attachments must be list of hashes")
+        if text is None and not attachments:
+            raise BadRequest("Message text or attachments must be given")
+        messages.append(OutgoingMessage(chat, text, attachments))
+    return SendMessages(access_token, messages)
+
+
 async def message_edit_params(request: web.Request) -> EditMessage:
     access_token = get_access_token(request)
     message_request = await message_request_params(request)
@@ -87,12 +156,37 @@ async def message_edit_params(request: web.Request) -> EditMessage:
     return EditMessage(access_token, message_request, text, attachments_ids)
 
 
+async def message_versions_params(
+    request: web.Request
+) -> GetMessageVersions:
+    access_token = get_access_token(request)
+    message_request = await message_request_params(request)
+    return GetMessageVersions(access_token, message_request)
+
+
+async def message_version_params(request: web.Request) -> GetMessageVersion:
+    access_token = get_access_token(request)
+    message_request = await message_request_params(request)
+    version_no = int_param(request.match_info.get("version", ""), "version")
+    return GetMessageVersion(access_token, message_request, version_no)
+
+
 async def message_delete_params(request: web.Request) -> DeleteMessage:
     access_token = get_access_token(request)
     message_request = await message_request_params(request)
     return DeleteMessage(access_token, message_request)
 
 
+async def mark_read_params(request: web.Request) -> MarkRead:
+    access_token = get_access_token(request)
+    chat_request = await chat_request_params(request)
+    payload = await get_request_payload(request)
+    no = payload.get("no")
+    if not isinstance(no, int) or isinstance(no, bool) or no < 0:
+        raise BadRequest("'no' must be non-negative int")
+    return MarkRead(access_token, chat_request, no)
+
+
 async def attachment_content_params(
     request: web.Request
 ) -> GetAttachmentContent:
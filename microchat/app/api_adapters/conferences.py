@@ -3,6 +3,7 @@ from aiohttp import web
 from microchat.api.conferences import GetConference, CreateConference
 from microchat.api.conferences import GetDefaultPermissions, EditDefaultPermissions
 from microchat.api.conferences import GetMembers, GetMember, AddMember, RemoveMember
+from microchat.api.conferences import AddMembers, RemoveMembers
 from microchat.api.conferences import GetMemberPermissions, EditMemberPermissions
 from microchat.api_utils.exceptions import BadRequest
 
@@ -11,6 +12,9 @@ from .misc import get_request_payload, int_param
 from .misc import get_access_token
 
 
+BULK_MAX_MEMBERS = 10_000
+
+
 async def conference_request_params(request: web.Request) -> GetConference:
     access_token = get_access_token(request)
     entity_id = request.match_info.get("entity_id")
@@ -65,7 +69,8 @@ async def members_request_params(request: web.Request) -> GetMembers:
     access_token = get_access_token(request)
     conference_request = await conference_request_params(request)
     disposition = get_disposition(request)
-    return GetMembers(access_token, conference_request, disposition)
+    role = request.query.get("role")
+    return GetMembers(access_token, conference_request, disposition, role)
 
 
 async def member_request_params(request: web.Request) -> GetMember:
@@ -94,12 +99,42 @@ async def member_add_params(request: web.Request) -> AddMember:
         )
 
 
+async def members_add_params(request: web.Request) -> AddMembers:
+    access_token = get_access_token(request)
+    conference_request = await conference_request_params(request)
+    payload = await get_request_payload(request)
+    invitees = payload.get("invitees")
+    if not isinstance(invitees, list) or not all(
+        isinstance(item, (int, str)) and not isinstance(item, bool)
+        for item in invitees
+    ):
+        raise BadRequest("'invitees' must be a list of ids and aliases")
+    if len(invitees) > BULK_MAX_MEMBERS:
+        raise BadRequest(f"At most {BULK_MAX_MEMBERS} invitees are allowed")
+    return AddMembers(access_token, conference_request, invitees)
+
+
 async def member_remove_params(request: web.Request) -> RemoveMember:
     access_token = get_access_token(request)
     member_request = await member_request_params(request)
     return RemoveMember(access_token, member_request)
 
 
+async def members_remove_params(request: web.Request) -> RemoveMembers:
+    access_token = get_access_token(request)
+    conference_request = await conference_request_params(request)
+    payload = await get_request_payload(request)
+    members = payload.get("members")
+    if not isinstance(members, list) or not all(
+        isinstance(item, int) and not isinstance(item, bool)
+        for item in members
+    ):
+        raise BadRequest("'members' must be a list of member numbers")
+    if len(members) > BULK_MAX_MEMBERS:
+        raise BadRequest(f"At most {BULK_MAX_MEMBERS} members are allowed")
+    return RemoveMembers(access_token, conference_request, members)
+
+
 async def member_permissions_request_params(
     request: web.Request
 ) -> GetMemberPermissions:
@@ -3,16 +3,27 @@ from typing import Any, TypeGuard
 from aiohttp import web
 
 from microchat.api.entities import GetSelf, GetEntity, EditSelf, EditEntity
-from microchat.api.entities import RemoveSelf, RemoveEntity
+from microchat.api.entities import RemoveSelf, RemoveEntity, SearchEntities
 from microchat.api.entities import GetPermissions, EditPermissions
 from microchat.api.entities import GetAvatars, GetAvatar, SetAvatar, RemoveAvatar
 from microchat.api_utils.exceptions import BadRequest
+from microchat.core.entities import User, Bot, Conference
 
 from .misc import get_disposition, get_permissions_patch
 from .misc import int_param, get_request_payload
 from .misc import get_access_token
 
 
+SEARCH_KINDS: dict[str, type[User | Bot | Conference]] = {
+    "user": User,
+    "bot": Bot,
+    "conference": Conference,
+}
+SEARCH_DEFAULT_COUNT = 20
+SEARCH_MAX_COUNT = 50
+SEARCH_MAX_QUERY_LENGTH = 64
+
+
 async def self_request_params(request: web.Request) -> GetSelf:
     access_token = get_access_token(request)
     return GetSelf(access_token)
@@ -49,6 +60,32 @@ async def entity_request_params(request: web.Request) -> GetEntity:
         raise BadRequest
 
 
+async def entities_search_params(request: web.Request) -> SearchEntities:
+    access_token = get_access_token(request)
+    query = request.query.get("q", "")
+    if not query.strip():
+        raise BadRequest("Search query 'q' must be given")
+    if len(query) > SEARCH_MAX_QUERY_LENGTH:
+        raise BadRequest(
+            f"Search query is longer than {SEARCH_MAX_QUERY_LENGTH}"
+        )
+    kinds_repr = request.query.get("kind")
+    kinds = tuple(SEARCH_KINDS.values())
+    if kinds_repr:
+        names = kinds_repr.split(",")
+        if not all(name in SEARCH_KINDS for name in names):
+            known = ", ".join(SEARCH_KINDS)
+            raise BadRequest(f"'kind' must be comma separated of {known}")
+        kinds = tuple(SEARCH_KINDS[name] for name in names)
+    count_repr = request.query.get("count")
+    count = SEARCH_DEFAULT_COUNT
+    if count_repr is not None:
+        count = int_param(count_repr, "count")
+    if not 0 < count <= SEARCH_MAX_COUNT:
+        raise BadRequest(f"'count' must be in 1..{SEARCH_MAX_COUNT}")
+    return SearchEntities(access_token, query, kinds, count)
+
+
 async def entity_edit_params(request: web.Request) -> EditEntity:
     access_token = get_access_token(request)
     entity_request = await entity_request_params(request)
@@ -0,0 +1,10 @@
+from aiohttp import web
+
+from microchat.api.events import GetEvents
+
+from .misc import get_access_token
+
+
+async def events_request_params(request: web.Request) -> GetEvents:
+    access_token = get_access_token(request)
+    return GetEvents(access_token)
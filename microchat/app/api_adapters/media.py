@@ -4,14 +4,15 @@ from aiohttp import web
 from aiohttp import multipart
 
 from microchat.api.media import DownloadMedia, DownloadPreview, UploadMedia
-from microchat.api.media import GetMediaInfo
+from microchat.api.media import GetMediaInfo, GetTopUsage
 from microchat.api.media import PartReader
 from microchat.api_utils.exceptions import BadRequest
 
-from .misc import get_access_token, get_media_access_info
+from .misc import get_access_token, get_media_access_info, int_param
 
 
-CHUNK_SIZE = 65535
+USAGE_DEFAULT_COUNT = 20
+USAGE_MAX_COUNT = 100
 
 
 class MultipartReader(PartReader):
@@ -22,9 +23,7 @@ class MultipartReader(PartReader):
     async def read(self) -> bytes:
         return await self._origin.read()
 
-    async def iter_chunks(
-        self, size: int = CHUNK_SIZE
-    ) -> AsyncIterable[bytes]:
+    async def iter_chunks(self, size: int) -> AsyncIterable[bytes]:
         chunk = await self._origin.read_chunk(size)
         while chunk:
             yield chunk
@@ -34,7 +33,9 @@ class MultipartReader(PartReader):
 async def upload_media_params(request: web.Request) -> UploadMedia:
     access_token = get_access_token(request)
     payload = await request.multipart()
-    return UploadMedia(access_token, iter_multipart(payload))
+    return UploadMedia(
+        access_token, iter_multipart(payload), request.content_length
+    )
 
 
 async def get_media_info_params(request: web.Request) -> GetMediaInfo:
@@ -55,6 +56,17 @@ async def download_preview_params(request: web.Request) -> DownloadPreview:
     return DownloadPreview(access_token, csrf_token, hash)
 
 
+async def top_usage_params(request: web.Request) -> GetTopUsage:
+    access_token = get_access_token(request)
+    count_repr = request.query.get("count")
+    count = USAGE_DEFAULT_COUNT
+    if count_repr is not None:
+        count = int_param(count_repr, "count")
+    if not 0 < count <= USAGE_MAX_COUNT:
+        raise BadRequest(f"'count' must be in 1..{USAGE_MAX_COUNT}")
+    return GetTopUsage(access_token, count)
+
+
 async def iter_multipart(
     parts: multipart.MultipartReader
 ) -> AsyncIterable[tuple[str, PartReader]]:
@@ -7,6 +7,9 @@ from microchat.core.entities import PERMISSIONS_FIELDS
 from microchat.api_utils.exceptions import BadRequest, Unauthorized
 
 
+# page size of lists when the query has no 'count'
+DEFAULT_COUNT = 20
+
 def int_param(string: str, name: str | None = None) -> int:
     try:
         return int(string)
@@ -41,7 +44,7 @@ def get_media_access_info(request: web.Request) -> tuple[str, str]:
 
 
 def get_disposition(request: web.Request) -> Disposition:
-    offset, count = None, None
+    offset, count = 0, DEFAULT_COUNT
     offset_repr = request.query.get("offset")
     count_repr = request.query.get("count")
     if offset_repr is not None:
@@ -64,6 +67,8 @@ async def get_request_payload(  # type: ignore
 
 def get_permissions_patch(params: dict[str, Any]) -> PermissionsPatch:  # type: ignore  # noqa
     patch = {key: params.get(key) for key in PERMISSIONS_FIELDS}
-    if not all(isinstance(value, bool) for value in patch.values()):
+    if not all(
+        value is None or isinstance(value, bool) for value in patch.values()
+    ):
         raise BadRequest("All parameters must be booleans")
     return cast(PermissionsPatch, patch)
@@ -0,0 +1,258 @@
+"""
+Batch of API requests sent as one request.
+
+Sub-requests are resolved by the API router and go through extractors and
+executors of their routes, as if they were sent one by one. They share one
+unit of work and one resolution of access token, so a batch of several
+requests costs about one of them. Sub-requests are run in order and are
+not atomic: an error of one of them is its response only and does not
+revert the others. Routes which stream their responses (events, media
+content) or read multipart bodies are not batched. Rate limit counts each
+sub-request as a request.
+"""
+from __future__ import annotations
+
+import logging
+import time
+
+from dataclasses import dataclass
+
+from asyncio import Queue
+
+from typing import AsyncIterable, Awaitable, Callable
+from typing import cast
+
+from aiohttp import web
+from aiohttp.web_urldispatcher import MatchInfoError, UrlMappingMatchInfo
+from yarl import URL
+
+from microchat.api_utils.exceptions import APIError, BadRequest
+from microchat.api_utils.exceptions import MethodNotAllowed, NotFound
+from microchat.api_utils.exceptions import InternalServerError
+from microchat.api_utils.exceptions import TooManyRequests, Unauthorized
+from microchat.api_utils.instrumentation import Instrumentation, Stage
+from microchat.api_utils.request import APIRequest, Authenticated
+from microchat.api_utils.request import CookieAuthenticated
+from microchat.api_utils.response import APIResponse, DEFAULT_JSON_DUMPER
+from microchat.api_utils.response import APIResponseBody
+from microchat.api_utils.types import AuthenticatedHandler, JSON
+from microchat.config import Config
+from microchat.core.entities import User
+from microchat.core.events import Event, EventStream
+from microchat.core.jwt_manager import JWTManager
+from microchat.services import Flights, ServiceError, ServiceSet
+from microchat.storages import UoW
+
+from .rate_limit import CHARGE_KEY
+
+
+BATCH_LOG = logging.getLogger("microchat.batch")
+
+BATCH_MAX_REQUESTS = 100
+METHODS = ("GET", "POST", "PATCH", "DELETE")
+
+Payload = APIResponseBody | JSON | AsyncIterable[bytes] | Queue[Event]
+Operation = tuple[
+    Callable[[APIRequest, ServiceSet], Awaitable[APIResponse[Payload]]],
+    Callable[[web.Request], Awaitable[APIRequest]]
+]
+
+
+@dataclass
+class SubRequest:
+    method: str
+    path: str
+    body: JSON
+
+
+@dataclass
+class Batch(APIRequest):
+    origin: web.Request
+    requests: list[SubRequest]
+    # rate limiter's charge of the client, requests which are rejected
+    # before they run are returned to it
+    charge: Callable[[float], bool] | None = None
+
+
+async def batch_params(request: web.Request) -> Batch:
+    # request can't be cloned after its body is read, sub-requests are
+    # cloned from a copy which is taken before
+    origin = request.clone()
+    payload = await request.json()
+    if not isinstance(payload, dict):
+        raise BadRequest("Request body must be dict")
+    requests = payload.get("requests")
+    if not isinstance(requests, list):
+        raise BadRequest("'requests' parameter must be list")
+    if not requests:
+        raise BadRequest("'requests' parameter must not be empty")
+    if len(requests) > BATCH_MAX_REQUESTS:
+        raise BadRequest(
+            f"Too many requests, at most {BATCH_MAX_REQUESTS} are allowed"
+        )
+    sub_requests = []
+    for item in requests:
+        if not isinstance(item, dict):
+            raise BadRequest("All requests must be dicts")
+        method = item.get("method")
+        path = item.get("path")
+        body = item.get("body")
+        if not isinstance(method, str) or method.upper() not in METHODS:
+            raise BadRequest(
+                f"'method' of request must be one of {', '.join(METHODS)}"
+            )
+        if not isinstance(path, str) or not path.startswith("/"):
+            raise BadRequest("'path' of request must be string starting with /")
+        if body is not None and not isinstance(body, dict):
+            raise BadRequest("'body' of request must be dict")
+        sub_requests.append(SubRequest(method.upper(), path, body))
+    # the batch request itself took a token already
+    charge = cast(Callable[[float], bool] | None, request.get(CHARGE_KEY))
+    if charge is not None and not charge(len(sub_requests) - 1):
+        raise TooManyRequests("Too many requests")
+    return Batch(origin, sub_requests, charge)
+
+
+def batch_executor(
+    operations: dict[object, Operation],
+    router: web.UrlDispatcher,
+    route: str,
+    uow_factory: Callable[[], UoW],
+    flights: Flights,
+    jwt_manager: JWTManager,
+    event_stream: EventStream,
+    config: Config,
+    instrumentation: Instrumentation | None = None,
+    label: str = ""
+) -> Callable[[Batch], Awaitable[APIResponse[JSON]]]:
+    async def execute_batch(batch: Batch) -> APIResponse[JSON]:
+        origin = batch.origin
+        # API app may be mounted with a prefix, paths are relative to it
+        resource = origin.match_info.route.resource
+        canonical = resource.canonical if resource is not None else route
+        prefix = canonical.removesuffix(route)
+        users: dict[str, User] = {}
+        responses: list[JSON] = []
+        async with uow_factory() as uow:
+            services = ServiceSet(
+                uow, uow_factory, flights, jwt_manager, event_stream, config
+            )
+            started = time.perf_counter()
+            rejected = 0
+            for sub_request in batch.requests:
+                api_response: APIResponse[Payload] | APIError
+                operation = None
+                try:
+                    operation = await _extract(
+                        operations, router, origin, prefix, sub_request
+                    )
+                    api_response = await _run(*operation, services, users)
+                except APIError as err:
+                    api_response = err
+                except ServiceError as service_exc:
+                    api_response = APIError.from_service_exc(service_exc)
+                except Exception:
+                    BATCH_LOG.exception(
+                        "%s %s failed", sub_request.method, sub_request.path
+                    )
+                    api_response = InternalServerError(
+                        "Internal server error"
+                    )
+                if operation is None:
+                    rejected += 1
+                responses.append(_sub_response(api_response))
+            executed = time.perf_counter()
+        if rejected and batch.charge is not None:
+            # the batch token pays for the first request in any case
+            batch.charge(-min(rejected, len(batch.requests) - 1))
+        if instrumentation is not None:
+            committed = time.perf_counter()
+            instrumentation.observe_stage(
+                label, Stage.EXECUTE, executed - started
+            )
+            instrumentation.observe_stage(
+                label, Stage.COMMIT, committed - executed
+            )
+        await services.outbox.flush()
+        return APIResponse(responses)
+    return execute_batch
+
+
+async def _extract(
+    operations: dict[object, Operation],
+    router: web.UrlDispatcher,
+    origin: web.Request,
+    prefix: str,
+    sub_request: SubRequest
+) -> tuple[
+    Callable[[APIRequest, ServiceSet], Awaitable[APIResponse[Payload]]],
+    APIRequest
+]:
+    """Returns executor and parameters of sub-request, runs nothing."""
+    request = origin.clone(
+        method=sub_request.method, rel_url=URL(prefix + sub_request.path)
+    )
+    match_info = await router.resolve(request)
+    if isinstance(match_info, MatchInfoError):
+        if isinstance(match_info.http_exception, web.HTTPMethodNotAllowed):
+            raise MethodNotAllowed(
+                f"{sub_request.method} is not allowed for {sub_request.path}"
+            )
+        raise NotFound(f"{sub_request.path} is not found")
+    operation = operations.get(match_info.handler)
+    if operation is None:
+        raise BadRequest(
+            f"{sub_request.method} {sub_request.path} can't be batched"
+        )
+    for app in reversed(origin.match_info.apps):
+        match_info.add_app(app)
+    _prepare(request, match_info, sub_request.body)
+    executor, extractor = operation
+    return executor, await extractor(request)
+
+
+async def _run(
+    executor: Callable[
+        [APIRequest, ServiceSet], Awaitable[APIResponse[Payload]]
+    ],
+    api_request: APIRequest,
+    services: ServiceSet,
+    users: dict[str, User]
+) -> APIResponse[Payload]:
+    if isinstance(api_request, CookieAuthenticated) or \
+            not isinstance(api_request, Authenticated):
+        return await executor(api_request, services)
+    user = users.get(api_request.access_token)
+    if user is None:
+        session = await services.auth.resolve_token(api_request.access_token)
+        if session.closed:
+            raise Unauthorized("Token was revoked")
+        user = users[api_request.access_token] = session.auth.user
+    authenticated = cast(
+        AuthenticatedHandler[Authenticated, APIResponse[Payload]], executor
+    )
+    return await authenticated(api_request, services, user)
+
+
+def _prepare(
+    request: web.Request, match_info: UrlMappingMatchInfo, body: JSON
+) -> None:
+    # aiohttp has no public way to set these for a request which is not
+    # dispatched by the application: match info is set by the application
+    # handler and the body is read from the cached bytes if there are ones
+    match_info.freeze()
+    request._match_info = match_info
+    request._read_bytes = DEFAULT_JSON_DUMPER(body).encode()
+
+
+def _sub_response(api_response: APIResponse[Payload] | APIError) -> JSON:
+    payload = getattr(api_response, "payload", None)
+    body = {"error": payload} if isinstance(api_response, APIError) else \
+        {"response": payload}
+    headers: dict[str, JSON] = {**(api_response.headers or {})}
+    return {
+        "status": api_response.status_code,
+        "headers": headers,
+        "body": body,
+    }
+
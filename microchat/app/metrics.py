@@ -0,0 +1,41 @@
+import hmac
+
+from aiohttp import web
+from aiohttp import typedefs
+
+from microchat.metrics import Registry, Tracer
+
+from .api_adapters.misc import int_param
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_TRACES_COUNT = 20
+
+
+def metrics_endpoint(registry: Registry, token: str) -> typedefs.Handler:
+    async def handler(request: web.Request) -> web.StreamResponse:
+        _check_token(request, token)
+        body = registry.exposition()
+        return web.Response(text=body, headers={"Content-Type": CONTENT_TYPE})
+    return handler
+
+
+def traces_endpoint(tracer: Tracer, token: str) -> typedefs.Handler:
+    async def handler(request: web.Request) -> web.StreamResponse:
+        _check_token(request, token)
+        count_repr = request.query.get("count")
+        count = DEFAULT_TRACES_COUNT
+        if count_repr is not None:
+            count = int_param(count_repr, "count")
+        traces = [trace.as_json() for trace in tracer.last(count)]
+        return web.json_response({"response": traces})
+    return handler
+
+
+def _check_token(request: web.Request, token: str) -> None:
+    # the header scrapers send, not the one of API sessions; empty token
+    # of an app built without config denies everybody
+    expected = f"Bearer {token}".encode()
+    given = request.headers.get("Authorization", "").encode()
+    if not token or not hmac.compare_digest(given, expected):
+        raise web.HTTPUnauthorized()
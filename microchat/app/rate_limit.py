@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import math
+import time
+
+from typing import Awaitable, Callable
+
+from aiohttp import web
+from aiohttp.typedefs import Handler
+
+
+# buckets of clients which are idle long enough to be full again are
+# forgotten when there are more clients than that
+MAX_CLIENTS = 65536
+# request key of a function which takes more tokens from the client's
+# bucket, for requests which run several operations (batches)
+CHARGE_KEY = "rate_limit_charge"
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    tokens: float
+    updated: float
+
+    def __init__(self, tokens: float, updated: float) -> None:
+        self.tokens = tokens
+        self.updated = updated
+
+
+def rate_limiter(
+    rate: float, burst: int
+) -> Callable[[web.Request, Handler], Awaitable[web.StreamResponse]]:
+    """
+    Limits requests of each client address to `rate` per second on average
+    and `burst` at once. Requests above the limit get 429 response. A
+    request takes one token, handlers may take more by `CHARGE_KEY` and
+    return ones they took for work which was not done (negative charge).
+    """
+    buckets: dict[str | None, TokenBucket] = {}
+
+    @web.middleware
+    async def limit_rate(
+        request: web.Request, handler: Handler
+    ) -> web.StreamResponse:
+        now = time.monotonic()
+        bucket = buckets.get(request.remote)
+        if bucket is None:
+            if len(buckets) >= MAX_CLIENTS:
+                _forget_idle(buckets, now, rate, burst)
+            bucket = buckets[request.remote] = TokenBucket(burst, now)
+        else:
+            elapsed = now - bucket.updated
+            bucket.tokens = min(bucket.tokens + elapsed * rate, burst)
+            bucket.updated = now
+        if bucket.tokens < 1:
+            retry_after = math.ceil((1 - bucket.tokens) / rate)
+            return web.json_response(
+                {"error": "Too many requests"}, status=429,
+                headers={"Retry-After": str(retry_after)}
+            )
+        bucket.tokens -= 1
+        client_bucket = bucket
+
+        def charge(tokens: float) -> bool:
+            if client_bucket.tokens < tokens:
+                return False
+            client_bucket.tokens = min(client_bucket.tokens - tokens, burst)
+            return True
+
+        request[CHARGE_KEY] = charge
+        return await handler(request)
+
+    return limit_rate
+
+
+def _forget_idle(
+    buckets: dict[str | None, TokenBucket],
+    now: float, rate: float, burst: int
+) -> None:
+    refill_time = burst / rate
+    idle = [
+        client for client, bucket in buckets.items()
+        if now - bucket.updated >= refill_time
+    ]
+    for client in idle:
+        del buckets[client]
@@ -4,17 +4,21 @@ from typing import AsyncIterable, Awaitable, Callable
 
 from aiohttp import web
 from aiohttp import typedefs
-from aiohttp_sse import sse_response
+from aiohttp_sse import EventSourceResponse, sse_response
 
 from microchat.api_utils.exceptions import APIError
+from microchat.api_utils.instrumentation import Instrumentation
 from microchat.api_utils.response import APIResponse, P
 from microchat.api_utils.types import JSON
+from microchat.core.events import Event, StreamOverflow
 
 
 def renderer(
-    dumps: typedefs.JSONEncoder
-) -> Callable[[APIResponse[P] | APIError], Awaitable[web.StreamResponse]]:
+    dumps: typedefs.JSONEncoder,
+    instrumentation: Instrumentation | None = None
+) -> Callable[[web.Request, APIResponse[P] | APIError], Awaitable[web.StreamResponse]]:
     async def render(
+        request: web.Request,
         api_response: APIResponse[P] | APIError
     ) -> web.StreamResponse:
         if isinstance(api_response.payload, AsyncIterable):
@@ -23,10 +27,11 @@ def renderer(
                 reason=api_response.reason,
                 headers=api_response.headers
             )
+            await response.prepare(request)
             async for chunk in api_response.payload:
                 await response.write(chunk)
+            await response.write_eof()
         elif isinstance(api_response.payload, asyncio.Queue):
-            request = web.Request()
             events_response = sse_response(
                 request,
                 status=api_response.status_code,
@@ -34,16 +39,17 @@ def renderer(
                 headers=api_response.headers
             )
             events_queue = api_response.payload
-            async with events_response as response:
-                while True:
-                    try:
-                        # may be CancelledError if connection was aborted
-                        event = await events_queue.get()
-                    except asyncio.CancelledError:
-                        break
-                    body = event.as_json()
-                    event_kind = event.__class__.__name__
-                    events_response.send(body, event=event_kind)
+            if instrumentation is not None:
+                instrumentation.events_stream_opened()
+            try:
+                async with events_response as response:
+                    await _send_events(response, events_queue)
+            except (asyncio.CancelledError, ConnectionResetError):
+                # connection was aborted
+                pass
+            finally:
+                if instrumentation is not None:
+                    instrumentation.events_stream_closed()
         else:
             payload: dict[str, JSON | P]
             if isinstance(api_response, APIError):
@@ -59,3 +65,31 @@ def renderer(
             )
         return response
     return render
+
+
+async def _send_events(
+    response: EventSourceResponse, events_queue: asyncio.Queue[Event]
+) -> None:
+    # aiohttp does not cancel handler when client disconnects, so next
+    # event is awaited along with response's ping which fails in that case
+    connection_closed = asyncio.ensure_future(response.wait())
+    try:
+        while True:
+            next_event = asyncio.ensure_future(events_queue.get())
+            await asyncio.wait(
+                (next_event, connection_closed),
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if not next_event.done():
+                next_event.cancel()
+                return
+            event = next_event.result()
+            body = event.as_json()
+            event_kind = event.__class__.__name__
+            await response.send(body, event=event_kind)
+            if isinstance(event, StreamOverflow):
+                return
+    finally:
+        connection_closed.cancel()
+        if connection_closed.done() and not connection_closed.cancelled():
+            connection_closed.exception()  # it is raised by response exit
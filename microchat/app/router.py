@@ -0,0 +1,406 @@
+"""
+Router which resolves paths by walking a tree of path segments instead of
+matching every route's regex in order.
+
+Static segments are looked up in a dict, dynamic ones are checked with
+matchers picked by their pattern: ints, words (aliases), hex strings
+(hashes) and alternatives (media types) have dedicated checks, other
+patterns are matched with a regex of the segment. Routes are registered
+by aiohttp as usual, so URL building and route listing work as before.
+
+Precedence is the same as of aiohttp: of resources matching the path, the
+earliest added one which has a route of the method wins. Every node knows
+the earliest resource under it, so branches which can't give an earlier
+one than found already are not walked.
+"""
+from __future__ import annotations
+
+import re
+
+from typing import Callable
+
+from aiohttp import hdrs
+from aiohttp import web
+from aiohttp.web_urldispatcher import AbstractResource, AbstractRoute
+from aiohttp.web_urldispatcher import MatchInfoError
+from aiohttp.web_urldispatcher import Resource, UrlMappingMatchInfo
+from aiohttp.web_urldispatcher import ROUTE_RE
+from yarl import URL
+
+
+PLACEHOLDER = re.compile(r"^\{(?P<name>[_a-zA-Z][_a-zA-Z0-9]*)(?::(?P<re>.+))?\}$")  # noqa
+ALTERNATIVES = re.compile(r"^\((?P<choices>\w+(?:\|\w+)*)\)(?P<suffix>\w*)$")
+
+DEFAULT_PATTERN = r"[^{}/]+"
+INT_PATTERN = r"\d+"
+WORD_PATTERN = r"\w+"
+HEX_PATTERN = r"[\da-fA-F]+"
+
+
+class SegmentMatcher:
+    """Matches one segment of path, possibly with static prefix/suffix."""
+
+    __slots__ = ("name", "prefix", "suffix", "check")
+
+    def __init__(
+        self, name: str, prefix: str, suffix: str, check: Callable[[str], object]
+    ) -> None:
+        self.name = name
+        self.prefix = prefix
+        self.suffix = suffix
+        self.check = check
+
+    def match(self, segment: str) -> dict[str, str] | None:
+        end = len(segment) - len(self.suffix)
+        if len(self.prefix) >= end:
+            return None
+        if not (segment.startswith(self.prefix) and segment.endswith(self.suffix)):  # noqa
+            return None
+        value = segment[len(self.prefix):end]
+        if not self.check(value):
+            return None
+        return {self.name: _unquote(value)}
+
+
+class RegexMatcher:
+    """Matches segment with several placeholders or unusual patterns."""
+
+    __slots__ = ("pattern",)
+
+    def __init__(self, pattern: re.Pattern[str]) -> None:
+        self.pattern = pattern
+
+    def match(self, segment: str) -> dict[str, str] | None:
+        match = self.pattern.fullmatch(segment)
+        if match is None:
+            return None
+        return {
+            key: _unquote(value) for key, value in match.groupdict().items()
+        }
+
+
+Matcher = SegmentMatcher | RegexMatcher
+
+
+# order of resource the route belongs to, route and match info
+Found = tuple[int, AbstractRoute, dict[str, str]]
+
+
+class Node:
+    __slots__ = (
+        "first", "static", "dynamic", "matchers", "resources", "routes"
+    )
+
+    def __init__(self, first: int) -> None:
+        # order of the earliest resource of the node or its descendants
+        self.first = first
+        self.static: dict[str, Node] = {}
+        # template of segment -> node, matchers are tried in order, which
+        # is the order of their first resources
+        self.dynamic: dict[str, Node] = {}
+        self.matchers: list[tuple[Matcher, Node]] = []
+        # resources with their order of adding
+        self.resources: list[tuple[int, AbstractResource]] = []
+        # method -> the earliest route of resources and its order, filled
+        # when router is frozen
+        self.routes: dict[str, tuple[int, AbstractRoute]] | None = None
+
+
+class TrieRouter(web.UrlDispatcher):
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._root = Node(0)
+        # path of resources as they were added -> canonical (may be
+        # prefixed when router's app is mounted as subapp)
+        self._templates: dict[AbstractResource, str] = {}
+        # nodes of paths without dynamic segments, which no other resource
+        # matches, filled when router is frozen
+        self._static_paths: dict[str, Node] = {}
+        self._prefix: str | None = None
+        # resources which can't be put to the tree are resolved by aiohttp
+        self._fallback = False
+        self._adding = False
+
+    def add_resource(self, path: str, *, name: str | None = None) -> Resource:
+        self._adding = True
+        try:
+            resource = super().add_resource(path, name=name)
+        finally:
+            self._adding = False
+        if resource in self._templates:
+            return resource
+        segments = _split_template(path)
+        if segments is None:
+            self._fallback = True
+            return resource
+        order = len(self._templates)
+        node = self._root
+        for segment in segments:
+            node = _child(node, segment, order)
+        node.resources.append((order, resource))
+        self._templates[resource] = _canonical(path)
+        self._prefix = None
+        return resource
+
+    def register_resource(self, resource: AbstractResource) -> None:
+        super().register_resource(resource)
+        if not self._adding:
+            # static files, subapps and so on
+            self._fallback = True
+
+    def freeze(self) -> None:
+        super().freeze()
+        self._prefix = self._detect_prefix()
+        # routes can't be added anymore, so routes of each node are
+        # indexed by method
+        nodes = [self._root]
+        while nodes:
+            node = nodes.pop()
+            if node.resources:
+                node.routes = {}
+                for order, resource in node.resources:
+                    for route in resource:
+                        node.routes.setdefault(route.method, (order, route))
+            nodes.extend(node.static.values())
+            nodes.extend(node.dynamic.values())
+        # a static path is resolved by a dict lookup unless resources of
+        # other nodes match it too
+        self._static_paths.clear()
+        for template in self._templates.values():
+            if _is_dynamic(template):
+                continue
+            matching: list[Node] = []
+            _collect(self._root, template.split("/"), 0, matching)
+            if len(matching) == 1:
+                self._static_paths[template] = matching[0]
+
+    async def resolve(self, request: web.Request) -> UrlMappingMatchInfo:
+        if self._fallback:
+            return await super().resolve(request)
+        prefix = self._prefix
+        if prefix is None:
+            prefix = self._prefix = self._detect_prefix()
+        path = request.rel_url.raw_path
+        if not path.startswith(prefix):
+            return MatchInfoError(web.HTTPNotFound())
+        path = path[len(prefix):]
+        method = request.method
+        node = self._static_paths.get(path)
+        if node is not None:
+            found = _route(node, method, len(self._templates))
+        else:
+            segments = path.split("/")
+            found = _lookup(
+                self._root, segments, 0, method, len(self._templates)
+            )
+        if found is not None:
+            _, route, match_dict = found
+            return UrlMappingMatchInfo(match_dict, route)
+        # unhappy path: methods of all resources matching the path
+        matching: list[Node] = []
+        _collect(self._root, path.split("/"), 0, matching)
+        if not matching:
+            return MatchInfoError(web.HTTPNotFound())
+        allowed_methods = {
+            route.method
+            for node in matching for _, resource in node.resources
+            for route in resource
+        }
+        return MatchInfoError(web.HTTPMethodNotAllowed(method, allowed_methods))
+
+    def _detect_prefix(self) -> str:
+        # aiohttp prefixes resources of subapp in place, prefix is the
+        # difference between canonical path and path resource was added by
+        prefix = None
+        for resource, template in self._templates.items():
+            canonical = resource.canonical
+            candidate = canonical[:len(canonical) - len(template)]
+            if not canonical.endswith(template) or \
+                    prefix not in (None, candidate):
+                self._fallback = True
+                return ""
+            prefix = candidate
+        return prefix or ""
+
+
+def _lookup(
+    node: Node, segments: list[str], index: int, method: str, before: int
+) -> Found | None:
+    """Finds the earliest route of method added before `before`."""
+    if index == len(segments):
+        return _route(node, method, before)
+    segment = segments[index]
+    found = None
+    child = node.static.get(segment)
+    if child is not None and child.first < before:
+        found = _lookup(child, segments, index + 1, method, before)
+        if found is not None:
+            before = found[0]
+    for matcher, child in node.matchers:
+        if child.first >= before:
+            break
+        values = matcher.match(segment)
+        if values is None:
+            continue
+        deeper = _lookup(child, segments, index + 1, method, before)
+        if deeper is not None:
+            deeper[2].update(values)
+            found = deeper
+            before = deeper[0]
+    return found
+
+
+def _route(node: Node, method: str, before: int) -> Found | None:
+    routes = node.routes
+    if routes is None:
+        for order, resource in node.resources:
+            if order >= before:
+                break
+            for route in resource:
+                if route.method in (method, hdrs.METH_ANY):
+                    return order, route, {}
+        return None
+    found = routes.get(method)
+    any_method = routes.get(hdrs.METH_ANY)
+    if any_method is not None and \
+            (found is None or any_method[0] < found[0]):
+        found = any_method
+    if found is None or found[0] >= before:
+        return None
+    return found[0], found[1], {}
+
+
+def _collect(
+    node: Node, segments: list[str], index: int, matching: list[Node]
+) -> None:
+    """Collects all nodes with resources which match the path."""
+    if index == len(segments):
+        if node.resources:
+            matching.append(node)
+        return
+    segment = segments[index]
+    child = node.static.get(segment)
+    if child is not None:
+        _collect(child, segments, index + 1, matching)
+    for matcher, child in node.matchers:
+        if matcher.match(segment) is not None:
+            _collect(child, segments, index + 1, matching)
+
+
+def _child(node: Node, segment: str, order: int) -> Node:
+    if not _is_dynamic(segment):
+        child = node.static.get(_requote(segment))
+        if child is None:
+            child = node.static[_requote(segment)] = Node(order)
+        return child
+    child = node.dynamic.get(segment)
+    if child is None:
+        child = node.dynamic[segment] = Node(order)
+        node.matchers.append((_matcher(segment), child))
+    return child
+
+
+def _split_template(path: str) -> list[str] | None:
+    segments: list[str] = []
+    position = 0
+    # placeholders' patterns may contain slashes, template is split only
+    # at slashes outside of them
+    for match in ROUTE_RE.finditer(path):
+        head = path[position:match.start()].split("/")
+        if segments:
+            segments[-1] += head[0]
+            head = head[1:]
+        segments.extend(head)
+        placeholder = match.group(0)
+        if "/" in placeholder:
+            return None
+        segments[-1] += placeholder
+        position = match.end()
+    tail = path[position:].split("/")
+    if segments:
+        segments[-1] += tail[0]
+        tail = tail[1:]
+    segments.extend(tail)
+    return segments
+
+
+def _matcher(segment: str) -> Matcher:
+    placeholders = list(ROUTE_RE.finditer(segment))
+    if len(placeholders) == 1:
+        placeholder = placeholders[0]
+        parsed = PLACEHOLDER.match(placeholder.group(0))
+        prefix = segment[:placeholder.start()]
+        suffix = segment[placeholder.end():]
+        if parsed is not None and not _is_dynamic(prefix + suffix):
+            check = _check(parsed["re"] or DEFAULT_PATTERN)
+            if check is not None:
+                return SegmentMatcher(
+                    parsed["name"], _requote(prefix), _requote(suffix), check
+                )
+    return RegexMatcher(_segment_regex(segment))
+
+
+def _check(pattern: str) -> Callable[[str], object] | None:
+    if pattern == INT_PATTERN:
+        return str.isdecimal
+    if pattern in (WORD_PATTERN, HEX_PATTERN, DEFAULT_PATTERN):
+        return re.compile(pattern).fullmatch
+    alternatives = ALTERNATIVES.match(pattern)
+    if alternatives is not None:
+        suffix = alternatives["suffix"]
+        choices = frozenset(
+            choice + suffix for choice in alternatives["choices"].split("|")
+        )
+        return choices.__contains__
+    return None
+
+
+def _segment_regex(segment: str) -> re.Pattern[str]:
+    # the same as aiohttp's DynamicResource does for whole path
+    pattern = ""
+    position = 0
+    for match in ROUTE_RE.finditer(segment):
+        pattern += re.escape(_requote(segment[position:match.start()]))
+        parsed = PLACEHOLDER.match(match.group(0))
+        if parsed is None:
+            raise ValueError(f"Invalid path segment '{segment}'")
+        regex = parsed["re"] or DEFAULT_PATTERN
+        pattern += f"(?P<{parsed['name']}>{regex})"
+        position = match.end()
+    pattern += re.escape(_requote(segment[position:]))
+    return re.compile(pattern)
+
+
+def _canonical(path: str) -> str:
+    return "/".join(
+        _canonical_segment(segment) for segment in _split_template(path) or ()
+    )
+
+
+def _canonical_segment(segment: str) -> str:
+    if not _is_dynamic(segment):
+        return _requote(segment)
+
+    def name_only(match: re.Match[str]) -> str:
+        parsed = PLACEHOLDER.match(match.group(0))
+        return f"{{{parsed['name']}}}" if parsed else match.group(0)
+    return ROUTE_RE.sub(name_only, segment)
+
+
+def _is_dynamic(segment: str) -> bool:
+    return "{" in segment or "}" in segment
+
+
+def _requote(value: str) -> str:
+    # the same as aiohttp does with static parts of routes
+    result = URL.build(path=value).raw_path
+    if "%" in value:
+        result = result.replace("%25", "%")
+    return result
+
+
+def _unquote(value: str) -> str:
+    if "%" not in value:
+        return value
+    return URL.build(path=value, encoded=True).path
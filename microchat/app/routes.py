@@ -1,39 +1,51 @@
 from asyncio import Queue
+import time
 
 from typing import AsyncIterable, Awaitable, Callable, TypeVar
+from typing import cast
 
 from aiohttp import web
 from aiohttp import typedefs
 
 from microchat.api_utils.exceptions import APIError
 from microchat.api_utils.handler import inject_services
+from microchat.api_utils.instrumentation import Instrumentation, Stage
 from microchat.api_utils.request import APIRequest
 from microchat.api_utils.response import APIResponse, DEFAULT_JSON_DUMPER
 from microchat.api_utils.response import P, APIResponseBody, JSON
 
-from microchat.core.events import Event
+from microchat.config import Config
+from microchat.core.events import Event, EventStream
 from microchat.core.jwt_manager import JWTManager
-from microchat.services import ServiceError, ServiceSet
+from microchat.services import Flights, ServiceError, ServiceSet
 from microchat.storages import UoW
 
 from microchat.api.auth import add_session, list_sessions, terminate_session
-from microchat.api.chats import list_chats, get_chat
+from microchat.api.chats import list_chats, get_chat, search_messages, mark_read
+from microchat.api.chats import sync_chats, send_messages
 from microchat.api.chats import list_messages, get_message, send_message, edit_message, remove_message
 from microchat.api.chats import list_chat_media, get_chat_media, remove_chat_media
 from microchat.api.chats import get_attachment_content
+from microchat.api.chats import list_message_versions, get_message_version
 from microchat.api.conferences import list_chat_members, add_chat_member, get_chat_member, remove_chat_member
 from microchat.api.conferences import get_chat_member_permissions, edit_chat_member_permissions
+from microchat.api.conferences import add_chat_members, remove_chat_members
 from microchat.api.entities import get_self, edit_self, remove_self
-from microchat.api.entities import get_entity, edit_entity, remove_entity
+from microchat.api.entities import get_entity, edit_entity, remove_entity, search_entities
 from microchat.api.entities import list_entity_avatars, get_entity_avatar, set_entity_avatar, remove_entity_avatar
 from microchat.api.entities import get_entity_permissions, edit_entity_permissions
+from microchat.api.events import get_events
 from microchat.api.media import store, get_media_info, get_content, get_preview
+from microchat.api.media import list_top_usage
 
+from .batch import Operation, batch_executor, batch_params
 from .rendering import renderer
+from .router import TrieRouter
 from .api_adapters import auth
 from .api_adapters import chats
 from .api_adapters import conferences
 from .api_adapters import entities
+from .api_adapters import events
 from .api_adapters import media
 
 
@@ -46,36 +58,78 @@ class APIEndpoints:
         self,
         uow_factory: Callable[[], UoW],
         jwt_manager: JWTManager,
-        renderer: Callable[[APIResponse[APIResponseBody | JSON | AsyncIterable[bytes] | Queue[Event]] | APIError], Awaitable[web.StreamResponse]]
+        event_stream: EventStream,
+        config: Config,
+        renderer: Callable[[web.Request, APIResponse[APIResponseBody | JSON | AsyncIterable[bytes] | Queue[Event]] | APIError], Awaitable[web.StreamResponse]],
+        instrumentation: Instrumentation | None = None,
+        flights: Flights | None = None
     ) -> None:
         self.uow_factory = uow_factory
+        # shared calls of routes are joined across the routes of the app
+        self.flights = Flights() if flights is None else flights
         self.jwt_manager = jwt_manager
+        self.event_stream = event_stream
+        self.config = config
         self.renderer = renderer
-        self._router = web.UrlDispatcher()
+        self.instrumentation = instrumentation
+        self._router = TrieRouter()
+        # handler -> executor and extractor of route which can be batched
+        self._operations: dict[object, Operation] = {}
 
     def add_route(
         self,
         method: str,
         route: str,
         executor: Callable[[R, ServiceSet], Awaitable[APIResponse[P]]],
-        extractor: Callable[[web.Request], Awaitable[R]]
+        extractor: Callable[[web.Request], Awaitable[R]],
+        batched: bool = True
     ) -> None:
-        with_services = inject_services(executor, self.uow_factory, self.jwt_manager)
-        handler = endpoint(with_services, extractor, self.renderer)
+        label = f"{method} {route}"
+        with_services = inject_services(
+            executor, self.uow_factory, self.flights, self.jwt_manager,
+            self.event_stream, self.config, self.instrumentation, label
+        )
+        handler = endpoint(
+            with_services, extractor, self.renderer,
+            self.instrumentation, label
+        )
         self._router.add_route(method, route, handler)
+        if batched:
+            self._operations[handler] = cast(Operation, (executor, extractor))
+
+    def add_batch_route(self, route: str) -> None:
+        label = f"POST {route}"
+        executor = batch_executor(
+            self._operations, self._router, route, self.uow_factory,
+            self.flights, self.jwt_manager, self.event_stream, self.config,
+            self.instrumentation, label
+        )
+        handler = endpoint(  # type: ignore
+            executor, batch_params, self.renderer, self.instrumentation, label
+        )
+        self._router.add_route("POST", route, handler)
 
 
 def get_api_router(
     uow_factory: Callable[[], UoW],
-    jwt_manager: JWTManager
+    jwt_manager: JWTManager,
+    event_stream: EventStream,
+    config: Config,
+    instrumentation: Instrumentation | None = None,
+    flights: Flights | None = None
 ) -> web.UrlDispatcher:
-    render = renderer(DEFAULT_JSON_DUMPER)
-    routes = APIEndpoints(uow_factory, jwt_manager, render)
+    render = renderer(DEFAULT_JSON_DUMPER, instrumentation)
+    routes = APIEndpoints(
+        uow_factory, jwt_manager, event_stream, config, render,
+        instrumentation, flights
+    )
     _add_auth_routes(routes)
     _add_chats_routes(routes)
     _add_conferences_routes(routes)
     _add_entities_routes(routes)
+    _add_events_routes(routes)
     _add_media_routes(routes)
+    routes.add_batch_route("/batch")
     return routes._router
 
 
@@ -100,14 +154,30 @@ def _add_chats_routes(router: APIEndpoints) -> None:
         list_chats, chats.chats_request_params
     )
     router.add_route(
-        "GET", "/chats/",
-        list_chats, chats.chats_request_params
+        "GET", "/chats/search",
+        search_messages, chats.search_request_params
+    )
+    router.add_route(
+        "GET", "/chats/sync",
+        sync_chats, chats.sync_request_params
+    )
+    router.add_route(
+        "POST", "/chats/messages",
+        send_messages, chats.messages_send_params
     )
     for path in r"/chats/{entity_id:\d+}", r"/chats/@{alias:\w+}":
         router.add_route(
             "GET", path,
             get_chat, chats.chat_request_params
         )
+        router.add_route(
+            "GET", path + "/search",
+            search_messages, chats.search_request_params
+        )
+        router.add_route(
+            "POST", path + "/read",
+            mark_read, chats.mark_read_params
+        )
     for path in r"/chats/{entity_id:\d+}/messages", r"/chats/@{alias:\w+}/messages":
         router.add_route(
             "GET", path,
@@ -117,7 +187,7 @@ def _add_chats_routes(router: APIEndpoints) -> None:
             "POST", path,
             send_message, chats.message_send_params
         )
-        message_path = path + r"/{id:\d+}"
+        message_path = path + r"/{message_id:\d+}"
         router.add_route(
             "GET", message_path,
             get_message, chats.message_request_params
@@ -130,17 +200,28 @@ def _add_chats_routes(router: APIEndpoints) -> None:
             "DELETE", message_path,
             remove_message, chats.message_delete_params
         )
+        versions_path = path + r"/{message_id:\d+}/versions"
+        router.add_route(
+            "GET", versions_path,
+            list_message_versions, chats.message_versions_params
+        )
+        router.add_route(
+            "GET", versions_path + r"/{version:\d+}",
+            get_message_version, chats.message_version_params
+        )
         attachment_content_path = path + r"/{message_id:\d+}/attachments/{id:\w+}/content"
         router.add_route(
             "GET", attachment_content_path,
-            get_attachment_content, chats.attachment_content_params
+            get_attachment_content, chats.attachment_content_params,
+            batched=False
         )
         attachment_content_path = path + r"/{message_id:\d+}/attachments/{id:\w+}/preview"
         router.add_route(
             "GET", attachment_content_path,
-            get_attachment_content, chats.attachment_preview_params
+            get_attachment_content, chats.attachment_preview_params,
+            batched=False
         )
-        media_types = r"{media_type:(photo|video|audio|animation|file)s}"
+        media_types = r"{media_type:(photo|video|audio|animation|file)}s"
         medias_path = f"{path}/{media_types}"
         router.add_route(
             "GET", medias_path,
@@ -168,6 +249,14 @@ def _add_conferences_routes(router: APIEndpoints) -> None:
             "POST", members_path,
             add_chat_member, conferences.member_add_params
         )
+        router.add_route(
+            "POST", members_path + "/bulk",
+            add_chat_members, conferences.members_add_params
+        )
+        router.add_route(
+            "POST", members_path + "/bulk/remove",
+            remove_chat_members, conferences.members_remove_params
+        )
         member_path = members_path + r"/{member_no:\d+}"
         router.add_route(
             "GET", member_path,
@@ -192,6 +281,7 @@ def _add_entities_routes(router: APIEndpoints) -> None:
     router.add_route("GET", "/entities/self", get_self, entities.self_request_params)
     router.add_route("PATCH", "/entities/self", edit_self, entities.self_edit_params)
     router.add_route("DELETE", "/entities/self", remove_self, entities.self_remove_params)
+    router.add_route("GET", "/entities/search", search_entities, entities.entities_search_params)
     for entity_path in r"/entities/{entity_id:\d+}", r"/entities/@{alias:\w+}":
         router.add_route("GET", entity_path, get_entity, entities.entity_request_params)
         router.add_route("PATCH", entity_path, edit_entity, entities.entity_edit_params)
@@ -207,17 +297,24 @@ def _add_entities_routes(router: APIEndpoints) -> None:
         router.add_route("PATCH", permissions_path, edit_entity_permissions, entities.permissions_edit_params)
 
 
+def _add_events_routes(router: APIEndpoints) -> None:
+    router.add_route("GET", "/events", get_events, events.events_request_params, batched=False)
+
+
 def _add_media_routes(router: APIEndpoints) -> None:
-    router.add_route("POST", "/media/", store, media.upload_media_params)
+    router.add_route("POST", "/media/", store, media.upload_media_params, batched=False)
+    router.add_route("GET", "/media/usage", list_top_usage, media.top_usage_params)
     router.add_route("GET", r"/media/{hash:[\da-fA-F]+}", get_media_info, media.get_media_info_params)
-    router.add_route("GET", r"/media/{hash:[\da-fA-F]+}/content", get_content, media.download_media_params)
-    router.add_route("GET", r"/media/{hash:[\da-fA-F]+}/preview", get_preview, media.download_preview_params)
+    router.add_route("GET", r"/media/{hash:[\da-fA-F]+}/content", get_content, media.download_media_params, batched=False)
+    router.add_route("GET", r"/media/{hash:[\da-fA-F]+}/preview", get_preview, media.download_preview_params, batched=False)
 
 
 def endpoint(
     executor: Callable[[R], Awaitable[APIResponse[P]]],
     extractor: Callable[[web.Request], Awaitable[R]],
-    renderer: Callable[[APIResponse[P] | APIError], Awaitable[web.StreamResponse]],
+    renderer: Callable[[web.Request, APIResponse[P] | APIError], Awaitable[web.StreamResponse]],
+    instrumentation: Instrumentation | None = None,
+    route: str = "",
 ) -> typedefs.Handler:
     async def handler(request: web.Request) -> web.StreamResponse:
         api_response: APIResponse[P] | APIError
@@ -229,6 +326,43 @@ def endpoint(
         except ServiceError as service_exc:
             exc_info = APIError.from_service_exc(service_exc)
             api_response = exc_info
-        reponse = await renderer(api_response)
+        reponse = await renderer(request, api_response)
+        return reponse
+
+    if instrumentation is None:
+        return handler
+
+    async def instrumented_handler(request: web.Request) -> web.StreamResponse:
+        api_response: APIResponse[P] | APIError
+        instrumentation.request_started(route)
+        stage: Stage | None = Stage.EXTRACT
+        received = started = time.perf_counter()
+        try:
+            try:
+                api_request = await extractor(request)
+                extracted = time.perf_counter()
+                instrumentation.observe_stage(
+                    route, Stage.EXTRACT, extracted - started
+                )
+                # executor observes execution and commit of its unit of work
+                # as separate stages
+                stage = None
+                api_response = await executor(api_request)
+            except APIError as err:
+                api_response = err
+            except ServiceError as service_exc:
+                exc_info = APIError.from_service_exc(service_exc)
+                api_response = exc_info
+            rendering = time.perf_counter()
+            if stage is not None:
+                instrumentation.observe_stage(route, stage, rendering - started)
+            reponse = await renderer(request, api_response)
+            rendered = time.perf_counter()
+            instrumentation.observe_stage(
+                route, Stage.RENDER, rendered - rendering
+            )
+        finally:
+            finished = time.perf_counter()
+            instrumentation.request_finished(route, finished - received)
         return reponse
-    return handler
+    return instrumented_handler
@@ -0,0 +1,3 @@
+from .broker import EventBroker  # noqa: F401
+from .client import BusClient  # noqa: F401
+from .codec import EventCodec, UnknownEvent  # noqa: F401
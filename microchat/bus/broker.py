@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+
+from pathlib import Path
+
+from .framing import FrameTooLarge, read_frame
+
+
+BROKER_LOG = logging.getLogger("microchat.bus.broker")
+
+# connection which does not read its events (stuck worker) is dropped
+# instead of making the broker buffer everything for it
+MAX_PENDING = 64 * 1024**2
+
+
+class EventBroker:
+    """
+    Relays events between worker processes over a Unix socket: each frame
+    received from a worker is sent to all other connected workers as is.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._server: asyncio.AbstractServer | None = None
+        self._peers: set[asyncio.StreamWriter] = set()
+        self._connections: set[asyncio.Task[None]] = set()
+
+    @property
+    def peers(self) -> int:
+        return len(self._peers)
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_unix_server(
+            self._serve, path=str(self.path)
+        )
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for peer in list(self._peers):
+            peer.close()
+        # closed connections see end of stream, wait for their handlers
+        # to finish instead of leaving them to be cancelled
+        if self._connections:
+            await asyncio.wait(self._connections)
+        self.path.unlink(missing_ok=True)
+
+    async def _serve(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        task = asyncio.current_task()
+        if task is not None:
+            self._connections.add(task)
+        self._peers.add(writer)
+        try:
+            while True:
+                frame = await read_frame(reader)
+                if frame is None:
+                    break
+                self._relay(writer, frame)
+        except (ConnectionError, FrameTooLarge) as exc:
+            BROKER_LOG.warning("Worker connection is dropped: %r", exc)
+        finally:
+            self._peers.discard(writer)
+            writer.close()
+            if task is not None:
+                self._connections.discard(task)
+
+    def _relay(self, sender: asyncio.StreamWriter, frame: bytes) -> None:
+        for peer in list(self._peers):
+            if peer is sender:
+                continue
+            if peer.transport.get_write_buffer_size() > MAX_PENDING:
+                BROKER_LOG.warning("Worker does not read events, dropped")
+                self._peers.discard(peer)
+                peer.close()
+                continue
+            peer.write(frame)
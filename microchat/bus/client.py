@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+
+from pathlib import Path
+
+from microchat.core.events import Event, EventStream, EventTransport
+
+from .codec import EventCodec, UnknownEvent
+from .framing import MAX_FRAME_SIZE, FrameTooLarge, add_record, frame
+from .framing import iter_records
+from .framing import payload, read_frame
+
+
+BUS_LOG = logging.getLogger("microchat.bus")
+
+MAX_BATCH_SIZE = 64 * 1024
+
+
+class BusClient(EventTransport):
+    """
+    Connects worker's event stream to the broker: events dispatched in this
+    worker are published to the broker, events of other workers are
+    delivered to local subscribers. Connection is restored if it breaks,
+    events published while it is down are lost.
+
+    Events published during one iteration of the event loop are sent as
+    one frame (up to `max_batch_size` bytes), so bursts of small events
+    cost one write and one wake-up of every other worker.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        stream: EventStream,
+        reconnect_delay: float = 1.0,
+        max_batch_size: int = MAX_BATCH_SIZE
+    ) -> None:
+        self.path = path
+        self.stream = stream
+        self.reconnect_delay = reconnect_delay
+        self.max_batch_size = max_batch_size
+        self.codec = EventCodec()
+        self._writer: asyncio.StreamWriter | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._connected = asyncio.Event()
+        self._batch = bytearray()
+        self._flush_scheduled = False
+
+    async def start(self, timeout: float = 5.0) -> None:
+        self.stream.transport = self
+        self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout)
+        except asyncio.TimeoutError:
+            BUS_LOG.warning("Events broker at %s is unavailable", self.path)
+
+    async def close(self) -> None:
+        if self.stream.transport is self:
+            self.stream.transport = None
+        self.flush()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def publish(self, event: Event) -> None:
+        if self._writer is None:
+            return
+        record = bytearray()
+        add_record(record, self.codec.encode(event))
+        if len(record) > MAX_FRAME_SIZE:
+            # it can't be sent at all, other events of the batch still can
+            BUS_LOG.error(
+                "%s event of %s bytes is too large to be published",
+                type(event).__name__, len(record)
+            )
+            return
+        if len(self._batch) + len(record) > MAX_FRAME_SIZE:
+            self.flush()
+        self._batch += record
+        if len(self._batch) >= self.max_batch_size:
+            self.flush()
+        elif not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self.flush)
+
+    def flush(self) -> None:
+        self._flush_scheduled = False
+        try:
+            if self._batch and self._writer is not None:
+                self._writer.write(frame(bytes(self._batch)))
+        finally:
+            self._batch.clear()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(
+                    str(self.path)
+                )
+            except OSError:
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+            self._writer = writer
+            self._connected.set()
+            try:
+                await self._receive(reader)
+            except (ConnectionError, FrameTooLarge) as exc:
+                BUS_LOG.warning("Events broker connection is lost: %r", exc)
+            finally:
+                self._writer = None
+                self._connected.clear()
+                writer.close()
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _receive(self, reader: asyncio.StreamReader) -> None:
+        while True:
+            received = await read_frame(reader)
+            if received is None:
+                return
+            for record in iter_records(payload(received)):
+                try:
+                    event = self.codec.decode(record)
+                except UnknownEvent as exc:
+                    BUS_LOG.warning("Unknown event kind %s is skipped", exc)
+                    continue
+                self.stream.deliver(event)
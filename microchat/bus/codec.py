@@ -0,0 +1,223 @@
+"""
+Compact binary encoding of events.
+
+Record of an event is its kind (CRC32 of event class name, the name is
+also the SSE event kind) followed by attribute values. Dataclass events
+are encoded as values of their fields in order, other events as
+attribute names and values. Values are tagged: ints are zigzag varints,
+strings and bytes are length-prefixed, datetimes are ISO strings,
+anything else falls back to pickle.
+"""
+from __future__ import annotations
+
+import dataclasses
+import pickle
+import struct
+import zlib
+
+from datetime import datetime as dt
+
+from microchat.core.events import Event
+
+
+KIND = struct.Struct("!I")
+DOUBLE = struct.Struct("!d")
+
+# value tags
+NONE, TRUE, FALSE = b"NTF"
+INT, FLOAT, STR, BYTES = b"idsb"
+LIST, DICT, DATETIME, PICKLED = b"lmtp"
+
+DATACLASS, ATTRIBUTES = 0, 1
+
+
+class UnknownEvent(Exception):
+    pass
+
+
+class EventCodec:
+
+    def __init__(self) -> None:
+        self._kinds: dict[int, type[Event]] = {}
+        self._fields: dict[type[Event], tuple[str, ...] | None] = {}
+
+    def encode(self, event: Event) -> bytes:
+        buffer = bytearray(KIND.pack(self._kind(type(event))))
+        fields = self._event_fields(type(event))
+        if fields is not None:
+            buffer.append(DATACLASS)
+            for field in fields:
+                _encode(buffer, getattr(event, field))
+        else:
+            buffer.append(ATTRIBUTES)
+            _encode(buffer, vars(event))
+        return bytes(buffer)
+
+    def decode(self, data: bytes | memoryview) -> Event:
+        view = memoryview(data)
+        kind, = KIND.unpack_from(view)
+        cls = self._event_class(kind)
+        layout = view[KIND.size]
+        event = cls.__new__(cls)
+        position = KIND.size + 1
+        if layout == DATACLASS:
+            attributes = event.__dict__
+            for field in self._event_fields(cls) or ():
+                attributes[field], position = _decode(view, position)
+        else:
+            encoded, position = _decode(view, position)
+            if not isinstance(encoded, dict):
+                raise ValueError("Event attributes must be encoded as dict")
+            event.__dict__.update(encoded)
+        return event
+
+    def _kind(self, cls: type[Event]) -> int:
+        kind = zlib.crc32(cls.__name__.encode())
+        known = self._kinds.setdefault(kind, cls)
+        if known is not cls:
+            raise ValueError(
+                f"Events '{known.__qualname__}' and '{cls.__qualname__}' "
+                "have the same name"
+            )
+        return kind
+
+    def _event_class(self, kind: int) -> type[Event]:
+        cls = self._kinds.get(kind)
+        if cls is None:
+            # event classes are the same in all workers, so kind which is
+            # not met yet belongs to one of Event subclasses
+            for subclass in _subclasses(Event):
+                self._kind(subclass)
+            cls = self._kinds.get(kind)
+        if cls is None:
+            raise UnknownEvent(kind)
+        return cls
+
+    def _event_fields(self, cls: type[Event]) -> tuple[str, ...] | None:
+        if cls not in self._fields:
+            fields = None
+            if hasattr(cls, "__dataclass_fields__"):
+                fields = tuple(
+                    field.name for field in dataclasses.fields(cls)  # type: ignore  # noqa
+                )
+            self._fields[cls] = fields
+        return self._fields[cls]
+
+
+def _subclasses(cls: type[Event]) -> list[type[Event]]:
+    subclasses = []
+    for subclass in cls.__subclasses__():
+        subclasses.append(subclass)
+        subclasses.extend(_subclasses(subclass))
+    return subclasses
+
+
+def _encode(buffer: bytearray, value: object) -> None:
+    if value is None:
+        buffer.append(NONE)
+    elif value is True:
+        buffer.append(TRUE)
+    elif value is False:
+        buffer.append(FALSE)
+    elif type(value) is int and -2**63 <= value < 2**63:
+        buffer.append(INT)
+        write_varint(buffer, (value << 1) ^ (value >> 63))
+    elif type(value) is float:
+        buffer.append(FLOAT)
+        buffer += DOUBLE.pack(value)
+    elif type(value) is str:
+        encoded = value.encode()
+        buffer.append(STR)
+        write_varint(buffer, len(encoded))
+        buffer += encoded
+    elif type(value) is bytes:
+        buffer.append(BYTES)
+        write_varint(buffer, len(value))
+        buffer += value
+    elif type(value) in (list, tuple):
+        items: list[object] | tuple[object, ...] = value  # type: ignore
+        buffer.append(LIST)
+        write_varint(buffer, len(items))
+        for item in items:
+            _encode(buffer, item)
+    elif type(value) is dict and all(type(key) is str for key in value):
+        mapping: dict[str, object] = value
+        buffer.append(DICT)
+        write_varint(buffer, len(mapping))
+        for key, item in mapping.items():
+            _encode(buffer, key)
+            _encode(buffer, item)
+    elif type(value) is dt:
+        _encode_tagged(buffer, DATETIME, value.isoformat().encode())
+    else:
+        # enums, entities, big ints and so on
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        _encode_tagged(buffer, PICKLED, pickled)
+
+
+def _encode_tagged(buffer: bytearray, tag: int, data: bytes) -> None:
+    buffer.append(tag)
+    write_varint(buffer, len(data))
+    buffer += data
+
+
+def _decode(view: memoryview, position: int) -> tuple[object, int]:
+    tag = view[position]
+    position += 1
+    if tag == NONE:
+        return None, position
+    if tag == TRUE:
+        return True, position
+    if tag == FALSE:
+        return False, position
+    if tag == INT:
+        encoded, position = read_varint(view, position)
+        return (encoded >> 1) ^ -(encoded & 1), position
+    if tag == FLOAT:
+        value, = DOUBLE.unpack_from(view, position)
+        return value, position + DOUBLE.size
+    if tag == LIST:
+        count, position = read_varint(view, position)
+        items = []
+        for _ in range(count):
+            item, position = _decode(view, position)
+            items.append(item)
+        return items, position
+    if tag == DICT:
+        count, position = read_varint(view, position)
+        mapping = {}
+        for _ in range(count):
+            key, position = _decode(view, position)
+            item, position = _decode(view, position)
+            mapping[key] = item
+        return mapping, position
+    size, position = read_varint(view, position)
+    data = view[position:position+size]
+    position += size
+    if tag == STR:
+        return str(data, "utf-8"), position
+    if tag == BYTES:
+        return data.tobytes(), position
+    if tag == DATETIME:
+        return dt.fromisoformat(str(data, "utf-8")), position
+    if tag == PICKLED:
+        return pickle.loads(data), position
+    raise ValueError(f"Unknown value tag {chr(tag)!r}")
+
+
+def write_varint(buffer: bytearray, value: int) -> None:
+    while value > 0x7f:
+        buffer.append(value & 0x7f | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def read_varint(view: memoryview, position: int) -> tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = view[position]
+        position += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
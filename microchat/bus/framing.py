@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import asyncio
+import struct
+
+from typing import Iterator
+
+from .codec import read_varint, write_varint
+
+
+HEADER = struct.Struct("!I")  # payload length
+MAX_FRAME_SIZE = 16 * 1024**2
+
+
+class FrameTooLarge(Exception):
+    pass
+
+
+def frame(payload: bytes) -> bytes:
+    if len(payload) > MAX_FRAME_SIZE:
+        raise FrameTooLarge(len(payload))
+    return HEADER.pack(len(payload)) + payload
+
+
+async def read_frame(reader: asyncio.StreamReader) -> bytes | None:
+    """Reads one frame with its header, returns None on end of stream."""
+    try:
+        header = await reader.readexactly(HEADER.size)
+        size, = HEADER.unpack(header)
+        if size > MAX_FRAME_SIZE:
+            raise FrameTooLarge(size)
+        payload = await reader.readexactly(size)
+    except asyncio.IncompleteReadError:
+        return None
+    return header + payload
+
+
+def payload(frame: bytes) -> bytes:
+    return frame[HEADER.size:]
+
+
+def add_record(batch: bytearray, record: bytes) -> None:
+    """Appends length-prefixed record to payload of batch frame."""
+    write_varint(batch, len(record))
+    batch += record
+
+
+def iter_records(payload: bytes) -> Iterator[memoryview]:
+    view = memoryview(payload)
+    position = 0
+    while position < len(view):
+        size, position = read_varint(view, position)
+        yield view[position:position+size]
+        position += size
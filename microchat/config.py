@@ -1,14 +1,216 @@
+"""
+Server configuration.
+
+Config is read once at startup from TOML document (see config.toml) and
+is immutable then. Each table of the document is a section, options are
+checked against section's fields: unknown options, wrong types and values
+out of bounds are reported as ConfigError with the option's full name.
+"""
+from __future__ import annotations
+
+import dataclasses
+import typing
+
+from dataclasses import dataclass, field
+from pathlib import Path
+
 from typing import Any, Mapping, TypeVar
 
 
-T = TypeVar("T")
+KiB = 1024
+MiB = 1024**2
+GiB = 1024**3
+
+
+class ConfigError(ValueError):
+    pass
+
+
+def option(  # type: ignore
+    default: Any,
+    *,
+    minimum: float | None = None,
+    maximum: float | None = None,
+    choices: tuple[str, ...] | None = None,
+    required: bool = False
+) -> Any:
+    metadata = {
+        "minimum": minimum, "maximum": maximum,
+        "choices": choices, "required": required
+    }
+    return field(default=default, metadata=metadata)
+
+
+@dataclass(frozen=True)
+class ServerConfig:
+    host: str = "0.0.0.0"
+    port: int = option(8080, minimum=1, maximum=65535)
+    # max size of request body, media uploads included
+    client_max_size: int = option(MiB, minimum=KiB)
+
+
+@dataclass(frozen=True)
+class AuthConfig:
+    jwt_secret: str = option("", required=True)
+
+
+@dataclass(frozen=True)
+class StorageConfig:
+    backend: str = option("memory", choices=("memory",))
+    # connections pool of database backends
+    pool_min_size: int = option(1, minimum=0)
+    pool_max_size: int = option(10, minimum=1)
+    # pause between compactions of deleted messages, seconds
+    compaction_interval: float = option(1.0, minimum=0.01)
+    # time a file nobody refers to is kept before it is removed, seconds
+    media_grace_period: float = option(3600.0, minimum=0)
+    # pause between sweeps of orphan files, seconds, and files per sweep
+    media_sweep_interval: float = option(60.0, minimum=0.01)
+    media_sweep_batch_size: int = option(1024, minimum=1)
+
+
+@dataclass(frozen=True)
+class CacheConfig:
+    # entries per in-process cache
+    max_entries: int = option(100_000, minimum=0)
 
 
+@dataclass(frozen=True)
+class EventsConfig:
+    # events buffered for a subscriber, 0 is unlimited; subscriber which
+    # falls behind more is dropped
+    queue_size: int = option(1024, minimum=0)
+
+
+@dataclass(frozen=True)
+class RateLimitConfig:
+    # requests per second from one client address, 0 disables limiting
+    rate: float = option(0.0, minimum=0)
+    # requests which client may make at once above the rate
+    burst: int = option(20, minimum=1)
+
+
+@dataclass(frozen=True)
+class MetricsConfig:
+    # /api/metrics and event loop monitor
+    enabled: bool = False
+    # request traces at /api/debug/traces and log of slow storage calls
+    tracing: bool = False
+    # storage call which takes this long is logged, seconds
+    slow_threshold: float = option(0.1, minimum=0)
+    # last request traces kept
+    kept_traces: int = option(100, minimum=1)
+    # bearer token of /api/metrics and /api/debug/traces requests
+    token: str = ""
+
+
+@dataclass(frozen=True)
+class MediaConfig:
+    # file storages of disk backends, not used by memory backend
+    root: Path | None = None
+    temp_dir: Path | None = None
+    upload_chunk_size: int = option(64 * KiB, minimum=KiB)
+    download_chunk_size: int = option(MiB, minimum=KiB)
+    # bytes of files a user may store, files stored already by somebody
+    # are not counted, 0 is unlimited
+    user_quota: int = option(GiB, minimum=0)
+
+
+@dataclass(frozen=True)
 class Config:
+    server: ServerConfig = ServerConfig()
+    auth: AuthConfig = AuthConfig()
+    storage: StorageConfig = StorageConfig()
+    cache: CacheConfig = CacheConfig()
+    events: EventsConfig = EventsConfig()
+    rate_limits: RateLimitConfig = RateLimitConfig()
+    metrics: MetricsConfig = MetricsConfig()
+    media: MediaConfig = MediaConfig()
 
     @classmethod
     def from_mapping(  # type: ignore
-        cls: type[T], mapping: Mapping[str, Any]
-    ) -> T:
-        config = cls()
+        cls, mapping: Mapping[str, Any]
+    ) -> Config:
+        sections = typing.get_type_hints(cls)
+        unknown = set(mapping) - set(sections)
+        if unknown:
+            raise ConfigError(f"Unknown section '{min(unknown)}'")
+        config = cls(**{
+            name: _parse_section(section, name, mapping.get(name, {}))
+            for name, section in sections.items()
+        })
+        storage = config.storage
+        if storage.pool_min_size > storage.pool_max_size:
+            raise ConfigError(
+                "'storage.pool_min_size' is greater than "
+                "'storage.pool_max_size'"
+            )
+        metrics = config.metrics
+        if (metrics.enabled or metrics.tracing) and not metrics.token:
+            raise ConfigError(
+                "'metrics.token' is required when metrics or tracing is on"
+            )
         return config
+
+
+S = TypeVar("S")
+
+
+def _parse_section(  # type: ignore
+    section: type[S], name: str, table: Any
+) -> S:
+    if not isinstance(table, Mapping):
+        raise ConfigError(f"'{name}' must be a table")
+    types = typing.get_type_hints(section)
+    fields = {
+        spec.name: spec
+        for spec in dataclasses.fields(section)  # type: ignore
+    }
+    unknown = set(table) - set(fields)
+    if unknown:
+        raise ConfigError(f"Unknown option '{name}.{min(unknown)}'")
+    values = {}
+    for key, spec in fields.items():
+        full_name = f"{name}.{key}"
+        if key not in table:
+            if spec.metadata.get("required"):
+                raise ConfigError(f"'{full_name}' is required")
+            continue
+        value = _convert(full_name, types[key], table[key])
+        _check(full_name, spec.metadata, value)
+        values[key] = value
+    return section(**values)
+
+
+def _convert(name: str, type_: object, value: object) -> object:
+    # tomlkit items are subclasses of plain types, they are converted to
+    # plain values (config is pickled for worker processes)
+    if type_ is bool and isinstance(value, bool):
+        return bool(value)
+    if type_ is str and isinstance(value, str):
+        return str(value)
+    if type_ is int and isinstance(value, int) and not isinstance(value, bool):
+        return int(value)
+    if type_ is float and isinstance(value, (int, float)) \
+            and not isinstance(value, bool):
+        return float(value)
+    if type_ == Path | None and isinstance(value, str):
+        return Path(str(value)) if value else None
+    expected = {
+        bool: "a boolean", str: "a string", int: "an integer",
+        float: "a number"
+    }
+    raise ConfigError(f"'{name}' must be {expected.get(type_, 'a path')}")  # type: ignore  # noqa
+
+
+def _check(name: str, metadata: Mapping[str, Any], value: object) -> None:  # type: ignore  # noqa
+    minimum, maximum = metadata.get("minimum"), metadata.get("maximum")
+    if minimum is not None and value < minimum:
+        raise ConfigError(f"'{name}' must be at least {minimum}")
+    if maximum is not None and value > maximum:
+        raise ConfigError(f"'{name}' must be at most {maximum}")
+    choices = metadata.get("choices")
+    if choices is not None and value not in choices:
+        raise ConfigError(f"'{name}' must be one of {', '.join(choices)}")
+    if metadata.get("required") and not value:
+        raise ConfigError(f"'{name}' must not be empty")
@@ -2,13 +2,13 @@ from __future__ import annotations
 
 from abc import ABC, abstractmethod
 from datetime import datetime as dt
-from enum import Enum, auto
+from enum import Enum, Flag, auto
 from hashlib import sha3_512
 
 from pathlib import Path
 
 from types import TracebackType
-from typing import Literal
+from typing import Literal, Mapping
 from typing import Generic, TypeVar
 
 from .types import Bound, BoundSequence
@@ -65,7 +65,10 @@ Actor = TypeVar("Actor", bound=User | Bot)
 class Relation(Entity, ABC, Generic[Actor]):
     actor: Actor
     related: User | Bot | Conference
-    permissions: Permissions | None
+    permissions: Permissions | None  # default ones of related if None
+    restrictions: list[Restrictions]
+    read_no: int  # messages before this `no` are read
+    unread: int  # messages from `read_no` which are not deleted
 
 
 class BotRelation(Relation[Bot], ABC):
@@ -111,7 +114,7 @@ class Authentication:
 
     def check(self, data: bytes) -> bool:
         if self.method is AuthMethod.PASSWORD:
-            return self.data == sha3_512(data)
+            return self.data == sha3_512(data).digest()
         method = self.method.name
         raise NotImplementedError(
             f"'{method}' authentication method is not implemented yet"
@@ -215,38 +218,88 @@ class Message(Entity):  # , Generic[C]):
     reply_to: Message | None
 
 
+class MessageVersion(Entity):
+    no: int  # number of version, 0 is the message as it was sent
+    text: str | None
+    attachments: list[Media]
+    time: dt  # time the message was sent or edited to this version
+
+
 class Attachment(Entity, Generic[M]):
     no: int  # index of attachment in all of attachments in dialog
     media: M
 
 
+class FoundMessage(Entity):
+    chat: Dialog | ConferenceParticipation[User]
+    message: Message
+
+
+class SearchResults(Entity):
+    found: list[FoundMessage]
+    before: int | None  # cursor of the next page, None on the last one
+
+
+class ChatChanges(Entity):
+    chat: Dialog | ConferenceParticipation[User]
+    messages: list[Message]  # sent or edited
+    deleted: list[int]  # `no`s of deleted messages
+    # False if there are too many changes: chat is to be fetched as usual
+    complete: bool
+
+
+class Changes(Entity):
+    version: int  # token of the next sync
+    chats: list[ChatChanges]
+    left: list[int]  # ids of related entities of chats user has left
+
+
+class ItemResult(Entity, Generic[T]):
+    """Result of an item of a bulk request: its value or an error."""
+    value: T | None
+    error: str | None
+
+
+class StorageUsage(Entity):
+    owner: User | Bot
+    uploaded: int  # bytes of all uploads
+    charged: int  # bytes of stored files, duplicates are not counted
+    uploads: dict[MIMEType, int]  # numbers of uploads by media type
+
+
 class Restrictions(Entity):
     since: dt
     to: dt
     restictor: Bound[User | Bot]
-    read: Literal[False] | None = None
-    send: Literal[False] | None = None
-    delete: Literal[False] | None = None
-    send_media: Literal[False] | None = None
-    send_mediamessage: Literal[False] | None = None
-    add_user: Literal[False] | None = None
-    pin_message: Literal[False] | None = None
-    edit_conference: Literal[False] | None = None
-
-
-class Permissions(Entity):
-    read: bool
-    send: bool
-    delete: bool
-    send_media: bool
-    send_mediamessage: bool
-    add_user: bool
-    remove_user: bool
-    pin_message: bool
-    edit_conference: bool
-
-
-PERMISSIONS_FIELDS = tuple(field for field in Permissions.__annotations__)
+    denied: Permissions  # permissions actor has not while restricted
+
+
+class Permissions(Flag):
+    READ = auto()
+    SEND = auto()
+    DELETE = auto()
+    SEND_MEDIA = auto()
+    SEND_MEDIAMESSAGE = auto()
+    ADD_USER = auto()
+    REMOVE_USER = auto()
+    PIN_MESSAGE = auto()
+    EDIT_CONFERENCE = auto()
+
+    @classmethod
+    def of(cls, *fields: str) -> Permissions:
+        permissions = cls(0)
+        for field in fields:
+            permissions |= cls[field.upper()]
+        return permissions
+
+    def patched(self, update: Mapping[str, bool | None]) -> Permissions:
+        """Grants permissions set to True and revokes ones set to False."""
+        granted = [field for field, value in update.items() if value]
+        revoked = [field for field, value in update.items() if value is False]
+        return (self | self.of(*granted)) & ~self.of(*revoked)
+
+
+PERMISSIONS_FIELDS = tuple(name.lower() for name in Permissions.__members__)
 
 MIME_TUPLES: dict[tuple[str, str], MIMETuple] = {
     **{("image", item.value): (MIMEType.IMAGE, item) for item in ImagesMIME},
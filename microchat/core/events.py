@@ -1,6 +1,13 @@
 from __future__ import annotations
 
 import asyncio
+import json
+import weakref
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+from typing import Iterable
 
 
 class Event:
@@ -8,13 +15,134 @@ class Event:
         pass
 
 
+class StreamOverflow(Event):
+    """Last event of subscriber which is dropped for falling behind."""
+
+    def as_json(self) -> str:
+        return "{}"
+
+
+@dataclass
+class MembersAdded(Event):
+    """Actors joined a conference, one event for a bulk request."""
+    conference: int
+    actors: list[int]
+
+    def as_json(self) -> str:
+        return json.dumps({"conference": self.conference, "actors": self.actors})  # noqa
+
+
+@dataclass
+class MembersRemoved(Event):
+    conference: int
+    actors: list[int]
+
+    def as_json(self) -> str:
+        return json.dumps({"conference": self.conference, "actors": self.actors})  # noqa
+
+
+class Subscription:
+    """
+    Filter of events of a subscriber: events of conferences its user is a
+    member of. Conferences the user joins or leaves are followed by events
+    about the user itself, which the user gets too.
+    """
+
+    def __init__(self, user_id: int, conferences: Iterable[int]) -> None:
+        self.user_id = user_id
+        self.conferences = set(conferences)
+
+    def accepts(self, event: Event) -> bool:
+        if isinstance(event, MembersAdded):
+            if self.user_id in event.actors:
+                self.conferences.add(event.conference)
+            return event.conference in self.conferences
+        if isinstance(event, MembersRemoved):
+            if event.conference not in self.conferences:
+                return False
+            if self.user_id in event.actors:
+                self.conferences.discard(event.conference)
+            return True
+        return False
+
+
+class EventTransport(ABC):
+    """Carries dispatched events to event streams of other processes."""
+
+    @abstractmethod
+    async def publish(self, event: Event) -> None:
+        pass
+
+
 class EventStream:
+    # Subscribers are kept weakly: queue which is not referenced by reader
+    # anymore (e.g. connection was closed) leaves the stream by itself.
+    # Queue of a subscriber holds at most `queue_size` events (0 is
+    # unlimited), subscriber which does not keep up is unsubscribed and
+    # gets StreamOverflow instead of the oldest event.
+
+    transport: EventTransport | None
+    queue_size: int
+
+    def __init__(
+        self, transport: EventTransport | None = None, queue_size: int = 0
+    ) -> None:
+        # queue -> its filter, None gets all events
+        self._subscribers: weakref.WeakKeyDictionary[
+            EventsQueue, Subscription | None
+        ] = weakref.WeakKeyDictionary()
+        self.transport = transport
+        self.queue_size = queue_size
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(
+        self, subscription: Subscription | None = None
+    ) -> EventsQueue:
+        queue: EventsQueue = asyncio.Queue(self.queue_size)
+        self._subscribers[queue] = subscription
+        return queue
 
-    def subscribe(self) -> EventsQueue:
-        return asyncio.Queue()
+    def unsubscribe(self, queue: EventsQueue) -> None:
+        self._subscribers.pop(queue, None)
 
     async def dispatch(self, event: Event) -> None:
-        pass
+        self.deliver(event)
+        if self.transport is not None:
+            await self.transport.publish(event)
+
+    def deliver(self, event: Event) -> None:
+        """Puts event to queues of this process' subscribers."""
+        for queue, subscription in list(self._subscribers.items()):
+            if subscription is not None and not subscription.accepts(event):
+                continue
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.unsubscribe(queue)
+                queue.get_nowait()
+                queue.put_nowait(StreamOverflow())
+
+
+class Outbox:
+    """
+    Events of a unit of work. They are dispatched after it is committed,
+    so a change which is rolled back is not announced.
+    """
+
+    def __init__(self, stream: EventStream) -> None:
+        self.stream = stream
+        self.events: list[Event] = []
+
+    def add(self, event: Event) -> None:
+        self.events.append(event)
+
+    async def flush(self) -> None:
+        events, self.events = self.events, []
+        for event in events:
+            await self.stream.dispatch(event)
 
 
 class EventStreamReader:
@@ -15,16 +15,21 @@ class IncompleteJWT(Exception):
 
 class JWTManager:
     secret: str
+    algorithm = "HS256"
 
     def __init__(self, secret: str) -> None:
         self.secret = secret
 
     def decode_access_token(self, token: str) -> SessionInfo:
-        return cast(SessionInfo, jwt.decode(token, self.secret))
+        return cast(SessionInfo, jwt.decode(
+            token, self.secret, algorithms=[self.algorithm]
+        ))
 
     def decode_csrf_token(self, token: str) -> SessionInfo:
-        return cast(SessionInfo, jwt.decode(token, self.secret))
+        return cast(SessionInfo, jwt.decode(
+            token, self.secret, algorithms=[self.algorithm]
+        ))
 
     def create_access_token(self, user_id: int, session_id: int) -> str:
         session_info = dict(session=session_id, user=user_id)
-        return jwt.encode(session_info, self.secret)
+        return jwt.encode(session_info, self.secret, algorithm=self.algorithm)
@@ -0,0 +1,6 @@
+from .loop import LoopMonitor  # noqa: F401
+from .pipeline import PipelineMetrics  # noqa: F401
+from .registry import Counter, Gauge, Histogram, Registry  # noqa: F401
+from .services import register_singleflight_metrics  # noqa: F401
+from .storage import register_sweeper_metrics  # noqa: F401
+from .tracing import Tracer  # noqa: F401
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from .registry import LabelValues, Registry
+
+
+BLOCKING_LOG = logging.getLogger("microchat.loop.blocking")
+
+LAG_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5)
+
+
+class LoopMonitor:
+    """
+    Watches the event loop:
+
+    - lag: how late a sleeping task wakes up, sampled every `interval`
+    - tasks: number of pending tasks at collection time
+    - blocking: a watchdog thread notices when the loop did not run its
+      callbacks for `block_threshold` seconds and logs stack of the loop
+      thread, i.e. the code which blocks the loop right now
+    """
+
+    def __init__(
+        self,
+        registry: Registry,
+        interval: float = 0.25,
+        block_threshold: float = 0.5,
+        logger: logging.Logger = BLOCKING_LOG
+    ) -> None:
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self.logger = logger
+        self.lag = registry.histogram(
+            "event_loop_lag_seconds",
+            "Delay of event loop wake-ups",
+            buckets=LAG_BUCKETS
+        )
+        self.blocks = registry.counter(
+            "event_loop_blocks",
+            "Times the event loop was blocked longer than threshold"
+        )
+        registry.callback(
+            "event_loop_tasks", "Pending tasks of the event loop",
+            "gauge", self._count_tasks
+        )
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._sampler: asyncio.Task[None] | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopped = threading.Event()
+        self._loop_thread_id = 0
+        self._last_beat = time.monotonic()
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._sampler = self._loop.create_task(self._sample())
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._sampler is not None:
+            self._sampler.cancel()
+            try:
+                await self._sampler
+            except asyncio.CancelledError:
+                pass
+            self._sampler = None
+        if self._watchdog is not None:
+            self._watchdog.join()
+            self._watchdog = None
+
+    async def _sample(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._last_beat = now
+            self.lag.observe(max(now - expected, 0))
+
+    def _watch(self) -> None:
+        reported_beat = None
+        # stalled loop can't update beat, so the watchdog expects a beat
+        # every `interval` and allows `block_threshold` on top of it
+        allowed = self.interval + self.block_threshold
+        while not self._stopped.wait(self.block_threshold / 2):
+            last_beat = self._last_beat
+            stalled_for = time.monotonic() - last_beat
+            if stalled_for < allowed or reported_beat == last_beat:
+                continue
+            reported_beat = last_beat
+            self.blocks.inc()
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else ""
+            self.logger.warning(
+                "Event loop is blocked for %.0f ms, loop thread stack:\n%s",
+                (stalled_for - self.interval) * 1000, stack
+            )
+
+    def _count_tasks(self) -> dict[LabelValues, float]:
+        if self._loop is None or self._loop.is_closed():
+            return {}
+        return {(): len(asyncio.all_tasks(self._loop))}
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from microchat.api_utils.instrumentation import Instrumentation, Stage
+
+from .registry import Registry
+
+
+STORAGE_CALLS_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+
+class PipelineMetrics(Instrumentation):
+    """Records per-route histograms of endpoints pipeline into registry."""
+
+    def __init__(self, registry: Registry) -> None:
+        self.requests = registry.histogram(
+            "request_seconds",
+            "Time spent in request processing",
+            labels=("route",)
+        )
+        self.stages = registry.histogram(
+            "request_stage_seconds",
+            "Time spent in each stage of request processing",
+            labels=("route", "stage")
+        )
+        self.storage_calls = registry.histogram(
+            "request_storage_calls",
+            "Storage calls made during request processing",
+            labels=("route",),
+            buckets=STORAGE_CALLS_BUCKETS
+        )
+        self.storage_seconds = registry.histogram(
+            "request_storage_seconds",
+            "Time spent in storage calls during request processing",
+            labels=("route",)
+        )
+        self.events_streams = registry.gauge(
+            "events_streams", "Open Server-Sent Events connections"
+        )
+        self.events_streams.set(0)
+
+    def request_finished(self, route: str, seconds: float) -> None:
+        self.requests.observe(seconds, route)
+
+    def observe_stage(self, route: str, stage: Stage, seconds: float) -> None:
+        self.stages.observe(seconds, route, stage.value)
+
+    def observe_storage(
+        self, route: str, calls: int, seconds: float
+    ) -> None:
+        self.storage_calls.observe(calls, route)
+        self.storage_seconds.observe(seconds, route)
+
+    def events_stream_opened(self) -> None:
+        self.events_streams.inc()
+
+    def events_stream_closed(self) -> None:
+        self.events_streams.dec()
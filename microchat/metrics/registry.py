@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+
+from typing import Callable, Iterable, Iterator, Sequence
+
+
+LabelValues = tuple[str, ...]
+Sample = tuple[str, LabelValues, float]  # name suffix, label values, value
+
+DEFAULT_BUCKETS = (
+    .0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10
+)
+
+
+class DuplicateMetric(Exception):
+    pass
+
+
+class Metric(ABC):
+    kind: str
+    name: str
+    documentation: str
+    labels: tuple[str, ...]
+
+    def __init__(
+        self, name: str, documentation: str, labels: Sequence[str] = ()
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+
+    @abstractmethod
+    def samples(self) -> Iterator[Sample]:
+        pass
+
+    def _check_labels(self, values: LabelValues) -> None:
+        if len(values) != len(self.labels):
+            raise ValueError(
+                f"'{self.name}' expects labels {self.labels}, got {values}"
+            )
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(
+        self, name: str, documentation: str, labels: Sequence[str] = ()
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._check_labels(labels)
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Iterator[Sample]:
+        for labels, value in self._values.items():
+            yield "_total", labels, value
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(
+        self, name: str, documentation: str, labels: Sequence[str] = ()
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self._values: dict[LabelValues, float] = {}
+
+    def set(self, value: float, *labels: str) -> None:
+        self._check_labels(labels)
+        self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._check_labels(labels)
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def samples(self) -> Iterator[Sample]:
+        for labels, value in self._values.items():
+            yield "", labels, value
+
+
+class CallbackMetric(Metric):
+    """
+    Metric which value is taken from a callback at collection time.
+    Used to expose counters kept by other components.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        kind: str,
+        callback: Callable[[], dict[LabelValues, float]],
+        labels: Sequence[str] = ()
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.kind = kind
+        self._callback = callback
+
+    def samples(self) -> Iterator[Sample]:
+        suffix = "_total" if self.kind == "counter" else ""
+        for labels, value in self._callback().items():
+            yield suffix, labels, value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+    buckets: tuple[float, ...]
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # per labels: [counts per bucket..., +Inf count], sum
+        self._counts: dict[LabelValues, list[int]] = {}
+        self._sums: dict[LabelValues, float] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        counts = self._counts.get(labels)
+        if counts is None:
+            self._check_labels(labels)
+            counts = self._counts[labels] = [0] * (len(self.buckets) + 1)
+            self._sums[labels] = 0
+        counts[bisect_left(self.buckets, value)] += 1
+        self._sums[labels] += value
+
+    def samples(self) -> Iterator[Sample]:
+        for labels, counts in self._counts.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield "_bucket", (*labels, _format_value(bound)), cumulative
+            cumulative += counts[-1]
+            yield "_bucket", (*labels, "+Inf"), cumulative
+            yield "_sum", labels, self._sums[labels]
+            yield "_count", labels, cumulative
+
+
+class Registry:
+
+    def __init__(self, prefix: str = "microchat") -> None:
+        self.prefix = prefix
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> None:
+        if metric.name in self._metrics:
+            raise DuplicateMetric(metric.name)
+        self._metrics[metric.name] = metric
+
+    def counter(
+        self, name: str, documentation: str, labels: Sequence[str] = ()
+    ) -> Counter:
+        counter = Counter(self._full_name(name), documentation, labels)
+        self.register(counter)
+        return counter
+
+    def gauge(
+        self, name: str, documentation: str, labels: Sequence[str] = ()
+    ) -> Gauge:
+        gauge = Gauge(self._full_name(name), documentation, labels)
+        self.register(gauge)
+        return gauge
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        histogram = Histogram(
+            self._full_name(name), documentation, labels, buckets
+        )
+        self.register(histogram)
+        return histogram
+
+    def callback(
+        self,
+        name: str,
+        documentation: str,
+        kind: str,
+        callback: Callable[[], dict[LabelValues, float]],
+        labels: Sequence[str] = ()
+    ) -> CallbackMetric:
+        metric = CallbackMetric(
+            self._full_name(name), documentation, kind, callback, labels
+        )
+        self.register(metric)
+        return metric
+
+    def exposition(self) -> str:
+        """Renders all metrics in Prometheus text format (version 0.0.4)."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            label_names = metric.labels
+            for suffix, values, value in metric.samples():
+                names = label_names
+                if suffix == "_bucket":
+                    names = (*label_names, "le")
+                labels = ",".join(
+                    f'{name}="{_escape(label)}"'
+                    for name, label in zip(names, values)
+                )
+                labels_repr = f"{{{labels}}}" if labels else ""
+                lines.append(
+                    f"{metric.name}{suffix}{labels_repr} {_format_value(value)}"
+                )
+        lines.append("")
+        return "\n".join(lines)
+
+    def _full_name(self, name: str) -> str:
+        return f"{self.prefix}_{name}" if self.prefix else name
+
+
+def _escape(value: str) -> str:
+    return (
+        value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r'\"')
+    )
+
+
+def _format_value(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from microchat.services.singleflight import Flights, SingleFlight
+
+from .registry import LabelValues, Registry
+
+
+def register_singleflight_metrics(
+    registry: Registry, flights: Flights
+) -> None:
+    groups: dict[str, SingleFlight[object, object]] = {
+        "chats.messages": flights.messages,  # type: ignore
+        "files.info": flights.media_infos,  # type: ignore
+    }
+
+    def calls() -> dict[LabelValues, float]:
+        return {(name, ): group.calls for name, group in groups.items()}
+
+    def collapsed() -> dict[LabelValues, float]:
+        return {(name, ): group.collapsed for name, group in groups.items()}
+
+    registry.callback(
+        "singleflight_calls", "Calls made through single-flight groups",
+        "counter", calls, labels=("group",)
+    )
+    registry.callback(
+        "singleflight_collapsed",
+        "Calls which joined already in-flight identical call",
+        "counter", collapsed, labels=("group",)
+    )
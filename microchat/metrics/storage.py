@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from .registry import LabelValues, Registry
+
+if TYPE_CHECKING:
+    from microchat.storages.memory.sweeper import Sweeper
+
+
+def register_sweeper_metrics(registry: Registry, sweeper: Sweeper) -> None:
+
+    def removed() -> dict[LabelValues, float]:
+        return {(): sweeper.removed_files}
+
+    def reclaimed() -> dict[LabelValues, float]:
+        return {(): sweeper.reclaimed_bytes}
+
+    def orphans() -> dict[LabelValues, float]:
+        return {(): len(sweeper.db.media_refs.released)}
+
+    registry.callback(
+        "storage_removed_files", "Orphan media files removed by sweeper",
+        "counter", removed
+    )
+    registry.callback(
+        "storage_reclaimed_bytes", "Bytes of orphan media files removed",
+        "counter", reclaimed
+    )
+    registry.callback(
+        "storage_orphan_files",
+        "Media files nobody refers to which wait for the grace period",
+        "gauge", orphans
+    )
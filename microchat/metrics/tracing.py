@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import logging
+import time
+
+from collections import Counter, deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from microchat.api_utils.instrumentation import Instrumentation, Stage
+from microchat.core.types import JSON
+
+
+SLOW_LOG = logging.getLogger("microchat.storage.slow")
+
+Attributes = dict[str, str | int]
+
+
+@dataclass
+class Span:
+    name: str
+    start: float  # time.perf_counter() value
+    duration: float
+    attributes: Attributes = field(default_factory=dict)
+    children: list[Span] = field(default_factory=list)
+
+    @property
+    def end(self) -> float:
+        return self.start + self.duration
+
+    def as_json(self, origin: float) -> JSON:
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": dict(self.attributes),
+            "children": [child.as_json(origin) for child in self.children],
+        }
+
+
+@dataclass
+class Trace:
+    route: str
+    started_at: float  # unix time
+    start: float  # time.perf_counter() value
+    duration: float = 0
+    spans: list[Span] = field(default_factory=list)
+    calls: Counter[str] = field(default_factory=Counter)
+
+    def finish(self, duration: float) -> None:
+        """Nests spans into each other according to their time intervals."""
+        self.duration = duration
+        roots: list[Span] = []
+        stack: list[Span] = []
+        for span in sorted(self.spans, key=lambda s: (s.start, -s.duration)):
+            while stack and span.end > stack[-1].end:
+                stack.pop()
+            siblings = stack[-1].children if stack else roots
+            siblings.append(span)
+            stack.append(span)
+        self.spans = roots
+
+    def as_json(self) -> JSON:
+        return {
+            "route": self.route,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 3),
+            "storage_calls": dict(self.calls),
+            "spans": [span.as_json(self.start) for span in self.spans],
+        }
+
+
+class Tracer(Instrumentation):
+    """
+    Collects span tree (pipeline stages and storage calls) of each request
+    and keeps the last `capacity` of them. Storage calls which took at
+    least `slow_threshold` seconds are logged to 'microchat.storage.slow'.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 100,
+        slow_threshold: float = 0.1,
+        slow_log: logging.Logger = SLOW_LOG
+    ) -> None:
+        self.traces: deque[Trace] = deque(maxlen=capacity)
+        self.slow_threshold = slow_threshold
+        self.slow_log = slow_log
+        self._current: ContextVar[Trace | None] = ContextVar(
+            "microchat_trace", default=None
+        )
+
+    def last(self, count: int) -> list[Trace]:
+        traces = list(self.traces)
+        return traces[-count:] if count > 0 else []
+
+    def request_started(self, route: str) -> None:
+        trace = Trace(route, time.time(), time.perf_counter())
+        self._current.set(trace)
+
+    def request_finished(self, route: str, seconds: float) -> None:
+        trace = self._current.get()
+        if trace is None:
+            return
+        self._current.set(None)
+        trace.finish(seconds)
+        self.traces.append(trace)
+
+    def observe_stage(self, route: str, stage: Stage, seconds: float) -> None:
+        trace = self._current.get()
+        if trace is None:
+            return
+        start = time.perf_counter() - seconds
+        trace.spans.append(Span(stage.value, start, seconds))
+
+    def observe_storage_call(
+        self,
+        route: str,
+        storage: str, method: str, arguments: dict[str, object],
+        seconds: float
+    ) -> None:
+        name = f"{storage}.{method}"
+        shapes = {
+            argument: argument_shape(value)
+            for argument, value in arguments.items()
+        }
+        if seconds >= self.slow_threshold:
+            self.slow_log.warning(
+                "%s took %.1f ms, route '%s', arguments %s",
+                name, seconds * 1000, route, shapes
+            )
+        trace = self._current.get()
+        if trace is None:
+            return
+        start = time.perf_counter() - seconds
+        trace.spans.append(Span(name, start, seconds, shapes))
+        trace.calls[name] += 1
+
+
+def argument_shape(value: object) -> str | int:
+    """
+    Describes argument without its content: ints (offsets, counts, ids)
+    are kept as is, collections and strings are reduced to their lengths,
+    entities to their types and ids.
+    """
+    if value is None or isinstance(value, bool):
+        return str(value)
+    if isinstance(value, int):
+        return value
+    if isinstance(value, (str, bytes, list, tuple, set, frozenset, dict)):
+        return f"{type(value).__name__}[{len(value)}]"
+    id = getattr(value, "id", None)
+    if isinstance(id, int):
+        return f"{type(value).__name__}#{id}"
+    return type(value).__name__
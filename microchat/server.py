@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Callable
+
+from .config import Config, ConfigError
+
+# aiohttp, metrics and storage backends are imported where they are
+# used, so the server imports only what is enabled in config.
+if TYPE_CHECKING:
+    from aiohttp import web
+
+    from .metrics import Registry
+    from .storages import UoW
+    from .storages.memory.compaction import Compactor
+    from .storages.memory.sweeper import Sweeper
+
+
+def create_storage(
+    config: Config, metrics: Registry | None = None
+) -> tuple[Callable[[], UoW], list[Compactor | Sweeper]]:
+    """Returns factory of units of work and background tasks of storage."""
+    storage = config.storage
+    if storage.backend == "memory":
+        from .storages.memory import MemoryDatabase, MemoryUoW
+        from .storages.memory.compaction import Compactor
+        from .storages.memory.sweeper import Sweeper
+        database = MemoryDatabase(config.cache.max_entries)
+        compactor = Compactor(
+            database, interval=storage.compaction_interval
+        )
+        sweeper = Sweeper(
+            database,
+            interval=storage.media_sweep_interval,
+            batch_size=storage.media_sweep_batch_size,
+            grace_period=storage.media_grace_period
+        )
+        if metrics is not None:
+            from .metrics import register_sweeper_metrics
+            register_sweeper_metrics(metrics, sweeper)
+        return lambda: MemoryUoW(database), [compactor, sweeper]
+    raise ConfigError(f"Unknown storage backend '{storage.backend}'")
+
+
+async def create_app(config: Config) -> web.Application:
+    from .app import app
+    from .core.events import EventStream
+    from .core.jwt_manager import JWTManager
+
+    jwt_manager = JWTManager(config.auth.jwt_secret)
+    metrics = loop_monitor = tracer = None
+    if config.metrics.enabled:
+        from .metrics import LoopMonitor, Registry
+        metrics = Registry()
+        loop_monitor = LoopMonitor(metrics)
+    if config.metrics.tracing:
+        from .metrics import Tracer
+        tracer = Tracer(
+            capacity=config.metrics.kept_traces,
+            slow_threshold=config.metrics.slow_threshold
+        )
+    uow_factory, tasks = create_storage(config, metrics)
+    event_stream = EventStream(queue_size=config.events.queue_size)
+    application = await app(
+        uow_factory, jwt_manager, config=config,
+        metrics=metrics, tracer=tracer, loop_monitor=loop_monitor,
+        event_stream=event_stream
+    )
+    if tasks:
+
+        async def start_storage_tasks(app: web.Application) -> None:
+            for task in tasks:
+                task.start()
+
+        async def stop_storage_tasks(app: web.Application) -> None:
+            for task in tasks:
+                await task.stop()
+
+        application.on_startup.append(start_storage_tasks)  # type: ignore
+        application.on_cleanup.append(stop_storage_tasks)  # type: ignore
+    return application
+
+
+def run(config: Config) -> None:
+    from aiohttp import web
+
+    web.run_app(
+        create_app(config),
+        host=config.server.host, port=config.server.port
+    )
+
@@ -1,3 +1,9 @@
+from functools import cached_property
+
+from typing import Callable
+
+from microchat.config import Config
+from microchat.core.events import EventStream, Outbox
 from microchat.core.jwt_manager import JWTManager
 from microchat.storages import UoW
 
@@ -5,21 +11,66 @@ from .agents import Agents
 from .auth import Auth
 from .chats import Chats
 from .conferences import Conferences
+from .events import Events
 from .files import Files
 from .general_exceptions import ServiceError  # noqa: F401
+from .singleflight import Flights
 
 
 class ServiceSet:
+    # Services are created on first access: most of handlers use one or two
+    # of them, so there is no need to build the whole set for each request.
+
+    uow: UoW
+    uow_factory: Callable[[], UoW]
+    flights: Flights
+    jwt_manager: JWTManager
+    event_stream: EventStream
+    outbox: Outbox
+    config: Config
+
+    def __init__(
+        self,
+        uow: UoW,
+        uow_factory: Callable[[], UoW],
+        flights: Flights,
+        jwt_manager: JWTManager,
+        event_stream: EventStream,
+        config: Config
+    ) -> None:
+        self.uow = uow
+        # shared calls (single flights) run in units of work of their own
+        self.uow_factory = uow_factory
+        self.flights = flights
+        self.jwt_manager = jwt_manager
+        self.event_stream = event_stream
+        # events are dispatched by the caller once uow is committed
+        self.outbox = Outbox(event_stream)
+        self.config = config
+
+    @cached_property
+    def auth(self) -> Auth:
+        return Auth(self.uow, self.jwt_manager)
+
+    @cached_property
+    def chats(self) -> Chats:
+        return Chats(self.uow, self.uow_factory, self.flights.messages)
+
+    @cached_property
+    def conferences(self) -> Conferences:
+        return Conferences(self.uow, self.outbox)
+
+    @cached_property
+    def events(self) -> Events:
+        return Events(self.uow, self.event_stream)
+
+    @cached_property
+    def files(self) -> Files:
+        return Files(
+            self.uow, self.uow_factory, self.flights.media_infos,
+            self.config.media
+        )
 
-    auth: Auth
-    chats: Chats
-    conferences: Conferences
-    files: Files
-    agents: Agents
-
-    def __init__(self, uow: UoW, jwt_manager: JWTManager) -> None:
-        self.auth = Auth(uow, jwt_manager)
-        self.chats = Chats(uow)
-        self.conferences = Conferences(uow)
-        self.files = Files(uow)
-        self.agents = Agents(uow)
+    @cached_property
+    def agents(self) -> Agents:
+        return Agents(self.uow)
@@ -4,7 +4,7 @@ from typing import List, TypeVar
 
 from microchat.core.entities import Bot, Conference, User
 from microchat.core.entities import ConferenceParticipation, Dialog
-from microchat.core.entities import Image
+from microchat.core.entities import Image, Permissions
 
 
 from .base_service import Service
@@ -40,6 +40,13 @@ class Agents(Service):
             relation = await self.uow.relations.get_relation(user, identity)
         return relation
 
+    async def search(
+        self,
+        user: User, query: str, kinds: tuple[type[Agent], ...], count: int
+    ) -> list[Agent]:
+        found = await self.uow.entities.search(query, kinds, count)
+        return found
+
     async def list_avatars(
         self, user: User, agent: Agent, offset: int, count: int
     ) -> List[Image]:
@@ -73,6 +80,12 @@ class Agents(Service):
         )
         return updated
 
+    async def get_permissions(
+        self, user: User, relation: Dialog | ConferenceParticipation[User]
+    ) -> Permissions:
+        permissions = await self.uow.relations.get_permissions(relation)
+        return permissions
+
     async def edit_permissions(
         self,
         user: User,
@@ -117,9 +130,8 @@ class Agents(Service):
             raise AccessDenied("You are not a bot's owner")
         elif isinstance(agent, Conference):
             relation = await self.get_chat(user, agent.id)
-            if not relation.permissions:
-                raise AccessDenied("You have not permissions in conference")
-            if not relation.permissions.edit_conference:
+            permissions = await self.uow.relations.get_permissions(relation)
+            if Permissions.EDIT_CONFERENCE not in permissions:
                 raise AccessDenied(
                     "'edit_conference' permission does not granted"
                 )
@@ -73,7 +73,7 @@ class Auth(Service):
         session_info = self.jwt_manager.decode_access_token(media_cookie)
         csrf_info = self.jwt_manager.decode_csrf_token(csrf_token)
         # TODO: add CSRF token checking
-        entity = self.uow.entities.get_by_id(session_info["user"])
+        entity = await self.uow.entities.get_by_id(session_info["user"])
         if not isinstance(entity, User):
             raise InvalidToken()
         session = await entity.sessions[session_info["session"]]
@@ -1,20 +1,40 @@
 from __future__ import annotations
 
-from typing import TypeVar, overload
+from typing import Callable, TypeVar, overload
 
 from microchat.core.entities import User
 from microchat.core.entities import ConferenceParticipation, Dialog
 from microchat.core.entities import Media
-from microchat.core.entities import Message, Attachment
+from microchat.core.entities import Message, MessageVersion, Attachment
+from microchat.core.entities import Changes, SearchResults
+from microchat.core.entities import ItemResult, Permissions
+from microchat.storages import UoW
 
 from .base_service import Service
 from .general_exceptions import AccessDenied, DoesNotExists
+from .singleflight import SingleFlight
 
 
 M = TypeVar("M", bound=Media)
+Chat = Dialog | ConferenceParticipation[User]
+# chat identity, text and attachments hashes of a message to send
+Outgoing = tuple[int | str, str | None, list[str] | None]
 
 
 class Chats(Service):
+    uow_factory: Callable[[], UoW]
+    # (conference id, offset, count) -> page of public conference messages
+    messages_flights: SingleFlight[tuple[int, int, int], list[Message]]
+
+    def __init__(
+        self,
+        uow: UoW,
+        uow_factory: Callable[[], UoW],
+        messages_flights: SingleFlight[tuple[int, int, int], list[Message]]
+    ) -> None:
+        super().__init__(uow)
+        self.uow_factory = uow_factory
+        self.messages_flights = messages_flights
 
     async def list_chats(
         self, user: User, offset: int, count: int
@@ -25,8 +45,16 @@ class Chats(Service):
     async def list_chat_messages(
         self,
         user: User, chat: Dialog | ConferenceParticipation[User],
-        offset: int, count: int
+        offset: int, count: int,
+        shared: bool = False
     ) -> list[Message]:
+        """
+        Page of a public conference is `shared` with concurrent identical
+        reads, it is read in a unit of work of its own then, so it is only
+        for plain reads, not for a lookup in the middle of a change.
+        """
+        if not await self._can_read(chat):
+            raise AccessDenied("Can't read messages due to chat restrictions")
         chats = self.uow.chats
         if isinstance(chat, Dialog):
             messages = await chats.get_dialog_messages(
@@ -38,10 +66,25 @@ class Chats(Service):
                 messages = await chats.get_private_conference_messages(
                     user, chat, offset, count, presences
                 )
-            else:
+            elif not shared:
                 messages = await chats.get_conference_messages(
                     user, chat, offset, count
                 )
+            else:
+                # public conference pages are the same for every member,
+                # so concurrent identical requests share one storage call,
+                # it outlives the request which started it, so it uses its
+                # own unit of work
+                key = (chat.related.id, offset, count)
+
+                async def get_page() -> list[Message]:
+                    async with self.uow_factory() as uow:
+                        return await uow.chats.get_conference_messages(
+                            user, chat, offset, count
+                        )
+
+                page = await self.messages_flights.do(key, get_page)
+                messages = list(page)
         return messages
 
     async def get_chat_message(
@@ -55,6 +98,30 @@ class Chats(Service):
             raise DoesNotExists()
         return message
 
+    async def search_messages(
+        self,
+        user: User, chat: Dialog | ConferenceParticipation[User] | None,
+        query: str, before: int | None, count: int
+    ) -> SearchResults:
+        chats = None
+        if chat is not None:
+            if not await self._can_read(chat):
+                raise AccessDenied(
+                    "Can't read messages due to chat restrictions"
+                )
+            chats = [chat]
+        found = await self.uow.chats.search_messages(
+            user, chats, query, before, count
+        )
+        results = SearchResults()
+        # page may be shorter than count if some chats are not readable,
+        # the cursor is still the last message found by storage
+        results.found = [
+            item for item in found if await self._can_read(item.chat)
+        ]
+        results.before = found[-1].message.id if len(found) >= count else None
+        return results
+
     @overload
     async def add_chat_message(
         self, user: User, chat: Dialog | ConferenceParticipation[User],
@@ -88,10 +155,10 @@ class Chats(Service):
         if isinstance(chat, ConferenceParticipation):
             # TODO: check that user is conference member
             pass
-        permissions = chat.permissions or chat.related.default_permissions
-        if not permissions.send:
+        permissions = await self.uow.relations.get_permissions(chat)
+        if Permissions.SEND not in permissions:
             raise AccessDenied("Can't send message due to chat restrictions")
-        if attachments_hashes and not permissions.send_media:
+        if attachments_hashes and Permissions.SEND_MEDIA not in permissions:
             raise AccessDenied(
                 "Can't send message with attachments due to chat restrictions"
             )
@@ -108,6 +175,51 @@ class Chats(Service):
         )
         return message
 
+    async def add_chat_messages(
+        self, user: User, outgoing: list[Outgoing]
+    ) -> list[ItemResult[Message]]:
+        """
+        Sends messages to many chats at once, result is per message. Chats
+        and their permissions are resolved once for all messages to them,
+        media once for all attachments; messages are written together.
+        """
+        results: list[ItemResult[Message]] = []
+        chats: dict[int | str, Chat | str] = {}
+        for identity, text, hashes in outgoing:
+            result: ItemResult[Message] = ItemResult()
+            result.value = result.error = None
+            results.append(result)
+            if identity not in chats:
+                chats[identity] = await self._sendable(user, identity)
+        hashes_union = list(dict.fromkeys(
+            hash for _, _, hashes in outgoing for hash in hashes or ()
+        ))
+        medias = await self._medias(user, hashes_union)
+        valid = []
+        items: list[tuple[Chat, str | None, list[Media] | None]] = []
+        for result, (identity, text, hashes) in zip(results, outgoing):
+            chat = chats[identity]
+            if isinstance(chat, str):
+                result.error = chat
+                continue
+            attachments = None
+            if hashes:
+                permissions = await self.uow.relations.get_permissions(chat)
+                if Permissions.SEND_MEDIA not in permissions:
+                    result.error = "Can't send attachments to the chat"
+                    continue
+                missing = [hash for hash in hashes if hash not in medias]
+                if missing:
+                    result.error = f"Media '{missing[0]}' does not exists"
+                    continue
+                attachments = [medias[hash] for hash in hashes]
+            valid.append(result)
+            items.append((chat, text, attachments))
+        messages = await self.uow.chats.add_messages(user, items)
+        for result, message in zip(valid, messages):
+            result.value = message
+        return results
+
     @overload
     async def edit_chat_message(
         self, user: User, chat: Dialog | ConferenceParticipation[User],
@@ -144,16 +256,50 @@ class Chats(Service):
         updated = await self.uow.chats.edit_message(message, text, attachments)
         return updated
 
+    async def list_message_versions(
+        self, user: User, chat: Dialog | ConferenceParticipation[User], no: int
+    ) -> list[MessageVersion]:
+        message = await self.get_chat_message(user, chat, no)
+        versions = await self.uow.chats.get_message_versions(message)
+        return versions
+
+    async def get_message_version(
+        self,
+        user: User, chat: Dialog | ConferenceParticipation[User],
+        no: int, version_no: int
+    ) -> MessageVersion:
+        message = await self.get_chat_message(user, chat, no)
+        versions = await self.uow.chats.get_message_versions(
+            message, version_no
+        )
+        if not versions or versions[0].no != version_no:
+            raise DoesNotExists()
+        return versions[0]
+
     async def remove_chat_message(
         self, user: User, chat: Dialog | ConferenceParticipation[User], no: int
     ) -> None:
-        permissions = chat.permissions or chat.related.default_permissions
+        permissions = await self.uow.relations.get_permissions(chat)
         message = await self.get_chat_message(user, chat, no)
         sender = await message.sender
-        if sender != user and not permissions.delete:
+        if sender != user and Permissions.DELETE not in permissions:
             raise AccessDenied("Can't delete other user's messages")
         await self.uow.chats.remove_message(message)
 
+    async def get_changes(self, user: User, version: int) -> Changes:
+        changes = await self.uow.chats.get_changes(user, version)
+        for chat_changes in changes.chats:
+            if not await self._can_read(chat_changes.chat):
+                chat_changes.messages = []
+                chat_changes.deleted = []
+        return changes
+
+    async def mark_read(
+        self, user: User, chat: Dialog | ConferenceParticipation[User], no: int
+    ) -> Dialog | ConferenceParticipation[User]:
+        chat = await self.uow.chats.mark_read(user, chat, no)
+        return chat
+
     async def list_chat_media(
         self,
         user: User, chat: Dialog | ConferenceParticipation[User],
@@ -197,9 +343,50 @@ class Chats(Service):
         media_type: type[M],
         no: int
     ) -> None:
-        permissions = chat.permissions or chat.related.default_permissions
+        permissions = await self.uow.relations.get_permissions(chat)
         attachment = await self.get_chat_media(user, chat, media_type, no)
         sender = attachment.media.loaded_by
-        if sender != user and not permissions.delete:
+        if sender != user and Permissions.DELETE not in permissions:
             raise AccessDenied("Can't delete other user's medias")
-        await self.uow.chats.remove_media(attachment)
+        await self.uow.chats.remove_media(chat, attachment)
+
+    async def _sendable(
+        self, user: User, identity: int | str
+    ) -> Chat | str:
+        """Returns chat user can send to or the reason why it can't."""
+        try:
+            if isinstance(identity, str):
+                related = await self.uow.entities.get_by_alias(identity)
+                identity = related.id
+            chat = await self.uow.relations.get_relation(user, identity)
+        except DoesNotExists:
+            return f"Chat '{identity}' does not exists"
+        permissions = await self.uow.relations.get_permissions(chat)
+        if Permissions.SEND not in permissions:
+            return "Can't send message due to chat restrictions"
+        return chat
+
+    async def _medias(
+        self, user: User, hashes: list[str]
+    ) -> dict[str, Media]:
+        """Returns media by hashes, ones which do not exist are missed."""
+        if not hashes:
+            return {}
+        try:
+            medias = await self.uow.media.get_by_hashes(user, hashes)
+            return dict(zip(hashes, medias))
+        except DoesNotExists:
+            pass
+        found = {}
+        for hash in hashes:
+            try:
+                found[hash] = await self.uow.media.get_by_hash(user, hash)
+            except DoesNotExists:
+                continue
+        return found
+
+    async def _can_read(
+        self, chat: Dialog | ConferenceParticipation[User]
+    ) -> bool:
+        permissions = await self.uow.relations.get_permissions(chat)
+        return Permissions.READ in permissions
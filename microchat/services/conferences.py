@@ -2,41 +2,49 @@ from __future__ import annotations
 
 from microchat.core.entities import Bot, Conference, User, Actor
 from microchat.core.entities import ConferenceParticipation, Dialog
-from microchat.core.entities import Permissions
+from microchat.core.entities import ItemResult, Permissions
+from microchat.core.events import MembersAdded, MembersRemoved, Outbox
+from microchat.storages import UoW
 
 from .base_service import Service
-from .general_exceptions import DoesNotExists, AccessDenied
+from .general_exceptions import AccessDenied, DoesNotExists
+
+
+Member = ConferenceParticipation[User | Bot]
 
 
 class Conferences(Service):
+    outbox: Outbox
+
+    def __init__(self, uow: UoW, outbox: Outbox) -> None:
+        super().__init__(uow)
+        self.outbox = outbox
 
     async def list_members(
         self, user: User | Bot, conference: Conference,
-        offset: int, count: int
+        offset: int, count: int, role: str | None = None
     ) -> list[ConferenceParticipation[User | Bot]]:
-        if conference.private:
-            relation = await self.uow.relations.get_relation(
-                user, conference.id
-            )
-            if isinstance(relation, Dialog):
-                raise RuntimeError
-            # TODO: somehow check that user is conference member
+        await self._check_access(user, conference)
         members = await self.uow.conferences.list_members(
-            conference, offset, count
+            conference, offset, count, role
         )
         return members
 
+    async def count_members(
+        self, user: User | Bot, conference: Conference,
+        role: str | None = None
+    ) -> int:
+        await self._check_access(user, conference)
+        count = await self.uow.conferences.count_members(conference, role)
+        return count
+
     async def get_member(
         self, user: User | Bot, conference: Conference,
         no: int | User | Bot
     ) -> ConferenceParticipation[User | Bot]:
         if isinstance(no, int):
-            members = await self.list_members(user, conference, no, 1)
-            if not members:
-                raise DoesNotExists()
-            member = members[0]
-            if member.no != no:
-                raise DoesNotExists()
+            await self._check_access(user, conference)
+            member = await self.uow.conferences.get_member(conference, no)
         else:
             member = await self.uow.conferences.find_member(conference, no)
         return member
@@ -46,22 +54,87 @@ class Conferences(Service):
         invitee: Actor
     ) -> ConferenceParticipation[Actor]:
         relation = await self.get_member(user, conference, user)
-        permissions = relation.permissions or conference.default_permissions
-        if not permissions.add_user:
+        permissions = await self.uow.relations.get_permissions(relation)
+        if Permissions.ADD_USER not in permissions:
             raise AccessDenied("'add_user' permission does not granted")
         member = await self.uow.conferences.add_member(conference, invitee)
+        self.outbox.add(MembersAdded(conference.id, [invitee.id]))
         return member
 
+    async def add_members(
+        self, user: User, conference: Conference,
+        invitees: list[int | str]
+    ) -> list[ItemResult[Member]]:
+        """Adds invitees by ids or aliases, result is per invitee."""
+        relation = await self.get_member(user, conference, user)
+        permissions = await self.uow.relations.get_permissions(relation)
+        if Permissions.ADD_USER not in permissions:
+            raise AccessDenied("'add_user' permission does not granted")
+        results = [_result() for _ in invitees]
+        pending: list[tuple[ItemResult[Member], User | Bot]] = []
+        for result, identity in zip(results, invitees):
+            try:
+                if isinstance(identity, int):
+                    invitee = await self.uow.entities.get_by_id(identity)
+                else:
+                    invitee = await self.uow.entities.get_by_alias(identity)
+            except DoesNotExists:
+                result.error = f"'{identity}' does not exists"
+                continue
+            if isinstance(invitee, Conference):
+                result.error = f"'{identity}' is a conference"
+                continue
+            pending.append((result, invitee))
+        members = await self.uow.conferences.add_members(
+            conference, [invitee for _, invitee in pending]
+        )
+        added = []
+        for (result, invitee), member in zip(pending, members):
+            if member is None:
+                result.error = f"'{invitee.alias}' is a member already"
+            else:
+                result.value = member
+                added.append(invitee.id)
+        if added:
+            self.outbox.add(MembersAdded(conference.id, added))
+        return results
+
     async def remove_member(
         self, user: User, conference: Conference,
         no: int | User | Bot
     ) -> None:
         relation = await self.get_member(user, conference, user)
-        permissions = relation.permissions or conference.default_permissions
-        if not permissions.remove_user:
+        permissions = await self.uow.relations.get_permissions(relation)
+        if Permissions.REMOVE_USER not in permissions:
             raise AccessDenied("'remove_user' permission does not granted")
         member = await self.get_member(user, conference, no)
         await self.uow.conferences.remove_member(member)
+        self.outbox.add(MembersRemoved(conference.id, [member.actor.id]))
+
+    async def remove_members(
+        self, user: User, conference: Conference, nos: list[int]
+    ) -> list[ItemResult[Member]]:
+        """Removes members by `no`, result is per `no`."""
+        relation = await self.get_member(user, conference, user)
+        permissions = await self.uow.relations.get_permissions(relation)
+        if Permissions.REMOVE_USER not in permissions:
+            raise AccessDenied("'remove_user' permission does not granted")
+        results = [_result() for _ in nos]
+        members: dict[int, Member] = {}
+        for result, no in zip(results, nos):
+            try:
+                member = await self.uow.conferences.get_member(conference, no)
+            except DoesNotExists:
+                result.error = f"Member #{no} does not exists"
+                continue
+            result.value = members[member.no] = member
+        await self.uow.conferences.remove_members(list(members.values()))
+        if members:
+            self.outbox.add(MembersRemoved(
+                conference.id,
+                [member.actor.id for member in members.values()]
+            ))
+        return results
 
     async def get_member_permissions(
         self, user: User | Bot, conference: Conference,
@@ -69,7 +142,7 @@ class Conferences(Service):
     ) -> Permissions:
         # TODO: somehow check that user is conference member
         member = await self.get_member(user, conference, no)
-        permissions = member.permissions or conference.default_permissions
+        permissions = await self.uow.relations.get_permissions(member)
         return permissions
 
     async def edit_member_permissions(
@@ -82,25 +155,48 @@ class Conferences(Service):
         send_media: bool | None = None,
         send_mediamessage: bool | None = None,
         add_user: bool | None = None,
+        remove_user: bool | None = None,
         pin_message: bool | None = None,
         edit_conference: bool | None = None,
     ) -> Permissions:
         relation = await self.get_member(user, conference, user)
-        user_perms = relation.permissions or conference.default_permissions
-        if not user_perms.remove_user:
+        user_perms = await self.uow.relations.get_permissions(relation)
+        if Permissions.REMOVE_USER not in user_perms:
             raise AccessDenied("'remove_user' permission does not granted")
         member = await self.get_member(user, conference, no)
-        # TODO: do something with this creepy part of code
-        permissions = member.permissions or conference.default_permissions
-        permissions.read = read or permissions.read
-        permissions.send = send or permissions.send
-        permissions.delete = delete or permissions.delete
-        permissions.send_media = send_media or permissions.send_media
-        permissions.send_mediamessage = send_mediamessage or permissions.send_mediamessage  # noqa
-        permissions.add_user = add_user or permissions.add_user
-        permissions.pin_message = pin_message or permissions.pin_message
-        permissions.edit_conference = edit_conference or permissions.edit_conference  # noqa
+        current = member.permissions
+        if current is None:
+            current = conference.default_permissions
+        permissions = current.patched({
+            "read": read,
+            "send": send,
+            "delete": delete,
+            "send_media": send_media,
+            "send_mediamessage": send_mediamessage,
+            "add_user": add_user,
+            "remove_user": remove_user,
+            "pin_message": pin_message,
+            "edit_conference": edit_conference,
+        })
         updated = await self.uow.conferences.update_permissions(
             member, permissions
         )
         return updated
+
+    async def _check_access(
+        self, user: User | Bot, conference: Conference
+    ) -> None:
+        if conference.private:
+            relation = await self.uow.relations.get_relation(
+                user, conference.id
+            )
+            if isinstance(relation, Dialog):
+                raise RuntimeError
+            # TODO: somehow check that user is conference member
+
+
+def _result() -> ItemResult[Member]:
+    result: ItemResult[Member] = ItemResult()
+    result.value = None
+    result.error = None
+    return result
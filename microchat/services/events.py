@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from microchat.core.entities import User
+from microchat.core.events import EventStream, EventsQueue, Subscription
+from microchat.storages import UoW
+
+from .base_service import Service
+
+
+class Events(Service):
+    event_stream: EventStream
+
+    def __init__(self, uow: UoW, event_stream: EventStream) -> None:
+        super().__init__(uow)
+        self.event_stream = event_stream
+
+    async def subscribe(self, user: User) -> EventsQueue:
+        conferences = await self.uow.chats.get_user_conferences(user)
+        subscription = Subscription(user.id, conferences)
+        return self.event_stream.subscribe(subscription)
@@ -2,24 +2,55 @@ from __future__ import annotations
 
 from contextlib import asynccontextmanager
 
-from typing import AsyncGenerator, Iterable, List
+from typing import AsyncGenerator, Callable, Iterable, List
 
-from microchat.core.entities import User, Media
+from microchat.config import MediaConfig
+from microchat.core.entities import User, Media, Privileges, StorageUsage
 from microchat.core.entities import FileInfo, TempFile, MIME_TUPLES
 from microchat.core.types import MIMETuple
+from microchat.storages import UoW
 
 from .base_service import Service
-from .general_exceptions import ServiceError
+from .general_exceptions import AccessDenied, DoesNotExists, ServiceError
+from .singleflight import SingleFlight
 
 
 class UnsupportedMIMEType(ServiceError):
     pass
 
 
+class QuotaExceeded(ServiceError):
+    pass
+
+
 class Files(Service):
+    uow_factory: Callable[[], UoW]
+    # hash -> media info
+    info_flights: SingleFlight[str, Media]
+    config: MediaConfig
+
+    def __init__(
+        self,
+        uow: UoW,
+        uow_factory: Callable[[], UoW],
+        info_flights: SingleFlight[str, Media],
+        config: MediaConfig
+    ) -> None:
+        super().__init__(uow)
+        self.uow_factory = uow_factory
+        self.info_flights = info_flights
+        self.config = config
 
     async def get_info(self, user: User, hash: str) -> Media:
-        return await self.uow.media.get_by_hash(user, hash)
+        # the lookup is the same for everybody, so it is shared by hash,
+        # access is checked for each caller then
+        async def find_by_hash() -> Media:
+            async with self.uow_factory() as uow:
+                return await uow.media.find_by_hash(hash)
+
+        media = await self.info_flights.do(hash, find_by_hash)
+        await self.uow.media.check_access(user, media)
+        return media
 
     async def get_infos(
         self, user: User, hashes: Iterable[str]
@@ -31,8 +62,10 @@ class Files(Service):
         user: User,
         file: FileInfo,
         *,
-        chunk_size: int = 1024**2
+        chunk_size: int | None = None
     ) -> AsyncGenerator[bytes, None]:
+        if chunk_size is None:
+            chunk_size = self.config.download_chunk_size
         reader = await self.uow.media.open(file)
         chunk = await reader.read(chunk_size)
         while chunk:
@@ -42,10 +75,35 @@ class Files(Service):
     async def materialize(
         self, user: User, file: TempFile, name: str, mime_repr: str
     ) -> Media:
+        """
+        Stores complete temporary file. Quota is checked exactly: a file
+        which is stored already is not charged, so it fits in any case.
+        """
         mime = self._parse_mime_repr(mime_repr)
+        left = await self.quota_left(user)
+        if left is not None and file.size > left:
+            # a file which is stored already is not charged
+            try:
+                await self.uow.media.get_by_hash(user, file.hash.hex())
+            except DoesNotExists:
+                raise QuotaExceeded("Storage quota exceeded")
         media = await self.uow.media.save_media(user, file, name, mime)
         return media
 
+    async def quota_left(self, user: User) -> int | None:
+        """Returns bytes user may store yet, None if there is no quota."""
+        if not self.config.user_quota:
+            return None
+        usage = await self.uow.media.get_usage(user)
+        return max(self.config.user_quota - usage.charged, 0)
+
+    async def list_top_usage(
+        self, user: User, count: int
+    ) -> list[StorageUsage]:
+        if user.privileges is not Privileges.ADMIN:
+            raise AccessDenied("Only admins can see usage of other users")
+        return await self.uow.media.list_top_usage(count)
+
     @asynccontextmanager
     async def tempfile(self) -> AsyncGenerator[TempFile, None]:
         tempfile = await self.uow.media.create_tempfile()
@@ -11,3 +11,7 @@ class AccessDenied(ServiceError):
 
 class DoesNotExists(ServiceError):
     pass
+
+
+class AlreadyExists(ServiceError):
+    pass
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import asyncio
+
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+from microchat.core.entities import Media, Message
+
+
+K = TypeVar("K", bound=Hashable)
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[K, T]):
+    """
+    Collapses concurrent calls with the same key into one in-flight call.
+
+    The first caller starts the call, callers that arrive before it is done
+    await the same result. The call runs in its own task, so cancellation
+    of any caller (e.g. aborted connection) does not affect the others.
+    The call may outlive its first caller, so it must not use resources
+    of the caller, such as its unit of work.
+    """
+
+    calls: int
+    collapsed: int
+
+    def __init__(self) -> None:
+        self._flights: dict[K, asyncio.Task[T]] = {}
+        self.calls = 0
+        self.collapsed = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: K, call: Callable[[], Awaitable[T]]) -> T:
+        self.calls += 1
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = asyncio.ensure_future(call())
+            self._flights[key] = flight
+            flight.add_done_callback(
+                lambda task: self._land(key, task)
+            )
+        else:
+            self.collapsed += 1
+        return await asyncio.shield(flight)
+
+    def _land(self, key: K, task: asyncio.Task[T]) -> None:
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        if not task.cancelled():
+            # mark exception as retrieved even if all callers went away
+            task.exception()
+
+
+class Flights:
+    """
+    Single-flight groups of one application, its service sets share them.
+    Groups are not process-wide, so applications (and tests) do not join
+    calls of each other.
+    """
+
+    def __init__(self) -> None:
+        # (conference id, offset, count) -> page of public conference messages
+        self.messages: SingleFlight[tuple[int, int, int], list[Message]] = (
+            SingleFlight()
+        )
+        # hash -> media info
+        self.media_infos: SingleFlight[str, Media] = SingleFlight()
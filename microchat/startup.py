@@ -0,0 +1,94 @@
+"""
+Startup profile of a worker: `python -m microchat --config FILE
+--profile-startup` imports subsystems one by one, builds the app and makes
+the first request to it in-process, reporting time of each step as JSON.
+Subsystems are imported in order of their dependencies, so time of each
+is what it adds to the ones above.
+"""
+from __future__ import annotations
+
+import importlib
+import json
+import sys
+import time
+
+from typing import TYPE_CHECKING, Awaitable, Callable
+
+if TYPE_CHECKING:
+    from aiohttp import web
+
+    from .config import Config
+
+
+SUBSYSTEMS = (
+    ("aiohttp", "aiohttp.web"),
+    ("jwt", "jwt"),
+    ("core", "microchat.core.entities"),
+    ("storages", "microchat.storages"),
+    ("services", "microchat.services"),
+    ("api", "microchat.api_utils.handler"),
+    ("routes", "microchat.app.routes"),
+    ("app", "microchat.app"),
+    ("metrics", "microchat.metrics"),
+    ("bus", "microchat.bus"),
+    ("memory_storage", "microchat.storages.memory"),
+)
+
+
+async def profile_startup(
+    config: Config,
+    create_app: Callable[[Config], Awaitable[web.Application]]
+) -> dict[str, object]:
+    imports: dict[str, float] = {}
+    for name, module in SUBSYSTEMS:
+        if module in sys.modules:
+            # imported by one of previous subsystems
+            imports[name] = 0.0
+            continue
+        started = time.perf_counter()
+        importlib.import_module(module)
+        imports[name] = _ms(time.perf_counter() - started)
+
+    from aiohttp.test_utils import TestClient, TestServer
+
+    from .app.routes import get_api_router
+    from .core.events import EventStream
+    from .core.jwt_manager import JWTManager
+
+    started = time.perf_counter()
+    application = await create_app(config)
+    create_app_ms = _ms(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    router = get_api_router(
+        lambda: None,  # type: ignore
+        JWTManager(config.auth.jwt_secret), EventStream(), config
+    )
+    router_ms = _ms(time.perf_counter() - started)
+
+    client = TestClient(TestServer(application))
+    await client.start_server()
+    try:
+        started = time.perf_counter()
+        async with client.get("/api/chats/") as response:
+            await response.read()
+        first_request_ms = _ms(time.perf_counter() - started)
+    finally:
+        await client.close()
+
+    return {
+        "imports_ms": imports,
+        "imports_total_ms": round(sum(imports.values()), 3),
+        "create_app_ms": create_app_ms,
+        "router_build_ms": router_ms,
+        "routes": len(router.routes()),
+        "first_request_ms": first_request_ms,
+    }
+
+
+def print_profile(profile: dict[str, object]) -> None:
+    print(json.dumps(profile, indent=2, sort_keys=True))
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
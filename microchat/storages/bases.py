@@ -7,8 +7,11 @@ from typing import Any, Iterable, TypeVar
 from microchat.core.entities import Authentication, Permissions, Session
 from microchat.core.entities import User, Bot, Conference, Dialog
 from microchat.core.entities import ConferenceParticipation, ConferencePresence
-from microchat.core.entities import Message, Attachment
+from microchat.core.entities import Message, Attachment, FoundMessage
+from microchat.core.entities import MessageVersion
+from microchat.core.entities import Changes
 from microchat.core.entities import Media, Image, TempFile, FileInfo
+from microchat.core.entities import StorageUsage
 from microchat.core.types import AsyncReader, AsyncSequence, MIMETuple
 
 
@@ -75,6 +78,20 @@ class EntitiesStorage(ABC):
     async def remove_entity(self, entity: Bot | User | Conference) -> None:
         pass
 
+    @abstractmethod
+    async def search(
+        self,
+        query: str,
+        kinds: tuple[type[User | Bot | Conference], ...],
+        count: int
+    ) -> list[User | Bot | Conference]:
+        """
+        Returns up to `count` entities of given kinds which alias, name,
+        surname or title starts with or contains query (case-insensitive),
+        best matches first. Private conferences are not returned.
+        """
+        pass
+
     @abstractmethod
     async def remove_avatar(
         self, entity: Bot | User | Conference, id: int
@@ -96,6 +113,22 @@ class RelationsStorage(ABC):
     ) -> Dialog:
         pass
 
+    @abstractmethod
+    async def get_permissions(
+        self,
+        relation: (
+            Dialog
+            | ConferenceParticipation[User]
+            | ConferenceParticipation[User | Bot]
+        )
+    ) -> Permissions:
+        """
+        Returns effective permissions of relation's actor: own ones or
+        default ones of related entity, without denied by restrictions
+        which are active now.
+        """
+        pass
+
 
 class ChatsStorage(ABC):
 
@@ -103,6 +136,16 @@ class ChatsStorage(ABC):
     async def get_user_chats(
         self, user: User, offset: int, count: int
     ) -> list[Dialog | ConferenceParticipation[User]]:
+        """
+        Returns user's chats by the last message which is not deleted,
+        from the latest. Conference without such messages is ordered by
+        time the user joined it. Chats have `unread` counted.
+        """
+        pass
+
+    @abstractmethod
+    async def get_user_conferences(self, user: User) -> list[int]:
+        """Returns ids of conferences user is a member of."""
         pass
 
     @abstractmethod
@@ -140,6 +183,19 @@ class ChatsStorage(ABC):
     ) -> Message:
         pass
 
+    @abstractmethod
+    async def add_messages(
+        self,
+        user: User,
+        messages: list[tuple[
+            Dialog | ConferenceParticipation[User],
+            str | None,
+            list[Media] | None
+        ]]
+    ) -> list[Message]:
+        """Adds (chat, text, attachments) messages in one transaction."""
+        pass
+
     @abstractmethod
     async def edit_message(
         self,
@@ -149,10 +205,53 @@ class ChatsStorage(ABC):
     ) -> Message:
         pass
 
+    @abstractmethod
+    async def get_message_versions(
+        self, message: Message, offset: int = 0
+    ) -> list[MessageVersion]:
+        """
+        Returns versions of message from `offset` to the latest one,
+        version 0 is the message as it was sent.
+        """
+        pass
+
     @abstractmethod
     async def remove_message(self, message: Message) -> None:
         pass
 
+    @abstractmethod
+    async def mark_read(
+        self, user: User, chat: Dialog | ConferenceParticipation[User], no: int
+    ) -> Dialog | ConferenceParticipation[User]:
+        """
+        Marks messages up to `no` as read. Read marker never goes back.
+        """
+        pass
+
+    @abstractmethod
+    async def get_changes(self, user: User, version: int) -> Changes:
+        """
+        Returns changes of user's chats made since version which is a
+        token of previous call (0 gives all chats).
+        """
+        pass
+
+    @abstractmethod
+    async def search_messages(
+        self,
+        user: User,
+        chats: list[Dialog | ConferenceParticipation[User]] | None,
+        query: str,
+        before: int | None,
+        count: int
+    ) -> list[FoundMessage]:
+        """
+        Returns up to `count` messages having all words of query, from the
+        newest. Search is done in given chats or in all user's chats if
+        `chats` is None. `before` is id of message to continue search from.
+        """
+        pass
+
     @abstractmethod
     async def get_dialog_medias(
         self,
@@ -186,7 +285,11 @@ class ChatsStorage(ABC):
         pass
 
     @abstractmethod
-    async def remove_media(self, attachment: Attachment[M]) -> None:
+    async def remove_media(
+        self,
+        chat: Dialog | ConferenceParticipation[User],
+        attachment: Attachment[M]
+    ) -> None:
         pass
 
 
@@ -194,8 +297,25 @@ class ConferencesStorage(ABC):
 
     @abstractmethod
     async def list_members(
-        self, conference: Conference, offset: int, count: int
+        self, conference: Conference, offset: int, count: int,
+        role: str | None = None
     ) -> list[ConferenceParticipation[User | Bot]]:
+        """
+        Returns present members by `no`, offset is a number of present
+        members (with the role if given) to skip.
+        """
+        pass
+
+    @abstractmethod
+    async def count_members(
+        self, conference: Conference, role: str | None = None
+    ) -> int:
+        pass
+
+    @abstractmethod
+    async def get_member(
+        self, conference: Conference, no: int
+    ) -> ConferenceParticipation[User | Bot]:
         pass
 
     @abstractmethod
@@ -210,12 +330,28 @@ class ConferencesStorage(ABC):
     ) -> ConferenceParticipation[Actor]:
         pass
 
+    @abstractmethod
+    async def add_members(
+        self, conference: Conference, invitees: list[User | Bot]
+    ) -> list[ConferenceParticipation[User | Bot] | None]:
+        """
+        Adds invitees at once, result is None for invitees who are members
+        already.
+        """
+        pass
+
     @abstractmethod
     async def remove_member(
         self, member: ConferenceParticipation[User | Bot]
     ) -> None:
         pass
 
+    @abstractmethod
+    async def remove_members(
+        self, members: list[ConferenceParticipation[User | Bot]]
+    ) -> None:
+        pass
+
     @abstractmethod
     async def update_permissions(
         self, member: ConferenceParticipation[User | Bot], update: Permissions
@@ -229,6 +365,16 @@ class MediaStorage(ABC):
     async def get_by_hash(self, user: User, hash: str) -> Media:
         pass
 
+    @abstractmethod
+    async def find_by_hash(self, hash: str) -> Media:
+        """Returns media whoever it is accessible to."""
+        pass
+
+    @abstractmethod
+    async def check_access(self, user: User, media: Media) -> None:
+        """Raises DoesNotExists if user may not access media."""
+        pass
+
     @abstractmethod
     async def get_by_hashes(
         self, user: User, hashes: Iterable[str]
@@ -245,6 +391,14 @@ class MediaStorage(ABC):
     async def create_tempfile(self) -> TempFile:
         pass
 
+    @abstractmethod
+    async def get_usage(self, user: User) -> StorageUsage:
+        pass
+
+    @abstractmethod
+    async def list_top_usage(self, count: int) -> list[StorageUsage]:
+        pass
+
     @abstractmethod
     async def open(self, file: FileInfo) -> AsyncReader:
         pass
@@ -0,0 +1,21 @@
+from microchat.storages import UoW
+
+from .database import MemoryDatabase
+from .storages import MemoryAuthenticationStorage
+from .storages import MemoryEntitiesStorage
+from .storages import MemoryRelationsStorage
+from .storages import MemoryChatsStorage
+from .storages import MemoryConferencesStorage
+from .storages import MemoryMediaStorage
+
+
+class MemoryUoW(UoW):
+    # changes are applied immediately, so there is nothing to commit
+
+    def __init__(self, database: MemoryDatabase) -> None:
+        self.auth = MemoryAuthenticationStorage(database)
+        self.entities = MemoryEntitiesStorage(database)
+        self.relations = MemoryRelationsStorage(database)
+        self.chats = MemoryChatsStorage(database)
+        self.conferences = MemoryConferencesStorage(database)
+        self.media = MemoryMediaStorage(database)
@@ -0,0 +1,186 @@
+"""
+Chats of an actor ordered by activity for the memory storage backend.
+
+Activity of a chat is the time of its last message which is not deleted
+or the time the actor joined a conference if it is later, so empty
+conferences and chats with all messages deleted take their place instead
+of going first or disappearing. Each actor has a sorted list of
+(activity, chat id) pairs: message log of a chat moves the chat in the
+lists of its members on send and delete, a page is a slice of the list.
+The list is kept in chunks of limited size as keys of the directory, so
+a move shifts one chunk instead of the whole list of a busy actor.
+Chats are ordered by version of their last change the same way for sync.
+
+Lists of all members of a large conference would be moved on each of its
+messages, so its log stops doing it: members read activity of their
+large conferences when chats are listed, one is a member of a few.
+"""
+from __future__ import annotations
+
+import heapq
+
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+
+from typing import Iterator, Protocol
+
+
+# chat with more lists following it does not move them
+MAX_FOLLOWERS = 2048
+CHUNK_SIZE = 256
+
+Pair = tuple[float, int]
+
+
+class Active(Protocol):
+
+    @property
+    def last_activity(self) -> float: ...
+
+    @property
+    def last_change(self) -> int: ...
+
+
+class SortedPairs:
+    """Sorted (key, id) pairs kept in chunks of limited size."""
+
+    def __init__(self) -> None:
+        self.chunks: list[list[Pair]] = []
+        # the first pair of each chunk but the first one
+        self.firsts: list[Pair] = []
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, pair: Pair) -> None:
+        self.size += 1
+        if not self.chunks:
+            self.chunks.append([pair])
+            return
+        chunk_no = bisect_right(self.firsts, pair)
+        chunk = self.chunks[chunk_no]
+        if not chunk or chunk[-1] < pair:
+            # the usual case: chat with a new message goes first
+            chunk.append(pair)
+        else:
+            insort(chunk, pair)
+        if len(chunk) > CHUNK_SIZE * 2:
+            self.chunks[chunk_no + 1:chunk_no + 1] = [chunk[CHUNK_SIZE:]]
+            del chunk[CHUNK_SIZE:]
+            self.firsts.insert(chunk_no, self.chunks[chunk_no + 1][0])
+
+    def remove(self, pair: Pair) -> None:
+        chunk_no = bisect_right(self.firsts, pair)
+        chunk = self.chunks[chunk_no]
+        del chunk[bisect_left(chunk, pair)]
+        self.size -= 1
+        if chunk or len(self.chunks) == 1:
+            if chunk_no and chunk[0] != self.firsts[chunk_no - 1]:
+                self.firsts[chunk_no - 1] = chunk[0]
+            return
+        del self.chunks[chunk_no]
+        del self.firsts[max(chunk_no - 1, 0)]
+
+    def descending(self, skip: int = 0) -> Iterator[Pair]:
+        """Yields pairs the greatest first, skips `skip` of them."""
+        chunk_no = len(self.chunks)
+        while chunk_no and skip >= len(self.chunks[chunk_no - 1]):
+            chunk_no -= 1
+            skip -= len(self.chunks[chunk_no])
+        for chunk in reversed(self.chunks[:chunk_no]):
+            yield from islice(reversed(chunk), skip, None)
+            skip = 0
+
+
+class ChatList:
+    """Ids of related entities of an actor's chats, the latest first."""
+
+    def __init__(self) -> None:
+        # (key, id) ascending
+        self.order = SortedPairs()
+        self.keys: dict[int, float] = {}
+        # id -> key of joining, key of chat is not less than it
+        self.since: dict[int, float] = {}
+        # id -> chat which key is read when listed
+        self.large: dict[int, Active] = {}
+
+    def __len__(self) -> int:
+        return len(self.keys) + len(self.large)
+
+    def key(self, chat: Active) -> float:
+        return chat.last_activity
+
+    def add(self, id: int, chat: Active, since: float = 0) -> None:
+        self.discard(id)
+        self.since[id] = since
+        self._put(id, self.key(chat))
+
+    def add_large(self, id: int, chat: Active, since: float = 0) -> None:
+        self.discard(id)
+        self.since[id] = since
+        self.large[id] = chat
+
+    def move(self, id: int, chat: Active) -> None:
+        key = self.keys.get(id)
+        if key is not None and key != max(self.key(chat), self.since[id]):
+            self._take(id)
+            self._put(id, self.key(chat))
+
+    def touch(self, id: int, since: float) -> None:
+        """Raises key of chat to `since` at least."""
+        if id not in self.since:
+            return
+        self.since[id] = max(self.since[id], since)
+        key = self.keys.get(id)
+        if key is not None and key < since:
+            self._take(id)
+            self._put(id, since)
+
+    def discard(self, id: int) -> None:
+        if id in self.keys:
+            self._take(id)
+        self.large.pop(id, None)
+        self.since.pop(id, None)
+
+    def page(self, offset: int, count: int) -> list[int]:
+        offset = max(offset, 0)
+        if not self.large:
+            pairs = self.order.descending(offset)
+            return [id for _, id in islice(pairs, max(count, 0))]
+        merged = self._merged()
+        return [id for _, id in islice(merged, offset, offset + count)]
+
+    def after(self, key: float) -> list[int]:
+        """Returns ids of chats which key is not less than given."""
+        ids = []
+        for chat_key, id in self._merged():
+            if chat_key < key:
+                break
+            ids.append(id)
+        return ids
+
+    def _merged(self) -> Iterator[Pair]:
+        since = self.since
+        large = sorted(
+            (max(self.key(chat), since[id]), id)
+            for id, chat in self.large.items()
+        )
+        return heapq.merge(
+            self.order.descending(), reversed(large), reverse=True
+        )
+
+    def _put(self, id: int, key: float) -> None:
+        key = max(key, self.since[id])
+        self.keys[id] = key
+        self.order.add((key, id))
+
+    def _take(self, id: int) -> None:
+        self.order.remove((self.keys.pop(id), id))
+
+
+class ChangeList(ChatList):
+    """Ids of an actor's chats ordered by version of the last change."""
+
+    def key(self, chat: Active) -> float:
+        return chat.last_change
@@ -0,0 +1,133 @@
+"""
+Compaction of deleted messages for the memory storage backend.
+
+A deleted message becomes a tombstone at once: it is hidden from pages,
+counts and search, its attachments from media lists. What it keeps (text,
+reply, edit history, attachments) is reclaimed later by the compactor
+which walks chats with tombstones in the background by small batches, so
+deletions stay cheap and the event loop is not blocked by a chat which
+lost a million of messages.
+
+Media files are shared by messages, their versions and avatars, they are
+counted by references: attachments take a reference to their media,
+avatars do the same, compacted tombstones and removed avatars release
+them. Files which are not referenced anymore, and uploaded files which
+were never attached, are removed by the sweeper after a grace period, so
+a file which was detached and attached again right after (as edits do)
+is kept.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+
+from typing import Iterable
+from typing import TYPE_CHECKING
+
+from microchat.core.entities import Media
+
+if TYPE_CHECKING:
+    from .database import MemoryDatabase
+    from .entities import MessageLog
+
+
+COMPACTION_LOG = logging.getLogger("microchat.storages.compaction")
+
+
+class MediaRefs:
+    """Numbers of references to media files by their hashes."""
+
+    def __init__(self) -> None:
+        self.counts: dict[str, int] = {}
+        # hash -> time file lost the last reference or was stored without
+        # one, the oldest first
+        self.released: dict[str, float] = {}
+        # logs which have tombstones to compact
+        self.pending: set[MessageLog] = set()
+
+    def __getitem__(self, hash: str) -> int:
+        return self.counts.get(hash, 0)
+
+    def acquire(self, medias: Iterable[Media]) -> None:
+        counts = self.counts
+        for media in medias:
+            hash = media.file_info.hash
+            counts[hash] = counts.get(hash, 0) + 1
+            self.released.pop(hash, None)
+
+    def release(self, medias: Iterable[Media]) -> None:
+        counts = self.counts
+        now = time.time()
+        for media in medias:
+            hash = media.file_info.hash
+            count = counts.get(hash, 0) - 1
+            if count > 0:
+                counts[hash] = count
+                continue
+            counts.pop(hash, None)
+            self.orphan(hash, now)
+
+    def orphan(self, hash: str, now: float | None = None) -> None:
+        """Marks file unreferenced since `now` if nothing refers to it."""
+        if hash in self.counts:
+            return
+        # reinserted to keep files ordered by time
+        self.released.pop(hash, None)
+        self.released[hash] = time.time() if now is None else now
+
+
+class Compactor:
+    """
+    Compacts tombstones of chats by `batch_size` tombstones at a time with
+    a pause between runs.
+    """
+
+    def __init__(
+        self,
+        db: MemoryDatabase,
+        interval: float = 1.0,
+        batch_size: int = 1024,
+        logger: logging.Logger = COMPACTION_LOG
+    ) -> None:
+        self.db = db
+        self.interval = interval
+        self.batch_size = batch_size
+        self.logger = logger
+        self.compacted = 0
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def compact(self, limit: int | None = None) -> int:
+        """Compacts up to `limit` tombstones, returns number compacted."""
+        pending = self.db.media_refs.pending
+        compacted = 0
+        while pending and (limit is None or compacted < limit):
+            log = next(iter(pending))
+            budget = None if limit is None else limit - compacted
+            compacted += log.compact(budget)
+            if not log.garbage:
+                pending.discard(log)
+        self.compacted += compacted
+        return compacted
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                while self.compact(self.batch_size):
+                    # other tasks go between batches
+                    await asyncio.sleep(0)
+            except Exception:
+                self.logger.exception("Compaction failed")
@@ -0,0 +1,357 @@
+from __future__ import annotations
+
+from datetime import datetime as dt
+import time
+from hashlib import sha3_256, sha3_512
+from itertools import count
+from pathlib import Path
+
+from microchat.core.entities import User, Bot, Conference
+from microchat.core.entities import Dialog, ConferencePresence
+from microchat.core.entities import AuthMethod, Authentication, Permissions
+from microchat.core.entities import Media, Image, Video, Audio, Preview
+from microchat.core.entities import FileInfo
+from microchat.core.types import MIMEType, ImagesMIME, MIMETuple
+from microchat.services.general_exceptions import AlreadyExists
+
+from .entities import MemoryUser, MemoryBot, MemoryConference
+from .entities import MemoryDialog, MemoryParticipation
+from .chat_list import ChangeList, ChatList
+from .compaction import MediaRefs
+from .directory import Directory
+from .entities import MessageLog
+from .members import MemberIndex
+from .permissions import PermissionsCache
+from .quotas import Quotas
+from .search import Vocabulary
+
+
+MEMBER_PERMISSIONS = Permissions.of(
+    "read", "send", "send_media", "send_mediamessage"
+)
+ALL_PERMISSIONS = ~Permissions(0)
+
+Agent = User | Bot | Conference
+Relation = MemoryDialog | MemoryParticipation
+
+
+class MemoryDatabase:
+    """
+    Process-local data set for the memory storage backend. Besides of the
+    storages it is used directly to seed data (tests, benchmarks, demos).
+    """
+
+    def __init__(self, cache_size: int = 100_000) -> None:
+        self.entities: dict[int, Agent] = {}
+        self.aliases: dict[str, Agent] = {}
+        self.authentications: dict[int, Authentication] = {}
+        # (actor id, related entity id) -> relation
+        self.relations: dict[tuple[int, int], Relation] = {}
+        # actor id -> related entity id -> relation
+        self.chats: dict[int, dict[int, Relation]] = {}
+        # actor id -> related entity ids ordered by activity
+        self.chat_lists: dict[int, ChatList] = {}
+        # actor id -> related entity ids ordered by version of change
+        self.change_lists: dict[int, ChangeList] = {}
+        # actor id -> (version, related entity id) of chats actor left
+        self.left: dict[int, list[tuple[int, int]]] = {}
+        # conference id -> participations by `no`, actor and role
+        self.members: dict[int, MemberIndex] = {}
+        self.media: dict[str, Media] = {}
+        self.contents: dict[str, bytes] = {}
+        self.media_refs = MediaRefs()
+        # storage usage by users who stored files
+        self.quotas = Quotas()
+        # words of all chats for prefix search
+        self.vocabulary = Vocabulary()
+        self.directory = Directory()
+        self.permissions = PermissionsCache(cache_size)
+        self._entity_ids = count(1)
+        # ids of messages and versions of changes for sync
+        self._message_ids = count(1)
+
+    def next_message_id(self) -> int:
+        return next(self._message_ids)
+
+    def next_version(self) -> int:
+        return next(self._message_ids)
+
+    def create_user(
+        self,
+        alias: str,
+        password: str,
+        name: str | None = None,
+        surname: str | None = None,
+        bio: str | None = None,
+    ) -> MemoryUser:
+        user = MemoryUser()
+        user.id = next(self._entity_ids)
+        user.alias = alias
+        user.title = name or alias
+        user.name = name or alias
+        user.surname = surname
+        user.bio = bio
+        user.privileges = None
+        user.default_permissions = ALL_PERMISSIONS
+        auth = Authentication()
+        auth.method = AuthMethod.PASSWORD
+        auth.user = user
+        auth.data = sha3_512(password.encode()).digest()
+        self.authentications[user.id] = auth
+        self._add_entity(user)
+        return user
+
+    def create_bot(
+        self, owner: User, alias: str, title: str,
+        description: str | None = None
+    ) -> MemoryBot:
+        bot = MemoryBot()
+        bot.id = next(self._entity_ids)
+        bot.owner = owner
+        bot.alias = alias
+        bot.title = title
+        bot.description = description
+        bot.default_permissions = ALL_PERMISSIONS
+        self._add_entity(bot)
+        return bot
+
+    def create_conference(
+        self, owner: User, alias: str, title: str,
+        private: bool = False, description: str | None = None
+    ) -> MemoryConference:
+        conference = MemoryConference()
+        conference.id = next(self._entity_ids)
+        conference.owner = owner
+        conference.alias = alias
+        conference.title = title
+        conference.description = description
+        conference.private = private
+        conference.default_permissions = MEMBER_PERMISSIONS
+        conference.log = MessageLog(
+            self.vocabulary, self._message_ids, self.media_refs
+        )
+        self.members[conference.id] = MemberIndex()
+        self._add_entity(conference)
+        owner_participation = self.join(conference, owner, "owner")
+        owner_participation.permissions = ALL_PERMISSIONS
+        return conference
+
+    def join(
+        self, conference: MemoryConference, actor: User | Bot,
+        role: str = "member"
+    ) -> MemoryParticipation:
+        if (actor.id, conference.id) in self.relations:
+            raise AlreadyExists(
+                f"{actor.alias} is in {conference.alias} already"
+            )
+        participation = self._join(conference, actor, role)
+        conference.log.touch()
+        return participation
+
+    def join_many(
+        self, conference: MemoryConference, actors: list[User | Bot],
+        role: str = "member"
+    ) -> list[MemoryParticipation | None]:
+        """
+        Joins actors who are not members yet, None is for the others.
+        Chat is changed once for all of them.
+        """
+        joined: list[MemoryParticipation | None] = []
+        for actor in actors:
+            if (actor.id, conference.id) in self.relations:
+                joined.append(None)
+            else:
+                joined.append(self._join(conference, actor, role))
+        if any(joined):
+            conference.log.touch()
+        return joined
+
+    def leave(self, participation: MemoryParticipation) -> None:
+        self.leave_many([participation])
+
+    def leave_many(self, participations: list[MemoryParticipation]) -> None:
+        touched: dict[int, MemoryConference] = {}
+        for participation in participations:
+            conference = participation.related
+            if isinstance(conference, MemoryConference):
+                touched[conference.id] = conference
+            self._leave(participation)
+        for conference in touched.values():
+            conference.log.touch()
+
+    def dialog(self, user: User, other: User | Bot) -> MemoryDialog:
+        """Returns user's side of dialog, both sides share messages."""
+        existing = self.relations.get((user.id, other.id))
+        if isinstance(existing, MemoryDialog):
+            return existing
+        log = MessageLog(
+            self.vocabulary, self._message_ids, self.media_refs
+        )
+        side = self._dialog_side(user, other, log)
+        if isinstance(other, User) and other is not user:
+            self._dialog_side(other, user, log)
+        return side
+
+    def store_file(
+        self, user: User | Bot, name: str, mime: MIMETuple, content: bytes
+    ) -> Media:
+        hash = sha3_256(content).hexdigest()
+        # upload which is never attached is removed as orphan one
+        self.media_refs.orphan(hash)
+        existing = self.media.get(hash)
+        self.quotas.record(user.id, len(content), existing is None, mime[0])
+        if existing is not None:
+            return existing
+        self.contents[hash] = content
+        media = self.make_media(user, name, mime, hash, len(content))
+        self.media[hash] = media
+        return media
+
+    def remove_file(self, hash: str) -> int:
+        """Removes file, returns its size."""
+        media = self.media.pop(hash, None)
+        content = self.contents.pop(hash, None)
+        if media is not None:
+            self.quotas.refund(media.loaded_by.id, media.file_info.size)
+            return media.file_info.size
+        return len(content or b"")
+
+    def make_media(
+        self, user: User | Bot, name: str, mime: MIMETuple,
+        hash: str, size: int
+    ) -> Media:
+        media_type, subtype = mime
+        media: Media
+        if media_type is MIMEType.IMAGE:
+            media = Image()
+        elif media_type is MIMEType.VIDEO:
+            media = Video()
+        else:
+            media = Audio()
+        media.file_info = _file_info(hash, size)
+        media.name = name
+        media.type = media_type
+        media.subtype = subtype
+        media.loaded_at = dt.now()
+        media.loaded_by = user
+        if isinstance(media, (Image, Video)):
+            # previews are not rendered, preview is the original content
+            preview = Preview()
+            preview.file_info = media.file_info
+            preview.name = name
+            preview.type = MIMEType.IMAGE
+            preview.subtype = ImagesMIME.JPEG
+            preview.loaded_at = media.loaded_at
+            preview.loaded_by = user
+            media.preview = preview
+        return media
+
+    def user_chats(self, actor: User | Bot) -> list[Relation]:
+        return list(self.chats.get(actor.id, {}).values())
+
+    def chat_list(self, actor: User | Bot) -> ChatList:
+        chat_list = self.chat_lists.get(actor.id)
+        if chat_list is None:
+            chat_list = self.chat_lists[actor.id] = ChatList()
+        return chat_list
+
+    def change_list(self, actor: User | Bot) -> ChangeList:
+        change_list = self.change_lists.get(actor.id)
+        if change_list is None:
+            change_list = self.change_lists[actor.id] = ChangeList()
+        return change_list
+
+    def touch_entity(self, entity: Agent) -> None:
+        """Records a change of entity in chats with it."""
+        if isinstance(entity, MemoryConference):
+            entity.log.touch()
+            return
+        for relation in self.chats.get(entity.id, {}).values():
+            if isinstance(relation, MemoryDialog):
+                relation.log.touch()
+
+    def touch_relation(self, actor: User | Bot, related: Agent) -> None:
+        """Records a change of actor's own relation (permissions)."""
+        change_list = self.change_lists.get(actor.id)
+        if change_list is not None:
+            change_list.touch(related.id, self.next_version())
+
+    def _join(
+        self, conference: MemoryConference, actor: User | Bot, role: str
+    ) -> MemoryParticipation:
+        participation = MemoryParticipation()
+        participation.actor = actor
+        participation.related = conference
+        participation.role = role
+        participation.permissions = None
+        participation.restrictions = []
+        # messages sent before joining are not unread
+        participation.read_no = len(conference.log)
+        participation.unread = 0
+        presence = ConferencePresence()
+        presence.join_at = len(conference.log)
+        presence.leave_at = None
+        participation.presences = [presence]
+        self.members[conference.id].add(participation)
+        self._add_relation(actor, conference, participation)
+        log = conference.log
+        version = self.next_version()
+        log.follow(self.chat_list(actor), conference.id, time.time())
+        log.follow(self.change_list(actor), conference.id, version)
+        return participation
+
+    def _leave(self, participation: MemoryParticipation) -> None:
+        conference = participation.related
+        actor = participation.actor
+        self.members[conference.id].remove(participation)
+        self.permissions.invalidate(actor.id, conference.id)
+        self.relations.pop((actor.id, conference.id), None)
+        self.chats.get(actor.id, {}).pop(conference.id, None)
+        if isinstance(conference, MemoryConference):
+            log = conference.log
+            log.unfollow(self.chat_list(actor), conference.id)
+            log.unfollow(self.change_list(actor), conference.id)
+            left = self.left.setdefault(actor.id, [])
+            left.append((self.next_version(), conference.id))
+            presences: list[ConferencePresence] = (
+                participation.__dict__.get("presences", [])
+            )
+            if presences and presences[-1].leave_at is None:
+                presences[-1].leave_at = len(conference.log)
+
+    def _add_entity(self, entity: Agent) -> None:
+        if entity.alias in self.aliases:
+            raise AlreadyExists(f"Alias '{entity.alias}' is taken already")
+        self.entities[entity.id] = entity
+        self.aliases[entity.alias] = entity
+        self.directory.add(entity)
+
+    def _add_relation(
+        self, actor: User | Bot, related: Agent, relation: Relation
+    ) -> None:
+        self.relations[(actor.id, related.id)] = relation
+        self.chats.setdefault(actor.id, {})[related.id] = relation
+
+    def _dialog_side(
+        self, user: User | Bot, other: User | Bot, log: MessageLog
+    ) -> MemoryDialog:
+        dialog = MemoryDialog()
+        dialog.actor = user  # type: ignore
+        dialog.related = other
+        dialog.permissions = None
+        dialog.restrictions = []
+        dialog.read_no = 0
+        dialog.unread = 0
+        dialog.log = log
+        self._add_relation(user, other, dialog)
+        log.follow(self.chat_list(user), other.id)
+        log.follow(self.change_list(user), other.id, self.next_version())
+        return dialog
+
+
+def _file_info(hash: str, size: int) -> FileInfo:
+    file_info = FileInfo()
+    file_info.path = Path(hash)
+    file_info.hash = hash
+    file_info.size = size
+    return file_info
@@ -0,0 +1,237 @@
+"""
+Directory of users, bots and conferences for the memory storage backend:
+search by case-insensitive prefix or substring of alias, name, surname
+and title.
+
+Prefixes are looked up in sorted keys: field values and their words.
+Keys are kept in sorted chunks, so registration of an account moves a
+chunk instead of the whole list. Substrings are found by trigrams: a
+trigram maps to ids of entities having it, candidates are checked
+against their fields.
+
+Matches are ranked: exact alias, alias prefix, prefix of other field or
+its word, substring; shorter fields go first. Exact alias is looked up by
+itself, so it is found however many fields start with the query. Private
+conferences are not listed.
+"""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+
+from typing import Iterator, Sequence
+
+from microchat.core.entities import User, Bot, Conference
+
+from .search import normalize
+
+
+Agent = User | Bot | Conference
+
+CHUNK_SIZE = 1024
+# at most this many matches are ranked for a query
+MAX_CANDIDATES = 200
+# at most this many keys and trigram candidates are looked at for a query,
+# matches of other kinds than searched ones are skipped but counted
+MAX_SCANNED = 10 * MAX_CANDIDATES
+# candidates are intersected by sets unless other ids are much more
+SET_INTERSECTION_RATIO = 16
+# key of prefix index is "value\0id"
+SEPARATOR = "\0"
+
+EXACT_ALIAS, ALIAS_PREFIX, PREFIX, SUBSTRING = range(4)
+
+
+class SortedKeys:
+    """Sorted strings kept in chunks of limited size."""
+
+    def __init__(self) -> None:
+        self.chunks: list[list[str]] = []
+        # the first key of each chunk but the first one
+        self.firsts: list[str] = []
+
+    def __len__(self) -> int:
+        return sum(map(len, self.chunks))
+
+    def add(self, key: str) -> None:
+        if not self.chunks:
+            self.chunks.append([key])
+            return
+        chunk_no = bisect_right(self.firsts, key)
+        chunk = self.chunks[chunk_no]
+        insort(chunk, key)
+        if len(chunk) > CHUNK_SIZE * 2:
+            self.chunks[chunk_no + 1:chunk_no + 1] = [chunk[CHUNK_SIZE:]]
+            del chunk[CHUNK_SIZE:]
+            self.firsts.insert(chunk_no, self.chunks[chunk_no + 1][0])
+
+    def discard(self, key: str) -> None:
+        if not self.chunks:
+            return
+        chunk_no = bisect_right(self.firsts, key)
+        chunk = self.chunks[chunk_no]
+        position = bisect_left(chunk, key)
+        if position == len(chunk) or chunk[position] != key:
+            return
+        del chunk[position]
+        if chunk or len(self.chunks) == 1:
+            if chunk_no and position == 0:
+                self.firsts[chunk_no - 1] = chunk[0]
+            return
+        del self.chunks[chunk_no]
+        del self.firsts[max(chunk_no - 1, 0)]
+
+    def starting_with(self, prefix: str) -> Iterator[str]:
+        chunk_no = bisect_right(self.firsts, prefix)
+        for chunk in islice(self.chunks, chunk_no, None):
+            for key in islice(chunk, bisect_left(chunk, prefix), None):
+                if not key.startswith(prefix):
+                    return
+                yield key
+
+
+class Directory:
+
+    def __init__(self) -> None:
+        self.entities: dict[int, Agent] = {}
+        # normalized alias -> ids, aliases may differ by case only
+        self.aliases: dict[str, set[int]] = {}
+        self.keys = SortedKeys()
+        self.trigrams: dict[str, array[int]] = {}
+
+    def add(self, entity: Agent) -> None:
+        if isinstance(entity, Conference) and entity.private:
+            return
+        self.entities[entity.id] = entity
+        alias = normalize(entity.alias)
+        self.aliases.setdefault(alias, set()).add(entity.id)
+        values = _values(entity)
+        for key in _keys(entity.id, values):
+            self.keys.add(key)
+        for trigram in _trigrams(values):
+            ids = self.trigrams.get(trigram)
+            if ids is None:
+                ids = self.trigrams[trigram] = array("I")
+            if ids and ids[-1] > entity.id:
+                insort(ids, entity.id)
+            else:
+                ids.append(entity.id)
+
+    def discard(self, entity: Agent) -> None:
+        """Removes entity, its fields must be the same as when added."""
+        if self.entities.pop(entity.id, None) is None:
+            return
+        alias = normalize(entity.alias)
+        same_alias = self.aliases.get(alias)
+        if same_alias is not None:
+            same_alias.discard(entity.id)
+            if not same_alias:
+                del self.aliases[alias]
+        values = _values(entity)
+        for key in _keys(entity.id, values):
+            self.keys.discard(key)
+        for trigram in _trigrams(values):
+            ids = self.trigrams.get(trigram)
+            if ids is None:
+                continue
+            position = bisect_left(ids, entity.id)
+            if position < len(ids) and ids[position] == entity.id:
+                del ids[position]
+            if not ids:
+                del self.trigrams[trigram]
+
+    def search(
+        self, query: str, kinds: tuple[type[Agent], ...], count: int
+    ) -> list[Agent]:
+        query = " ".join(normalize(query).split())
+        if not query:
+            return []
+        ranks: dict[int, tuple[int, int, int]] = {}
+        for id in self.aliases.get(query, ()):
+            entity = self.entities[id]
+            if isinstance(entity, kinds):
+                ranks[id] = _rank(entity, query)
+        scanned = 0
+        for id in self._prefixed(query):
+            scanned += 1
+            if scanned > MAX_SCANNED or len(ranks) >= MAX_CANDIDATES:
+                break
+            entity = self.entities[id]
+            if id in ranks or not isinstance(entity, kinds):
+                continue
+            ranks[id] = _rank(entity, query)
+        if len(ranks) < count and len(query) >= 3:
+            checked = 0
+            for id in self._containing(query):
+                checked += 1
+                if checked > MAX_SCANNED:
+                    break
+                entity = self.entities[id]
+                if id in ranks or not isinstance(entity, kinds):
+                    continue
+                values = _values(entity)
+                if any(query in value for value in values):
+                    ranks[id] = (SUBSTRING, min(map(len, values)), id)
+        found = sorted(ranks, key=ranks.__getitem__)[:count]
+        return [self.entities[id] for id in found]
+
+    def _prefixed(self, query: str) -> Iterator[int]:
+        for key in self.keys.starting_with(query):
+            yield int(key.rpartition(SEPARATOR)[2])
+
+    def _containing(self, query: str) -> list[int]:
+        postings = []
+        for trigram in _trigrams((query,)):
+            ids = self.trigrams.get(trigram)
+            if ids is None:
+                return []
+            postings.append(ids)
+        postings.sort(key=len)
+        candidates: Sequence[int] = postings[0]
+        for ids in postings[1:]:
+            if len(ids) > len(candidates) * SET_INTERSECTION_RATIO:
+                candidates = [id for id in candidates if _contains(ids, id)]
+            else:
+                candidates = sorted(set(candidates).intersection(ids))
+        return list(candidates)
+
+
+def _values(entity: Agent) -> set[str]:
+    """Normalized fields of entity which are searched."""
+    fields = [entity.alias, entity.title]
+    if isinstance(entity, User):
+        fields.append(entity.name)
+        if entity.surname:
+            fields.append(f"{entity.name} {entity.surname}")
+            fields.append(entity.surname)
+    return {" ".join(normalize(field).split()) for field in fields if field}
+
+
+def _keys(id: int, values: set[str]) -> set[str]:
+    prefixes = set(values)
+    for value in values:
+        prefixes.update(value.split())
+    return {f"{prefix}{SEPARATOR}{id}" for prefix in prefixes}
+
+
+def _trigrams(values: tuple[str, ...] | set[str]) -> set[str]:
+    trigrams = set()
+    for value in values:
+        for start in range(len(value) - 2):
+            trigrams.add(value[start:start + 3])
+    return trigrams
+
+
+def _rank(entity: Agent, query: str) -> tuple[int, int, int]:
+    alias = normalize(entity.alias)
+    if alias == query:
+        return EXACT_ALIAS, len(alias), entity.id
+    if alias.startswith(query):
+        return ALIAS_PREFIX, len(alias), entity.id
+    return PREFIX, min(map(len, _values(entity))), entity.id
+
+
+def _contains(ids: array[int], id: int) -> bool:
+    position = bisect_left(ids, id)
+    return position < len(ids) and ids[position] == id
@@ -0,0 +1,525 @@
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+from datetime import datetime as dt
+import itertools
+import time
+
+from typing import AsyncIterator, Generator, Generic, Iterable, Iterator
+from typing import Sequence, TypeVar, overload
+
+from microchat.core.entities import User, Bot, Conference
+from microchat.core.entities import Dialog, ConferenceParticipation
+from microchat.core.entities import ConferencePresence, Session, Image
+from microchat.core.entities import Message, MessageVersion
+from microchat.core.entities import Attachment, Media
+from microchat.core.types import AsyncSequence, Bound, BoundSequence
+
+from .chat_list import MAX_FOLLOWERS, ChatList
+from .compaction import MediaRefs
+from .history import History
+from .search import MessageIndex, Vocabulary
+from .tombstones import Tombstones
+
+
+T = TypeVar("T")
+M = TypeVar("M", bound=Media)
+
+
+class Ready(Generic[T]):
+    """Awaitable which is already done."""
+
+    def __init__(self, value: T) -> None:
+        self.value = value
+
+    def __await__(self) -> Generator[None, None, T]:
+        yield from ()
+        return self.value
+
+
+class Loaded(Bound[T]):
+    """Bound attribute which value is kept by the object itself."""
+
+    @overload
+    def __get__(self, obj: None, cls: type) -> Loaded[T]: ...
+    @overload  # noqa
+    def __get__(self, obj: object, cls: type) -> Ready[T]: ...
+
+    def __get__(  # noqa
+        self, obj: object | None, cls: type
+    ) -> Ready[T] | Loaded[T]:
+        if obj is None:
+            return self
+        return Ready(obj.__dict__[self.name])
+
+    def __set__(self, obj: object, value: T) -> None:
+        obj.__dict__[self.name] = value
+
+
+class MemorySequence(AsyncSequence[T]):
+
+    def __init__(self, items: list[T]) -> None:
+        self._items = items
+
+    @overload
+    async def __getitem__(self, index: int) -> T: ...
+    @overload  # noqa
+    async def __getitem__(self, index: slice) -> Sequence[T]: ...  # type: ignore
+
+    async def __getitem__(self, index: int | slice) -> T | Sequence[T]:  # type: ignore  # noqa
+        return self._items[index]
+
+    @overload
+    def __setitem__(self, index: int, value: T) -> None: ...
+    @overload  # noqa
+    def __setitem__(self, index: slice, values: Iterable[T]) -> None: ...  # type: ignore
+
+    def __setitem__(  # type: ignore  # noqa
+        self, index: int | slice, value: T | Iterable[T]
+    ) -> None:
+        self._items[index] = value  # type: ignore
+
+    @overload
+    def __delitem__(self, index: int) -> None: ...
+    @overload  # noqa
+    def __delitem__(self, index: slice) -> None: ...  # type: ignore
+
+    def __delitem__(self, index: int | slice) -> None:  # type: ignore  # noqa
+        del self._items[index]
+
+    async def __aiter__(self) -> AsyncIterator[T]:  # type: ignore
+        for item in self._items:
+            yield item
+
+    def __await__(self) -> Generator[None, None, Sequence[T]]:
+        yield from ()
+        return list(self._items)
+
+    async def append(self, value: T) -> None:
+        self._items.append(value)
+
+    async def count(self, value: T) -> int:
+        return self._items.count(value)
+
+    async def extend(self, values: Iterable[T]) -> None:
+        self._items.extend(values)
+
+    async def index(
+        self, value: T, start: int = 0, stop: int = 2**63 - 1
+    ) -> int:
+        return self._items.index(value, start, stop)
+
+    async def insert(self, index: int, value: T) -> None:
+        self._items.insert(index, value)
+
+
+class LoadedSequence(BoundSequence[T]):
+    """Bound sequence which items are kept by the object itself."""
+
+    @overload
+    def __get__(self, obj: None, cls: type) -> LoadedSequence[T]: ...
+    @overload  # noqa
+    def __get__(self, obj: object, cls: type) -> MemorySequence[T]: ...
+
+    def __get__(  # noqa
+        self, obj: object | None, cls: type
+    ) -> MemorySequence[T] | LoadedSequence[T]:
+        if obj is None:
+            return self
+        items: list[T] = obj.__dict__.setdefault(self.name, [])
+        return MemorySequence(items)
+
+    def __set__(self, obj: object, value: list[T]) -> None:
+        obj.__dict__[self.name] = value
+
+
+class MemoryUser(User):
+    avatars = LoadedSequence[Image]()
+    dialogs = LoadedSequence[Dialog]()
+    conferences = LoadedSequence[Conference]()
+    sessions = LoadedSequence[Session]()
+
+
+class MemoryBot(Bot):
+    avatars = LoadedSequence[Image]()
+    dialogs = LoadedSequence[Dialog]()
+    conferences = LoadedSequence[Conference]()
+
+
+class MemoryConference(Conference):
+    avatars = LoadedSequence[Image]()
+    log: MessageLog
+
+
+class MemoryDialog(Dialog):
+    log: MessageLog
+
+
+class MemoryParticipation(ConferenceParticipation[User | Bot]):
+    presences = LoadedSequence[ConferencePresence]()
+
+
+class MemoryMessage(Message):
+    sender = Loaded[User | Bot]()
+    attachments = LoadedSequence[Attachment[Media]]()
+    log: MessageLog
+
+
+class MessageLog:
+    """
+    Messages of one chat kept column-wise: a message is a row number (its
+    `no`) in a few flat arrays, so a chat with millions of messages costs
+    tens of megabytes instead of a million of objects. Rarely used columns
+    (edits, replies, attachments) are sparse dicts. Message objects are
+    built only for messages which are actually read. Texts are indexed
+    for search as they are changed, chat lists of members are moved when
+    the last message changes. Previous versions of edited messages are kept
+    by history as deltas.
+
+    Changes are versioned for sync by `clock` which gives ids of messages
+    too, so new messages are versioned by their ids and only edits,
+    deletions and changes of chat itself are put to a journal.
+
+    Deleted messages and attachments are tombstones, what they keep is
+    reclaimed by `compact`, media they use are counted by `refs`.
+    """
+
+    def __init__(
+        self,
+        vocabulary: Vocabulary | None = None,
+        clock: Iterator[int] | None = None,
+        refs: MediaRefs | None = None
+    ) -> None:
+        self.clock = clock or itertools.count(1)
+        self.ids = array("q")
+        self.sent = array("d")  # unix time
+        self.texts: list[str | None] = []
+        self.senders: list[User | Bot] = []
+        self.edited: dict[int, float] = {}
+        self.replies: dict[int, int] = {}
+        self.attachments: dict[int, list[Attachment[Media]]] = {}
+        self.deleted = Tombstones()
+        self.history = History()
+        # all attachments of chat in order, attachment `no` is index here
+        self.media: list[Attachment[Media] | None] = []
+        self.media_messages = array("q")
+        self.removed_media = Tombstones()
+        self.refs = MediaRefs() if refs is None else refs
+        # deleted messages which keep texts and edits, media of removed
+        # attachments which are still referenced
+        self.garbage: list[int] = []
+        self.detached: list[Media] = []
+        self.index = MessageIndex(vocabulary)
+        # the last message which is not deleted, -1 if there is none
+        self.latest = -1
+        # chat lists showing this chat -> id of the chat there, None if
+        # there are too many of them and they read activity themselves
+        self.followers: dict[ChatList, int] | None = {}
+        # versions of changes and `no`s of changed messages, -1 is chat
+        self.changes = array("q")
+        self.changed = array("q")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def last_activity(self) -> float:
+        return self.sent[self.latest] if self.latest >= 0 else 0
+
+    @property
+    def last_change(self) -> int:
+        last = self.changes[-1] if self.changes else 0
+        return max(last, self.ids[-1]) if self.ids else last
+
+    def follow(self, chat_list: ChatList, id: int, since: float = 0) -> None:
+        """Keeps chat `id` of chat_list ordered by activity of this log."""
+        if self.followers is None:
+            chat_list.add_large(id, self, since)
+            return
+        self.followers[chat_list] = id
+        chat_list.add(id, self, since)
+        if len(self.followers) > MAX_FOLLOWERS:
+            for chat_list, id in self.followers.items():
+                chat_list.add_large(id, self, chat_list.since[id])
+            self.followers = None
+
+    def unfollow(self, chat_list: ChatList, id: int) -> None:
+        if self.followers is not None:
+            self.followers.pop(chat_list, None)
+        chat_list.discard(id)
+
+    def append(
+        self,
+        id: int,
+        sender: User | Bot,
+        text: str | None,
+        medias: Sequence[Media] = (),
+        reply_to: int | None = None,
+        sent: float | None = None,
+    ) -> int:
+        no = len(self.ids)
+        self.ids.append(id)
+        self.sent.append(time.time() if sent is None else sent)
+        self.texts.append(text)
+        self.senders.append(sender)
+        self.index.add(no, text)
+        if reply_to is not None:
+            self.replies[no] = reply_to
+        if medias:
+            self.attachments[no] = self._attach(no, medias)
+        self.latest = no
+        self._moved()
+        return no
+
+    def edit(
+        self, no: int, text: str | None, medias: Sequence[Media] | None
+    ) -> None:
+        edited = time.time()
+        old_medias = None
+        if medias is not None:
+            old_medias = [
+                attachment.media for attachment in self.attachments.get(no, ())
+            ]
+        new_text = self.texts[no] if text is None else text
+        self.history.record(no, edited, self.texts[no], new_text, old_medias)
+        if text is not None:
+            self.index.discard(no, self.texts[no])
+            self.texts[no] = text
+            self.index.add(no, text)
+        if medias is not None:
+            # history keeps references of replaced attachments
+            for attachment in self.attachments.pop(no, ()):
+                self._detach(attachment)
+            self.attachments[no] = self._attach(no, medias)
+        self.edited[no] = edited
+        self._changed(no)
+
+    def remove(self, no: int) -> None:
+        if not self.deleted.add(no):
+            return
+        self.index.discard(no, self.texts[no])
+        for attachment in self.attachments.pop(no, ()):
+            self._detach(attachment)
+            self.detached.append(attachment.media)
+        self._collectable(no)
+        if no == self.latest:
+            self.latest = self.deleted.skip_back(no)
+        self._changed(no)
+
+    def compact(self, limit: int | None = None) -> int:
+        """
+        Reclaims texts, replies and edits of up to `limit` deleted messages
+        and releases media they and removed attachments used. Returns
+        number of messages compacted.
+        """
+        if self.detached:
+            self.refs.release(self.detached)
+            self.detached = []
+        garbage = self.garbage
+        count = len(garbage) if limit is None else min(limit, len(garbage))
+        for no in garbage[len(garbage) - count:]:
+            self.texts[no] = None
+            self.replies.pop(no, None)
+            self.edited.pop(no, None)
+            self.refs.release(self.history.discard(no))
+        del garbage[len(garbage) - count:]
+        return count
+
+    def touch(self) -> None:
+        """Records a change of chat itself: its entity, members and so on."""
+        self._changed(-1)
+
+    def changes_since(
+        self,
+        version: int,
+        limit: int,
+        ranges: Sequence[tuple[int, int | None]] | None = None
+    ) -> list[int] | None:
+        """
+        Returns `no`s of messages sent, edited or deleted since version,
+        None if there are more than limit. `ranges` limits messages to
+        given [start, stop) intervals of `no`.
+        """
+        first_new = bisect_left(self.ids, version)
+        start = bisect_left(self.changes, version)
+        changed = {no for no in self.changed[start:] if 0 <= no < first_new}
+        if len(changed) + len(self.ids) - first_new > limit:
+            return None
+        nos = sorted(changed)
+        nos.extend(range(first_new, len(self.ids)))
+        if ranges is not None:
+            nos = [no for no in nos if _fit(no, ranges) == no]
+        return nos
+
+    def count(
+        self,
+        start: int,
+        ranges: Sequence[tuple[int, int | None]] | None = None
+    ) -> int:
+        """
+        Returns number of messages which are not deleted from `no` equal
+        to start, `ranges` limits them to [start, stop) intervals of `no`.
+        """
+        total = len(self.ids)
+        if ranges is None:
+            ranges = [(0, None)]
+        count = 0
+        for first, stop in ranges:
+            first = max(first, start)
+            last = total if stop is None else min(stop, total)
+            if first < last:
+                count += last - first - self.deleted.count(first, last)
+        return count
+
+    def remove_attachment(self, no: int) -> None:
+        attachment = self.media[no]
+        if attachment is None:
+            return
+        self._detach(attachment)
+        self.detached.append(attachment.media)
+        self._collectable(None)
+        message_no = self.media_messages[no]
+        message_attachments = self.attachments.get(message_no, [])
+        if attachment in message_attachments:
+            message_attachments.remove(attachment)
+        self._changed(message_no)
+
+    def message(self, no: int) -> MemoryMessage:
+        message = self._message(no)
+        reply_to = self.replies.get(no)
+        if reply_to is not None:
+            # replied message is shallow: its own reply is not loaded
+            message.reply_to = self._message(reply_to)
+        return message
+
+    def page(
+        self,
+        offset: int, count: int,
+        ranges: Sequence[tuple[int, int | None]] | None = None
+    ) -> list[Message]:
+        """
+        Returns up to `count` messages starting from `no` equal to `offset`.
+        `ranges` limits messages to given [start, stop) intervals of `no`.
+        """
+        messages: list[Message] = []
+        no, total = max(offset, 0), len(self.ids)
+        deleted = self.deleted
+        while no < total and len(messages) < count:
+            if ranges is not None:
+                next_no = _fit(no, ranges)
+                if next_no is None:
+                    break
+                if next_no != no:
+                    no = next_no
+                    continue
+            next_no = deleted.skip(no)
+            if next_no != no:
+                # a run of deleted messages is skipped at once
+                no = next_no
+                continue
+            messages.append(self.message(no))
+            no += 1
+        return messages
+
+    def media_page(
+        self,
+        media_type: type[M],
+        offset: int, count: int,
+        ranges: Sequence[tuple[int, int | None]] | None = None
+    ) -> list[Attachment[M]]:
+        attachments: list[Attachment[M]] = []
+        no, total = max(offset, 0), len(self.media)
+        while no < total and len(attachments) < count:
+            next_no = self.removed_media.skip(no)
+            if next_no != no:
+                no = next_no
+                continue
+            attachment = self.media[no]
+            no += 1
+            if attachment is None:
+                continue
+            if not isinstance(attachment.media, media_type):
+                continue
+            message_no = self.media_messages[attachment.no]
+            if ranges is not None and _fit(message_no, ranges) != message_no:
+                continue
+            attachments.append(attachment)  # type: ignore
+        return attachments
+
+    def versions(self, no: int, stop: int = 0) -> list[MessageVersion]:
+        """Returns versions of a message from `stop` to the latest one."""
+        medias = [
+            attachment.media for attachment in self.attachments.get(no, ())
+        ]
+        versions = self.history.versions(
+            no, self.sent[no], self.texts[no], medias, stop
+        )
+        first = self.history.count(no) - len(versions)
+        result = []
+        for version_no, (edited, text, version_medias) in enumerate(
+            reversed(versions), first
+        ):
+            version = MessageVersion()
+            version.no = version_no
+            version.text = text
+            version.attachments = list(version_medias)
+            version.time = dt.fromtimestamp(edited)
+            result.append(version)
+        return result
+
+    def _changed(self, no: int) -> None:
+        self.changes.append(next(self.clock))
+        self.changed.append(no)
+        self._moved()
+
+    def _moved(self) -> None:
+        if self.followers:
+            for chat_list, id in self.followers.items():
+                chat_list.move(id, self)
+
+    def _collectable(self, no: int | None) -> None:
+        if no is not None:
+            self.garbage.append(no)
+        self.refs.pending.add(self)
+
+    def _detach(self, attachment: Attachment[Media]) -> None:
+        self.media[attachment.no] = None
+        self.removed_media.add(attachment.no)
+
+    def _attach(
+        self, no: int, medias: Sequence[Media]
+    ) -> list[Attachment[Media]]:
+        self.refs.acquire(medias)
+        attachments = []
+        for media in medias:
+            attachment: Attachment[Media] = Attachment()
+            attachment.no = len(self.media)
+            attachment.media = media
+            self.media.append(attachment)
+            self.media_messages.append(no)
+            attachments.append(attachment)
+        return attachments
+
+    def _message(self, no: int) -> MemoryMessage:
+        message = MemoryMessage()
+        message.log = self
+        message.id = self.ids[no]
+        message.no = no
+        message.sender = self.senders[no]
+        message.text = self.texts[no]
+        message.attachments = self.attachments.get(no, [])
+        message.time_sent = dt.fromtimestamp(self.sent[no])
+        edited = self.edited.get(no)
+        message.time_edit = dt.fromtimestamp(edited) if edited else None
+        message.reply_to = None
+        return message
+
+
+def _fit(no: int, ranges: Sequence[tuple[int, int | None]]) -> int | None:
+    """Returns the smallest `no` not less than given which is in ranges."""
+    for start, stop in ranges:
+        if stop is not None and no >= stop:
+            continue
+        return max(no, start)
+    return None
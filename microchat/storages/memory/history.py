@@ -0,0 +1,145 @@
+"""
+Edit history of messages for the memory storage backend.
+
+Message log keeps the latest text of a message as is, history keeps what
+is needed to get the previous ones: for each edit a delta which turns the
+new text back to the old one. A delta is the changed middle part only,
+the common prefix and suffix of the texts are not stored, so a message
+edited many times costs its text once and sizes of its edits instead of
+its size for each edit. A version is got by applying deltas from the
+latest text back. Attachments of a version are kept only when an edit
+changes them, media themselves are shared.
+"""
+from __future__ import annotations
+
+from typing import Sequence
+
+from microchat.core.entities import Media
+
+
+# start and end of the changed part of a newer text and the older part,
+# None is the older text which was None itself
+Delta = tuple[int, int, str | None]
+
+
+class Edit:
+    """Change of a message from one version to the next one."""
+
+    __slots__ = ("time", "delta", "medias")
+
+    def __init__(
+        self,
+        time: float,
+        delta: Delta | None,
+        medias: tuple[Media, ...] | None
+    ) -> None:
+        # time the next version was made
+        self.time = time
+        # None if the edit didn't change text
+        self.delta = delta
+        # attachments of the previous version, None if the edit didn't
+        # change them
+        self.medias = medias
+
+
+class History:
+    """Edits of messages of a chat by message `no`, the oldest first."""
+
+    def __init__(self) -> None:
+        self.edits: dict[int, list[Edit]] = {}
+
+    def __len__(self) -> int:
+        return len(self.edits)
+
+    def record(
+        self,
+        no: int,
+        time: float,
+        old_text: str | None,
+        new_text: str | None,
+        old_medias: Sequence[Media] | None
+    ) -> None:
+        delta = None
+        if new_text != old_text:
+            delta = diff(old_text, new_text)
+        medias = None if old_medias is None else tuple(old_medias)
+        self.edits.setdefault(no, []).append(Edit(time, delta, medias))
+
+    def count(self, no: int) -> int:
+        """Returns number of versions of a message, the sent one too."""
+        return len(self.edits.get(no, ())) + 1
+
+    def versions(
+        self,
+        no: int,
+        sent: float,
+        text: str | None,
+        medias: Sequence[Media],
+        stop: int = 0
+    ) -> list[tuple[float, str | None, tuple[Media, ...]]]:
+        """
+        Returns (time, text, attachments) of versions of a message from the
+        latest one back to `stop`, the latest ones are what log keeps.
+        """
+        edits = self.edits.get(no, [])
+        versions = []
+        current = tuple(medias)
+        for version_no in range(len(edits), max(stop, 0) - 1, -1):
+            edit = edits[version_no - 1] if version_no else None
+            versions.append((edit.time if edit else sent, text, current))
+            if edit is None:
+                break
+            if edit.delta is not None:
+                text = patch(text, edit.delta)
+            if edit.medias is not None:
+                current = edit.medias
+        return versions
+
+    def discard(self, no: int) -> list[Media]:
+        """Drops edits of a message, returns attachments they kept."""
+        return [
+            media
+            for edit in self.edits.pop(no, ())
+            for media in edit.medias or ()
+        ]
+
+
+def diff(old: str | None, new: str | None) -> Delta:
+    """Returns delta which turns the new text back to the old one."""
+    if old is None or new is None:
+        return 0, len(new or ""), old
+    prefix = _common_prefix(old, new)
+    suffix = _common_suffix(old[prefix:], new[prefix:])
+    return prefix, len(new) - suffix, old[prefix:len(old) - suffix]
+
+
+def patch(text: str | None, delta: Delta) -> str | None:
+    start, end, middle = delta
+    if middle is None:
+        return None
+    text = text or ""
+    return text[:start] + middle + text[end:]
+
+
+def _common_prefix(a: str, b: str) -> int:
+    # halves are compared by slices, which is done by C code, instead of
+    # comparing texts char by char
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[low:middle] == b[low:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _common_suffix(a: str, b: str) -> int:
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[len(a) - middle:len(a) - low] == b[len(b) - middle:len(b) - low]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
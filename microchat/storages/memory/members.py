@@ -0,0 +1,124 @@
+"""
+Members of a conference for the memory storage backend.
+
+Participations are kept in a list by member `no` together with a map from
+actor id to `no`, so a member is found by either of them at once. Pages
+are taken from shards: `no`s of present members grouped by ranges of
+`no`, one set of shards for all members and one for each role. A page
+skips whole shards by their sizes and slices the rest, members who left
+are not scanned. Counts of members are kept as they join and leave.
+"""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, insort
+
+from .entities import MemoryParticipation
+
+
+# range of member `no`s kept by a shard
+SHARD_SIZE = 1024
+
+
+class Shards:
+    """Sorted member `no`s kept by ranges."""
+
+    def __init__(self) -> None:
+        self.shards: list[array[int]] = []
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, no: int) -> None:
+        shard_no = no // SHARD_SIZE
+        while len(self.shards) <= shard_no:
+            self.shards.append(array("I"))
+        shard = self.shards[shard_no]
+        if shard and shard[-1] > no:
+            insort(shard, no)
+        else:
+            shard.append(no)
+        self.size += 1
+
+    def discard(self, no: int) -> None:
+        shard_no = no // SHARD_SIZE
+        if shard_no >= len(self.shards):
+            return
+        shard = self.shards[shard_no]
+        position = bisect_left(shard, no)
+        if position < len(shard) and shard[position] == no:
+            del shard[position]
+            self.size -= 1
+
+    def page(self, offset: int, count: int) -> list[int]:
+        nos: list[int] = []
+        offset = max(offset, 0)
+        for shard in self.shards:
+            if offset >= len(shard):
+                offset -= len(shard)
+                continue
+            nos.extend(shard[offset:offset + count - len(nos)])
+            offset = 0
+            if len(nos) >= count:
+                break
+        return nos
+
+
+class MemberIndex:
+    """Participations of a conference by `no`, by actor and by role."""
+
+    def __init__(self) -> None:
+        # index is participation `no`, None is a member who left
+        self.members: list[MemoryParticipation | None] = []
+        # actor id -> `no` of present participation
+        self.nos: dict[int, int] = {}
+        self.everyone = Shards()
+        self.roles: dict[str, Shards] = {}
+
+    def __len__(self) -> int:
+        return len(self.everyone)
+
+    def add(self, member: MemoryParticipation) -> None:
+        """Adds member with the next `no`."""
+        member.no = len(self.members)
+        self.members.append(member)
+        self.nos[member.actor.id] = member.no
+        self.everyone.add(member.no)
+        role = self.roles.get(member.role)
+        if role is None:
+            role = self.roles[member.role] = Shards()
+        role.add(member.no)
+
+    def remove(self, member: MemoryParticipation) -> None:
+        if self.get(member.no) is not member:
+            return
+        self.members[member.no] = None
+        del self.nos[member.actor.id]
+        self.everyone.discard(member.no)
+        self.roles[member.role].discard(member.no)
+
+    def get(self, no: int) -> MemoryParticipation | None:
+        if 0 <= no < len(self.members):
+            return self.members[no]
+        return None
+
+    def find(self, actor_id: int) -> MemoryParticipation | None:
+        no = self.nos.get(actor_id)
+        return None if no is None else self.members[no]
+
+    def count(self, role: str | None = None) -> int:
+        if role is None:
+            return len(self.everyone)
+        shards = self.roles.get(role)
+        return 0 if shards is None else len(shards)
+
+    def page(
+        self, offset: int, count: int, role: str | None = None
+    ) -> list[MemoryParticipation]:
+        """Returns present members ordered by `no`."""
+        shards = self.everyone if role is None else self.roles.get(role)
+        if shards is None:
+            return []
+        members = self.members
+        return [members[no] for no in shards.page(offset, count)]  # type: ignore  # noqa
@@ -0,0 +1,74 @@
+"""
+Effective permissions of actors in chats for the memory storage backend.
+
+Effective permissions are actor's own permissions in a chat or default
+permissions of the related entity if actor has no own ones, without
+permissions denied by restrictions which are active now. They are cached
+per (actor, related entity) till the next start or end of a restriction,
+so a check of permissions is a lookup and a bitwise AND. Storage drops
+the entry of a relation when its permissions are changed and all entries
+of an entity (by its generation) when its default permissions are.
+"""
+from __future__ import annotations
+
+import math
+import time
+
+from microchat.core.entities import Permissions, Relation, User, Bot
+
+
+Chat = Relation[User] | Relation[Bot] | Relation[User | Bot]
+
+
+class PermissionsCache:
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        # (actor id, related entity id) -> (permissions, valid until,
+        # generation of related entity)
+        self.entries: dict[tuple[int, int], tuple[Permissions, float, int]] = {}  # noqa
+        # related entity id -> generation of its default permissions
+        self.generations: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, relation: Chat) -> Permissions:
+        key = (relation.actor.id, relation.related.id)
+        generation = self.generations.get(key[1], 0)
+        now = time.time()
+        entry = self.entries.get(key)
+        if entry is not None:
+            permissions, valid_until, entry_generation = entry
+            if entry_generation == generation and now < valid_until:
+                return permissions
+        permissions, valid_until = effective(relation, now)
+        if self.max_entries:
+            if entry is None and len(self.entries) >= self.max_entries:
+                # the oldest entry goes first
+                del self.entries[next(iter(self.entries))]
+            self.entries[key] = permissions, valid_until, generation
+        return permissions
+
+    def invalidate(self, actor_id: int, related_id: int) -> None:
+        self.entries.pop((actor_id, related_id), None)
+
+    def invalidate_related(self, related_id: int) -> None:
+        self.generations[related_id] = self.generations.get(related_id, 0) + 1
+
+
+def effective(relation: Chat, now: float) -> tuple[Permissions, float]:
+    """Returns permissions and the time till which they are the same."""
+    permissions = relation.permissions
+    if permissions is None:
+        permissions = relation.related.default_permissions
+    valid_until = math.inf
+    for restriction in relation.restrictions:
+        since = restriction.since.timestamp()
+        to = restriction.to.timestamp()
+        if since <= now < to:
+            permissions &= ~restriction.denied
+            valid_until = min(valid_until, to)
+        elif now < since:
+            valid_until = min(valid_until, since)
+    return permissions, valid_until
@@ -0,0 +1,82 @@
+"""
+Media storage usage of users for the memory storage backend.
+
+Usage is a row of counters per user kept in columns of arrays: bytes the
+user uploaded, bytes of files the user is charged for, and numbers of
+uploads by media type. A file is charged to the user who stored it first,
+uploads of a file which is stored already count as uploaded bytes only.
+Counters are updated by each store and removal of a file, so reading
+usage of a user or the top of users does not look at files at all.
+"""
+from __future__ import annotations
+
+from array import array
+from heapq import nlargest
+
+from microchat.core.types import MIMEType
+
+
+MEDIA_TYPES = tuple(MIMEType)
+_COLUMNS = {media_type: column for column, media_type in enumerate(MEDIA_TYPES)}  # noqa
+
+
+class Quotas:
+
+    def __init__(self) -> None:
+        # user id -> row
+        self.rows: dict[int, int] = {}
+        self.users = array("q")
+        self.uploaded = array("q")
+        self.charged = array("q")
+        # len(MEDIA_TYPES) counters per row
+        self.uploads = array("I")
+
+    def __len__(self) -> int:
+        return len(self.users)
+
+    def record(
+        self, user_id: int, size: int, charged: bool, media_type: MIMEType
+    ) -> None:
+        """Counts upload of `size` bytes, charges them if file is new."""
+        row = self._row(user_id)
+        self.uploaded[row] += size
+        if charged:
+            self.charged[row] += size
+        self.uploads[row * len(MEDIA_TYPES) + _COLUMNS[media_type]] += 1
+
+    def refund(self, user_id: int, size: int) -> None:
+        """Returns bytes of a removed file to the user charged for it."""
+        row = self.rows.get(user_id)
+        if row is not None:
+            self.charged[row] = max(self.charged[row] - size, 0)
+
+    def usage(self, user_id: int) -> tuple[int, int, dict[MIMEType, int]]:
+        """Returns uploaded bytes, charged bytes and uploads by type."""
+        row = self.rows.get(user_id)
+        if row is None:
+            return 0, 0, {}
+        start = row * len(MEDIA_TYPES)
+        uploads = {
+            media_type: count
+            for media_type, count in zip(
+                MEDIA_TYPES, self.uploads[start:start + len(MEDIA_TYPES)]
+            )
+            if count
+        }
+        return self.uploaded[row], self.charged[row], uploads
+
+    def top(self, count: int) -> list[int]:
+        """Returns ids of `count` users charged the most, the most first."""
+        charged = self.charged
+        rows = nlargest(count, range(len(self.users)), key=charged.__getitem__)
+        return [self.users[row] for row in rows]
+
+    def _row(self, user_id: int) -> int:
+        row = self.rows.get(user_id)
+        if row is None:
+            row = self.rows[user_id] = len(self.users)
+            self.users.append(user_id)
+            self.uploaded.append(0)
+            self.charged.append(0)
+            self.uploads.extend([0] * len(MEDIA_TYPES))
+        return row
@@ -0,0 +1,282 @@
+"""
+Full-text index of messages for the memory storage backend.
+
+Texts are split to words which are case-folded (so "Привет", "ПРИВЕТ" and
+"привет" are the same word, "ё" is folded to "е" as people type it both
+ways). Each chat has its own inverted index: word -> ascending message
+`no`s, updated when messages are added, edited and removed, so a search
+never reads message texts. Most words occur in a chat once, such words
+keep the only `no` as is instead of an array. Words of all chats are kept
+in one sorted vocabulary to expand prefix queries ("прив*") and to share
+word strings between chats, a word is dropped from it when no chat has
+it anymore. A prefix is expanded to words of the searched chat only, so
+words of other chats do not push its own ones out of the expansion.
+"""
+from __future__ import annotations
+
+import heapq
+import re
+import unicodedata
+
+from array import array
+from bisect import bisect_left, insort
+from itertools import islice
+
+from typing import Iterable, Iterator, Sequence
+
+
+WORD = re.compile(r"\w+")
+QUERY_TERM = re.compile(r"(\w+)(\*?)")
+
+MAX_WORD_LENGTH = 64
+MAX_QUERY_TERMS = 8
+# prefix term matches at most this many words, the shortest go first
+MAX_PREFIX_EXPANSION = 256
+# matches are found by blocks growing from the first to the max size:
+# the first page needs a few of them, next ones are cheaper by blocks
+FIRST_BLOCK = 32
+MAX_BLOCK = 4096
+# block is intersected by sets unless other postings are much denser
+SET_INTERSECTION_RATIO = 16
+
+Term = tuple[str, bool]  # word, is prefix
+Postings = int | array  # type: ignore
+
+
+def normalize(text: str) -> str:
+    if text.isascii():
+        return text.lower()
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return text.replace("ё", "е")
+
+
+def words(text: str) -> set[str]:
+    return {
+        word for word in WORD.findall(normalize(text))
+        if len(word) <= MAX_WORD_LENGTH
+    }
+
+
+def parse_query(query: str) -> list[Term]:
+    """
+    Splits query to terms which all must be found in a message. Term with
+    trailing `*` matches words starting with it.
+    """
+    terms: dict[Term, None] = {}
+    for word, star in QUERY_TERM.findall(normalize(query)):
+        if len(word) <= MAX_WORD_LENGTH:
+            terms[(word, bool(star))] = None
+    return list(terms)[:MAX_QUERY_TERMS]
+
+
+class Vocabulary:
+    """Sorted words of all indexed messages."""
+
+    def __init__(self) -> None:
+        self.words: list[str] = []
+        self.known: dict[str, str] = {}
+        # word -> number of chat indexes having it
+        self.users: dict[str, int] = {}
+
+    def add(self, word: str) -> str:
+        """Counts one more chat having word, returns the known string."""
+        known = self.known.get(word)
+        if known is None:
+            known = self.known[word] = word
+            self.users[word] = 0
+            insort(self.words, word)
+        self.users[known] += 1
+        return known
+
+    def release(self, word: str) -> None:
+        """Counts one chat less having word, drops word nobody has."""
+        users = self.users.get(word, 0) - 1
+        if users > 0:
+            self.users[word] = users
+            return
+        self.users.pop(word, None)
+        if self.known.pop(word, None) is not None:
+            del self.words[bisect_left(self.words, word)]
+
+    def between(self, prefix: str) -> tuple[int, int]:
+        """Returns [start, stop) of words starting with prefix."""
+        start = bisect_left(self.words, prefix)
+        return start, bisect_left(self.words, prefix + "\U0010ffff", start)
+
+
+class MessageIndex:
+    """Inverted index of one chat's messages."""
+
+    def __init__(self, vocabulary: Vocabulary | None = None) -> None:
+        self.vocabulary = vocabulary or Vocabulary()
+        self.postings: dict[str, Postings] = {}
+
+    def add(self, no: int, text: str | None) -> None:
+        if not text:
+            return
+        postings = self.postings
+        for word in words(text):
+            numbers = postings.get(word)
+            if numbers is None:
+                postings[self.vocabulary.add(word)] = no
+                continue
+            if isinstance(numbers, int):
+                numbers = postings[word] = array("I", (numbers,))
+            if numbers[-1] > no:
+                # edited message, its number is in the middle
+                insort(numbers, no)
+            else:
+                numbers.append(no)
+
+    def discard(self, no: int, text: str | None) -> None:
+        if not text:
+            return
+        postings = self.postings
+        for word in words(text):
+            numbers = postings.get(word)
+            if numbers is None:
+                continue
+            if isinstance(numbers, int):
+                if numbers == no:
+                    del postings[word]
+                    self.vocabulary.release(word)
+                continue
+            position = bisect_left(numbers, no)
+            if position < len(numbers) and numbers[position] == no:
+                del numbers[position]
+            if len(numbers) == 1:
+                postings[word] = numbers[0]
+
+    def expand(self, terms: Sequence[Term]) -> list[list[str]]:
+        """Returns words of this chat matching each of terms."""
+        return [
+            self.starting_with(word) if prefix else [word]
+            for word, prefix in terms
+        ]
+
+    def starting_with(self, prefix: str) -> list[str]:
+        vocabulary = self.vocabulary
+        postings = self.postings
+        start, stop = vocabulary.between(prefix)
+        # words of the prefix or words of the chat, which are fewer
+        if stop - start <= len(postings):
+            matches = [
+                word for word in vocabulary.words[start:stop]
+                if word in postings
+            ]
+        else:
+            matches = [word for word in postings if word.startswith(prefix)]
+        if len(matches) <= MAX_PREFIX_EXPANSION:
+            return matches
+        return heapq.nsmallest(MAX_PREFIX_EXPANSION, matches, key=len)
+
+    def search(
+        self,
+        terms: Sequence[Term],
+        before: int,
+        ranges: Sequence[tuple[int, int | None]] | None = None
+    ) -> Iterator[int]:
+        """
+        Yields `no`s of messages less than `before` having each of terms
+        (see `parse_query`), from the newest. `ranges` limits them to
+        [start, stop) intervals.
+        """
+        if not terms:
+            return
+        groups: list[list[Sequence[int]]] = []
+        for candidates in self.expand(terms):
+            postings = [
+                _sequence(self.postings[candidate]) for candidate in candidates
+                if candidate in self.postings
+            ]
+            if not postings:
+                return
+            groups.append(postings)
+        # the rarest term drives, others are intersected with its blocks
+        groups.sort(key=lambda postings: sum(map(len, postings)))
+        driver, others = groups[0], groups[1:]
+        for start, stop in _windows(before, ranges):
+            for block in _blocks(driver, start, stop):
+                for postings in others:
+                    block = _intersect(block, postings)
+                yield from block
+
+
+def _sequence(numbers: Postings) -> Sequence[int]:
+    return (numbers,) if isinstance(numbers, int) else numbers
+
+
+def _windows(
+    before: int, ranges: Sequence[tuple[int, int | None]] | None
+) -> Iterator[tuple[int, int]]:
+    if ranges is None:
+        yield 0, before
+        return
+    for start, stop in sorted(ranges, reverse=True):
+        stop = before if stop is None else min(stop, before)
+        if start < stop:
+            yield start, stop
+
+
+def _blocks(
+    postings: list[Sequence[int]], start: int, stop: int
+) -> Iterator[list[int]]:
+    """Yields `no`s in [start, stop) by descending blocks."""
+    size = FIRST_BLOCK
+    if len(postings) == 1:
+        numbers = postings[0]
+        first = bisect_left(numbers, start)
+        last = bisect_left(numbers, stop, first)
+        while last > first:
+            block = list(numbers[max(last - size, first):last])
+            block.reverse()
+            yield block
+            last -= size
+            size = min(size * 2, MAX_BLOCK)
+        return
+    merged = _unique(heapq.merge(
+        *(_reversed_between(numbers, start, stop) for numbers in postings),
+        reverse=True
+    ))
+    while block := list(islice(merged, size)):
+        yield block
+        size = min(size * 2, MAX_BLOCK)
+
+
+def _reversed_between(
+    numbers: Sequence[int], start: int, stop: int
+) -> Iterator[int]:
+    first = bisect_left(numbers, start)
+    for position in range(bisect_left(numbers, stop) - 1, first - 1, -1):
+        yield numbers[position]
+
+
+def _intersect(block: list[int], postings: list[Sequence[int]]) -> list[int]:
+    if not block:
+        return block
+    low, high = block[-1], block[0] + 1
+    present: set[int] = set()
+    for numbers in postings:
+        first = bisect_left(numbers, low)
+        last = bisect_left(numbers, high, first)
+        if last - first > len(block) * SET_INTERSECTION_RATIO:
+            return [no for no in block if _contains(postings, no)]
+        present.update(numbers[first:last])
+    return [no for no in block if no in present]
+
+
+def _unique(numbers: Iterable[int]) -> Iterator[int]:
+    previous = None
+    for no in numbers:
+        if no != previous:
+            yield no
+            previous = no
+
+
+def _contains(postings: list[Sequence[int]], no: int) -> bool:
+    for numbers in postings:
+        position = bisect_left(numbers, no)
+        if position < len(numbers) and numbers[position] == no:
+            return True
+    return False
+
@@ -0,0 +1,637 @@
+from __future__ import annotations
+
+import heapq
+
+from bisect import bisect_left
+from datetime import datetime as dt
+from hashlib import sha3_256
+
+from typing import Any, Iterable, Iterator, TypeVar
+
+from microchat.core.entities import Authentication, Permissions, Session
+from microchat.core.entities import User, Bot, Conference, Dialog
+from microchat.core.entities import ConferenceParticipation, ConferencePresence
+from microchat.core.entities import Message, Attachment, FoundMessage
+from microchat.core.entities import MessageVersion
+from microchat.core.entities import ChatChanges, Changes
+from microchat.core.entities import Media, Image, TempFile, FileInfo
+from microchat.core.entities import StorageUsage
+from microchat.core.types import AsyncReader, AsyncSequence, MIMETuple
+from microchat.services.general_exceptions import AlreadyExists, DoesNotExists
+from microchat.storages.bases import AuthenticationStorage
+from microchat.storages.bases import EntitiesStorage
+from microchat.storages.bases import RelationsStorage
+from microchat.storages.bases import ChatsStorage
+from microchat.storages.bases import ConferencesStorage
+from microchat.storages.bases import MediaStorage
+
+from .database import MemoryDatabase
+from .entities import MemoryConference, MemoryDialog, MemoryMessage
+from .entities import MemoryParticipation, MessageLog
+from .search import parse_query
+
+
+Agent = TypeVar("Agent", bound=User | Bot | Conference)
+Actor = TypeVar("Actor", bound=User | Bot)
+M = TypeVar("M", bound=Media)
+Chat = (
+    Dialog
+    | ConferenceParticipation[User]
+    | ConferenceParticipation[User | Bot]
+)
+
+USER_FIELDS = ("alias", "avatar", "name", "surname", "bio")
+# chat with more changes is not synced by messages
+SYNC_MAX_MESSAGES = 100
+
+
+class MemoryStorage:
+
+    def __init__(self, database: MemoryDatabase) -> None:
+        self.db = database
+
+
+class MemoryAuthenticationStorage(MemoryStorage, AuthenticationStorage):
+
+    async def get_auth_data(
+        self, user: User, auth_kind: str
+    ) -> Authentication:
+        auth = self.db.authentications.get(user.id)
+        if auth is None or auth.method.name.lower() != auth_kind:
+            raise DoesNotExists(f"No '{auth_kind}' authentication for user")
+        return auth
+
+    async def create_session(
+        self, user: User, auth: Authentication
+    ) -> Session:
+        sessions = user.sessions
+        session = Session()
+        session.id = len(await sessions)
+        session.name = f"session {session.id}"
+        session.last_active = dt.now()
+        session.location = None
+        session.ip_address = ""
+        session.auth = auth
+        session.closed = False
+        await sessions.append(session)
+        return session
+
+    async def terminate_session(self, user: User, session: Session) -> None:
+        session.closed = True
+
+
+class MemoryEntitiesStorage(MemoryStorage, EntitiesStorage):
+
+    async def get_by_alias(self, alias: str) -> User | Bot | Conference:
+        entity = self.db.aliases.get(alias)
+        if entity is None:
+            raise DoesNotExists(f"Entity '{alias}' does not exists")
+        return entity
+
+    async def get_by_id(self, id: int) -> User | Bot | Conference:
+        entity = self.db.entities.get(id)
+        if entity is None:
+            raise DoesNotExists(f"Entity #{id} does not exists")
+        return entity
+
+    async def edit_user(
+        self,
+        user: User,
+        alias: str | None = None,
+        avatar: Image | None = None,
+        name: str | None = None,
+        surname: str | None = None,
+        bio: str | None = None
+    ) -> User:
+        values = (alias, avatar, name, surname, bio)
+        update = {
+            field: value
+            for field, value in zip(USER_FIELDS, values)
+            if value is not None
+        }
+        return await self.edit_entity(user, update)
+
+    async def edit_entity(  # type: ignore
+        self, entity: Agent, update: dict[str, Any]
+    ) -> Agent:
+        alias = update.get("alias")
+        if alias is not None and alias != entity.alias:
+            if alias in self.db.aliases:
+                raise AlreadyExists(f"Alias '{alias}' is taken already")
+            del self.db.aliases[entity.alias]
+            self.db.aliases[alias] = entity
+        self.db.directory.discard(entity)
+        for field, value in update.items():
+            setattr(entity, field, value)
+        self.db.directory.add(entity)
+        if "default_permissions" in update:
+            self.db.permissions.invalidate_related(entity.id)
+        self.db.touch_entity(entity)
+        return entity
+
+    async def set_avatar(
+        self, entity: Bot | User | Conference, avatar: Image
+    ) -> None:
+        await entity.avatars.append(avatar)
+        entity.avatar = avatar
+        self.db.media_refs.acquire([avatar])
+        self.db.touch_entity(entity)
+
+    async def remove_entity(self, entity: Bot | User | Conference) -> None:
+        self.db.entities.pop(entity.id, None)
+        self.db.aliases.pop(entity.alias, None)
+        self.db.directory.discard(entity)
+        self.db.media_refs.release(await entity.avatars[:])
+
+    async def search(
+        self,
+        query: str,
+        kinds: tuple[type[User | Bot | Conference], ...],
+        count: int
+    ) -> list[User | Bot | Conference]:
+        return self.db.directory.search(query, kinds, count)
+
+    async def remove_avatar(
+        self, entity: Bot | User | Conference, id: int
+    ) -> None:
+        try:
+            avatar = await entity.avatars[id]
+            del entity.avatars[id]
+        except IndexError:
+            raise DoesNotExists(f"Avatar #{id} does not exists")
+        self.db.media_refs.release([avatar])
+        self.db.touch_entity(entity)
+
+
+class MemoryRelationsStorage(MemoryStorage, RelationsStorage):
+
+    async def get_relation(
+        self, user: User | Bot, id: int
+    ) -> Dialog | ConferenceParticipation[User]:
+        relation = self.db.relations.get((user.id, id))
+        if relation is None:
+            related = self.db.entities.get(id)
+            if isinstance(related, (User, Bot)):
+                return self.db.dialog(user, related)  # type: ignore
+            raise DoesNotExists(f"Chat #{id} does not exists")
+        return await _counted(relation)  # type: ignore
+
+    async def edit_permissions(
+        self, user: User, relation: Dialog, update: dict[str, bool]
+    ) -> Dialog:
+        current = relation.permissions
+        if current is None:
+            current = relation.related.default_permissions
+        relation.permissions = current.patched(update)
+        self.db.permissions.invalidate(user.id, relation.related.id)
+        self.db.touch_relation(user, relation.related)
+        return relation
+
+    async def get_permissions(self, relation: Chat) -> Permissions:
+        return self.db.permissions.get(relation)
+
+
+class MemoryChatsStorage(MemoryStorage, ChatsStorage):
+
+    async def get_user_chats(
+        self, user: User, offset: int, count: int
+    ) -> list[Dialog | ConferenceParticipation[User]]:
+        chat_list = self.db.chat_lists.get(user.id)
+        if chat_list is None:
+            return []
+        chats = self.db.chats[user.id]
+        return [
+            await _counted(chats[id])  # type: ignore
+            for id in chat_list.page(offset, count)
+        ]
+
+    async def get_user_conferences(self, user: User) -> list[int]:
+        return [
+            id for id, chat in self.db.chats.get(user.id, {}).items()
+            if isinstance(chat, MemoryParticipation)
+        ]
+
+    async def get_dialog_messages(
+        self, user: User, chat: Dialog, offset: int, count: int
+    ) -> list[Message]:
+        return _log(chat).page(offset, count)
+
+    async def get_conference_messages(
+        self,
+        user: User, chat: ConferenceParticipation[User],
+        offset: int, count: int,
+    ) -> list[Message]:
+        return _log(chat).page(offset, count)
+
+    async def get_private_conference_messages(
+        self,
+        user: User,
+        chat: ConferenceParticipation[User],
+        offset: int,
+        count: int,
+        presences: AsyncSequence[ConferencePresence]
+    ) -> list[Message]:
+        ranges = _ranges(await presences)
+        return _log(chat).page(offset, count, ranges)
+
+    async def add_message(
+        self,
+        user: User, chat: Dialog | ConferenceParticipation[User],
+        text: str | None,
+        attachments: list[Media] | None,
+        reply_to: Message | None
+    ) -> Message:
+        log = _log(chat)
+        no = log.append(
+            self.db.next_message_id(), user, text, attachments or (),
+            reply_to.no if reply_to is not None else None
+        )
+        # sender has read the chat
+        chat.read_no = no + 1
+        return log.message(no)
+
+    async def add_messages(
+        self,
+        user: User,
+        messages: list[tuple[
+            Dialog | ConferenceParticipation[User],
+            str | None,
+            list[Media] | None
+        ]]
+    ) -> list[Message]:
+        added: list[Message] = []
+        for chat, text, attachments in messages:
+            log = _log(chat)
+            no = log.append(
+                self.db.next_message_id(), user, text, attachments or ()
+            )
+            chat.read_no = no + 1
+            added.append(log.message(no))
+        return added
+
+    async def edit_message(
+        self,
+        message: Message,
+        text: str | None,
+        attachments: list[Media] | None
+    ) -> Message:
+        log = _message_log(message)
+        log.edit(message.no, text, attachments)
+        return log.message(message.no)
+
+    async def get_message_versions(
+        self, message: Message, offset: int = 0
+    ) -> list[MessageVersion]:
+        return _message_log(message).versions(message.no, offset)
+
+    async def remove_message(self, message: Message) -> None:
+        _message_log(message).remove(message.no)
+
+    async def mark_read(
+        self, user: User, chat: Dialog | ConferenceParticipation[User], no: int
+    ) -> Dialog | ConferenceParticipation[User]:
+        read_no = min(no + 1, len(_log(chat)))
+        chat.read_no = max(chat.read_no, read_no)
+        return await _counted(chat)  # type: ignore
+
+    async def get_changes(self, user: User, version: int) -> Changes:
+        changes = Changes()
+        changes.version = self.db.next_version()
+        changes.chats = []
+        change_list = self.db.change_lists.get(user.id)
+        if change_list is None:
+            changes.left = []
+            return changes
+        chats = self.db.chats[user.id]
+        for id in change_list.after(version):
+            chat = await _counted(chats[id])
+            ranges = None
+            if isinstance(chat, ConferenceParticipation) and \
+                    chat.related.private:
+                ranges = _ranges(await chat.presences)
+            log = _log(chat)
+            nos = None
+            if version > 0:
+                nos = log.changes_since(version, SYNC_MAX_MESSAGES, ranges)
+            chat_changes = ChatChanges()
+            chat_changes.chat = chat  # type: ignore
+            chat_changes.messages = []
+            chat_changes.deleted = []
+            chat_changes.complete = nos is not None
+            if nos is not None:
+                for no in nos:
+                    if no in log.deleted:
+                        chat_changes.deleted.append(no)
+                    else:
+                        chat_changes.messages.append(log.message(no))
+            changes.chats.append(chat_changes)
+        left = self.db.left.get(user.id, [])
+        start = bisect_left(left, (version, 0))
+        changes.left = [
+            id for _, id in left[start:] if id not in chats
+        ]
+        return changes
+
+    async def search_messages(
+        self,
+        user: User,
+        chats: list[Dialog | ConferenceParticipation[User]] | None,
+        query: str,
+        before: int | None,
+        count: int
+    ) -> list[FoundMessage]:
+        terms = parse_query(query)
+        if not terms:
+            return []
+        searched: list[Chat] = []
+        if chats is None:
+            searched.extend(self.db.user_chats(user))
+        else:
+            searched.extend(chats)
+        # chats are merged by message id (ids grow with time) and are
+        # opened from the one with the newest message: a chat is searched
+        # only if its messages are newer than the found ones
+        heads = []
+        for chat in searched:
+            log = _log(chat)
+            stop = len(log) if before is None else bisect_left(log.ids, before)
+            if stop:
+                heads.append((log.ids[stop - 1], stop, chat))
+        heads.sort(key=lambda head: head[0], reverse=True)
+        streams: list[tuple[Chat, MessageLog, Iterator[int]]] = []
+        # (-message id, message `no`, stream index)
+        newest: list[tuple[int, int, int]] = []
+        found: list[FoundMessage] = []
+        opened = 0
+        while len(found) < count:
+            while opened < len(heads) and \
+                    (not newest or heads[opened][0] > -newest[0][0]):
+                _, stop, chat = heads[opened]
+                opened += 1
+                ranges = None
+                if isinstance(chat, ConferenceParticipation) and \
+                        chat.related.private:
+                    ranges = _ranges(await chat.presences)
+                log = _log(chat)
+                stream = log.index.search(terms, stop, ranges)
+                no = next(stream, None)
+                if no is not None:
+                    heapq.heappush(newest, (-log.ids[no], no, len(streams)))
+                    streams.append((chat, log, stream))
+            if not newest:
+                break
+            _, no, stream_no = heapq.heappop(newest)
+            chat, log, stream = streams[stream_no]
+            message = FoundMessage()
+            message.chat = chat  # type: ignore
+            message.message = log.message(no)
+            found.append(message)
+            no = next(stream, None)
+            if no is not None:
+                heapq.heappush(newest, (-log.ids[no], no, stream_no))
+        return found
+
+    async def get_dialog_medias(
+        self,
+        user: User,
+        chat: Dialog,
+        media_type: type[M],
+        offset: int,
+        count: int
+    ) -> list[Attachment[M]]:
+        return _log(chat).media_page(media_type, offset, count)
+
+    async def get_conference_medias(
+        self,
+        user: User, chat: ConferenceParticipation[User],
+        media_type: type[M],
+        offset: int, count: int,
+    ) -> list[Attachment[M]]:
+        return _log(chat).media_page(media_type, offset, count)
+
+    async def get_private_conference_medias(
+        self,
+        user: User,
+        chat: ConferenceParticipation[User],
+        media_type: type[M],
+        offset: int,
+        count: int,
+        presences: AsyncSequence[ConferencePresence]
+    ) -> list[Attachment[M]]:
+        ranges = _ranges(await presences)
+        return _log(chat).media_page(media_type, offset, count, ranges)
+
+    async def remove_media(
+        self,
+        chat: Dialog | ConferenceParticipation[User],
+        attachment: Attachment[M]
+    ) -> None:
+        log = _log(chat)
+        if attachment.no < len(log.media):
+            if log.media[attachment.no] is attachment:
+                log.remove_attachment(attachment.no)
+
+
+class MemoryConferencesStorage(MemoryStorage, ConferencesStorage):
+
+    async def list_members(
+        self, conference: Conference, offset: int, count: int,
+        role: str | None = None
+    ) -> list[ConferenceParticipation[User | Bot]]:
+        members = self.db.members.get(conference.id)
+        if members is None:
+            return []
+        return members.page(offset, count, role)  # type: ignore
+
+    async def count_members(
+        self, conference: Conference, role: str | None = None
+    ) -> int:
+        members = self.db.members.get(conference.id)
+        return 0 if members is None else members.count(role)
+
+    async def get_member(
+        self, conference: Conference, no: int
+    ) -> ConferenceParticipation[User | Bot]:
+        members = self.db.members.get(conference.id)
+        member = None if members is None else members.get(no)
+        if member is None:
+            raise DoesNotExists(f"Member #{no} does not exists")
+        return member
+
+    async def find_member(
+        self, conference: Conference, actor: Actor
+    ) -> ConferenceParticipation[Actor]:
+        members = self.db.members.get(conference.id)
+        member = None if members is None else members.find(actor.id)
+        if member is None:
+            raise DoesNotExists(f"{actor.alias} is not a conference member")
+        return member  # type: ignore
+
+    async def add_member(
+        self, conference: Conference, invitee: Actor
+    ) -> ConferenceParticipation[Actor]:
+        if not isinstance(conference, MemoryConference):
+            raise DoesNotExists("Conference does not exists")
+        return self.db.join(conference, invitee)  # type: ignore
+
+    async def add_members(
+        self, conference: Conference, invitees: list[User | Bot]
+    ) -> list[ConferenceParticipation[User | Bot] | None]:
+        if not isinstance(conference, MemoryConference):
+            raise DoesNotExists("Conference does not exists")
+        return self.db.join_many(conference, invitees)  # type: ignore
+
+    async def remove_member(
+        self, member: ConferenceParticipation[User | Bot]
+    ) -> None:
+        if isinstance(member, MemoryParticipation):
+            self.db.leave(member)
+
+    async def remove_members(
+        self, members: list[ConferenceParticipation[User | Bot]]
+    ) -> None:
+        self.db.leave_many([
+            member for member in members
+            if isinstance(member, MemoryParticipation)
+        ])
+
+    async def update_permissions(
+        self, member: ConferenceParticipation[User | Bot], update: Permissions
+    ) -> Permissions:
+        member.permissions = update
+        self.db.permissions.invalidate(member.actor.id, member.related.id)
+        self.db.touch_relation(member.actor, member.related)
+        return update
+
+
+class MemoryTempFile(TempFile):
+
+    def __init__(self) -> None:
+        self._hash = sha3_256()
+        self._chunks: list[bytes] = []
+        self.hash = self._hash.digest()
+        self.size = 0
+
+    @property
+    def content(self) -> bytes:
+        return b"".join(self._chunks)
+
+    async def __aexit__(
+        self,
+        exc_cls: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: object
+    ) -> None:
+        await self.close()
+
+    async def write(self, data: bytes) -> None:
+        self._hash.update(data)
+        self.hash = self._hash.digest()
+        self._chunks.append(data)
+        self.size += len(data)
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryReader(AsyncReader):
+
+    def __init__(self, content: bytes) -> None:
+        self._content = memoryview(content)
+        self._position = 0
+
+    async def read(self, size: int = 0) -> bytes:
+        start = self._position
+        stop = len(self._content) if size <= 0 else start + size
+        chunk = self._content[start:stop]
+        self._position = start + len(chunk)
+        return bytes(chunk)
+
+
+class MemoryMediaStorage(MemoryStorage, MediaStorage):
+
+    async def get_by_hash(self, user: User, hash: str) -> Media:
+        media = await self.find_by_hash(hash)
+        await self.check_access(user, media)
+        return media
+
+    async def find_by_hash(self, hash: str) -> Media:
+        media = self.db.media.get(hash)
+        if media is None:
+            raise DoesNotExists(f"Media '{hash}' does not exists")
+        return media
+
+    async def check_access(self, user: User, media: Media) -> None:
+        # memory backend does not restrict access to uploaded media
+        pass
+
+    async def get_by_hashes(
+        self, user: User, hashes: Iterable[str]
+    ) -> list[Media]:
+        return [await self.get_by_hash(user, hash) for hash in hashes]
+
+    async def save_media(
+        self, user: User, file: TempFile, name: str, mime: MIMETuple
+    ) -> Media:
+        if not isinstance(file, MemoryTempFile):
+            raise TypeError("Memory storage saves only own temporary files")
+        return self.db.store_file(user, name, mime, file.content)
+
+    async def create_tempfile(self) -> TempFile:
+        return MemoryTempFile()
+
+    async def get_usage(self, user: User) -> StorageUsage:
+        return self._usage(user)
+
+    async def list_top_usage(self, count: int) -> list[StorageUsage]:
+        entities = self.db.entities
+        return [
+            self._usage(owner)
+            for user_id in self.db.quotas.top(count)
+            # usage of removed users is kept, they are not listed
+            if isinstance(owner := entities.get(user_id), (User, Bot))
+        ]
+
+    async def open(self, file: FileInfo) -> AsyncReader:
+        content = self.db.contents.get(file.hash)
+        if content is None:
+            raise DoesNotExists(f"Content of '{file.hash}' is missing")
+        return MemoryReader(content)
+
+    def _usage(self, owner: User | Bot) -> StorageUsage:
+        usage = StorageUsage()
+        usage.owner = owner
+        usage.uploaded, usage.charged, usage.uploads = self.db.quotas.usage(
+            owner.id
+        )
+        return usage
+
+
+def _log(chat: Chat) -> MessageLog:
+    if isinstance(chat, MemoryDialog):
+        return chat.log
+    conference = chat.related
+    if isinstance(conference, MemoryConference):
+        return conference.log
+    raise DoesNotExists("Chat is not stored in memory")
+
+
+def _message_log(message: Message) -> MessageLog:
+    if not isinstance(message, MemoryMessage):
+        raise DoesNotExists("Message is not stored in memory")
+    return message.log
+
+
+async def _counted(chat: Chat) -> Chat:
+    """Counts unread messages of chat."""
+    ranges = None
+    if isinstance(chat, ConferenceParticipation) and chat.related.private:
+        ranges = _ranges(await chat.presences)
+    chat.unread = _log(chat).count(chat.read_no, ranges)
+    return chat
+
+
+def _ranges(
+    presences: Iterable[ConferencePresence]
+) -> list[tuple[int, int | None]]:
+    return [(presence.join_at, presence.leave_at) for presence in presences]
@@ -0,0 +1,94 @@
+"""
+Removal of orphan media files for the memory storage backend.
+
+A file is an orphan when nothing refers to it: it was uploaded and never
+attached, or the last message, version or avatar which used it is gone.
+Media references keep orphans in order of time they became ones, so the
+sweeper reads them from the oldest and stops at the first one which is
+younger than the grace period: a run costs the files it removes, not all
+files. Runs are throttled: at most `batch_size` files each `interval`
+seconds, so the sweeper never holds the event loop for long.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+
+from itertools import islice
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .database import MemoryDatabase
+
+
+SWEEPER_LOG = logging.getLogger("microchat.storages.sweeper")
+
+
+class Sweeper:
+
+    def __init__(
+        self,
+        db: MemoryDatabase,
+        interval: float = 60.0,
+        batch_size: int = 1024,
+        grace_period: float = 3600.0,
+        logger: logging.Logger = SWEEPER_LOG
+    ) -> None:
+        self.db = db
+        self.interval = interval
+        self.batch_size = batch_size
+        self.grace_period = grace_period
+        self.logger = logger
+        self.removed_files = 0
+        self.reclaimed_bytes = 0
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def sweep(
+        self, now: float | None = None, limit: int | None = None
+    ) -> tuple[int, int]:
+        """
+        Removes up to `limit` orphans older than the grace period, returns
+        number of files removed and bytes reclaimed.
+        """
+        released = self.db.media_refs.released
+        deadline = (time.time() if now is None else now) - self.grace_period
+        expired = []
+        for hash, since in islice(released.items(), limit):
+            if since > deadline:
+                break
+            expired.append(hash)
+        reclaimed = 0
+        for hash in expired:
+            del released[hash]
+            reclaimed += self.db.remove_file(hash)
+        self.removed_files += len(expired)
+        self.reclaimed_bytes += reclaimed
+        return len(expired), reclaimed
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                removed, reclaimed = self.sweep(limit=self.batch_size)
+            except Exception:
+                self.logger.exception("Sweep of orphan files failed")
+                continue
+            if removed:
+                self.logger.info(
+                    "Removed %d orphan files, %d bytes reclaimed",
+                    removed, reclaimed
+                )
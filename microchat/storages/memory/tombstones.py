@@ -0,0 +1,75 @@
+"""
+Deleted messages and attachments of a chat for the memory storage backend.
+
+Deleted items keep their `no`s, so numbering of the others does not
+change. Their `no`s are kept twice: sorted as is, to count deleted ones
+in a range by two bisections, and as runs of consecutive `no`s, to skip a
+run by one bisection when a page is read. Messages are mostly deleted
+in bulk or by the last ones, so runs are few even when deleted messages
+are many.
+"""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, bisect_right, insort
+
+
+class Tombstones:
+
+    def __init__(self) -> None:
+        self.nos = array("q")
+        # runs of deleted `no`s: [starts[i], stops[i]), ascending
+        self.starts = array("q")
+        self.stops = array("q")
+
+    def __len__(self) -> int:
+        return len(self.nos)
+
+    def __contains__(self, no: int) -> bool:
+        position = bisect_right(self.starts, no) - 1
+        return position >= 0 and no < self.stops[position]
+
+    def add(self, no: int) -> bool:
+        """Marks `no` deleted, returns False if it was deleted already."""
+        starts, stops = self.starts, self.stops
+        position = bisect_right(starts, no) - 1
+        if position >= 0 and no < stops[position]:
+            return False
+        insort(self.nos, no)
+        joins_previous = position >= 0 and stops[position] == no
+        next_position = position + 1
+        joins_next = next_position < len(starts) and \
+            starts[next_position] == no + 1
+        if joins_previous and joins_next:
+            stops[position] = stops[next_position]
+            del starts[next_position]
+            del stops[next_position]
+        elif joins_previous:
+            stops[position] = no + 1
+        elif joins_next:
+            starts[next_position] = no
+        else:
+            starts.insert(next_position, no)
+            stops.insert(next_position, no + 1)
+        return True
+
+    def skip(self, no: int) -> int:
+        """Returns the first `no` not less than given which is not deleted."""
+        position = bisect_right(self.starts, no) - 1
+        if position >= 0 and no < self.stops[position]:
+            return self.stops[position]
+        return no
+
+    def skip_back(self, no: int) -> int:
+        """
+        Returns the last `no` not greater than given which is not deleted,
+        -1 if there is none.
+        """
+        position = bisect_right(self.starts, no) - 1
+        if position >= 0 and no < self.stops[position]:
+            return self.starts[position] - 1
+        return no
+
+    def count(self, first: int, last: int) -> int:
+        """Returns number of deleted `no`s in [first, last)."""
+        return bisect_left(self.nos, last) - bisect_left(self.nos, first)
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import functools
+import inspect
+import time
+
+from types import TracebackType
+
+from typing import Awaitable, Callable, Protocol
+
+from . import UoW
+
+
+class StorageObserver(Protocol):
+    def __call__(
+        self,
+        storage: str, method: str, arguments: dict[str, object],
+        seconds: float
+    ) -> None: ...
+
+
+class StorageCalls:
+    """Counts storage calls and time spent in them."""
+
+    calls: int
+    seconds: float
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.seconds = 0
+
+    def __call__(
+        self,
+        storage: str, method: str, arguments: dict[str, object],
+        seconds: float
+    ) -> None:
+        self.calls += 1
+        self.seconds += seconds
+
+
+class ObservedStorage:
+    """Reports every coroutine method call of wrapped storage to observer."""
+
+    def __init__(
+        self, origin: object, name: str, observer: StorageObserver
+    ) -> None:
+        self._origin = origin
+        self._name = name
+        self._observer = observer
+
+    def __getattr__(self, name: str) -> object:
+        attr = getattr(self._origin, name)
+        if not inspect.iscoroutinefunction(attr):
+            return attr
+        observed = _observed(attr, self._name, name, self._observer)
+        setattr(self, name, observed)
+        return observed
+
+
+class ObservedUoW(UoW):
+    """
+    Wraps storages of already entered UoW. Storages are wrapped on first
+    access.
+    """
+
+    def __init__(self, origin: UoW, observer: StorageObserver) -> None:
+        self._origin = origin
+        self._observer = observer
+
+    def __getattr__(self, name: str) -> object:
+        storage = getattr(self._origin, name)
+        observed = ObservedStorage(storage, name, self._observer)
+        setattr(self, name, observed)
+        return observed
+
+
+class ObservedUoWFactory:
+    """
+    Makes units of work of origin factory which are observed as ObservedUoW
+    once entered, e.g. ones of shared calls started by an observed request.
+    """
+
+    def __init__(
+        self, origin: Callable[[], UoW], observer: StorageObserver
+    ) -> None:
+        self._origin = origin
+        self._observer = observer
+
+    def __call__(self) -> UoW:
+        return _ObservedOnEnter(self._origin(), self._observer)
+
+
+class _ObservedOnEnter(UoW):
+
+    def __init__(self, origin: UoW, observer: StorageObserver) -> None:
+        self._origin = origin
+        self._observer = observer
+
+    async def __aenter__(self) -> ObservedUoW:  # type: ignore
+        uow = await self._origin.__aenter__()
+        return ObservedUoW(uow, self._observer)
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None
+    ) -> None:
+        await self._origin.__aexit__(exc_type, exc, tb)  # type: ignore
+
+
+def _observed(  # type: ignore
+    method: Callable[..., Awaitable[object]],
+    storage_name: str,
+    method_name: str,
+    observer: StorageObserver
+) -> Callable[..., Awaitable[object]]:
+    parameters = tuple(inspect.signature(method).parameters)
+
+    @functools.wraps(method)
+    async def wrapped(*args: object, **kwargs: object) -> object:
+        started = time.perf_counter()
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            arguments = dict(zip(parameters, args))
+            arguments.update(kwargs)
+            observer(storage_name, method_name, arguments, elapsed)
+    return wrapped
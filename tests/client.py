@@ -0,0 +1,43 @@
+"""
+Application on memory storage served to a test client, for tests which go
+through HTTP routes.
+"""
+from contextlib import asynccontextmanager
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from microchat.app import app
+from microchat.config import Config
+from microchat.core.jwt_manager import JWTManager
+from microchat.storages.memory import MemoryDatabase, MemoryUoW
+
+
+PASSWORD = "password"
+
+
+@asynccontextmanager
+async def served(db: MemoryDatabase, config: Config | None = None):
+    application = await app(
+        lambda: MemoryUoW(db), JWTManager("secret"), config=config
+    )
+    async with TestClient(TestServer(application)) as client:
+        yield client
+
+
+async def login(client: TestClient, user) -> dict[str, str]:
+    """Returns headers of requests made on behalf of user."""
+    payload = {"username": user.alias, "password": PASSWORD}
+    async with client.post("/api/auth/sessions", json=payload) as response:
+        body = await response.json()
+        assert response.status == 201, body
+    return {"Authentication": f"Bearer {body['response']}"}
+
+
+async def call(client: TestClient, headers, method, path, json=None):
+    """Returns status and body of API request."""
+    async with client.request(
+        method, "/api" + path, headers=headers, json=json
+    ) as response:
+        if response.content_type != "application/json":
+            return response.status, await response.text()
+        return response.status, await response.json()
@@ -0,0 +1,125 @@
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from microchat.api_utils.request import APIRequest
+from microchat.api_utils.response import APIResponse, DEFAULT_JSON_DUMPER
+from microchat.app.batch import BATCH_MAX_REQUESTS
+from microchat.app.rate_limit import rate_limiter
+from microchat.app.rendering import renderer
+from microchat.app.routes import APIEndpoints
+from microchat.config import Config, MiB
+from microchat.core.events import EventStream
+from microchat.core.jwt_manager import JWTManager
+from microchat.storages import UoW
+
+
+OK = [{"method": "GET", "path": "/ok"}]
+
+def test_unexpected_error_is_response_of_its_sub_request():
+    requests = [
+        {"method": "GET", "path": "/fail"},
+        {"method": "GET", "path": "/ok"},
+    ]
+    status, body = asyncio.run(_post_batch(requests, burst=10))
+    assert status == 200
+    assert [item["status"] for item in body["response"]] == [500, 200]
+
+
+def test_sub_requests_are_rate_limited():
+    requests = [{"method": "GET", "path": "/ok"}] * 4
+    assert asyncio.run(_post_batch(requests, burst=4))[0] == 200
+    assert asyncio.run(_post_batch(requests, burst=3))[0] == 429
+
+
+def test_oversized_body_takes_only_its_own_token():
+    async def scenario():
+        async with _client(burst=3) as client:
+            path = "/ok" + "x" * 2048
+            oversized = await _post(client, [{"method": "GET", "path": path}])
+            batch = await _post(client, OK * 2)
+            return oversized, batch, await _get_ok(client)
+
+    oversized, batch, single = asyncio.run(scenario())
+    assert oversized[0] == 413
+    assert batch[0] == 200
+    assert single == 429
+
+
+def test_oversized_batch_is_not_charged():
+    async def scenario():
+        async with _client(burst=3, client_max_size=MiB) as client:
+            oversized = await _post(client, OK * (BATCH_MAX_REQUESTS + 1))
+            batch = await _post(client, OK * 2)
+            return oversized, batch, await _get_ok(client)
+
+    oversized, batch, single = asyncio.run(scenario())
+    assert oversized[0] == 400
+    assert batch[0] == 200
+    assert single == 429
+
+
+def test_tokens_of_rejected_sub_requests_are_returned():
+    requests = [
+        {"method": "GET", "path": "/unknown"},
+        {"method": "DELETE", "path": "/ok"},
+        *OK, *OK,
+    ]
+
+    async def scenario():
+        async with _client(burst=4) as client:
+            first = await _post(client, requests)
+            second = await _post(client, OK * 2)
+            return first, second, await _get_ok(client)
+
+    (status, body), second, single = asyncio.run(scenario())
+    assert status == 200
+    statuses = [item["status"] for item in body["response"]]
+    assert statuses == [404, 405, 200, 200]
+    # two tokens are returned and taken by the second batch
+    assert second[0] == 200
+    assert single == 429
+
+
+async def _post_batch(requests, burst):
+    async with _client(burst) as client:
+        return await _post(client, requests)
+
+
+def _client(burst, client_max_size=1024):
+    async def ok(request, services):
+        return APIResponse("ok")
+
+    async def fail(request, services):
+        raise ValueError("unexpected")
+
+    async def no_params(request):
+        return APIRequest()
+
+    routes = APIEndpoints(
+        UoW, JWTManager("secret"), EventStream(), Config(),
+        renderer(DEFAULT_JSON_DUMPER)
+    )
+    routes.add_route("GET", "/ok", ok, no_params)
+    routes.add_route("GET", "/fail", fail, no_params)
+    routes.add_batch_route("/batch")
+    app = web.Application(
+        router=routes._router, middlewares=[rate_limiter(0.01, burst)],
+        client_max_size=client_max_size
+    )
+    return TestClient(TestServer(app))
+
+
+async def _post(client, requests):
+    async with client.post(
+        "/batch", json={"requests": requests}
+    ) as response:
+        if response.content_type != "application/json":
+            return response.status, await response.text()
+        return response.status, await response.json()
+
+
+async def _get_ok(client):
+    async with client.get("/ok") as response:
+        return response.status
@@ -0,0 +1,60 @@
+import asyncio
+
+from microchat.storages.memory import MemoryDatabase
+
+from .client import PASSWORD, call, login, served
+
+
+def test_bulk_add_and_remove_have_result_per_item():
+    async def scenario():
+        db = MemoryDatabase()
+        owner = db.create_user("owner", PASSWORD, "Owner")
+        member = db.create_user("member", PASSWORD, "Member")
+        invitee = db.create_user("invitee", PASSWORD, "Invitee")
+        conference = db.create_conference(owner, "conference", "Conference")
+        other = db.create_conference(owner, "other", "Other")
+        db.join(conference, member)
+        members = db.members[conference.id]
+        path = f"/{conference.id}/members/bulk"
+        async with served(db) as client:
+            headers = await login(client, owner)
+            added = await call(client, headers, "POST", path, {
+                "invitees": [
+                    "nobody", member.id, other.id, "invitee", invitee.id
+                ]
+            })
+            nos = [
+                members.find(member.id).no, 100,
+                members.find(invitee.id).no, members.find(member.id).no,
+            ]
+            removed = await call(
+                client, headers, "POST", path + "/remove", {"members": nos}
+            )
+        present = [
+            participation.actor.id for participation in members.page(0, 10)
+        ]
+        return added, removed, nos, present, (owner, member, invitee, other)
+
+    added, removed, nos, present, entities = asyncio.run(scenario())
+    owner, member, invitee, other = entities
+    status, body = added
+    assert status == 200
+    assert [result["error"] for result in body["response"]] == [
+        "'nobody' does not exists",
+        "'member' is a member already",
+        f"'{other.id}' is a conference",
+        None,
+        "'invitee' is a member already",
+    ]
+    assert body["response"][3]["value"]["no"] == nos[2]
+    status, body = removed
+    assert status == 200
+    assert [result["error"] for result in body["response"]] == [
+        None, "Member #100 does not exists", None, None
+    ]
+    removed_nos = [
+        result["value"]["no"] if result["value"] else None
+        for result in body["response"]
+    ]
+    assert removed_nos == [nos[0], None, nos[2], nos[0]]
+    assert present == [owner.id]
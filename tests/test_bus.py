@@ -0,0 +1,62 @@
+import asyncio
+from pathlib import Path
+
+from microchat.bus import client
+from microchat.bus import BusClient
+from microchat.bus.framing import iter_records, payload
+from microchat.core.events import EventStream, MembersAdded
+
+
+def test_too_large_event_is_dropped(monkeypatch):
+    monkeypatch.setattr(client, "MAX_FRAME_SIZE", 64)
+
+    async def scenario():
+        bus, writer = _connected_bus()
+        await bus.publish(MembersAdded(10, list(range(1000, 1100))))
+        await bus.publish(MembersAdded(10, [1]))
+        bus.flush()
+        return bus, writer.frames
+
+    bus, frames = asyncio.run(scenario())
+    assert [_decoded(bus, frame) for frame in frames] == [
+        [MembersAdded(10, [1])]
+    ]
+
+
+def test_batch_is_sent_before_it_overflows_frame(monkeypatch):
+    monkeypatch.setattr(client, "MAX_FRAME_SIZE", 64)
+
+    async def scenario():
+        bus, writer = _connected_bus()
+        for conference in range(20):
+            await bus.publish(MembersAdded(conference, [1, 2]))
+        bus.flush()
+        return bus, writer.frames
+
+    bus, frames = asyncio.run(scenario())
+    assert len(frames) > 1
+    assert all(len(payload(frame)) <= 64 for frame in frames)
+    events = [event for frame in frames for event in _decoded(bus, frame)]
+    assert events == [
+        MembersAdded(conference, [1, 2]) for conference in range(20)
+    ]
+
+
+class FakeWriter:
+
+    def __init__(self):
+        self.frames = []
+
+    def write(self, data):
+        self.frames.append(data)
+
+
+def _connected_bus():
+    bus = BusClient(Path("unused"), EventStream())
+    writer = bus._writer = FakeWriter()
+    return bus, writer
+
+
+def _decoded(bus, frame):
+    records = iter_records(payload(frame))
+    return [bus.codec.decode(record) for record in records]
@@ -0,0 +1,78 @@
+import asyncio
+import random
+
+from microchat.storages.memory import MemoryDatabase, chat_list
+from microchat.storages.memory.chat_list import ChatList
+
+from .client import PASSWORD, call, login, served
+
+
+def test_page_is_latest_first_across_chunks(monkeypatch):
+    monkeypatch.setattr(chat_list, "CHUNK_SIZE", 4)
+    chats = {id: Chat(random.random()) for id in range(100)}
+    chats_list = ChatList()
+    for id, chat in chats.items():
+        chats_list.add(id, chat)
+    for id in random.sample(sorted(chats), 60):
+        chats[id].last_activity = random.random()
+        chats_list.move(id, chats[id])
+    for id in random.sample(sorted(chats), 20):
+        chats_list.discard(id)
+        del chats[id]
+    expected = sorted(chats, key=lambda id: (chats[id].last_activity, id))
+    expected.reverse()
+    assert len(chats_list.order.chunks) > 1
+    assert chats_list.page(0, 100) == expected
+    assert chats_list.page(13, 20) == expected[13:33]
+    assert chats_list.page(75, 20) == expected[75:]
+    assert chats_list.page(-5, 3) == expected[:3]
+
+
+def test_touch_raises_chat_to_time_of_joining():
+    chats_list = ChatList()
+    chats_list.add(1, Chat(1.0))
+    chats_list.add(2, Chat(2.0))
+    chats_list.add(3, Chat(0.5), since=3.0)
+    assert chats_list.page(0, 10) == [3, 2, 1]
+    chats_list.touch(1, 5.0)
+    assert chats_list.page(0, 10) == [1, 3, 2]
+
+
+def test_large_chats_are_merged_by_activity():
+    chats_list = ChatList()
+    large = Chat(1.5)
+    chats_list.add(1, Chat(1.0))
+    chats_list.add(2, Chat(2.0))
+    chats_list.add_large(3, large)
+    assert chats_list.page(0, 10) == [2, 3, 1]
+    large.last_activity = 3.0
+    assert chats_list.page(0, 2) == [3, 2]
+    assert chats_list.page(1, 10) == [2, 1]
+    assert chats_list.after(2.0) == [3, 2]
+
+
+def test_chats_are_paged_without_query():
+    async def scenario():
+        db = MemoryDatabase()
+        owner = db.create_user("owner", PASSWORD, "Owner")
+        for no in range(25):
+            other = db.create_user(f"other{no}", PASSWORD, f"Other {no}")
+            dialog = db.dialog(owner, other)
+            dialog.log.append(db.next_message_id(), other, "text")
+        async with served(db) as client:
+            headers = await login(client, owner)
+            first = await call(client, headers, "GET", "/chats/")
+            last = await call(client, headers, "GET", "/chats/?offset=20")
+        return first, last
+
+    (status, first), (last_status, last) = asyncio.run(scenario())
+    assert status == last_status == 200
+    assert len(first["response"]) == 20
+    assert len(last["response"]) == 5
+
+
+class Chat:
+
+    def __init__(self, last_activity):
+        self.last_activity = last_activity
+        self.last_change = 0
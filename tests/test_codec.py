@@ -0,0 +1,90 @@
+import dataclasses
+from datetime import datetime as dt, timezone
+
+import pytest
+
+from microchat.bus.codec import EventCodec, read_varint, write_varint
+from microchat.core.events import Event, MembersAdded
+
+
+INTS = [
+    0, 1, -1, 63, -64, 64, -65, 2**31 - 1, -2**31,
+    2**63 - 1, -2**63, 2**63, -2**63 - 1, 2**100,
+]
+
+
+@pytest.mark.parametrize("value", [0, 1, 127, 128, 2**14 - 1, 2**14, 2**64])
+def test_varint_round_trip(value):
+    buffer = bytearray(b"x")
+    write_varint(buffer, value)
+    assert read_varint(memoryview(bytes(buffer)), 1) == (value, len(buffer))
+
+
+def test_varint_sizes():
+    sizes = [(0, 1), (127, 1), (128, 2), (2**14 - 1, 2), (2**14, 3)]
+    for value, size in sizes:
+        buffer = bytearray()
+        write_varint(buffer, value)
+        assert len(buffer) == size
+
+
+@pytest.mark.parametrize("value", INTS)
+def test_ints_round_trip(value):
+    decoded = _round_trip(Values(value))
+    assert decoded.value == value
+    assert type(decoded.value) is int
+
+
+def test_small_ints_are_small():
+    codec = EventCodec()
+    # kind, layout, tag and one byte of zigzag varint
+    assert len(codec.encode(Values(-64))) == 4 + 1 + 1 + 1
+    assert len(codec.encode(Values(64))) == 4 + 1 + 1 + 2
+
+
+@pytest.mark.parametrize("value", [
+    None, True, False, 0.5, -0.0, "", "текст", b"\x00\xff",
+    [1, "a", [None]], {"a": 1, "b": {"c": [2.5]}},
+    dt(2024, 1, 2, 3, 4, 5, 6, tzinfo=timezone.utc),
+    {1: "not str key"}, (1, 2),
+])
+def test_values_round_trip(value):
+    decoded = _round_trip(Values(value)).value
+    if isinstance(value, tuple):
+        # tuples are sent as lists
+        value = list(value)
+    assert decoded == value
+    assert type(decoded) is type(value)
+
+
+def test_dataclass_event_round_trip():
+    event = MembersAdded(10, [1, 2, 3])
+    assert _round_trip(event) == event
+
+
+def test_plain_event_round_trip():
+    event = PlainEvent()
+    event.conference = 10
+    event.actors = [-1, 2**40]
+    decoded = _round_trip(event)
+    assert type(decoded) is PlainEvent
+    assert vars(decoded) == vars(event)
+
+
+def test_new_codec_decodes_kinds_it_has_not_met():
+    record = EventCodec().encode(MembersAdded(10, [1]))
+    assert EventCodec().decode(record) == MembersAdded(10, [1])
+
+
+@dataclasses.dataclass
+class Values(Event):
+    value: object
+
+
+class PlainEvent(Event):
+    pass
+
+
+def _round_trip(event):
+    codec = EventCodec()
+    return codec.decode(codec.encode(event))
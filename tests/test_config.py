@@ -0,0 +1,67 @@
+from pathlib import Path
+
+import pytest
+import tomlkit
+
+from microchat.config import Config, ConfigError
+
+
+AUTH = {"auth": {"jwt_secret": "secret"}}
+SHIPPED = Path(__file__).parent.parent / "config.toml"
+
+
+def test_shipped_config_requires_own_secret():
+    with SHIPPED.open() as file:
+        document = tomlkit.load(file)
+    with pytest.raises(ConfigError, match="'auth.jwt_secret'"):
+        Config.from_mapping(document)
+    document["auth"]["jwt_secret"] = "secret"
+    assert Config.from_mapping(document).auth.jwt_secret == "secret"
+
+
+@pytest.mark.parametrize("mapping, message", [
+    ({"unknown": {}}, "Unknown section 'unknown'"),
+    ({"server": {"unknown": 1}}, "Unknown option 'server.unknown'"),
+    ({"server": []}, "'server' must be a table"),
+    ({"server": {"port": "80"}}, "'server.port' must be an integer"),
+    ({"server": {"port": True}}, "'server.port' must be an integer"),
+    ({"server": {"port": 0}}, "'server.port' must be at least 1"),
+    ({"storage": {"backend": "sql"}}, "'storage.backend' must be one of"),
+    ({"media": {"temp_dir": 1}}, "'media.temp_dir' must be a path"),
+    ({"metrics": {"tracing": 1}}, "'metrics.tracing' must be a boolean"),
+    (
+        {"metrics": {"slow_threshold": -1}},
+        "'metrics.slow_threshold' must be at least 0"
+    ),
+    (
+        {"metrics": {"kept_traces": 0}},
+        "'metrics.kept_traces' must be at least 1"
+    ),
+    ({"metrics": {"enabled": True}}, "'metrics.token' is required"),
+    ({"metrics": {"tracing": True}}, "'metrics.token' is required"),
+    (
+        {"storage": {"pool_min_size": 5, "pool_max_size": 2}},
+        "'storage.pool_min_size' is greater than 'storage.pool_max_size'"
+    ),
+])
+def test_invalid_options_are_reported(mapping, message):
+    with pytest.raises(ConfigError, match=message):
+        Config.from_mapping({**AUTH, **mapping})
+
+
+def test_secret_is_required():
+    with pytest.raises(ConfigError, match="'auth.jwt_secret' is required"):
+        Config.from_mapping({})
+    with pytest.raises(ConfigError, match="'auth.jwt_secret' must not be"):
+        Config.from_mapping({"auth": {"jwt_secret": ""}})
+
+
+def test_numbers_and_paths_are_converted():
+    config = Config.from_mapping({
+        **AUTH, "media": {"temp_dir": "/tmp/uploads", "root": ""},
+        "rate_limits": {"rate": 5},
+    })
+    assert config.rate_limits.rate == 5.0
+    assert type(config.rate_limits.rate) is float
+    assert config.media.temp_dir == Path("/tmp/uploads")
+    assert config.media.root is None
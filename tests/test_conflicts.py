@@ -0,0 +1,49 @@
+import asyncio
+
+from microchat.storages.memory import MemoryDatabase
+
+from .client import PASSWORD, call, login, served
+
+
+def test_taken_alias_is_conflict():
+    async def scenario():
+        db = MemoryDatabase()
+        user = db.create_user("user", PASSWORD, "User")
+        db.create_user("taken", PASSWORD, "Taken")
+        async with served(db) as client:
+            headers = await login(client, user)
+            edit = {"method": "PATCH", "path": "/entities/self"}
+            single = await call(
+                client, headers, "PATCH", "/entities/self", {"alias": "taken"}
+            )
+            batch = await call(client, headers, "POST", "/batch", {
+                "requests": [
+                    {**edit, "body": {"alias": "taken"}},
+                    {**edit, "body": {"alias": "free"}},
+                ]
+            })
+        return single, batch, user.alias
+
+    single, (status, body), alias = asyncio.run(scenario())
+    assert single[0] == 409, single
+    assert status == 200
+    assert [item["status"] for item in body["response"]] == [409, 200]
+    assert alias == "free"
+
+
+def test_member_invited_again_is_conflict():
+    async def scenario():
+        db = MemoryDatabase()
+        owner = db.create_user("owner", PASSWORD, "Owner")
+        member = db.create_user("member", PASSWORD, "Member")
+        conference = db.create_conference(owner, "conference", "Conference")
+        db.join(conference, member)
+        async with served(db) as client:
+            headers = await login(client, owner)
+            return await call(
+                client, headers, "POST", f"/{conference.id}/members",
+                {"invitee_id": member.id}
+            )
+
+    status, _ = asyncio.run(scenario())
+    assert status == 409
@@ -0,0 +1,33 @@
+from microchat.core.entities import Bot, Conference, User
+from microchat.storages.memory import MemoryDatabase
+from microchat.storages.memory.directory import MAX_CANDIDATES
+
+
+def test_exact_alias_is_found_among_many_equal_names():
+    db = MemoryDatabase()
+    for no in range(MAX_CANDIDATES + 100):
+        db.create_user(f"user{no}", "password", name="bob")
+    bob = db.create_user("bob", "password")
+    found = db.directory.search("bob", (User,), 20)
+    assert found[0] is bob
+    assert len(found) == 20
+
+
+def test_exact_alias_is_found_case_insensitively():
+    db = MemoryDatabase()
+    bob = db.create_user("Bob", "password")
+    assert db.directory.search("bob", (User,), 20) == [bob]
+
+
+def test_search_skips_other_kinds_within_scan_bound():
+    db = MemoryDatabase()
+    for no in range(MAX_CANDIDATES + 100):
+        db.create_user(f"user{no}", "password", name="bob")
+    assert db.directory.search("bob", (Bot, Conference), 20) == []
+
+
+def test_removed_entity_is_not_found_by_alias():
+    db = MemoryDatabase()
+    bob = db.create_user("bob", "password")
+    db.directory.discard(bob)
+    assert db.directory.search("bob", (User,), 20) == []
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from microchat.api_utils.handler import inject_services
+from microchat.api_utils.response import APIResponse
+from microchat.config import Config
+from microchat.core.events import EventStream, MembersAdded, MembersRemoved
+from microchat.core.events import Subscription
+from microchat.core.jwt_manager import JWTManager
+from microchat.services import Flights
+from microchat.storages import UoW
+
+
+def test_subscriber_gets_events_of_own_conferences_only():
+    async def scenario():
+        stream = EventStream()
+        member = stream.subscribe(Subscription(1, [10]))
+        stranger = stream.subscribe(Subscription(2, []))
+        stream.deliver(MembersAdded(10, [3]))
+        stream.deliver(MembersAdded(20, [3]))
+        return member.qsize(), stranger.qsize()
+
+    assert asyncio.run(scenario()) == (1, 0)
+
+
+def test_subscription_follows_membership_of_its_user():
+    subscription = Subscription(1, [])
+    assert subscription.accepts(MembersAdded(10, [1]))
+    assert subscription.accepts(MembersAdded(10, [2]))
+    assert subscription.accepts(MembersRemoved(10, [1]))
+    assert not subscription.accepts(MembersAdded(10, [2]))
+    assert not subscription.accepts(MembersRemoved(10, [2]))
+
+
+def test_stream_without_subscription_gets_all_events():
+    async def scenario():
+        stream = EventStream()
+        queue = stream.subscribe()
+        stream.deliver(MembersAdded(10, [3]))
+        return queue.qsize()
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_events_are_dispatched_after_commit():
+    async def scenario():
+        stream = EventStream()
+        queue = stream.subscribe()
+        await _announcing(UoW, stream)(None)
+        return queue.qsize()
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_events_of_failed_commit_are_not_dispatched():
+    async def scenario():
+        stream = EventStream()
+        queue = stream.subscribe()
+        with pytest.raises(RuntimeError):
+            await _announcing(FailingCommitUoW, stream)(None)
+        return queue.qsize()
+
+    assert asyncio.run(scenario()) == 0
+
+
+class FailingCommitUoW(UoW):
+
+    async def __aexit__(self, exc_type, exc, tb):
+        raise RuntimeError("commit failed")
+
+
+def _announcing(uow_factory, stream):
+    async def executor(request, services):
+        services.outbox.add(MembersAdded(10, [1]))
+        return APIResponse(None)
+
+    return inject_services(
+        executor, uow_factory, Flights(), JWTManager("secret"), stream,
+        Config()
+    )
@@ -0,0 +1,51 @@
+import pytest
+
+from microchat.storages.memory.history import History, diff, patch
+
+
+TEXTS = [
+    ("", ""), ("", "new"), ("old", ""), ("same", "same"),
+    ("hello world", "hello there world"), ("abcabc", "abc"),
+    ("aaaa", "aaaaa"), ("prefix middle", "prefix"),
+    ("suffix", "new suffix"), ("текст 🙂", "текст 🙃!"),
+    (None, "text"), ("text", None), (None, None),
+]
+
+
+@pytest.mark.parametrize("old, new", TEXTS)
+def test_delta_turns_new_text_back_to_old(old, new):
+    assert patch(new, diff(old, new)) == old
+
+
+def test_delta_keeps_changed_middle_only():
+    old = "a long common prefix, old part, a long common suffix"
+    new = "a long common prefix, new part, a long common suffix"
+    start, end, middle = diff(old, new)
+    assert middle == "old"
+    assert new[start:end] == "new"
+
+
+def test_versions_are_restored_back_from_latest():
+    history = History()
+    texts = ["first", "first edit", None, "third", "third edit"]
+    medias = [("a",), ("a",), ("b",), ("b",), ()]
+    for no in range(1, len(texts)):
+        history.record(
+            7, float(no), texts[no - 1], texts[no],
+            medias[no - 1] if medias[no - 1] != medias[no] else None
+        )
+    versions = history.versions(7, 0.0, texts[-1], medias[-1])
+    assert history.count(7) == len(texts)
+    assert versions == [
+        (float(no), texts[no], medias[no]) for no in reversed(range(5))
+    ]
+    assert history.versions(7, 0.0, texts[-1], medias[-1], stop=3) == \
+        versions[:2]
+
+
+def test_discard_returns_kept_attachments():
+    history = History()
+    history.record(1, 1.0, "a", "b", ["media"])
+    history.record(1, 2.0, "b", "c", None)
+    assert history.discard(1) == ["media"]
+    assert history.count(1) == 1
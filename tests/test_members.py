@@ -0,0 +1,78 @@
+import asyncio
+
+from microchat.storages.memory import MemoryDatabase, members
+
+from .client import PASSWORD, call, login, served
+
+
+def test_page_skips_members_who_left(monkeypatch):
+    monkeypatch.setattr(members, "SHARD_SIZE", 4)
+    db, conference, actors = _conference(20)
+    index = db.members[conference.id]
+    for actor in actors[2:11]:
+        db.leave(index.find(actor.id))
+    present = [index.get(0)] + [
+        index.find(actor.id) for actor in actors[:2] + actors[11:]
+    ]
+    assert len(index) == len(present) == 12
+    assert index.page(0, 20) == present
+    assert index.page(1, 3) == present[1:4]
+    assert index.page(2, 4) == present[2:6]
+    assert index.page(10, 5) == present[10:]
+    assert index.page(12, 5) == []
+
+
+def test_page_filters_by_role(monkeypatch):
+    monkeypatch.setattr(members, "SHARD_SIZE", 4)
+    db, conference, actors = _conference(0)
+    index = db.members[conference.id]
+    roles = ["admin" if no % 3 == 0 else "member" for no in range(15)]
+    for no, role in enumerate(roles):
+        actor = db.create_user(f"actor{no}", PASSWORD, f"Actor {no}")
+        db.join(conference, actor, role)
+        actors.append(actor)
+    db.leave(index.find(actors[4].id))
+    admins = [
+        index.find(actor.id) for actor, role in zip(actors, roles)
+        if role == "admin"
+    ]
+    assert index.count("admin") == len(admins) == 5
+    assert index.count("member") == 9
+    assert index.count("owner") == 1
+    assert index.count("guest") == 0
+    assert index.page(0, 10, "admin") == admins
+    assert index.page(2, 2, "admin") == admins[2:4]
+    assert index.page(0, 10, "guest") == []
+    assert [member.role for member in index.page(3, 4, "member")] == [
+        "member"
+    ] * 4
+
+
+def test_members_are_paged_by_role_without_offset():
+    async def scenario():
+        db, conference, actors = _conference(30)
+        index = db.members[conference.id]
+        db.leave(index.find(actors[0].id))
+        async with served(db) as client:
+            headers = await login(client, actors[1])
+            path = f"/{conference.id}/members"
+            everyone = await call(client, headers, "GET", path)
+            owners = await call(client, headers, "GET", path + "?role=owner")
+        return everyone, owners
+
+    (status, everyone), (owners_status, owners) = asyncio.run(scenario())
+    assert status == owners_status == 200
+    assert len(everyone["response"]) == 20
+    assert len(owners["response"]) == 1
+
+
+def _conference(size):
+    db = MemoryDatabase()
+    owner = db.create_user("owner", PASSWORD, "Owner")
+    conference = db.create_conference(owner, "conference", "Conference")
+    actors = []
+    for no in range(size):
+        actor = db.create_user(f"member{no}", PASSWORD, f"Member {no}")
+        db.join(conference, actor)
+        actors.append(actor)
+    return db, conference, actors
@@ -0,0 +1,182 @@
+import asyncio
+import time
+
+import pytest
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from microchat.api_utils.instrumentation import Instrumentation, Stage
+from microchat.api_utils.request import APIRequest
+from microchat.api_utils.response import APIResponse, DEFAULT_JSON_DUMPER
+from microchat.app import app
+from microchat.app.rendering import renderer
+from microchat.app.routes import APIEndpoints
+from microchat.config import Config, MetricsConfig
+from microchat.core.events import EventStream
+from microchat.core.jwt_manager import JWTManager
+from microchat.metrics import LoopMonitor, Registry
+from microchat.metrics.registry import DuplicateMetric
+from microchat.storages import UoW
+from microchat.storages.memory import MemoryDatabase, MemoryUoW
+
+from .client import served
+
+
+COMMIT_SECONDS = 0.05
+
+
+def test_exposition_of_each_kind():
+    registry = Registry()
+    requests = registry.counter("requests", "Requests", labels=("route",))
+    requests.inc("GET /chats/")
+    requests.inc("GET /chats/", amount=2)
+    requests.inc('say "hi"\n')
+    registry.gauge("streams", "Open streams").set(1.5)
+    latency = registry.histogram("latency", "Latency", buckets=(.1, 1))
+    for value in (.05, .1, .5, 5):
+        latency.observe(value)
+    registry.callback(
+        "flights", "Flights", "counter", lambda: {("chats", ): 4},
+        labels=("group", )
+    )
+    assert registry.exposition() == "\n".join([
+        "# HELP microchat_requests Requests",
+        "# TYPE microchat_requests counter",
+        'microchat_requests_total{route="GET /chats/"} 3',
+        'microchat_requests_total{route="say \\"hi\\"\\n"} 1',
+        "# HELP microchat_streams Open streams",
+        "# TYPE microchat_streams gauge",
+        "microchat_streams 1.5",
+        "# HELP microchat_latency Latency",
+        "# TYPE microchat_latency histogram",
+        'microchat_latency_bucket{le="0.1"} 2',
+        'microchat_latency_bucket{le="1"} 3',
+        'microchat_latency_bucket{le="+Inf"} 4',
+        "microchat_latency_sum 5.65",
+        "microchat_latency_count 4",
+        "# HELP microchat_flights Flights",
+        "# TYPE microchat_flights counter",
+        'microchat_flights_total{group="chats"} 4',
+        "",
+    ])
+
+
+def test_metric_names_and_labels_are_checked():
+    registry = Registry()
+    counter = registry.counter("requests", "Requests", labels=("route",))
+    with pytest.raises(DuplicateMetric):
+        registry.gauge("requests", "Requests")
+    with pytest.raises(ValueError, match="expects labels"):
+        counter.inc()
+
+
+def test_loop_monitor_logs_blocking_code(caplog):
+    registry = Registry()
+
+    async def scenario():
+        monitor = LoopMonitor(registry, interval=0.01, block_threshold=0.05)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        _block_loop()
+        await asyncio.sleep(0.05)
+        tasks = registry.exposition()
+        await monitor.stop()
+        return monitor, tasks
+
+    monitor, exposition = asyncio.run(scenario())
+    blocked = [
+        record.getMessage() for record in caplog.records
+        if record.name == "microchat.loop.blocking"
+    ]
+    assert len(blocked) == 1
+    assert "_block_loop" in blocked[0]
+    assert "microchat_event_loop_blocks_total 1\n" in exposition
+    # the scenario and the sampler
+    assert "microchat_event_loop_tasks 2\n" in exposition
+    assert 'microchat_event_loop_lag_seconds_bucket{le="+Inf"}' in exposition
+
+
+def test_metrics_require_token():
+    config = Config(metrics=MetricsConfig(enabled=True, token="token"))
+
+    async def scenario():
+        registry = Registry()
+        application = await app(
+            lambda: MemoryUoW(MemoryDatabase()), JWTManager("secret"),
+            config=config, metrics=registry
+        )
+        statuses = []
+        async with TestClient(TestServer(application)) as client:
+            for headers in (
+                {}, {"Authorization": "Bearer other"},
+                {"Authorization": "Bearer token"},
+            ):
+                async with client.get(
+                    "/api/metrics", headers=headers
+                ) as response:
+                    statuses.append(response.status)
+        return statuses
+
+    assert asyncio.run(scenario()) == [401, 401, 200]
+
+
+def test_metrics_are_off_by_default():
+    async def scenario():
+        async with served(MemoryDatabase()) as client:
+            async with client.get("/api/metrics") as response:
+                return response.status
+
+    assert Config().metrics.enabled is False
+    assert asyncio.run(scenario()) == 404
+
+
+def test_execute_stage_excludes_commit():
+    async def scenario():
+        stages = RecordingStages()
+        routes = APIEndpoints(
+            SlowCommitUoW, JWTManager("secret"), EventStream(), Config(),
+            renderer(DEFAULT_JSON_DUMPER), stages
+        )
+        routes.add_route("GET", "/ok", _ok, _no_params)
+        routes.add_batch_route("/batch")
+        application = web.Application(router=routes._router)
+        async with TestClient(TestServer(application)) as client:
+            async with client.get("/ok") as response:
+                assert response.status == 200
+            batch = {"requests": [{"method": "GET", "path": "/ok"}]}
+            async with client.post("/batch", json=batch) as response:
+                assert response.status == 200
+        return stages.seconds
+
+    seconds = asyncio.run(scenario())
+    for route in "GET /ok", "POST /batch":
+        assert seconds[route, Stage.EXECUTE] < COMMIT_SECONDS
+        assert seconds[route, Stage.COMMIT] >= COMMIT_SECONDS
+
+
+class RecordingStages(Instrumentation):
+
+    def __init__(self):
+        self.seconds = {}
+
+    def observe_stage(self, route, stage, seconds):
+        self.seconds[route, stage] = seconds
+
+
+class SlowCommitUoW(UoW):
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await asyncio.sleep(COMMIT_SECONDS)
+
+
+async def _ok(request, services):
+    return APIResponse("ok")
+
+
+async def _no_params(request):
+    return APIRequest()
+
+
+def _block_loop():
+    time.sleep(0.3)
@@ -0,0 +1,41 @@
+import asyncio
+
+from microchat.storages.memory import MemoryDatabase
+
+from .client import PASSWORD, call, login, served
+
+
+def test_lists_are_paged_without_query():
+    async def scenario():
+        db = MemoryDatabase()
+        owner = db.create_user("owner", PASSWORD, "Owner")
+        other = db.create_user("other", PASSWORD, "Other")
+        conference = db.create_conference(owner, "conference", "Conference")
+        db.join(conference, other)
+        dialog = db.dialog(owner, other)
+        for no in range(30):
+            dialog.log.append(db.next_message_id(), owner, f"text {no}")
+        paths = [
+            "/auth/sessions", "/chats/", f"/chats/{other.id}/messages",
+            f"/chats/{other.id}/messages/photos", f"/{conference.id}/members",
+            f"/entities/{other.id}/avatars",
+        ]
+        async with served(db) as client:
+            headers = await login(client, owner)
+            results = {}
+            for path in paths:
+                results[path] = await call(client, headers, "GET", path)
+            requests = [{"method": "GET", "path": path} for path in paths]
+            batch = await call(
+                client, headers, "POST", "/batch", {"requests": requests}
+            )
+        return paths, results, batch
+
+    paths, results, batch = asyncio.run(scenario())
+    for path in paths:
+        assert results[path][0] == 200, (path, results[path])
+    messages = results[paths[2]][1]["response"]
+    assert len(messages) == 20
+    status, body = batch
+    assert status == 200
+    assert [item["status"] for item in body["response"]] == [200] * 6
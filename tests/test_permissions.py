@@ -0,0 +1,117 @@
+import asyncio
+from datetime import datetime as dt
+
+from microchat.core.entities import Permissions
+from microchat.storages.memory import MemoryDatabase, MemoryUoW, permissions
+
+from .client import PASSWORD
+
+
+READ, SEND = Permissions.of("read"), Permissions.of("send")
+
+
+def test_own_permissions_edit_drops_cached_entry():
+    db, conference, member = _conference()
+    uow = MemoryUoW(db)
+
+    async def scenario():
+        before = await _permissions(uow, member)
+        await uow.conferences.update_permissions(member, READ)
+        return before, await _permissions(uow, member)
+
+    before, after = asyncio.run(scenario())
+    assert before & SEND
+    assert after == READ
+
+
+def test_default_permissions_edit_drops_entries_of_conference():
+    db, conference, member = _conference()
+    uow = MemoryUoW(db)
+
+    async def scenario():
+        before = await _permissions(uow, member)
+        await uow.entities.edit_entity(
+            conference, {"default_permissions": READ}
+        )
+        return before, await _permissions(uow, member)
+
+    before, after = asyncio.run(scenario())
+    assert before & SEND
+    assert after == READ
+
+
+def test_role_change_by_rejoining_is_not_served_from_cache():
+    # role of a participation is fixed, it changes by leaving and joining
+    # again, the new participation must not get permissions of the old one
+    db, conference, member = _conference()
+    uow = MemoryUoW(db)
+    actor = member.actor
+
+    async def scenario():
+        await uow.conferences.update_permissions(member, READ)
+        before = await _permissions(uow, member)
+        db.leave(member)
+        admin = db.join(conference, actor, "admin")
+        return before, await _permissions(uow, admin)
+
+    before, after = asyncio.run(scenario())
+    assert before == READ
+    assert after == conference.default_permissions
+
+
+def test_member_removal_drops_cached_entry():
+    db, conference, member = _conference()
+    uow = MemoryUoW(db)
+
+    async def scenario():
+        await _permissions(uow, member)
+        await uow.conferences.remove_members([member])
+
+    asyncio.run(scenario())
+    assert (member.actor.id, conference.id) not in db.permissions.entries
+
+
+def test_restriction_is_lifted_when_it_expires(monkeypatch):
+    db, conference, member = _conference()
+    clock = Clock(1000.0)
+    monkeypatch.setattr(permissions, "time", clock)
+    member.restrictions = [Restriction(1100.0, 1200.0, SEND)]
+    cache = db.permissions
+    assert cache.get(member) & SEND
+    clock.now = 1100.0
+    assert not cache.get(member) & SEND
+    assert cache.get(member) & READ
+    clock.now = 1199.0
+    assert not cache.get(member) & SEND
+    clock.now = 1200.0
+    assert cache.get(member) & SEND
+    assert len(cache) == 1
+
+
+class Clock:
+
+    def __init__(self, now):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+class Restriction:
+
+    def __init__(self, since, to, denied):
+        self.since = dt.fromtimestamp(since)
+        self.to = dt.fromtimestamp(to)
+        self.denied = denied
+
+
+def _conference():
+    db = MemoryDatabase()
+    owner = db.create_user("owner", PASSWORD, "Owner")
+    user = db.create_user("user", PASSWORD, "User")
+    conference = db.create_conference(owner, "conference", "Conference")
+    return db, conference, db.join(conference, user)
+
+
+async def _permissions(uow, member):
+    return await uow.relations.get_permissions(member)
@@ -0,0 +1,115 @@
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import make_mocked_request
+
+from microchat.app.router import TrieRouter
+
+
+ROUTES = [
+    ("GET", "/chats/"),
+    ("GET", "/chats/{chat_no:\\d+}"),
+    ("GET", "/chats/{alias:\\w+}"),
+    ("GET", "/chats/{chat_no:\\d+}/messages/{message_no:\\d+}"),
+    ("PATCH", "/chats/{chat_no:\\d+}/messages/{message_no:\\d+}"),
+    ("GET", "/media/{hash:[\\da-fA-F]+}"),
+    ("GET", "/media/{hash:[\\da-fA-F]+}/content"),
+    ("GET", "/chats/{chat_no:\\d+}/media/{type:(image|video)}s"),
+    ("GET", "/files/{name}.{extension}"),
+]
+
+PATHS = [
+    ("GET", "/chats/"),
+    ("GET", "/chats/12"),
+    ("GET", "/chats/some_alias"),
+    ("GET", "/chats/12/messages/3"),
+    ("PATCH", "/chats/12/messages/3"),
+    ("DELETE", "/chats/12/messages/3"),
+    ("GET", "/chats/12/messages/x"),
+    ("GET", "/media/9f86d0"),
+    ("GET", "/media/9f86d0/content"),
+    ("GET", "/media/not-hex"),
+    ("GET", "/chats/12/media/images"),
+    ("GET", "/chats/12/media/audios"),
+    ("GET", "/files/report.txt"),
+    ("GET", "/chats/%D0%B0%D0%B1"),
+    ("GET", "/nothing/here"),
+    ("GET", "/chats"),
+]
+
+
+def test_trie_resolves_as_url_dispatcher():
+    trie = _router(TrieRouter(), ROUTES)
+    linear = _router(web.UrlDispatcher(), ROUTES)
+    for method, path in PATHS:
+        trie_info, linear_info = asyncio.run(
+            _resolve(trie, linear, method, path)
+        )
+        assert _resolution(trie_info) == _resolution(linear_info), path
+
+
+def test_earlier_route_wins_as_in_url_dispatcher():
+    routes = [("GET", "/entities/{alias:\\w+}"), ("GET", "/entities/self")]
+    trie = _router(TrieRouter(), routes)
+    linear = _router(web.UrlDispatcher(), routes)
+    trie_info, linear_info = asyncio.run(
+        _resolve(trie, linear, "GET", "/entities/self")
+    )
+    assert _resolution(trie_info) == _resolution(linear_info)
+
+
+def test_later_route_of_method_wins_as_in_url_dispatcher():
+    routes = [
+        ("GET", "/entities/{alias:\\w+}"), ("POST", "/entities/self"),
+        ("*", "/any/{name}"), ("GET", "/any/thing"),
+    ]
+    trie = _router(TrieRouter(), routes)
+    linear = _router(web.UrlDispatcher(), routes)
+    for method, path in [
+        ("GET", "/entities/self"), ("POST", "/entities/self"),
+        ("PUT", "/entities/self"), ("GET", "/any/thing"),
+    ]:
+        trie_info, linear_info = asyncio.run(
+            _resolve(trie, linear, method, path)
+        )
+        assert _resolution(trie_info) == _resolution(linear_info), path
+
+
+def test_static_route_added_first_wins():
+    routes = [("GET", "/entities/self"), ("GET", "/entities/{alias:\\w+}")]
+    trie = _router(TrieRouter(), routes)
+    request = make_mocked_request("GET", "/entities/self")
+    info = asyncio.run(trie.resolve(request))
+    assert info.route.resource.canonical == "/entities/self"
+    assert dict(info) == {}
+
+
+def test_method_not_allowed_lists_methods_of_path():
+    trie = _router(TrieRouter(), ROUTES)
+    request = make_mocked_request("DELETE", "/chats/12/messages/3")
+    info = asyncio.run(trie.resolve(request))
+    assert isinstance(info.http_exception, web.HTTPMethodNotAllowed)
+    assert info.http_exception.allowed_methods == {"GET", "PATCH"}
+
+
+async def _handler(request):
+    return web.Response()
+
+
+def _router(router, routes):
+    for method, path in routes:
+        router.add_route(method, path, _handler)
+    router.freeze()
+    return router
+
+
+async def _resolve(trie, linear, method, path):
+    request = make_mocked_request(method, path)
+    return await trie.resolve(request), await linear.resolve(request)
+
+
+def _resolution(info):
+    if info.http_exception is not None:
+        error = info.http_exception
+        return type(error), getattr(error, "allowed_methods", None)
+    return info.route.method, info.route.resource.canonical, dict(info)
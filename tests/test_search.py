@@ -0,0 +1,43 @@
+from microchat.storages.memory.search import MAX_PREFIX_EXPANSION
+from microchat.storages.memory.search import MessageIndex, Vocabulary
+from microchat.storages.memory.search import parse_query
+
+
+def test_prefix_is_expanded_to_words_of_searched_chat():
+    vocabulary = Vocabulary()
+    other = MessageIndex(vocabulary)
+    for no in range(MAX_PREFIX_EXPANSION + 44):
+        other.add(no, f"ab{no}")
+    chat = MessageIndex(vocabulary)
+    chat.add(0, "abracadabra")
+    assert list(chat.search(parse_query("ab*"), 1)) == [0]
+
+
+def test_word_nobody_has_is_dropped_from_vocabulary():
+    vocabulary = Vocabulary()
+    first, second = MessageIndex(vocabulary), MessageIndex(vocabulary)
+    first.add(0, "shared only")
+    second.add(0, "shared")
+    first.discard(0, "shared only")
+    assert vocabulary.words == ["shared"]
+    second.discard(0, "shared")
+    assert vocabulary.words == []
+    assert not vocabulary.known
+
+
+def test_word_of_edited_message_stays_while_other_message_has_it():
+    index = MessageIndex()
+    index.add(0, "hello")
+    index.add(1, "hello world")
+    index.discard(1, "hello world")
+    assert index.vocabulary.words == ["hello"]
+    assert list(index.search(parse_query("hel*"), 2)) == [0]
+
+
+def test_terms_are_intersected_newest_first():
+    index = MessageIndex()
+    for no, text in enumerate(["red apple", "green apple", "red car"]):
+        index.add(no, text)
+    assert list(index.search(parse_query("red"), 3)) == [2, 0]
+    assert list(index.search(parse_query("apple red"), 3)) == [0]
+    assert list(index.search(parse_query("APP* r*"), 3)) == [0]
@@ -0,0 +1,52 @@
+import asyncio
+
+from microchat.core.entities import Permissions
+from microchat.storages.memory import MemoryDatabase
+
+from .client import PASSWORD, call, login, served
+
+def test_each_message_has_own_result():
+    async def scenario():
+        db = MemoryDatabase()
+        user = db.create_user("user", PASSWORD, "User")
+        other = db.create_user("other", PASSWORD, "Other")
+        db.dialog(user, other)
+        owner = db.create_user("owner", PASSWORD, "Owner")
+        open_ = db.create_conference(owner, "open", "Open")
+        db.join(open_, user)
+        muted = db.create_conference(owner, "muted", "Muted")
+        db.join(muted, user).permissions = Permissions.of("read")
+        stranger = db.create_conference(owner, "stranger", "Stranger")
+        messages = [
+            {"chat": other.id, "text": "to dialog"},
+            {"chat": "nobody", "text": "to unknown"},
+            {"chat": muted.id, "text": "to muted"},
+            {"chat": stranger.id, "text": "to stranger"},
+            {"chat": "open", "text": "to open"},
+        ]
+        async with served(db) as client:
+            headers = await login(client, user)
+            status, body = await call(
+                client, headers, "POST", "/chats/messages",
+                {"messages": messages}
+            )
+        logs = [
+            [chat.log.message(no).text for no in range(len(chat.log))]
+            for chat in (db.dialog(user, other), muted, stranger, open_)
+        ]
+        return status, body["response"], logs, stranger.id
+
+    status, results, logs, stranger = asyncio.run(scenario())
+    assert status == 200
+    assert [result["error"] for result in results] == [
+        None,
+        "Chat 'nobody' does not exists",
+        "Can't send message due to chat restrictions",
+        f"Chat '{stranger}' does not exists",
+        None,
+    ]
+    assert [result["value"]["text"] for result in results[::4]] == [
+        "to dialog", "to open"
+    ]
+    assert [result["value"] for result in results[1:4]] == [None] * 3
+    assert logs == [["to dialog"], [], [], ["to open"]]
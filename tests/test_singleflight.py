@@ -0,0 +1,119 @@
+import asyncio
+
+from microchat.config import MediaConfig
+from microchat.services.files import Files
+from microchat.services.general_exceptions import DoesNotExists
+from microchat.services.singleflight import Flights
+from microchat.storages import UoW
+
+
+DENIED_USER = 2
+
+def test_flight_outlives_its_first_caller_on_own_unit_of_work():
+    # callers are different users: lookup is shared, access is checked
+    # for each of them in their own unit of work
+    async def scenario():
+        release = asyncio.Event()
+        factory = RecordingUoWFactory(release)
+        flights = Flights()
+        first = Files(
+            factory(), factory, flights.media_infos, MediaConfig()
+        )
+        second = Files(
+            factory(), factory, flights.media_infos, MediaConfig()
+        )
+        first_call = asyncio.create_task(first.get_info(_User(1), "ab"))
+        second_call = asyncio.create_task(second.get_info(_User(3), "ab"))
+        await asyncio.sleep(0)
+        first_call.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return await second_call, factory.created
+
+    media, created = asyncio.run(scenario())
+    assert media.active
+    # two of request units of work and one of the flight
+    assert len(created) == 3
+    assert media.uow is created[2]
+    assert created[1].media.checked == [(3, media)]
+
+
+def test_access_is_checked_for_each_caller():
+    async def scenario():
+        release = asyncio.Event()
+        factory = RecordingUoWFactory(release)
+        users = [_User(1), _User(2)]
+        flights = Flights()
+        services = [
+            Files(factory(), factory, flights.media_infos, MediaConfig())
+            for _ in users
+        ]
+        calls = [
+            asyncio.create_task(files.get_info(user, "cd"))
+            for files, user in zip(services, users)
+        ]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        return results, factory.created
+
+    (allowed, denied), created = asyncio.run(scenario())
+    assert len(created) == 3
+    assert created[0].media.checked == [(1, allowed)]
+    assert isinstance(denied, DoesNotExists)
+
+
+class RecordingUoWFactory:
+
+    def __init__(self, release):
+        self.release = release
+        self.created = []
+
+    def __call__(self):
+        uow = RecordingUoW(self.release)
+        self.created.append(uow)
+        return uow
+
+
+class RecordingUoW(UoW):
+
+    def __init__(self, release):
+        self.active = False
+        self.media = StubMedia(self, release)
+
+    async def __aenter__(self):
+        self.active = True
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.active = False
+
+
+class StubMedia:
+
+    def __init__(self, uow, release):
+        self.uow = uow
+        self.release = release
+        self.checked = []
+
+    async def find_by_hash(self, hash):
+        await self.release.wait()
+        return _Found(self.uow, self.uow.active)
+
+    async def check_access(self, user, media):
+        if user.id == DENIED_USER:
+            raise DoesNotExists()
+        self.checked.append((user.id, media))
+
+
+class _Found:
+
+    def __init__(self, uow, active):
+        self.uow = uow
+        self.active = active
+
+
+class _User:
+
+    def __init__(self, id):
+        self.id = id
@@ -0,0 +1,66 @@
+import time
+
+from microchat.core.types import ImagesMIME, MIMEType
+from microchat.storages.memory import MemoryDatabase
+from microchat.storages.memory.sweeper import Sweeper
+
+from .client import PASSWORD
+
+
+MIME = (MIMEType.IMAGE, ImagesMIME.PNG)
+GRACE_PERIOD = 60.0
+
+
+def test_file_referenced_within_grace_period_is_kept():
+    db, user, log = _dialog()
+    attached = db.store_file(user, "attached.png", MIME, b"attached")
+    uploaded_again = db.store_file(user, "again.png", MIME, b"again")
+    orphan = db.store_file(user, "orphan.png", MIME, b"orphan")
+    log.append(db.next_message_id(), user, "", [attached])
+    sweeper = Sweeper(db, grace_period=GRACE_PERIOD)
+    uploaded_at = time.time()
+    # an upload of the same file later starts its grace period again
+    db.media_refs.orphan(_hash(uploaded_again), uploaded_at + 30)
+
+    assert sweeper.sweep(uploaded_at + GRACE_PERIOD + 1) == (1, 6)
+    assert set(db.media) == {_hash(attached), _hash(uploaded_again)}
+    assert _hash(orphan) not in db.contents
+    assert sweeper.sweep(uploaded_at + GRACE_PERIOD + 31) == (1, 5)
+    assert set(db.media) == {_hash(attached)}
+
+
+def test_orphans_are_collected_oldest_first():
+    db, user, log = _dialog()
+    medias = [
+        db.store_file(user, f"{no}.png", MIME, f"image {no}".encode())
+        for no in range(4)
+    ]
+    first, second, third, fourth = map(_hash, medias)
+    refs = db.media_refs
+    for hash, since in (first, 100), (second, 200), (third, 300):
+        refs.orphan(hash, since)
+    # released again later, it goes last
+    refs.orphan(first, 400)
+    refs.orphan(fourth, 500)
+    sweeper = Sweeper(db, grace_period=GRACE_PERIOD)
+    now = 1000.0
+
+    assert sweeper.sweep(now, limit=1)[0] == 1
+    assert second not in db.media
+    assert sweeper.sweep(now, limit=2)[0] == 2
+    assert set(db.media) == {fourth}
+    # the oldest left is younger than the grace period, sweep stops there
+    refs.orphan(fourth, now - GRACE_PERIOD / 2)
+    assert sweeper.sweep(now) == (0, 0)
+    assert sweeper.removed_files == 3
+
+
+def _dialog():
+    db = MemoryDatabase()
+    user = db.create_user("user", PASSWORD, "User")
+    other = db.create_user("other", PASSWORD, "Other")
+    return db, user, db.dialog(user, other).log
+
+
+def _hash(media):
+    return media.file_info.hash
@@ -0,0 +1,103 @@
+import asyncio
+
+from microchat.storages.memory import MemoryDatabase
+from microchat.storages.memory.storages import SYNC_MAX_MESSAGES
+
+from .client import PASSWORD, call, login, served
+
+
+def test_sync_returns_edits_deletions_and_membership_changes():
+    async def scenario():
+        db, owner, other = _users()
+        dialog = db.dialog(owner, other)
+        for text in "abc":
+            dialog.log.append(db.next_message_id(), owner, text)
+        left = db.create_conference(owner, "left", "Left")
+        member = db.join(left, other)
+        joined = db.create_conference(owner, "joined", "Joined")
+        db.create_conference(owner, "quiet", "Quiet")
+        async with served(db) as client:
+            owner_headers = await login(client, owner)
+            headers = await login(client, other)
+            token = await _sync_token(client, headers)
+            messages = f"/chats/{other.id}/messages"
+            await call(
+                client, owner_headers, "PATCH", messages + "/0",
+                {"text": "edited"}
+            )
+            await call(client, owner_headers, "DELETE", messages + "/1")
+            await call(
+                client, owner_headers, "POST",
+                f"/{left.id}/members/bulk/remove", {"members": [member.no]}
+            )
+            await call(
+                client, owner_headers, "POST", f"/{joined.id}/members/bulk",
+                {"invitees": [other.id]}
+            )
+            first = await _sync(client, headers, token)
+            again = await _sync(client, headers, token)
+            later = await _sync(client, headers, first["token"])
+        return owner, left, joined, first, again, later
+
+    owner, left, joined, first, again, later = asyncio.run(scenario())
+    chats = _by_related(first)
+    assert set(chats) == {owner.id, joined.id}
+    dialog = chats[owner.id]
+    assert dialog["complete"] is True
+    assert [(m["no"], m["text"]) for m in dialog["messages"]] == [
+        (0, "edited")
+    ]
+    assert dialog["deleted"] == [1]
+    assert chats[joined.id]["chat"]["role"] == "member"
+    assert first["left"] == [left.id]
+    # a token may be used again, e.g. when a response was lost
+    assert _without_token(again) == _without_token(first)
+    assert later["token"] >= first["token"]
+    assert later["chats"] == [] and later["left"] == []
+
+
+def test_stale_token_makes_chat_incomplete():
+    async def scenario():
+        db, owner, other = _users()
+        dialog = db.dialog(owner, other)
+        dialog.log.append(db.next_message_id(), owner, "first")
+        async with served(db) as client:
+            headers = await login(client, other)
+            token = await _sync_token(client, headers)
+            for no in range(SYNC_MAX_MESSAGES + 1):
+                dialog.log.append(db.next_message_id(), owner, f"text {no}")
+            return await _sync(client, headers, token)
+
+    changes = asyncio.run(scenario())
+    [chat] = changes["chats"]
+    assert chat["complete"] is False
+    assert chat["messages"] == chat["deleted"] == []
+
+
+def _users():
+    db = MemoryDatabase()
+    owner = db.create_user("owner", PASSWORD, "Owner")
+    other = db.create_user("other", PASSWORD, "Other")
+    return db, owner, other
+
+
+async def _sync_token(client, headers):
+    status, body = await call(client, headers, "GET", "/chats/sync")
+    assert status == 200, body
+    return body["response"]["token"]
+
+
+async def _sync(client, headers, token):
+    status, body = await call(
+        client, headers, "GET", f"/chats/sync?token={token}"
+    )
+    assert status == 200, body
+    return body["response"]
+
+
+def _by_related(changes):
+    return {chat["chat"]["related"]["id"]: chat for chat in changes["chats"]}
+
+
+def _without_token(changes):
+    return {key: value for key, value in changes.items() if key != "token"}
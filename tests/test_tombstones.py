@@ -0,0 +1,70 @@
+import random
+
+from microchat.storages.memory.tombstones import Tombstones
+
+
+def test_runs_are_joined_and_split():
+    tombstones = Tombstones()
+    for no in (5, 7, 3):
+        assert tombstones.add(no)
+    assert _runs(tombstones) == [(3, 4), (5, 6), (7, 8)]
+    assert tombstones.add(6)
+    assert _runs(tombstones) == [(3, 4), (5, 8)]
+    assert tombstones.add(4)
+    assert _runs(tombstones) == [(3, 8)]
+    assert not tombstones.add(5)
+    assert len(tombstones) == 5
+
+
+def test_skip_over_runs():
+    tombstones = _deleted([0, 1, 2, 5, 6, 9])
+    assert tombstones.skip(0) == 3
+    assert tombstones.skip(3) == 3
+    assert tombstones.skip(5) == 7
+    assert tombstones.skip(9) == 10
+    assert tombstones.skip_back(2) == -1
+    assert tombstones.skip_back(6) == 4
+    assert tombstones.skip_back(8) == 8
+
+
+def test_count_in_ranges():
+    tombstones = _deleted([0, 1, 2, 5, 6, 9])
+    assert tombstones.count(0, 10) == 6
+    assert tombstones.count(1, 6) == 3
+    assert tombstones.count(3, 5) == 0
+    assert tombstones.count(9, 9) == 0
+
+
+def test_matches_plain_set():
+    generator = random.Random(0)
+    tombstones = Tombstones()
+    deleted = set()
+    for _ in range(500):
+        no = generator.randrange(200)
+        assert tombstones.add(no) == (no not in deleted)
+        deleted.add(no)
+    starts = [start for start, _ in _runs(tombstones)]
+    stops = [stop for _, stop in _runs(tombstones)]
+    assert all(stop < start for stop, start in zip(stops, starts[1:]))
+    for no in range(210):
+        assert (no in tombstones) == (no in deleted)
+        assert tombstones.skip(no) == min(
+            n for n in range(no, 211) if n not in deleted
+        )
+        assert tombstones.skip_back(no) == max(
+            (n for n in range(no + 1) if n not in deleted), default=-1
+        )
+        assert tombstones.count(no // 2, no) == len(
+            [n for n in deleted if no // 2 <= n < no]
+        )
+
+
+def _deleted(nos):
+    tombstones = Tombstones()
+    for no in nos:
+        tombstones.add(no)
+    return tombstones
+
+
+def _runs(tombstones):
+    return list(zip(tombstones.starts, tombstones.stops))
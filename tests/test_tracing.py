@@ -0,0 +1,86 @@
+import asyncio
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from microchat.app import app
+from microchat.config import Config
+from microchat.core.jwt_manager import JWTManager
+from microchat.metrics import Registry, Tracer
+from microchat.server import create_app
+from microchat.storages.memory import MemoryDatabase, MemoryUoW
+
+from .client import PASSWORD, call, login
+
+
+def test_slow_storage_call_is_logged_and_traced(caplog):
+    config = Config.from_mapping({
+        "auth": {"jwt_secret": "secret"},
+        "metrics": {
+            "tracing": True, "slow_threshold": 0, "kept_traces": 1,
+            "token": "token",
+        },
+    })
+
+    async def scenario():
+        application = await create_app(config)
+        async with TestClient(TestServer(application)) as client:
+            payload = {"username": "nobody", "password": "password"}
+            for _ in range(2):
+                async with client.post(
+                    "/api/auth/sessions", json=payload
+                ) as response:
+                    assert response.status == 404
+            async with client.get("/api/debug/traces") as response:
+                assert response.status == 401
+            headers = {"Authorization": "Bearer token"}
+            async with client.get(
+                "/api/debug/traces", headers=headers
+            ) as response:
+                return response.status, await response.json()
+
+    status, body = asyncio.run(scenario())
+    assert status == 200
+    [trace] = body["response"]
+    assert trace["route"] == "POST /auth/sessions"
+    [call] = trace["storage_calls"]
+    slow = [
+        record.getMessage() for record in caplog.records
+        if record.name == "microchat.storage.slow"
+    ]
+    assert len(slow) == 2 * trace["storage_calls"][call]
+    assert all(message.startswith(call) for message in slow)
+    [span] = [span for span in trace["spans"] if span["name"] == "execute"]
+    assert [child["name"] for child in span["children"]] == [call]
+
+
+def test_shared_reads_are_traced_and_counted_per_app():
+    async def scenario():
+        db = MemoryDatabase()
+        owner = db.create_user("owner", PASSWORD, "Owner")
+        conference = db.create_conference(owner, "conference", "Conference")
+        conference.log.append(db.next_message_id(), owner, "text")
+        results = []
+        for _ in range(2):
+            registry, tracer = Registry(), Tracer()
+            application = await app(
+                lambda: MemoryUoW(db), JWTManager("secret"),
+                metrics=registry, tracer=tracer
+            )
+            async with TestClient(TestServer(application)) as client:
+                headers = await login(client, owner)
+                path = f"/chats/{conference.id}/messages"
+                page = await call(client, headers, "GET", path)
+                message = await call(client, headers, "GET", path + "/0")
+            results.append((page, message, registry, tracer))
+        return results
+
+    for page, message, registry, tracer in asyncio.run(scenario()):
+        assert page[0] == message[0] == 200
+        # a lookup of one message is not shared, it reads in request's UoW
+        shared = 'microchat_singleflight_calls_total{group="chats.messages"}'
+        assert f"{shared} 1\n" in registry.exposition()
+        [list_trace] = [
+            trace for trace in tracer.traces
+            if trace.route.endswith("/messages")
+        ]
+        assert list_trace.calls["chats.get_conference_messages"] == 1
@@ -0,0 +1,103 @@
+import asyncio
+
+from microchat.core.entities import ConferencePresence
+from microchat.storages.memory import MemoryDatabase
+
+from .client import PASSWORD, call, login, served
+
+
+def test_deleted_messages_are_not_unread():
+    async def scenario():
+        db, owner, other = _users()
+        dialog = db.dialog(owner, other)
+        for no in range(5):
+            dialog.log.append(db.next_message_id(), owner, f"text {no}")
+        async with served(db) as client:
+            owner_headers = await login(client, owner)
+            headers = await login(client, other)
+            before = await _chat(client, headers, owner.id)
+            for no in 1, 3:
+                await call(
+                    client, owner_headers, "DELETE",
+                    f"/chats/{other.id}/messages/{no}"
+                )
+            after = await _chat(client, headers, owner.id)
+            await _read(client, headers, owner.id, 2)
+            read = await _chat(client, headers, owner.id)
+        return before, after, read
+
+    before, after, read = asyncio.run(scenario())
+    assert before["unread"] == 5
+    assert after["unread"] == 3
+    # messages 3 (deleted) and 4 are after the read one
+    assert read["unread"] == 1
+
+
+def test_messages_of_private_conference_out_of_presence_are_not_unread():
+    async def scenario():
+        db, owner, other = _users()
+        conference = db.create_conference(
+            owner, "private", "Private", private=True
+        )
+        member = db.join(conference, other)
+        for no in range(8):
+            conference.log.append(db.next_message_id(), owner, f"text {no}")
+        # the member was away while messages 2, 3 and 4 were sent
+        member.presences = [_presence(0, 2), _presence(5, None)]
+        async with served(db) as client:
+            headers = await login(client, other)
+            before = await _chat(client, headers, conference.id)
+            await _read(client, headers, conference.id, 3)
+            read = await _chat(client, headers, conference.id)
+        return before, read
+
+    before, read = asyncio.run(scenario())
+    assert before["unread"] == 5
+    assert read["unread"] == 3
+
+
+def test_read_no_does_not_move_backwards():
+    async def scenario():
+        db, owner, other = _users()
+        dialog = db.dialog(owner, other)
+        for no in range(6):
+            dialog.log.append(db.next_message_id(), owner, f"text {no}")
+        async with served(db) as client:
+            headers = await login(client, other)
+            forward = await _read(client, headers, owner.id, 4)
+            backward = await _read(client, headers, owner.id, 1)
+            beyond = await _read(client, headers, owner.id, 100)
+        return forward, backward, beyond
+
+    forward, backward, beyond = asyncio.run(scenario())
+    assert (forward["read_no"], forward["unread"]) == (5, 1)
+    assert (backward["read_no"], backward["unread"]) == (5, 1)
+    assert (beyond["read_no"], beyond["unread"]) == (6, 0)
+
+
+def _users():
+    db = MemoryDatabase()
+    owner = db.create_user("owner", PASSWORD, "Owner")
+    other = db.create_user("other", PASSWORD, "Other")
+    return db, owner, other
+
+
+def _presence(join_at, leave_at):
+    presence = ConferencePresence()
+    presence.join_at = join_at
+    presence.leave_at = leave_at
+    return presence
+
+
+async def _chat(client, headers, id):
+    status, body = await call(client, headers, "GET", f"/chats/{id}")
+    assert status == 200, body
+    return body["response"]
+
+
+async def _read(client, headers, id, no):
+    status, body = await call(
+        client, headers, "POST", f"/chats/{id}/read", {"no": no}
+    )
+    assert status == 200, body
+    return body["response"]